@@ -1,10 +1,55 @@
+from .quectelCellBroadcast import QuectelCellBroadcast
+from .quectelConfigEngine import QuectelConfigEngine
+from .quectelDeviceRegistry import QuectelDeviceRegistry
+from .quectelGeofence import QuectelGeofenceEngine
 from .quectelGnssATCommands import QuectelGnssATCommands
+from .quectelGnssSession import QuectelGnssSession
 from .quectelModemATCommands import QuectelModemATCommands
+from .quectelNmeaLog import QuectelNmeaLog
+from .quectelNmeaReader import QuectelNmeaReader
+from .quectelNmeaSubscriptions import QuectelNmeaSubscriptions
+from .quectelPacketCounter import QuectelPacketCounter
+from .quectelPhonebook import QuectelPhonebook
+from .quectelPortDiscovery import QuectelPortDiscovery
+from .quectelRegistration import QuectelRegistrationTracker
+from .quectelSatelliteTable import QuectelSatelliteTable
 from .quectelSerial import QuectelSerial
+from .quectelSignalSampler import QuectelSignalSampler
+from .quectelSimulator import QuectelSimulatedSerial
+from .quectelSmsInbox import QuectelSmsInbox
+from .quectelSmsOutbox import QuectelSmsOutbox
+from .quectelSmsStorage import QuectelSmsStorage
+from .quectelSmsStream import QuectelSmsReassembler
+from .quectelTrackLog import QuectelTrackReader, QuectelTrackWriter
+from .quectelTtffBenchmark import QuectelTtffBenchmark
+from .quectelXtraManager import QuectelXtraManager
 
 
 __all__ = [
+    "QuectelCellBroadcast",
+    "QuectelConfigEngine",
+    "QuectelDeviceRegistry",
+    "QuectelGeofenceEngine",
     "QuectelGnssATCommands",
+    "QuectelGnssSession",
     "QuectelModemATCommands",
+    "QuectelNmeaLog",
+    "QuectelNmeaReader",
+    "QuectelNmeaSubscriptions",
+    "QuectelPacketCounter",
+    "QuectelPhonebook",
+    "QuectelPortDiscovery",
+    "QuectelRegistrationTracker",
+    "QuectelSatelliteTable",
     "QuectelSerial",
+    "QuectelSignalSampler",
+    "QuectelSimulatedSerial",
+    "QuectelSmsInbox",
+    "QuectelSmsOutbox",
+    "QuectelSmsStorage",
+    "QuectelSmsReassembler",
+    "QuectelTrackReader",
+    "QuectelTrackWriter",
+    "QuectelTtffBenchmark",
+    "QuectelXtraManager",
 ]
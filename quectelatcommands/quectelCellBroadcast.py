@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import splitResponseFields
+from quectelatcommands.quectelSmsPdu import (
+    ENCODING_8BIT,
+    ENCODING_GSM7,
+    ENCODING_UCS2,
+    gsm7Decode,
+    gsm7Encode,
+    packSeptets,
+    unpackSeptets,
+)
+
+URC_CELL_BROADCAST = "+CBM:"
+
+# AT+CNMI <bm> routing the messages directly with +CBM
+CNMI_BM_DIRECT = 2
+
+# Message identifiers of the public warning systems: ETWS, then CMAS and EU-Alert
+PWS_CHANNELS = "4352-4359,4370-4399"
+
+# GSM format of a page (3GPP TS 23.041 9.4.1.2): 6 octet header, 82 octet content
+CBS_HEADER_OCTETS = 6
+CBS_PAGE_OCTETS = 82
+CBS_PAGE_SEPTETS = 93
+CBS_MAX_PAGES = 15
+# UMTS format (9.4.2.2), every page in one PDU: message type, then 82 octet pages
+# followed by their length
+CBS_MESSAGE_TYPE = 1
+CBS_UMTS_HEADER_OCTETS = 7
+
+# Padding of the pages
+CBS_PADDING = "\r"
+
+# Languages of the coding groups 0 and 2 of the data coding scheme (3GPP TS 23.038)
+CBS_LANGUAGES = (
+    "de",
+    "en",
+    "it",
+    "fr",
+    "es",
+    "nl",
+    "sv",
+    "da",
+    "pt",
+    "fi",
+    "no",
+    "el",
+    "tr",
+    "hu",
+    "pl",
+    None,
+)
+CBS_LANGUAGES_GROUP_2 = ("cs", "he", "ar", "ru", "is")
+
+# Data coding schemes of the encoded pages: GSM 7 bit language unspecified, UCS2
+DCS_GSM7 = 0x0F
+DCS_UCS2 = 0x48
+
+
+class CbsPage(NamedTuple):
+    """
+    Page of a cell broadcast message.
+    """
+
+    serial: int
+    messageId: int
+    dcs: int
+    # Page number and number of pages, from 1
+    page: int
+    pages: int
+    # ISO 639 language, None when not given by the data coding scheme
+    language: Optional[str]
+    # Decoded text, None for 8 bit data
+    text: Optional[str]
+    data: bytes
+
+
+class CellBroadcast(NamedTuple):
+    """
+    Cell broadcast message reassembled from its pages.
+    """
+
+    serial: int
+    messageId: int
+    dcs: int
+    language: Optional[str]
+    # Text, None for 8 bit data
+    text: Optional[str]
+    data: bytes
+    pages: int
+    # False when pages are missing: the pages received are joined in order
+    complete: bool
+    # Port of the module which received the first page
+    port: str
+    # time.monotonic() of the first page
+    receivedTime: float
+
+    @property
+    def geographicalScope(self) -> int:
+        """
+        0 cell wide immediate, 1 PLMN wide, 2 location area wide, 3 cell wide.
+        """
+        return self.serial >> 14
+
+    @property
+    def messageCode(self) -> int:
+        return (self.serial >> 4) & 0x3FF
+
+    @property
+    def updateNumber(self) -> int:
+        return self.serial & 0xF
+
+
+def cbsCoding(p_dcs: int) -> tuple[str, Optional[str], bool]:
+    """
+    Get the coding of a cell broadcast data coding scheme (3GPP TS 23.038 5).
+
+    :param p_dcs: Data coding scheme.
+    :type p_dcs: int
+
+    :return: Encoding (ENCODING_GSM7, ENCODING_8BIT or ENCODING_UCS2), language, and
+        whether the language is given by the first two characters of the text instead.
+    :rtype: tuple[str, Optional[str], bool]
+    """
+    group = p_dcs >> 4
+    if group == 0x0:
+        return ENCODING_GSM7, CBS_LANGUAGES[p_dcs & 0x0F], False
+    if group == 0x1:
+        if p_dcs == 0x11:
+            return ENCODING_UCS2, None, True
+        return ENCODING_GSM7, None, p_dcs == 0x10
+    if group == 0x2:
+        index = p_dcs & 0x0F
+        language = (
+            CBS_LANGUAGES_GROUP_2[index] if index < len(CBS_LANGUAGES_GROUP_2) else None
+        )
+        return ENCODING_GSM7, language, False
+    if group == 0x3:
+        return ENCODING_GSM7, None, False
+    if 0x4 <= group <= 0x7 or group == 0x9:
+        if p_dcs & 0x20:
+            # Compressed
+            return ENCODING_8BIT, None, False
+        alphabet = (p_dcs >> 2) & 0x03
+        encoding = {0: ENCODING_GSM7, 2: ENCODING_UCS2}.get(alphabet, ENCODING_8BIT)
+        return encoding, None, False
+    if group == 0xF:
+        return (ENCODING_8BIT if p_dcs & 0x04 else ENCODING_GSM7), None, False
+    return ENCODING_8BIT, None, False
+
+
+def _decodeContent(
+    p_content: bytes, p_dcs: int
+) -> tuple[Optional[str], Optional[str], bytes]:
+    """
+    Decode the content of a page.
+
+    :return: Language, text (None for 8 bit data) and data.
+    """
+    encoding, language, indicated = cbsCoding(p_dcs)
+    if encoding == ENCODING_GSM7:
+        text = gsm7Decode(unpackSeptets(p_content, len(p_content) * 8 // 7))
+        if indicated:
+            # Language, then a carriage return
+            language, text = text[:2], text[3:]
+        return language, text.rstrip(CBS_PADDING), b""
+    if encoding == ENCODING_UCS2:
+        content = p_content
+        if indicated:
+            # Language as 2 GSM 7 bit characters padded to 2 octets
+            language = gsm7Decode(unpackSeptets(content[:2], 2))
+            content = content[2:]
+        text = content[: len(content) // 2 * 2].decode("utf-16-be", errors="replace")
+        return language, text.rstrip(CBS_PADDING + "\x00"), b""
+    return language, None, p_content
+
+
+def decodeCbsPdu(p_pdu: str) -> list[CbsPage]:
+    """
+    Decode a cell broadcast PDU: one page in the GSM format, or every page in the UMTS
+    format.
+
+    :param p_pdu: PDU in hexadecimal, as given by ``+CBM`` in PDU mode.
+    :type p_pdu: str
+
+    :raises ValueError: If the PDU is malformed.
+
+    :return: Pages.
+    :rtype: list[CbsPage]
+    """
+    pdu = bytes.fromhex(p_pdu)
+    umtsLength = len(pdu) - CBS_UMTS_HEADER_OCTETS
+    if (
+        len(pdu) != CBS_HEADER_OCTETS + CBS_PAGE_OCTETS
+        and pdu[:1] == bytes([CBS_MESSAGE_TYPE])
+        and umtsLength > 0
+        and umtsLength % (CBS_PAGE_OCTETS + 1) == 0
+    ):
+        messageId = int.from_bytes(pdu[1:3], "big")
+        serial = int.from_bytes(pdu[3:5], "big")
+        dcs = pdu[5]
+        pages = pdu[6]
+        if pages != umtsLength // (CBS_PAGE_OCTETS + 1):
+            raise ValueError(f"Number of pages {pages} does not match the length")
+        result = []
+        for page in range(pages):
+            offset = CBS_UMTS_HEADER_OCTETS + page * (CBS_PAGE_OCTETS + 1)
+            length = min(pdu[offset + CBS_PAGE_OCTETS], CBS_PAGE_OCTETS)
+            language, text, data = _decodeContent(pdu[offset : offset + length], dcs)
+            result.append(
+                CbsPage(serial, messageId, dcs, page + 1, pages, language, text, data)
+            )
+        return result
+
+    if len(pdu) <= CBS_HEADER_OCTETS:
+        raise ValueError(f"Cell broadcast PDU too short: {len(pdu)} octets")
+    serial = int.from_bytes(pdu[0:2], "big")
+    messageId = int.from_bytes(pdu[2:4], "big")
+    dcs = pdu[4]
+    # Page parameter 0x00 stands for 1/1
+    page, pages = (pdu[5] >> 4) or 1, (pdu[5] & 0x0F) or 1
+    if page > pages:
+        raise ValueError(f"Page {page} of {pages}")
+    language, text, data = _decodeContent(pdu[CBS_HEADER_OCTETS:], dcs)
+    return [CbsPage(serial, messageId, dcs, page, pages, language, text, data)]
+
+
+def decodeCbmUrc(p_urc: str) -> list[CbsPage]:
+    """
+    Decode a ``+CBM`` URC, in PDU or text mode.
+
+    :param p_urc: URC lines joined with ``\\n``: ``+CBM: <length>`` then the PDU, or
+        ``+CBM: <sn>,<mid>,<dcs>,<page>,<pages>`` then the text.
+    :type p_urc: str
+
+    :raises ValueError: If the URC is malformed.
+
+    :return: Pages.
+    :rtype: list[CbsPage]
+    """
+    header, _, body = p_urc.partition("\n")
+    fields = splitResponseFields(header)
+    if len(fields) == 1:
+        return decodeCbsPdu(body.strip())
+    if len(fields) < 5:
+        raise ValueError(f"Malformed +CBM: {header}")
+    serial, messageId, dcs, page, pages = (int(field) for field in fields[:5])
+    encoding, language, indicated = cbsCoding(dcs)
+    text = body
+    if indicated and encoding == ENCODING_GSM7:
+        language, text = text[:2], text[3:]
+    return [
+        CbsPage(
+            serial,
+            messageId,
+            dcs,
+            page,
+            pages,
+            language,
+            text.rstrip(CBS_PADDING),
+            b"",
+        )
+    ]
+
+
+def encodeCbsPages(
+    p_messageId: int, p_serial: int, p_text: str, p_dcs: Optional[int] = None
+) -> list[str]:
+    """
+    Encode a cell broadcast message into pages of the GSM format, e.g. for the
+    simulator.
+
+    :param p_messageId: Message identifier, e.g. 4370 for a presidential alert.
+    :type p_messageId: int
+    :param p_serial: Serial number: geographical scope, message code, update number.
+    :type p_serial: int
+    :param p_text: Text.
+    :type p_text: str
+    :param p_dcs: Data coding scheme, None for DCS_GSM7 or DCS_UCS2 depending on the
+        text. Only GSM 7 bit and UCS2 schemes without language indication are supported.
+    :type p_dcs: Optional[int]
+
+    :raises ValueError: If the text needs more than 15 pages.
+
+    :return: Pages in hexadecimal.
+    :rtype: list[str]
+    """
+    septets = gsm7Encode(p_text)
+    dcs = (
+        p_dcs if p_dcs is not None else (DCS_GSM7 if septets is not None else DCS_UCS2)
+    )
+    contents = []
+    if cbsCoding(dcs)[0] == ENCODING_GSM7 and septets is not None:
+        padding = gsm7Encode(CBS_PADDING) or b""
+        while septets or not contents:
+            size = CBS_PAGE_SEPTETS
+            # An escape is not separated from its character
+            if len(septets) > size and septets[size - 1] == 0x1B:
+                size -= 1
+            contents.append(
+                packSeptets(septets[:size].ljust(CBS_PAGE_SEPTETS, padding))
+            )
+            septets = septets[size:]
+    else:
+        data = p_text.encode("utf-16-be")
+        characters = CBS_PAGE_OCTETS // 2
+        padding = CBS_PADDING.encode("utf-16-be")
+        while data or not contents:
+            page = data[: characters * 2]
+            page += padding * ((CBS_PAGE_OCTETS - len(page)) // 2)
+            contents.append(page.ljust(CBS_PAGE_OCTETS, b"\x00"))
+            data = data[characters * 2 :]
+
+    if len(contents) > CBS_MAX_PAGES:
+        raise ValueError(f"Text needs {len(contents)} pages, {CBS_MAX_PAGES} at most")
+    pages = []
+    for number, content in enumerate(contents, 1):
+        header = (
+            p_serial.to_bytes(2, "big")
+            + p_messageId.to_bytes(2, "big")
+            + bytes([dcs, (number << 4) | len(contents)])
+        )
+        pages.append((header + content[:CBS_PAGE_OCTETS]).hex().upper())
+    return pages
+
+
+class QuectelCellBroadcast:
+    def __init__(
+        self,
+        p_maxPending: int = 32,
+        p_dedupeSize: int = 1024,
+    ):
+        """
+        Stream of the cell broadcast messages of one or several modules, e.g. for a
+        public warning gateway.
+
+        ``attach`` selects the channels and data coding schemes with ``AT+CSCB`` and
+        routes the messages with ``+CBM``. The pages are decoded in the URC handler,
+        multi-page messages are reassembled, and every message is given once to each
+        subscriber queue, however many modules received it: the messages are identified
+        by their message identifier, serial number and data coding scheme, the last
+        ``p_dedupeSize`` ones being remembered. A new version of a message has a new
+        update number, so it is given again. A message given incomplete is given once
+        more when all its pages are received, e.g. from another module or when it is
+        repeated, but not twice incomplete.
+
+        :param p_maxPending: Maximum number of incomplete multi-page messages kept; the
+            oldest one is given incomplete when another one arrives.
+        :type p_maxPending: int
+        :param p_dedupeSize: Number of messages remembered to drop the duplicates.
+        :type p_dedupeSize: int
+        """
+        self.maxPending = p_maxPending
+        self.dedupeSize = p_dedupeSize
+        self.lock = threading.Lock()
+        # (message identifier, serial number, data coding scheme) to the pages received,
+        # the port and the time of the first one
+        self.pending: OrderedDict[
+            tuple[int, int, int], tuple[dict[int, CbsPage], str, float]
+        ] = OrderedDict()
+        # Keys of the messages given, to whether they were complete
+        self.recent: OrderedDict[tuple[int, int, int], bool] = OrderedDict()
+        self.subscribers: list[queue.Queue[CellBroadcast]] = []
+        self.handlers: dict[QuectelModemATCommands, Callable[[str], None]] = {}
+        self.statistics = {
+            "pages": 0,
+            "messages": 0,
+            "duplicates": 0,
+            "incomplete": 0,
+            "malformed": 0,
+            "dropped": 0,
+        }
+
+    def attach(
+        self,
+        p_modem: QuectelModemATCommands,
+        p_channels: str = PWS_CHANNELS,
+        p_dcss: str = "",
+    ) -> tuple[bool, list[str]]:
+        """
+        Receive the cell broadcast messages of a module.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_channels: Message identifiers accepted, e.g. ``"0,50,4370-4399"``.
+        :type p_channels: str
+        :param p_dcss: Data coding schemes accepted, e.g. ``"0-3,5"``, empty for all.
+        :type p_dcss: str
+
+        :return: Tuple containing the status of the configuration and the responses.
+        :rtype: tuple[bool, list[str]]
+        """
+        port = p_modem.serialPort.port
+
+        def handler(p_urc: str):
+            self._onBroadcast(port, p_urc)
+
+        self.handlers[p_modem] = handler
+        p_modem.serialPort.addUrcHandler(URC_CELL_BROADCAST, handler, 2)
+
+        response: list[str] = []
+        status = True
+        for commandStatus, commandResponse in (
+            p_modem.shortMessageServiceCommands914SelectCellBroadcastMessageTypesWrite(
+                0, p_channels, p_dcss
+            ),
+            p_modem.updateSmsEventReporting(p_bm=CNMI_BM_DIRECT),
+        ):
+            status = status and commandStatus
+            response += commandResponse
+        if not status:
+            self.detach(p_modem)
+        return status, response
+
+    def detach(self, p_modem: QuectelModemATCommands):
+        """
+        Stop receiving the messages of a module.
+
+        :param p_modem: Modem client given to ``attach``.
+        :type p_modem: QuectelModemATCommands
+        """
+        handler = self.handlers.pop(p_modem, None)
+        if handler is not None:
+            p_modem.serialPort.removeUrcHandler(URC_CELL_BROADCAST, handler)
+
+    def subscribe(self, p_queueSize: int = 64) -> queue.Queue[CellBroadcast]:
+        """
+        Get a queue of the messages received from now on.
+
+        When the subscriber is late and its queue is full, the oldest message is dropped
+        for the new one.
+
+        :param p_queueSize: Maximum number of messages waiting in the queue.
+        :type p_queueSize: int
+
+        :return: Queue of the messages.
+        :rtype: queue.Queue[CellBroadcast]
+        """
+        subscriber: queue.Queue[CellBroadcast] = queue.Queue(maxsize=p_queueSize)
+        with self.lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, p_subscriber: queue.Queue[CellBroadcast]):
+        """
+        Stop giving the messages to a queue.
+
+        :param p_subscriber: Queue returned by ``subscribe``.
+        :type p_subscriber: queue.Queue[CellBroadcast]
+        """
+        with self.lock:
+            if p_subscriber in self.subscribers:
+                self.subscribers.remove(p_subscriber)
+
+    def flush(self):
+        """
+        Give the multi-page messages still waiting for pages, incomplete.
+        """
+        with self.lock:
+            while self.pending:
+                key, (pages, port, receivedTime) = self.pending.popitem(last=False)
+                self._deliver(key, pages, port, receivedTime)
+
+    def _onBroadcast(self, p_port: str, p_urc: str):
+        try:
+            pages = decodeCbmUrc(p_urc)
+        except ValueError:
+            self.statistics["malformed"] += 1
+            return
+
+        now = time.monotonic()
+        with self.lock:
+            for page in pages:
+                self.statistics["pages"] += 1
+                key = (page.messageId, page.serial, page.dcs)
+                if self.recent.get(key):
+                    self.recent.move_to_end(key)
+                    self.statistics["duplicates"] += 1
+                    continue
+
+                received, port, receivedTime = self.pending.setdefault(
+                    key, ({}, p_port, now)
+                )
+                received[page.page] = page
+                if len(received) >= page.pages:
+                    del self.pending[key]
+                    self._deliver(key, received, port, receivedTime)
+
+            while len(self.pending) > self.maxPending:
+                key, (received, port, receivedTime) = self.pending.popitem(last=False)
+                self._deliver(key, received, port, receivedTime)
+
+    def _deliver(
+        self,
+        p_key: tuple[int, int, int],
+        p_pages: dict[int, CbsPage],
+        p_port: str,
+        p_receivedTime: float,
+    ):
+        """
+        Give a message to the subscribers, the lock being held.
+        """
+        pages = [p_pages[number] for number in sorted(p_pages)]
+        texts = [page.text for page in pages]
+        first = pages[0]
+        message = CellBroadcast(
+            first.serial,
+            first.messageId,
+            first.dcs,
+            first.language,
+            "".join(texts) if None not in texts else None,
+            b"".join(page.data for page in pages),
+            first.pages,
+            len(pages) == first.pages,
+            p_port,
+            p_receivedTime,
+        )
+
+        if not message.complete and p_key in self.recent:
+            # Already given, complete or not: only all the pages make a new message
+            self.recent.move_to_end(p_key)
+            self.statistics["duplicates"] += 1
+            return
+        self.recent[p_key] = message.complete
+        self.recent.move_to_end(p_key)
+        while len(self.recent) > self.dedupeSize:
+            self.recent.popitem(last=False)
+        self.statistics["messages"] += 1
+        if not message.complete:
+            self.statistics["incomplete"] += 1
+
+        for subscriber in self.subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(message)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                        self.statistics["dropped"] += 1
+                    except queue.Empty:
+                        pass
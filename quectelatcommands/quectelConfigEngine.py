@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+
+import json
+from typing import Any, Callable, Optional
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    responsePrefix,
+    splitResponseFields,
+)
+
+
+def _toInt(p_value: Any) -> int:
+    """
+    Convert a document or response value to an integer, accepting ``"0x..."`` strings.
+    """
+    if isinstance(p_value, str):
+        return int(p_value, 0) if p_value.lower().startswith("0x") else int(p_value)
+    return int(p_value)
+
+
+class QuectelConfigSetting:
+    def __init__(
+        self,
+        p_order: int,
+        p_readCommand: str,
+        p_parse: Callable[[list[str]], Any],
+        p_normalize: Callable[[Any], Any],
+        p_write: Callable[[Any, Any], tuple[bool, list[str]]],
+        p_fields: tuple[str, ...] = (),
+    ):
+        """
+        Setting managed by the configuration engine.
+
+        :param p_order: Rank of the setting in the write sequence, lower values are written first.
+        :type p_order: int
+        :param p_readCommand: AT command reading the current value.
+        :type p_readCommand: str
+        :param p_parse: Convert the response lines of ``p_readCommand`` into a value, ``None`` if unknown.
+        :type p_parse: Callable[[list[str]], Any]
+        :param p_normalize: Convert a value of the desired-state document into a comparable value.
+        :type p_normalize: Callable[[Any], Any]
+        :param p_write: Write a value with the AT commands client.
+        :type p_write: Callable[[Any, Any], tuple[bool, list[str]]]
+        :param p_fields: Keys that a dictionary value must give when the current value is
+            unknown, the missing keys being otherwise taken from the current value.
+        :type p_fields: tuple[str, ...]
+        """
+        self.order = p_order
+        self.readCommand = p_readCommand
+        self.parse = p_parse
+        self.normalize = p_normalize
+        self.write = p_write
+        self.fields = p_fields
+
+    def matches(self, p_current: Any, p_desired: Any) -> bool:
+        """
+        Check whether the current value already satisfies the desired value.
+
+        For dictionary values, only the keys given in the desired value are compared.
+
+        :param p_current: Current value, as returned by ``parse``.
+        :type p_current: Any
+        :param p_desired: Desired value, as returned by ``normalize``.
+        :type p_desired: Any
+
+        :return: True if no write is needed.
+        :rtype: bool
+        """
+        if p_current is None:
+            return False
+        if isinstance(p_desired, dict):
+            return all(p_current.get(key) == value for key, value in p_desired.items())
+        return p_current == p_desired
+
+
+def _firstFields(p_prefix: str) -> Callable[[list[str]], Optional[list[str]]]:
+    def fields(p_lines: list[str]) -> Optional[list[str]]:
+        lines = findResponseLines(p_lines, p_prefix)
+        return splitResponseFields(lines[0]) if lines else None
+
+    return fields
+
+
+def _subCommandSetting(
+    p_order: int,
+    p_command: str,
+    p_name: str,
+    p_convert: Callable[[Any], Any],
+    p_write: Callable[[Any, Any], tuple[bool, list[str]]],
+) -> QuectelConfigSetting:
+    """
+    Setting read with ``AT+<command>="<name>"`` and answered by ``+<command>: "<name>",<value>``.
+    """
+    readCommand = f'AT+{p_command}="{p_name}"'
+    fields = _firstFields(responsePrefix(readCommand))
+
+    def parse(p_lines: list[str]) -> Any:
+        values = fields(p_lines)
+        return p_convert(values[1]) if values and len(values) > 1 else None
+
+    return QuectelConfigSetting(p_order, readCommand, parse, p_convert, p_write)
+
+
+def _queryIntSetting(
+    p_order: int,
+    p_command: str,
+    p_write: Callable[[Any, Any], tuple[bool, list[str]]],
+) -> QuectelConfigSetting:
+    """
+    Setting read with ``AT+<command>?`` and answered by ``+<command>: <value>``.
+    """
+    fields = _firstFields(f"+{p_command}:")
+
+    def parse(p_lines: list[str]) -> Optional[int]:
+        values = fields(p_lines)
+        return _toInt(values[0]) if values else None
+
+    return QuectelConfigSetting(p_order, f"AT+{p_command}?", parse, _toInt, p_write)
+
+
+def _bandSetting() -> QuectelConfigSetting:
+    fields = _firstFields('+QCFG: "band"')
+
+    def parse(p_lines: list[str]) -> Optional[dict]:
+        values = fields(p_lines)
+        if not values or len(values) < 3:
+            return None
+        return {"bandval": int(values[1], 16), "ltebandval": int(values[2], 16)}
+
+    def normalize(p_value: dict) -> dict:
+        return {key: _toInt(value) for key, value in p_value.items()}
+
+    def write(p_client: QuectelModemATCommands, p_value: dict):
+        return p_client.statusControlCommands40306ConfigureBand(
+            p_value["bandval"], p_value["ltebandval"]
+        )
+
+    return QuectelConfigSetting(
+        40, 'AT+QCFG="band"', parse, normalize, write, ("bandval", "ltebandval")
+    )
+
+
+_PDP_FIELDS = (
+    ("pdp_type", str, "IP"),
+    ("apn", str, ""),
+    ("pdp_addr", str, ""),
+    ("data_comp", int, 0),
+    ("head_comp", int, 0),
+    ("ipv4_addr_alloc", int, 0),
+    ("request_type", int, 0),
+    ("p_cscf_discovery", int, 0),
+    ("im_cn_signalling_flag_ind", int, 0),
+)
+
+
+def _pdpSetting(p_cid: int) -> QuectelConfigSetting:
+    def parse(p_lines: list[str]) -> Optional[dict]:
+        for line in findResponseLines(p_lines, "+CGDCONT:"):
+            values = splitResponseFields(line)
+            if values[0] == str(p_cid):
+                return {
+                    name: convert(value) if value != "" else default
+                    for (name, convert, default), value in zip(_PDP_FIELDS, values[1:])
+                }
+        return None
+
+    def normalize(p_value: dict) -> dict:
+        converters = {name: convert for name, convert, _ in _PDP_FIELDS}
+        return {key: converters[key](value) for key, value in p_value.items()}
+
+    def write(p_client: QuectelModemATCommands, p_value: dict):
+        values = {name: default for name, _, default in _PDP_FIELDS}
+        values.update(p_value)
+        return p_client.packetDomainCommands1002DefinePdpContextWrite(
+            p_cid, *(values[name] for name, _, _ in _PDP_FIELDS)
+        )
+
+    return QuectelConfigSetting(60, "AT+CGDCONT?", parse, normalize, write)
+
+
+def _urcSetting(p_urcType: str) -> QuectelConfigSetting:
+    return _subCommandSetting(
+        50,
+        "QINDCFG",
+        p_urcType,
+        _toInt,
+        lambda p_client, p_value: p_client.statusControlCommands40400ControlUrcIndication(
+            p_urcType, p_value, 1
+        ),
+    )
+
+
+def _gnssSetting(
+    p_order: int, p_name: str, p_write: Callable[[Any, Any], tuple[bool, list[str]]]
+) -> QuectelConfigSetting:
+    return _subCommandSetting(p_order, "QGPSCFG", p_name, _toInt, p_write)
+
+
+MODEM_SETTINGS: dict[str, Callable[[], QuectelConfigSetting]] = {
+    "cmee": lambda: _queryIntSetting(
+        0,
+        "CMEE",
+        lambda p_client, p_value: p_client.generalCommands222ErrorMessageFormatWrite(
+            p_value
+        ),
+    ),
+    "servicedomain": lambda: _subCommandSetting(
+        10,
+        "QCFG",
+        "servicedomain",
+        _toInt,
+        lambda p_client, p_value: p_client.statusControlCommands40305ConfigureServiceDomain(
+            p_value, 1
+        ),
+    ),
+    "gprsattach": lambda: _subCommandSetting(
+        10,
+        "QCFG",
+        "gprsattach",
+        _toInt,
+        lambda p_client, p_value: p_client.statusControlCommands40301ConfigureGprsAttachMode(
+            p_value, 1
+        ),
+    ),
+    "nwscanmode": lambda: _subCommandSetting(
+        20,
+        "QCFG",
+        "nwscanmode",
+        _toInt,
+        lambda p_client, p_value: p_client.statusControlCommands40302ConfigureNetworkSearchMode(
+            p_value
+        ),
+    ),
+    "nwscanseq": lambda: _subCommandSetting(
+        30,
+        "QCFG",
+        "nwscanseq",
+        _toInt,
+        lambda p_client, p_value: p_client.statusControlCommands40303ConfigureNetworkSearchingSequence(
+            p_value
+        ),
+    ),
+    "roamserviceex": lambda: _subCommandSetting(
+        30,
+        "QCFG",
+        "roamserviceex",
+        _toInt,
+        lambda p_client, p_value: p_client.statusControlCommands40304ConfigureRelevantFunctionsInRoamingState(
+            p_value
+        ),
+    ),
+    "band": _bandSetting,
+    "cmgf": lambda: _queryIntSetting(
+        70,
+        "CMGF",
+        lambda p_client, p_value: p_client.shortMessageServiceCommands902MessageFormatWrite(
+            p_value
+        ),
+    ),
+}
+
+GNSS_SETTINGS: dict[str, Callable[[], QuectelConfigSetting]] = {
+    "gnssconfig": lambda: _gnssSetting(
+        10,
+        "gnssconfig",
+        lambda p_client, p_value: p_client.configureGnss20207ConfigureSupportedGnssConstellationsWrite(
+            p_value
+        ),
+    ),
+    "outport": lambda: _subCommandSetting(
+        20,
+        "QGPSCFG",
+        "outport",
+        str,
+        lambda p_client, p_value: p_client.configureGnss20201ConfigureOutputPortOfNmeaSentencesWrite(
+            p_value
+        ),
+    ),
+    "nmeasrc": lambda: _gnssSetting(
+        20,
+        "nmeasrc",
+        lambda p_client, p_value: p_client.configureGnss20202EnableDisableAcquisitionOfNmeaSentencesWrite(
+            p_value
+        ),
+    ),
+    "gpsnmeatype": lambda: _gnssSetting(
+        30,
+        "gpsnmeatype",
+        lambda p_client, p_value: p_client.configureGnss20203ConfigureOutputTypeOfGpsNmeaWrite(
+            p_value
+        ),
+    ),
+    "glonassnmeatype": lambda: _gnssSetting(
+        30,
+        "glonassnmeatype",
+        lambda p_client, p_value: p_client.configureGnss20204ConfigureOutputTypeOfGlonassNmeaSentencesWrite(
+            p_value
+        ),
+    ),
+    "galileonmeatype": lambda: _gnssSetting(
+        30,
+        "galileonmeatype",
+        lambda p_client, p_value: p_client.configureGnss20205ConfigureOutputTypeOfGalileoNmeaSentencesWrite(
+            p_value
+        ),
+    ),
+    "beidounmeatype": lambda: _gnssSetting(
+        30,
+        "beidounmeatype",
+        lambda p_client, p_value: p_client.configureGnss20206ConfigureOutputTypeOfBeidouNmeaSentencesWrite(
+            p_value
+        ),
+    ),
+    "gsvextnmeatype": lambda: _gnssSetting(
+        30,
+        "gsvextnmeatype",
+        lambda p_client, p_value: p_client.configureGnss20210EnableDisableGnssExtendedGgsvWrite(
+            p_value
+        ),
+    ),
+    "odpcontrol": lambda: _gnssSetting(
+        50,
+        "odpcontrol",
+        lambda p_client, p_value: p_client.configureGnss20208ConfigureOdpModeWrite(
+            p_value
+        ),
+    ),
+    "dpoenable": lambda: _gnssSetting(
+        50,
+        "dpoenable",
+        lambda p_client, p_value: p_client.configureGnss20209EnableDisableDpoModeWrite(
+            p_value
+        ),
+    ),
+    "plane": lambda: _gnssSetting(
+        50,
+        "plane",
+        lambda p_client, p_value: p_client.configureGnss20211ConfigurePlaneModeUsedByMoAgpsSessionWrite(
+            p_value
+        ),
+    ),
+    "autogps": lambda: _gnssSetting(
+        50,
+        "autogps",
+        lambda p_client, p_value: p_client.configureGnss20212EnableDisableGnssToRunAutomaticallyWrite(
+            p_value
+        ),
+    ),
+    "suplver": lambda: _gnssSetting(
+        50,
+        "suplver",
+        lambda p_client, p_value: p_client.configureGnss20213ConfigureSuplProtocolVersionWrite(
+            p_value
+        ),
+    ),
+    "agpsposmode": lambda: _gnssSetting(
+        50,
+        "agpsposmode",
+        lambda p_client, p_value: p_client.configureGnss20214ConfigureAgpsPositioningModeWrite(
+            p_value
+        ),
+    ),
+    "fixfreq": lambda: _gnssSetting(
+        60,
+        "fixfreq",
+        lambda p_client, p_value: p_client.configureGnss20216ConfigureNmeaOutputFrequencyWrite(
+            p_value
+        ),
+    ),
+}
+
+
+class QuectelConfigEngine:
+    def __init__(
+        self,
+        p_modem: Optional[QuectelModemATCommands] = None,
+        p_gnss: Optional[QuectelGnssATCommands] = None,
+    ):
+        """
+        Apply a desired-state configuration document, writing only the settings that differ.
+
+        The document has a ``"modem"`` and/or a ``"gnss"`` section, for example:
+
+        .. code-block:: json
+
+            {
+                "modem": {
+                    "nwscanmode": 3,
+                    "band": {"bandval": "0x0", "ltebandval": "0x80800C5"},
+                    "urc": {"csq": 1, "smsfull": 1},
+                    "pdp": {"1": {"pdp_type": "IP", "apn": "internet"}}
+                },
+                "gnss": {"outport": "usbnmea", "gpsnmeatype": 2, "fixfreq": 1}
+            }
+
+        Supported keys are those of ``MODEM_SETTINGS`` and ``GNSS_SETTINGS``, plus the
+        ``"urc"`` (``AT+QINDCFG``) and ``"pdp"`` (``AT+CGDCONT``) modem groups.
+
+        :param p_modem: Opened client used for the ``"modem"`` section.
+        :type p_modem: Optional[QuectelModemATCommands]
+        :param p_gnss: Opened client used for the ``"gnss"`` section.
+        :type p_gnss: Optional[QuectelGnssATCommands]
+        """
+        self.clients = {"modem": p_modem, "gnss": p_gnss}
+
+    @staticmethod
+    def loadDocument(p_fileName: str) -> dict:
+        """
+        Load a desired-state document from a JSON file.
+
+        :param p_fileName: Path of the JSON file.
+        :type p_fileName: str
+
+        :return: Desired-state document.
+        :rtype: dict
+        """
+        with open(p_fileName, "r") as f:
+            return json.load(f)
+
+    def settings(
+        self, p_document: dict
+    ) -> dict[tuple[str, str], tuple[QuectelConfigSetting, Any]]:
+        """
+        Flatten a desired-state document into settings.
+
+        :param p_document: Desired-state document.
+        :type p_document: dict
+
+        :raises KeyError: If the document contains an unknown setting.
+
+        :return: ``(section, key)`` to ``(setting, desired value)``.
+        :rtype: dict[tuple[str, str], tuple[QuectelConfigSetting, Any]]
+        """
+        settings = {}
+        for section, values in p_document.items():
+            table = {"modem": MODEM_SETTINGS, "gnss": GNSS_SETTINGS}[section]
+            for key, value in values.items():
+                if section == "modem" and key == "urc":
+                    for urcType, enable in value.items():
+                        setting = _urcSetting(urcType)
+                        settings[(section, f"urc.{urcType}")] = (setting, enable)
+                elif section == "modem" and key == "pdp":
+                    for cid, context in value.items():
+                        setting = _pdpSetting(int(cid))
+                        settings[(section, f"pdp.{cid}")] = (setting, context)
+                else:
+                    settings[(section, key)] = (table[key](), value)
+        return settings
+
+    def readCurrent(self, p_document: dict) -> dict[tuple[str, str], Any]:
+        """
+        Read the current value of every setting of a document, one batch per client.
+
+        :param p_document: Desired-state document.
+        :type p_document: dict
+
+        :return: ``(section, key)`` to current value, ``None`` if it could not be read.
+        :rtype: dict[tuple[str, str], Any]
+        """
+        settings = self.settings(p_document)
+        current = {}
+        for section, client in self.clients.items():
+            keys = [key for key in settings if key[0] == section]
+            if not keys or client is None:
+                continue
+
+            commands = list(dict.fromkeys(settings[key][0].readCommand for key in keys))
+            results = dict(zip(commands, client.sendCommandBatch(commands)))
+            for key in keys:
+                setting = settings[key][0]
+                status, response = results[setting.readCommand]
+                current[key] = setting.parse(response) if status else None
+        return current
+
+    def diff(self, p_document: dict) -> list[tuple[str, str, Any, Any]]:
+        """
+        Compute the minimal list of writes needed to reach a desired state.
+
+        :param p_document: Desired-state document.
+        :type p_document: dict
+
+        :return: ``(section, key, current value, desired value)`` in write order.
+        :rtype: list[tuple[str, str, Any, Any]]
+        """
+        settings = self.settings(p_document)
+        current = self.readCurrent(p_document)
+        changes = []
+        for (section, key), (setting, value) in settings.items():
+            desired = setting.normalize(value)
+            if not setting.matches(current.get((section, key)), desired):
+                changes.append((section, key, current.get((section, key)), desired))
+
+        sections = list(self.clients)
+        return sorted(
+            changes,
+            key=lambda change: (
+                sections.index(change[0]),
+                settings[(change[0], change[1])][0].order,
+            ),
+        )
+
+    def apply(self, p_document: dict, p_dryRun: bool = False) -> tuple[bool, list[str]]:
+        """
+        Bring the modem to a desired state.
+
+        A dictionary value may give only some keys, the others being kept from the
+        current value; if the current value could not be read, the keys of
+        ``QuectelConfigSetting.fields`` are required and the setting fails otherwise.
+
+        :param p_document: Desired-state document.
+        :type p_document: dict
+        :param p_dryRun: Only report the writes that would be done.
+        :type p_dryRun: bool
+
+        :return: Tuple containing the status of the writes and one line per write.
+        :rtype: tuple[bool, list[str]]
+        """
+        settings = self.settings(p_document)
+        status = True
+        report = []
+        for section, key, current, desired in self.diff(p_document):
+            line = f"{section}.{key}: {current} -> {desired}"
+            if p_dryRun:
+                report.append(line)
+                continue
+
+            setting = settings[(section, key)][0]
+            if isinstance(desired, dict) and isinstance(current, dict):
+                desired = {**current, **desired}
+            elif isinstance(desired, dict):
+                missing = [field for field in setting.fields if field not in desired]
+                if missing:
+                    # The current value is unknown, nothing to complete the document with
+                    status = False
+                    report.append(f"{line} ERROR: missing {', '.join(missing)}")
+                    continue
+            writeStatus, _ = setting.write(self.clients[section], desired)
+            status = status and writeStatus
+            report.append(f"{line} {'OK' if writeStatus else 'ERROR'}")
+
+        return status, report
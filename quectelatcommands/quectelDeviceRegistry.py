@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from serial.tools import list_ports
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def defaultRegistryFileName() -> str:
+    """
+    Get the default path of the device registry file.
+
+    :return: ``$XDG_CACHE_HOME/quectelatcommands/devices.jsonl``, ``~/.cache`` being used
+        when ``XDG_CACHE_HOME`` is not set.
+    :rtype: str
+    """
+    cacheDir = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cacheDir, "quectelatcommands", "devices.jsonl")
+
+
+def listUsbSerialPorts() -> list[dict]:
+    """
+    List the USB serial ports from sysfs, without opening them.
+
+    :return: One dictionary per port with ``device`` (e.g. ``/dev/ttyUSB2``), ``usbKey``
+        (identifies the physical module), ``usbPath`` (e.g. ``1-1.2``), ``interface``
+        (USB interface number), ``vid`` and ``pid``.
+    :rtype: list[dict]
+    """
+    ports = []
+    for port in list_ports.comports():
+        if port.vid is None or not port.location:
+            continue
+
+        usbPath, _, interface = port.location.partition(":")
+        vidPid = f"{port.vid:04x}:{port.pid:04x}"
+        ports.append(
+            {
+                "device": port.device,
+                "usbKey": (
+                    f"{vidPid}/{port.serial_number}"
+                    if port.serial_number
+                    else f"{vidPid}@{usbPath}"
+                ),
+                "usbPath": usbPath,
+                "interface": interface.split(".")[-1] if interface else "",
+                "vid": port.vid,
+                "pid": port.pid,
+            }
+        )
+    return sorted(ports, key=lambda port: port["device"])
+
+
+class QuectelDeviceRegistry:
+    def __init__(self, p_fileName: Optional[str] = None):
+        """
+        Persistent registry of the known modules, keyed by IMEI and by USB identity.
+
+        Each module record holds what is otherwise probed at every start: the AT and
+        NMEA ports (and their USB interfaces), the working baud rate, the model, the
+        firmware revision and the supported commands. The file is append-only, one JSON
+        line per update, and is compacted when it grows.
+
+        USB modules without a serial number are identified by their USB path, i.e. the
+        physical USB port they are plugged in.
+
+        :param p_fileName: Path of the registry file, ``defaultRegistryFileName()`` if None.
+        :type p_fileName: Optional[str]
+        """
+        self.fileName = p_fileName or defaultRegistryFileName()
+        self.devices: dict[str, dict] = {}
+        self.lineCount = 0
+        self.load()
+
+    def load(self):
+        """
+        Load the registry file, the latest line of a device overriding the previous ones.
+        """
+        self.devices = {}
+        self.lineCount = 0
+        if not os.path.exists(self.fileName):
+            return
+
+        with open(self.fileName, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Line truncated by an interrupted write
+                    continue
+                self.lineCount += 1
+                self.devices.setdefault(record["key"], {}).update(record)
+
+    def get(self, p_key: str) -> Optional[dict]:
+        """
+        Get a device record by IMEI or by USB key.
+
+        :param p_key: IMEI or USB key, as returned by ``listUsbSerialPorts``.
+        :type p_key: str
+
+        :return: Device record, None if unknown.
+        :rtype: Optional[dict]
+        """
+        for record in self.devices.values():
+            if p_key in (record.get("imei"), record.get("usbKey")):
+                return record
+        return None
+
+    def update(self, p_record: dict) -> dict:
+        """
+        Add or update a device record.
+
+        :param p_record: Fields to store. ``imei`` or ``usbKey`` is required.
+        :type p_record: dict
+
+        :raises ValueError: If the record has neither ``imei`` nor ``usbKey``.
+
+        :return: Merged device record.
+        :rtype: dict
+        """
+        existing = None
+        for key in ("imei", "usbKey"):
+            if p_record.get(key):
+                existing = self.get(p_record[key])
+            if existing is not None:
+                break
+
+        if existing is not None:
+            key = existing["key"]
+        elif p_record.get("imei") or p_record.get("usbKey"):
+            key = p_record.get("imei") or p_record["usbKey"]
+        else:
+            raise ValueError("A device record needs an IMEI or a USB key")
+
+        record = dict(p_record, key=key, updated=time.time())
+        with self._locked():
+            with open(self.fileName, "a") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.lineCount += 1
+
+        self.devices.setdefault(key, {}).update(record)
+        if self.lineCount > 4 * len(self.devices) + 16:
+            self.compact()
+        return self.devices[key]
+
+    def compact(self):
+        """
+        Rewrite the registry file with a single line per device.
+
+        The file is read again first, under a lock, so that the records appended by
+        other processes since ``load`` are kept.
+        """
+        with self._locked():
+            self.load()
+            temporaryFileName = self.fileName + ".tmp"
+            with open(temporaryFileName, "w") as f:
+                for record in self.devices.values():
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            os.replace(temporaryFileName, self.fileName)
+        self.lineCount = len(self.devices)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the registry file between processes, through a
+        ``.lock`` file next to it. Without ``fcntl`` (Windows), nothing is locked.
+        """
+        directory = os.path.dirname(self.fileName)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.fileName + ".lock", "a") as lockFile:
+            fcntl.flock(lockFile, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockFile, fcntl.LOCK_UN)
+
+    def findAttached(self) -> list[dict]:
+        """
+        Get the known devices that are currently plugged in, without sending any AT command.
+
+        The ``atPort`` and ``nmeaPort`` of the returned records are resolved again from
+        their USB interfaces, so they stay valid when the ``/dev/ttyUSB*`` numbering changes.
+
+        :return: Device records of the attached devices.
+        :rtype: list[dict]
+        """
+        ports: dict[str, dict[str, str]] = {}
+        for port in listUsbSerialPorts():
+            ports.setdefault(port["usbKey"], {})[port["interface"]] = port["device"]
+
+        attached = []
+        for record in self.devices.values():
+            interfaces = ports.get(record.get("usbKey", ""))
+            if interfaces is None:
+                continue
+            record = dict(record)
+            for role in ("at", "nmea"):
+                device = interfaces.get(record.get(f"{role}Interface", ""))
+                if device is not None:
+                    record[f"{role}Port"] = device
+            attached.append(record)
+        return attached
+
+    def registerModem(
+        self,
+        p_modem: QuectelModemATCommands,
+        p_nmeaPort: Optional[str] = None,
+        p_withSupportedCommands: bool = True,
+    ) -> dict:
+        """
+        Probe an opened modem and store its record.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_nmeaPort: NMEA port of the same module, if known.
+        :type p_nmeaPort: Optional[str]
+        :param p_withSupportedCommands: Also store the list of supported commands.
+        :type p_withSupportedCommands: bool
+
+        :return: Stored device record.
+        :rtype: dict
+        """
+        record = p_modem.probeDeviceInfo(p_withSupportedCommands)
+        devices = {
+            os.path.realpath(port["device"]): port for port in listUsbSerialPorts()
+        }
+        for role, device in (("at", record["atPort"]), ("nmea", p_nmeaPort)):
+            if device is None:
+                continue
+            record[f"{role}Port"] = device
+            port = devices.get(os.path.realpath(device))
+            if port is not None:
+                record["usbKey"] = port["usbKey"]
+                record[f"{role}Interface"] = port["interface"]
+
+        record = self.update(record)
+        p_modem.deviceInfo = record
+        return record
+
+    def createModem(
+        self, p_key: Optional[str] = None, p_timeout: int = 1
+    ) -> Optional[QuectelModemATCommands]:
+        """
+        Create a modem client from the registry, without probing.
+
+        :param p_key: IMEI or USB key of the device, the first attached known device if None.
+        :type p_key: Optional[str]
+        :param p_timeout: Timeout for the serial connection.
+        :type p_timeout: int
+
+        :return: Modem client, not opened, with its record in ``deviceInfo``. None if no
+            matching device is attached.
+        :rtype: Optional[QuectelModemATCommands]
+        """
+        for record in self.findAttached():
+            if p_key is not None and p_key not in (
+                record.get("imei"),
+                record["usbKey"],
+            ):
+                continue
+            modem = QuectelModemATCommands(
+                record["atPort"], record.get("baudrate", 115200), p_timeout
+            )
+            modem.deviceInfo = record
+            return modem
+        return None
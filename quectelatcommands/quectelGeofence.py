@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+
+import math
+import random
+import statistics
+import time
+from array import array
+from typing import Iterable, Iterator, NamedTuple, Optional, Sequence
+from quectelatcommands.quectelGnssPosition import GnssPosition
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+GEOFENCE_ENTER = "enter"
+GEOFENCE_EXIT = "exit"
+
+
+class GeofenceEvent(NamedTuple):
+    """
+    Crossing of a geofence border by a tracker.
+    """
+
+    fenceId: str
+    # GEOFENCE_ENTER or GEOFENCE_EXIT
+    kind: str
+    trackerId: str
+    # Seconds since midnight UTC of the fix, or index of the position in a batch
+    utc: Optional[float]
+    latitude: float
+    longitude: float
+
+
+def pointInPolygon(
+    p_latitude: float,
+    p_longitude: float,
+    p_latitudes: Sequence[float],
+    p_longitudes: Sequence[float],
+) -> bool:
+    """
+    Test whether a point is inside a polygon, by ray casting.
+
+    :param p_latitude: Latitude of the point. Unit: degree.
+    :type p_latitude: float
+    :param p_longitude: Longitude of the point. Unit: degree.
+    :type p_longitude: float
+    :param p_latitudes: Latitudes of the vertices, the polygon being closed implicitly.
+    :type p_latitudes: Sequence[float]
+    :param p_longitudes: Longitudes of the vertices.
+    :type p_longitudes: Sequence[float]
+
+    :return: True if the point is inside.
+    :rtype: bool
+    """
+    inside = False
+    previousLatitude = p_latitudes[-1]
+    previousLongitude = p_longitudes[-1]
+    for latitude, longitude in zip(p_latitudes, p_longitudes):
+        if (latitude > p_latitude) != (previousLatitude > p_latitude) and (
+            p_longitude
+            < (previousLongitude - longitude)
+            * (p_latitude - latitude)
+            / (previousLatitude - latitude)
+            + longitude
+        ):
+            inside = not inside
+        previousLatitude = latitude
+        previousLongitude = longitude
+    return inside
+
+
+class QuectelGeofenceEngine:
+    def __init__(self, p_cellSize: float = 0.01):
+        """
+        Geofence evaluation over a stream of fixes, with a uniform grid index.
+
+        Each polygon is registered in the grid cells covered by its bounding box. A
+        position is only tested against the polygons of its cell, after a bounding box
+        check. Enter and exit events are computed per tracker from the set of fences
+        containing its last position. Polygons must not cross the antimeridian.
+
+        :param p_cellSize: Size of the grid cells. Unit: degree. About the size of the
+            fences gives the fewest candidates per position.
+        :type p_cellSize: float
+        """
+        self.cellSize = p_cellSize
+        self.grid: dict[tuple[int, int], list[int]] = {}
+        # Per fence index, None once removed
+        self.fenceIds: list[Optional[str]] = []
+        self.latitudes: list[array] = []
+        self.longitudes: list[array] = []
+        self.bounds: list[tuple[float, float, float, float]] = []
+        self.indexes: dict[str, int] = {}
+        # Fences containing the last position of each tracker
+        self.states: dict[str, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.indexes)
+
+    def addFence(self, p_fenceId: str, p_vertices: Sequence[tuple[float, float]]):
+        """
+        Add a polygon, replacing the fence of the same ID.
+
+        :param p_fenceId: ID of the fence, given in the events.
+        :type p_fenceId: str
+        :param p_vertices: ``(latitude, longitude)`` of at least 3 vertices. Unit: degree.
+        :type p_vertices: Sequence[tuple[float, float]]
+
+        :raises ValueError: If the polygon has less than 3 vertices.
+        """
+        if len(p_vertices) < 3:
+            raise ValueError(f"Fence {p_fenceId} needs at least 3 vertices")
+        if p_fenceId in self.indexes:
+            self.removeFence(p_fenceId)
+
+        latitudes = array("d", (vertex[0] for vertex in p_vertices))
+        longitudes = array("d", (vertex[1] for vertex in p_vertices))
+        bounds = (min(latitudes), min(longitudes), max(latitudes), max(longitudes))
+        index = len(self.fenceIds)
+        self.fenceIds.append(p_fenceId)
+        self.latitudes.append(latitudes)
+        self.longitudes.append(longitudes)
+        self.bounds.append(bounds)
+        self.indexes[p_fenceId] = index
+        for cell in self._cells(bounds):
+            self.grid.setdefault(cell, []).append(index)
+
+    def removeFence(self, p_fenceId: str):
+        """
+        Remove a fence. Trackers inside it get no exit event.
+
+        :param p_fenceId: ID of the fence.
+        :type p_fenceId: str
+        """
+        index = self.indexes.pop(p_fenceId, None)
+        if index is None:
+            return
+        for cell in self._cells(self.bounds[index]):
+            self.grid[cell].remove(index)
+            if not self.grid[cell]:
+                del self.grid[cell]
+        self.fenceIds[index] = None
+        for state in self.states.values():
+            state.discard(index)
+
+    def locate(self, p_latitude: float, p_longitude: float) -> list[str]:
+        """
+        Get the fences containing a point.
+
+        :param p_latitude: Latitude. Unit: degree.
+        :type p_latitude: float
+        :param p_longitude: Longitude. Unit: degree.
+        :type p_longitude: float
+
+        :return: IDs of the fences.
+        :rtype: list[str]
+        """
+        return [self.fenceIds[index] for index in self._locate(p_latitude, p_longitude)]
+
+    def update(
+        self,
+        p_latitude: float,
+        p_longitude: float,
+        p_utc: Optional[float] = None,
+        p_trackerId: str = "",
+    ) -> list[GeofenceEvent]:
+        """
+        Move a tracker and compute its geofence events.
+
+        :param p_latitude: Latitude. Unit: degree.
+        :type p_latitude: float
+        :param p_longitude: Longitude. Unit: degree.
+        :type p_longitude: float
+        :param p_utc: Time of the position, given in the events.
+        :type p_utc: Optional[float]
+        :param p_trackerId: ID of the tracker.
+        :type p_trackerId: str
+
+        :return: Exit events, then enter events.
+        :rtype: list[GeofenceEvent]
+        """
+        inside = self._locate(p_latitude, p_longitude)
+        previous = self.states.get(p_trackerId, set())
+        self.states[p_trackerId] = inside
+        if inside == previous:
+            return []
+
+        return [
+            GeofenceEvent(
+                self.fenceIds[index], kind, p_trackerId, p_utc, p_latitude, p_longitude
+            )
+            for kind, indexes in (
+                (GEOFENCE_EXIT, previous - inside),
+                (GEOFENCE_ENTER, inside - previous),
+            )
+            for index in sorted(indexes)
+        ]
+
+    def events(
+        self, p_fixes: Iterable[GnssPosition], p_trackerId: str = ""
+    ) -> Iterator[GeofenceEvent]:
+        """
+        Evaluate a stream of fixes.
+
+        :param p_fixes: Fixes, e.g. ``QuectelGnssSession.fixes()`` or positions from
+            ``QuectelGnssATCommands.acquirePosition``.
+        :type p_fixes: Iterable[GnssPosition]
+        :param p_trackerId: ID of the tracker.
+        :type p_trackerId: str
+
+        :return: Generator of events.
+        :rtype: Iterator[GeofenceEvent]
+        """
+        for fix in p_fixes:
+            yield from self.update(fix.latitude, fix.longitude, fix.utc, p_trackerId)
+
+    def locateBatch(
+        self, p_latitudes: "np.ndarray", p_longitudes: "np.ndarray"
+    ) -> tuple["np.ndarray", "np.ndarray"]:
+        """
+        Get the fences containing many points. Requires ``numpy``.
+
+        The points are grouped by grid cell, and each candidate polygon is tested against
+        all the points of its cell at once.
+
+        :param p_latitudes: Latitudes. Unit: degree.
+        :type p_latitudes: np.ndarray
+        :param p_longitudes: Longitudes. Unit: degree.
+        :type p_longitudes: np.ndarray
+
+        :return: Point indexes and fence indexes (see ``fenceIds``) of every
+            containment, sorted by point.
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        if np is None:
+            raise ImportError(
+                "numpy is required to evaluate batches: pip install quectelatcommands[numpy]"
+            )
+
+        latitudes = np.asarray(p_latitudes, dtype=np.float64)
+        longitudes = np.asarray(p_longitudes, dtype=np.float64)
+        rows = np.floor(latitudes / self.cellSize).astype(np.int64)
+        columns = np.floor(longitudes / self.cellSize).astype(np.int64)
+        order = np.lexsort((columns, rows))
+        keys = np.stack((rows[order], columns[order]), axis=1)
+        starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+        starts = np.concatenate(([0], starts, [len(order)]))
+
+        points: list["np.ndarray"] = []
+        fences: list["np.ndarray"] = []
+        for start, stop in zip(starts[:-1], starts[1:]):
+            if start == stop:
+                continue
+            candidates = self.grid.get((int(keys[start, 0]), int(keys[start, 1])))
+            if not candidates:
+                continue
+            cellPoints = order[start:stop]
+            cellLatitudes = latitudes[cellPoints]
+            cellLongitudes = longitudes[cellPoints]
+            for index in candidates:
+                inside = self._pointsInPolygon(index, cellLatitudes, cellLongitudes)
+                if inside.any():
+                    points.append(cellPoints[inside])
+                    fences.append(np.full(int(inside.sum()), index, dtype=np.int64))
+
+        if not points:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        pointIndexes = np.concatenate(points)
+        fenceIndexes = np.concatenate(fences)
+        order = np.lexsort((fenceIndexes, pointIndexes))
+        return pointIndexes[order], fenceIndexes[order]
+
+    def replayBatch(
+        self,
+        p_latitudes: "np.ndarray",
+        p_longitudes: "np.ndarray",
+        p_utc: Optional["np.ndarray"] = None,
+        p_trackerId: str = "",
+    ) -> list[GeofenceEvent]:
+        """
+        Compute the events of a recorded track, continuing the state of the tracker.
+        Requires ``numpy``.
+
+        :param p_latitudes: Latitudes, in time order. Unit: degree.
+        :type p_latitudes: np.ndarray
+        :param p_longitudes: Longitudes. Unit: degree.
+        :type p_longitudes: np.ndarray
+        :param p_utc: Times of the positions, the position indexes if None.
+        :type p_utc: Optional[np.ndarray]
+        :param p_trackerId: ID of the tracker.
+        :type p_trackerId: str
+
+        :return: Events in time order.
+        :rtype: list[GeofenceEvent]
+        """
+        count = len(p_latitudes)
+        if count == 0:
+            return []
+        pointIndexes, fenceIndexes = self.locateBatch(p_latitudes, p_longitudes)
+        previous = self.states.get(p_trackerId, set())
+
+        # Runs of consecutive points inside the same fence
+        order = np.lexsort((pointIndexes, fenceIndexes))
+        points = pointIndexes[order]
+        fences = fenceIndexes[order]
+        breaks = (np.diff(fences) != 0) | (np.diff(points) != 1)
+        runStarts = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+        runEnds = np.concatenate((np.flatnonzero(breaks), [len(points) - 1]))
+
+        transitions: list[tuple[int, int, str]] = []
+        continued: set[int] = set()
+        for start, end in zip(runStarts.tolist(), runEnds.tolist()):
+            if start > end:
+                continue
+            fence = int(fences[start])
+            if points[start] > 0 or fence not in previous:
+                transitions.append((int(points[start]), fence, GEOFENCE_ENTER))
+            else:
+                continued.add(fence)
+            if points[end] + 1 < count:
+                transitions.append((int(points[end]) + 1, fence, GEOFENCE_EXIT))
+        for fence in previous - continued:
+            transitions.append((0, fence, GEOFENCE_EXIT))
+
+        self.states[p_trackerId] = {
+            int(fence) for fence in fenceIndexes[pointIndexes == count - 1]
+        }
+
+        latitudes = np.asarray(p_latitudes, dtype=np.float64)
+        longitudes = np.asarray(p_longitudes, dtype=np.float64)
+        # Exits before enters at the same position, as in update
+        transitions.sort(key=lambda item: (item[0], item[2] != GEOFENCE_EXIT, item[1]))
+        return [
+            GeofenceEvent(
+                self.fenceIds[fence],
+                kind,
+                p_trackerId,
+                float(p_utc[point]) if p_utc is not None else float(point),
+                float(latitudes[point]),
+                float(longitudes[point]),
+            )
+            for point, fence, kind in transitions
+            if self.fenceIds[fence] is not None
+        ]
+
+    def _cells(
+        self, p_bounds: tuple[float, float, float, float]
+    ) -> Iterator[tuple[int, int]]:
+        minLatitude, minLongitude, maxLatitude, maxLongitude = p_bounds
+        for row in range(
+            math.floor(minLatitude / self.cellSize),
+            math.floor(maxLatitude / self.cellSize) + 1,
+        ):
+            for column in range(
+                math.floor(minLongitude / self.cellSize),
+                math.floor(maxLongitude / self.cellSize) + 1,
+            ):
+                yield row, column
+
+    def _locate(self, p_latitude: float, p_longitude: float) -> set[int]:
+        cell = (
+            math.floor(p_latitude / self.cellSize),
+            math.floor(p_longitude / self.cellSize),
+        )
+        inside = set()
+        for index in self.grid.get(cell, ()):
+            minLatitude, minLongitude, maxLatitude, maxLongitude = self.bounds[index]
+            if (
+                minLatitude <= p_latitude <= maxLatitude
+                and minLongitude <= p_longitude <= maxLongitude
+                and pointInPolygon(
+                    p_latitude,
+                    p_longitude,
+                    self.latitudes[index],
+                    self.longitudes[index],
+                )
+            ):
+                inside.add(index)
+        return inside
+
+    def _pointsInPolygon(
+        self, p_index: int, p_latitudes: "np.ndarray", p_longitudes: "np.ndarray"
+    ) -> "np.ndarray":
+        """
+        Ray casting of many points against one polygon, edge by edge.
+        """
+        vertexLatitudes = self.latitudes[p_index]
+        vertexLongitudes = self.longitudes[p_index]
+        inside = np.zeros(len(p_latitudes), dtype=bool)
+        previousLatitude = vertexLatitudes[-1]
+        previousLongitude = vertexLongitudes[-1]
+        for latitude, longitude in zip(vertexLatitudes, vertexLongitudes):
+            if latitude != previousLatitude:
+                crosses = (latitude > p_latitudes) != (previousLatitude > p_latitudes)
+                crossing = (previousLongitude - longitude) * (
+                    p_latitudes - latitude
+                ) / (previousLatitude - latitude) + longitude
+                inside ^= crosses & (p_longitudes < crossing)
+            previousLatitude = latitude
+            previousLongitude = longitude
+        return inside
+
+
+def benchmarkGeofences(
+    p_fenceCount: int = 10000,
+    p_rate: float = 10,
+    p_seconds: float = 600,
+    p_cellSize: float = 0.01,
+    p_seed: int = 0,
+) -> dict:
+    """
+    Measure the evaluation cost of a tracker moving among many fences.
+
+    Octagonal fences of 100 to 500 m are spread over a 1° square, and a track at 15 m/s
+    crosses it at ``p_rate`` fixes per second.
+
+    :param p_fenceCount: Number of fences.
+    :type p_fenceCount: int
+    :param p_rate: Fix rate. Unit: Hz.
+    :type p_rate: float
+    :param p_seconds: Duration of the track. Unit: second.
+    :type p_seconds: float
+    :param p_cellSize: Grid cell size. Unit: degree.
+    :type p_cellSize: float
+    :param p_seed: Random seed.
+    :type p_seed: int
+
+    :return: ``fixes``, ``events``, per-fix ``mean`` and ``p99`` evaluation time and
+        ``load`` (share of one CPU used at ``p_rate``) of ``update``, and
+        ``batchPerFix`` of ``replayBatch`` when ``numpy`` is available. Unit: second.
+    :rtype: dict
+    """
+    generator = random.Random(p_seed)
+    engine = QuectelGeofenceEngine(p_cellSize)
+    metersPerDegree = 111320.0
+    for fence in range(p_fenceCount):
+        latitude = 48.0 + generator.random()
+        longitude = 11.0 + generator.random()
+        radius = generator.uniform(100, 500) / metersPerDegree
+        engine.addFence(
+            f"fence{fence}",
+            [
+                (
+                    latitude + radius * math.sin(angle),
+                    longitude
+                    + radius * math.cos(angle) / math.cos(math.radians(latitude)),
+                )
+                for angle in (step * math.pi / 4 for step in range(8))
+            ],
+        )
+
+    fixCount = int(p_rate * p_seconds)
+    step = 15.0 / p_rate / metersPerDegree
+    heading = generator.uniform(0, 2 * math.pi)
+    latitude, longitude = 48.5, 11.5
+    track = []
+    for _ in range(fixCount):
+        heading += generator.gauss(0, 0.05)
+        latitude = min(max(latitude + step * math.sin(heading), 48.0), 49.0)
+        longitude = min(max(longitude + step * math.cos(heading), 11.0), 12.0)
+        track.append((latitude, longitude))
+
+    durations = []
+    events = 0
+    for index, (latitude, longitude) in enumerate(track):
+        start = time.perf_counter()
+        events += len(engine.update(latitude, longitude, index / p_rate, "benchmark"))
+        durations.append(time.perf_counter() - start)
+
+    durations.sort()
+    mean = statistics.fmean(durations)
+    result = {
+        "fixes": fixCount,
+        "events": events,
+        "mean": mean,
+        "p99": durations[int(0.99 * (len(durations) - 1))],
+        "load": mean * p_rate,
+    }
+    if np is not None:
+        latitudes = np.array([position[0] for position in track])
+        longitudes = np.array([position[1] for position in track])
+        start = time.perf_counter()
+        engine.replayBatch(latitudes, longitudes, p_trackerId="batch")
+        result["batchPerFix"] = (time.perf_counter() - start) / fixCount
+    return result
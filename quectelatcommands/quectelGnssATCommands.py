@@ -1,23 +1,52 @@
 #!/usr/bin/env python3
 
-from typing import Optional
+from typing import Any, Optional
+from quectelatcommands.quectelGnssPosition import GnssPosition, decodeQgpslocResponse
 from quectelatcommands.quectelSerial import QuectelSerial
+from quectelatcommands.quectelSnapshot import (
+    loadSnapshot,
+    restoreSnapshot,
+    saveSnapshot,
+    takeSnapshot,
+)
 
 
 class QuectelGnssATCommands:
     def __init__(
-        self, p_port: str = "/dev/ttyUSB1", p_baudrate: int = 115200, p_timeout: int = 1
+        self,
+        p_port: str = "/dev/ttyUSB1",
+        p_baudrate: int = 115200,
+        p_timeout: int = 1,
+        p_freshnessWindow: float = 0,
     ):
         """
         Quectel modem AT commands.
-        """
-        self.serialPort = QuectelSerial(p_port, p_baudrate, p_timeout)
 
-    def open(self):
+        :param p_port: Serial port to connect to.
+        :type p_port: str
+        :param p_baudrate: Baudrate to use.
+        :type p_baudrate: int
+        :param p_timeout: Timeout for the serial connection.
+        :type p_timeout: int
+        :param p_freshnessWindow: Time during which the successful response of a read
+            command is given again without sending the command, until a write is sent.
+            Unit: second.
+        :type p_freshnessWindow: float
+        """
+        self.serialPort = QuectelSerial(
+            p_port, p_baudrate, p_timeout, p_freshnessWindow
+        )
+        self.capturedCommands: Optional[list[str]] = None
+
+    def open(self, p_connection: Optional[Any] = None):
         """
         Open the serial connection.
+
+        :param p_connection: Already opened connection to use instead of the serial port,
+            e.g. a ``QuectelSimulatedSerial``.
+        :type p_connection: Optional[Any]
         """
-        self.serialPort.open()
+        self.serialPort.open(p_connection)
 
     def sendCommand(self, p_command: str) -> tuple[bool, list[str]]:
         """
@@ -29,15 +58,91 @@ class QuectelGnssATCommands:
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
         """
+        if self.capturedCommands is not None:
+            self.capturedCommands.append(p_command)
+            return True, []
 
         return self.serialPort.sendCommand(p_command)
 
+    def sendCommandBatch(
+        self, p_commands: list[str], p_maxLineLength: int = 256
+    ) -> list[tuple[bool, list[str]]]:
+        """
+        Send several AT commands, the reads concatenated into as few command lines as
+        possible and the writes sent one by one.
+
+        :param p_commands: AT commands to send.
+        :type p_commands: list[str]
+        :param p_maxLineLength: Maximum length of a concatenated command line.
+        :type p_maxLineLength: int
+
+        :return: Status and response of each command, in the order of ``p_commands``.
+        :rtype: list[tuple[bool, list[str]]]
+        """
+        return self.serialPort.sendCommandBatch(p_commands, p_maxLineLength)
+
+    def sendCommandWithPayload(
+        self,
+        p_command: str,
+        p_payload: bytes,
+        p_prompt: str = "CONNECT",
+        p_timeout: float = 10,
+    ) -> tuple[bool, list[str]]:
+        """
+        Send an AT command that reads data after a prompt, e.g. a file upload.
+
+        :param p_command: AT command to send.
+        :type p_command: str
+        :param p_payload: Data written once the prompt is received.
+        :type p_payload: bytes
+        :param p_prompt: Start of the line asking for the data.
+        :type p_prompt: str
+        :param p_timeout: Maximum time to wait for the final result code. Unit: second.
+        :type p_timeout: float
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        return self.serialPort.sendCommandWithPayload(
+            p_command, p_payload, p_prompt, p_timeout
+        )
+
     def close(self):
         """
         Close the serial connection.
         """
         self.serialPort.close()
 
+    def snapshot(self, p_fileName: str) -> tuple[bool, list[str]]:
+        """
+        Save every readable setting to a file, read in one batch of AT commands.
+
+        The settings are those returned by the ``*Read`` methods. The file is
+        compact JSON, gzip-compressed if its name ends with ``.gz``.
+
+        :param p_fileName: Path of the snapshot file.
+        :type p_fileName: str
+
+        :return: Tuple containing the status of the snapshot and the captured commands.
+        :rtype: tuple[bool, list[str]]
+        """
+        snapshot = takeSnapshot(self, [])
+        saveSnapshot(snapshot, p_fileName)
+        return bool(snapshot["reads"]), list(snapshot["reads"])
+
+    def restore(self, p_fileName: str) -> tuple[bool, list[str]]:
+        """
+        Write back the settings of a file saved by ``snapshot``: the settings that differ
+        are written in concatenated command lines, see ``restoreSnapshot``.
+
+        :param p_fileName: Path of the snapshot file.
+        :type p_fileName: str
+
+        :return: Tuple containing the status of the writes and one line per write.
+        :rtype: tuple[bool, list[str]]
+        """
+        return restoreSnapshot(self, loadSnapshot(p_fileName))
+
     def freeAtCommand(self, p_command: str):
         """
         Free AT command.
@@ -690,6 +795,23 @@ class QuectelGnssATCommands:
         """
         return self.sendCommand(f"AT+QGPSLOC={p_mode}")
 
+    def acquirePosition(self, p_mode: int = 2) -> tuple[bool, Optional[GnssPosition]]:
+        """
+        Acquire the position with ``AT+QGPSLOC`` and decode it.
+
+        :param p_mode: Latitude and longitude display format, see
+            ``gnssGeneralCommands20600AcquirePositioningInformation``.
+        :type p_mode: int
+
+        :return: Tuple containing the status of the command and the position. The status
+            is True with no position while the position is not fixed yet.
+        :rtype: tuple[bool, Optional[GnssPosition]]
+        """
+        status, response = self.gnssGeneralCommands20600AcquirePositioningInformation(
+            p_mode
+        )
+        return decodeQgpslocResponse(status, response, p_mode)
+
     def gnssGeneralCommands20700ConfigureSuplServerUrlRead(
         self,
     ) -> tuple[bool, list[str]]:
@@ -910,6 +1032,192 @@ def free_at_command(ctx, command: str):
     client.close()
 
 
+@main.command("ensure-xtra")
+@click.pass_context
+@click.option(
+    "--module-file",
+    type=str,
+    default="UFS:xtra2.bin",
+    help="Name of the gpsOneXTRA file on the module.",
+    show_default=True,
+)
+@click.option(
+    "--cache-dir",
+    type=str,
+    default=None,
+    help="Directory of the gpsOneXTRA file cache.",
+)
+def ensure_xtra(ctx, module_file: str, cache_dir: Optional[str]):
+    """Inject gpsOneXTRA time and data only when the injected data has expired."""
+    from quectelatcommands.quectelDeviceRegistry import QuectelDeviceRegistry
+    from quectelatcommands.quectelXtraManager import QuectelXtraManager
+
+    client: QuectelGnssATCommands = ctx.obj["client"]
+    client.open()
+    manager = QuectelXtraManager(
+        client, module_file, cache_dir, p_registry=QuectelDeviceRegistry()
+    )
+    report = manager.ensure()
+    client.close()
+    print(f"valid: {report['valid']}, expiry: {report['expiry']}")
+    if report["rebootRequired"]:
+        print("gpsOneXTRA enabled, reboot the module to inject the data")
+    print(
+        f"steps: {', '.join(report['steps']) or 'none'}, "
+        f"elapsed: {report['elapsed']:.1f} s, saved: {report['saved']:.1f} s"
+    )
+
+
+@main.command("geofence-benchmark")
+@click.option(
+    "--fences", type=int, default=10000, help="Number of fences.", show_default=True
+)
+@click.option(
+    "--rate", type=float, default=10, help="Fix rate, in Hz.", show_default=True
+)
+@click.option(
+    "--seconds",
+    type=float,
+    default=600,
+    help="Duration of the simulated track, in seconds.",
+    show_default=True,
+)
+def geofence_benchmark(fences: int, rate: float, seconds: float):
+    """Measure the geofence evaluation cost of a simulated track."""
+    from quectelatcommands.quectelGeofence import benchmarkGeofences
+
+    result = benchmarkGeofences(fences, rate, seconds)
+    print(f"fixes: {result['fixes']}, events: {result['events']}")
+    print(
+        f"per fix: mean {result['mean'] * 1e6:.1f} us, p99 {result['p99'] * 1e6:.1f} us, "
+        f"CPU load at {rate:g} Hz: {result['load']:.3%}"
+    )
+    if "batchPerFix" in result:
+        print(f"batch replay per fix: {result['batchPerFix'] * 1e6:.1f} us")
+
+
+@main.command("ttff-benchmark")
+@click.pass_context
+@click.option(
+    "--results-file",
+    "-r",
+    type=str,
+    default="ttff.jsonl",
+    help="File the runs are appended to, one JSON line per run.",
+    show_default=True,
+)
+@click.option(
+    "--runs",
+    "-n",
+    type=int,
+    default=5,
+    help="Runs per configuration.",
+    show_default=True,
+)
+@click.option(
+    "--delete-type",
+    "-d",
+    type=int,
+    multiple=True,
+    default=(0, 1, 2, 3),
+    help="AT+QGPSDEL types to measure.",
+    show_default=True,
+)
+@click.option(
+    "--xtra",
+    "-x",
+    type=int,
+    multiple=True,
+    default=(0, 1),
+    help="gpsOneXTRA settings to measure.",
+    show_default=True,
+)
+@click.option(
+    "--agps-mode",
+    type=int,
+    multiple=True,
+    help="AGPS positioning modes to measure, the current one if not given.",
+)
+@click.option(
+    "--constellations",
+    type=int,
+    multiple=True,
+    help='Constellation sets of AT+QGPSCFG="gnssconfig" to measure, the current one '
+    "if not given.",
+)
+@click.option(
+    "--fix-timeout",
+    type=float,
+    default=120.0,
+    help="Maximum time to wait for a fix, in seconds.",
+    show_default=True,
+)
+@click.option(
+    "--xtra-data-file",
+    type=str,
+    default=None,
+    help='gpsOneXTRA data file injected again after delete type 3, e.g. "RAM:xtra2.bin".',
+)
+@click.option(
+    "--simulate",
+    type=float,
+    default=None,
+    help="Run against a simulated module at this speed instead of the port.",
+)
+def ttff_benchmark(
+    ctx,
+    results_file: str,
+    runs: int,
+    delete_type: tuple[int, ...],
+    xtra: tuple[int, ...],
+    agps_mode: tuple[int, ...],
+    constellations: tuple[int, ...],
+    fix_timeout: float,
+    xtra_data_file: Optional[str],
+    simulate: Optional[float],
+):
+    """Measure the time to first fix per start type and assistance settings."""
+    from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+    from quectelatcommands.quectelTtffBenchmark import QuectelTtffBenchmark
+
+    client: QuectelGnssATCommands = ctx.obj["client"]
+    connection = QuectelSimulatedSerial(simulate) if simulate else None
+    client.open(connection)
+    benchmark = QuectelTtffBenchmark(
+        client,
+        results_file,
+        runs,
+        fix_timeout,
+        p_timeScale=simulate or 1.0,
+        p_xtraDataFileName=xtra_data_file,
+        p_connection=connection,
+    )
+    summary = benchmark.run(
+        benchmark.configurations(
+            delete_type, xtra, agps_mode or (None,), constellations or (None,)
+        )
+    )
+    client.close()
+    for entry in summary:
+        ttffs = " ".join(
+            f"{name}={entry[name]:.1f}" if entry[name] is not None else f"{name}=-"
+            for name in ("min", "median", "p90", "max")
+        )
+        options = " ".join(
+            f"{label}={entry[name]}" if entry[name] is not None else f"{label}=-"
+            for label, name in (
+                ("xtra", "xtra"),
+                ("agps", "agpsMode"),
+                ("constellations", "constellations"),
+            )
+        )
+        errors = " not applied" if entry["errors"] else ""
+        print(
+            f"{entry['start']:<12} {options} "
+            f"fixes={entry['fixes']}/{entry['runs']} {ttffs}{errors}"
+        )
+
+
 @main.group()
 @click.pass_context
 def configure_gnss(ctx):
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+import datetime
+from typing import NamedTuple, Optional
+from quectelatcommands.quectelNmeaReader import nmeaTime
+from quectelatcommands.quectelResponseParser import isCmeError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# CME error of AT+QGPSLOC while the position is not fixed yet, and its verbose text
+CME_ERROR_NOT_FIXED = 516
+CME_ERROR_NOT_FIXED_TEXT = "Not fixed now"
+
+POSITION_COLUMNS = (
+    "utc",
+    "latitude",
+    "longitude",
+    "hdop",
+    "altitude",
+    "fix",
+    "cog",
+    "speedKmh",
+    "speedKnots",
+    "date",
+    "satellites",
+)
+
+# Index of each field of the +QGPSLOC response per display mode. Latitude and longitude
+# hold the index of the value and of the hemisphere: a trailing letter in mode 0, a
+# separate field in mode 1, a sign in mode 2.
+_FIELD_OFFSETS = {
+    0: {
+        "utc": 0,
+        "latitude": (1, 1),
+        "longitude": (2, 2),
+        "hdop": 3,
+        "altitude": 4,
+        "fix": 5,
+        "cog": 6,
+        "speedKmh": 7,
+        "speedKnots": 8,
+        "date": 9,
+        "satellites": 10,
+        "count": 11,
+    },
+    1: {
+        "utc": 0,
+        "latitude": (1, 2),
+        "longitude": (3, 4),
+        "hdop": 5,
+        "altitude": 6,
+        "fix": 7,
+        "cog": 8,
+        "speedKmh": 9,
+        "speedKnots": 10,
+        "date": 11,
+        "satellites": 12,
+        "count": 13,
+    },
+    2: {
+        "utc": 0,
+        "latitude": (1, None),
+        "longitude": (2, None),
+        "hdop": 3,
+        "altitude": 4,
+        "fix": 5,
+        "cog": 6,
+        "speedKmh": 7,
+        "speedKnots": 8,
+        "date": 9,
+        "satellites": 10,
+        "count": 11,
+    },
+}
+
+
+class GnssPosition(NamedTuple):
+    """
+    Position given by ``AT+QGPSLOC``, whatever the display mode.
+    """
+
+    # Seconds since midnight UTC
+    utc: Optional[float]
+    latitude: float
+    longitude: float
+    hdop: float
+    altitude: float
+    # 2: 2D positioning, 3: 3D positioning
+    fix: int
+    cog: float
+    speedKmh: float
+    speedKnots: float
+    date: Optional[datetime.date]
+    satellites: int
+
+
+def _splitFields(p_line: str) -> list[str]:
+    return p_line.split(":", 1)[1].strip().split(",")
+
+
+def _coordinate(p_fields: list[str], p_offsets: tuple, p_mode: int) -> float:
+    value, hemisphere = p_offsets
+    if p_mode == 2:
+        return float(p_fields[value])
+    if p_mode == 0:
+        text = p_fields[value]
+        number, letter = float(text[:-1]), text[-1]
+    else:
+        number, letter = float(p_fields[value]), p_fields[hemisphere]
+    degrees = number // 100 + (number % 100) / 60
+    return -degrees if letter in ("S", "W") else degrees
+
+
+def _date(p_field: str) -> Optional[datetime.date]:
+    if len(p_field) != 6:
+        return None
+    return datetime.date(2000 + int(p_field[4:6]), int(p_field[2:4]), int(p_field[0:2]))
+
+
+def parseQgpsloc(p_line: str, p_mode: int) -> Optional[GnssPosition]:
+    """
+    Decode a ``+QGPSLOC:`` line.
+
+    :param p_line: Response line, e.g.
+        ``+QGPSLOC: 013921.000,31.86105,117.19956,0.7,70.3,3,0.00,0.0,0.0,221124,09``.
+    :type p_line: str
+    :param p_mode: Display mode used for ``AT+QGPSLOC``: 0, 1 or 2.
+    :type p_mode: int
+
+    :return: Position, None if the line is malformed.
+    :rtype: Optional[GnssPosition]
+    """
+    offsets = _FIELD_OFFSETS[p_mode]
+    fields = _splitFields(p_line)
+    if len(fields) < offsets["count"]:
+        return None
+    try:
+        return GnssPosition(
+            nmeaTime(fields[offsets["utc"]]),
+            _coordinate(fields, offsets["latitude"], p_mode),
+            _coordinate(fields, offsets["longitude"], p_mode),
+            float(fields[offsets["hdop"]]),
+            float(fields[offsets["altitude"]]),
+            int(fields[offsets["fix"]]),
+            float(fields[offsets["cog"]]),
+            float(fields[offsets["speedKmh"]]),
+            float(fields[offsets["speedKnots"]]),
+            _date(fields[offsets["date"]]),
+            int(fields[offsets["satellites"]]),
+        )
+    except ValueError:
+        return None
+
+
+def decodeQgpslocResponse(
+    p_status: bool, p_response: list[str], p_mode: int
+) -> tuple[bool, Optional[GnssPosition]]:
+    """
+    Decode the response of ``AT+QGPSLOC``.
+
+    :param p_status: Status of the command.
+    :type p_status: bool
+    :param p_response: Response of the command.
+    :type p_response: list[str]
+    :param p_mode: Display mode used for the command: 0, 1 or 2.
+    :type p_mode: int
+
+    :return: Tuple containing the status and the position. The status is True with no
+        position when the position is not fixed yet (``+CME ERROR: 516``, or
+        ``+CME ERROR: Not fixed now`` with ``AT+CMEE=2``).
+    :rtype: tuple[bool, Optional[GnssPosition]]
+    """
+    if not p_status:
+        return (
+            isCmeError(p_response, CME_ERROR_NOT_FIXED, CME_ERROR_NOT_FIXED_TEXT),
+            None,
+        )
+
+    for line in p_response:
+        if line.startswith("+QGPSLOC:"):
+            position = parseQgpsloc(line, p_mode)
+            return position is not None, position
+    return False, None
+
+
+def decodeQgpslocBatch(p_lines: list[str], p_mode: int) -> dict[str, "np.ndarray"]:
+    """
+    Decode many ``+QGPSLOC:`` lines of the same display mode into column arrays.
+
+    The fields are gathered per column at their precomputed offsets and converted, and
+    the ddmm.mmmm coordinates turned into degrees, on whole arrays. Requires ``numpy``.
+
+    :param p_lines: Response lines. Malformed lines are dropped.
+    :type p_lines: list[str]
+    :param p_mode: Display mode used for ``AT+QGPSLOC``: 0, 1 or 2.
+    :type p_mode: int
+
+    :return: One array per column of ``POSITION_COLUMNS``. ``utc`` is in seconds since
+        midnight and ``date`` in ``datetime64[D]``.
+    :rtype: dict[str, np.ndarray]
+    """
+    if np is None:
+        raise ImportError(
+            "numpy is required to decode batches: pip install quectelatcommands[numpy]"
+        )
+
+    count = _FIELD_OFFSETS[p_mode]["count"]
+    lines = [
+        line for line in p_lines if ":" in line and len(_splitFields(line)) >= count
+    ]
+    try:
+        return _decodeBatch(lines, p_mode)
+    except ValueError:
+        # A field is not a number: drop the lines rejected by parseQgpsloc
+        return _decodeBatch(
+            [line for line in lines if parseQgpsloc(line, p_mode) is not None], p_mode
+        )
+
+
+def _decodeBatch(p_lines: list[str], p_mode: int) -> dict[str, "np.ndarray"]:
+    offsets = _FIELD_OFFSETS[p_mode]
+    rows = [_splitFields(line)[: offsets["count"]] for line in p_lines]
+    table = np.array(rows, dtype=str).reshape(len(rows), offsets["count"])
+
+    def column(p_name: str, p_type: type = np.float64) -> "np.ndarray":
+        return table[:, offsets[p_name]].astype(p_type)
+
+    def coordinate(p_name: str) -> "np.ndarray":
+        value, hemisphere = offsets[p_name]
+        if p_mode == 2:
+            return table[:, value].astype(np.float64)
+        if p_mode == 0:
+            text = table[:, value]
+            numbers = np.char.rstrip(text, "NSEW").astype(np.float64)
+            letters = np.char.lstrip(text, "0123456789.")
+        else:
+            numbers = table[:, value].astype(np.float64)
+            letters = table[:, hemisphere]
+        degrees = numbers // 100 + (numbers % 100) / 60
+        return np.where((letters == "S") | (letters == "W"), -degrees, degrees)
+
+    utc = column("utc")
+    date = column("date", np.int64)
+    return {
+        "utc": (utc // 10000) * 3600 + (utc // 100 % 100) * 60 + utc % 100,
+        "latitude": coordinate("latitude"),
+        "longitude": coordinate("longitude"),
+        "hdop": column("hdop", np.float32),
+        "altitude": column("altitude"),
+        "fix": column("fix", np.int8),
+        "cog": column("cog", np.float32),
+        "speedKmh": column("speedKmh", np.float32),
+        "speedKnots": column("speedKnots", np.float32),
+        "date": (
+            (date % 100 + 30).astype("datetime64[Y]").astype("datetime64[M]")
+            + (date // 100 % 100 - 1)
+        ).astype("datetime64[D]")
+        + (date // 10000 - 1),
+        "satellites": column("satellites", np.int16),
+    }
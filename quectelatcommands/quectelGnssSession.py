@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+import asyncio
+import queue
+import time
+from typing import AsyncIterator, Iterator, Optional
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelGnssPosition import GnssPosition
+from quectelatcommands.quectelNmeaReader import (
+    NmeaGga,
+    NmeaGsa,
+    NmeaRecord,
+    NmeaRmc,
+    QuectelNmeaReader,
+)
+from quectelatcommands.quectelResponseParser import isCmeError
+
+SOURCE_AUTO = "auto"
+SOURCE_NMEA = "nmea"
+SOURCE_URC = "urc"
+SOURCE_POLL = "poll"
+
+# CME error of AT+QGPS when the session is ongoing, and its verbose text
+_SESSION_ONGOING = 504
+_SESSION_ONGOING_TEXT = "Session is ongoing"
+_KNOTS_TO_KMH = 1.852
+
+
+class QuectelGnssSession:
+    def __init__(
+        self,
+        p_gnss: QuectelGnssATCommands,
+        p_fixRate: int = 1,
+        p_gnssMode: int = 1,
+        p_nmeaPort: Optional[str] = None,
+        p_source: str = SOURCE_AUTO,
+        p_fixMaxtime: int = 30,
+        p_fixMaxdist: int = 50,
+    ):
+        """
+        Continuous positioning session (``AT+QGPS`` with ``fix_count`` 0).
+
+        Fixes are taken from the cheapest available source:
+
+        - ``nmea``: the NMEA port stream, when ``p_nmeaPort`` is given.
+        - ``urc``: NMEA sentences received as ``+QGPSURC`` on the AT port.
+        - ``poll``: ``AT+QGPSLOC`` polling, aligned to ``p_fixRate``.
+
+        With ``auto``, the NMEA port is used when given, then ``+QGPSURC`` if such a URC
+        is received before the first poll, else polling.
+
+        :param p_gnss: Opened GNSS client, on the AT port.
+        :type p_gnss: QuectelGnssATCommands
+        :param p_fixRate: Interval between two fixes. Unit: second.
+        :type p_fixRate: int
+        :param p_gnssMode: GNSS working mode, see
+            ``gnssGeneralCommands20400TurnOnGnssWrite``.
+        :type p_gnssMode: int
+        :param p_nmeaPort: NMEA port, e.g. ``/dev/ttyUSB1``.
+        :type p_nmeaPort: Optional[str]
+        :param p_source: ``auto``, ``nmea``, ``urc`` or ``poll``.
+        :type p_source: str
+        :param p_fixMaxtime: Maximum positioning time. Unit: second.
+        :type p_fixMaxtime: int
+        :param p_fixMaxdist: Accuracy threshold of positioning. Unit: meter.
+        :type p_fixMaxdist: int
+        """
+        self.gnss = p_gnss
+        self.fixRate = p_fixRate
+        self.gnssMode = p_gnssMode
+        self.nmeaPort = p_nmeaPort
+        self.source = p_source
+        self.fixMaxtime = p_fixMaxtime
+        self.fixMaxdist = p_fixMaxdist
+        self.running = False
+        self.urcQueue: queue.Queue = queue.Queue(maxsize=256)
+        self.nmeaReader: Optional[QuectelNmeaReader] = None
+
+    def __enter__(self) -> "QuectelGnssSession":
+        self.start()
+        return self
+
+    def __exit__(self, p_type, p_value, p_traceback):
+        self.stop()
+
+    def start(self) -> tuple[bool, list[str]]:
+        """
+        Turn on GNSS for continuous positioning.
+
+        :return: Tuple containing the status of the command and the response. An ongoing
+            session is not an error.
+        :rtype: tuple[bool, list[str]]
+        """
+        self.gnss.serialPort.addUrcHandler("+QGPSURC:", self._onUrc)
+        status, response = self.gnss.gnssGeneralCommands20400TurnOnGnssWrite(
+            self.gnssMode, self.fixMaxtime, self.fixMaxdist, 0, self.fixRate
+        )
+        self.running = status or isCmeError(
+            response, _SESSION_ONGOING, _SESSION_ONGOING_TEXT
+        )
+        if not self.running:
+            self.gnss.serialPort.removeUrcHandler("+QGPSURC:", self._onUrc)
+        return self.running, response
+
+    def stop(self) -> tuple[bool, list[str]]:
+        """
+        End the generators and turn off GNSS.
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        self.running = False
+        self.gnss.serialPort.removeUrcHandler("+QGPSURC:", self._onUrc)
+        if self.nmeaReader is not None:
+            self.nmeaReader.close()
+        return self.gnss.gnssGeneralCommands20500TurnOffGnssWrite()
+
+    def fixes(self) -> Iterator[GnssPosition]:
+        """
+        Yield the fixes until ``stop`` is called.
+
+        :return: Generator of positions, only valid fixes.
+        :rtype: Iterator[GnssPosition]
+        """
+        source = self.source
+        if source == SOURCE_AUTO:
+            source = SOURCE_NMEA if self.nmeaPort else SOURCE_POLL
+        if source == SOURCE_NMEA:
+            yield from self._nmeaFixes()
+        elif source == SOURCE_URC:
+            yield from self._urcFixes()
+        else:
+            yield from self._pollFixes(self.source == SOURCE_AUTO)
+
+    def __iter__(self) -> Iterator[GnssPosition]:
+        return self.fixes()
+
+    async def __aiter__(self) -> AsyncIterator[GnssPosition]:
+        """
+        Yield the fixes to an ``async for`` loop, the blocking reads running in a thread.
+        """
+        loop = asyncio.get_running_loop()
+        fixes = self.fixes()
+        end = object()
+        while True:
+            fix = await loop.run_in_executor(None, next, fixes, end)
+            if fix is end:
+                return
+            yield fix
+
+    def _onUrc(self, p_line: str):
+        start = p_line.find("$")
+        if start < 0:
+            return
+        try:
+            self.urcQueue.put_nowait(p_line[start:].rstrip('"') + "\r\n")
+        except queue.Full:
+            pass
+
+    def _nmeaFixes(self) -> Iterator[GnssPosition]:
+        self.nmeaReader = QuectelNmeaReader(
+            self.nmeaPort, p_sentenceTypes=("GGA", "RMC", "GSA")
+        )
+        self.nmeaReader.open()
+        try:
+            yield from self._combine(self.nmeaReader.records())
+        finally:
+            self.nmeaReader.close()
+            self.nmeaReader = None
+
+    def _urcFixes(self) -> Iterator[GnssPosition]:
+        reader = QuectelNmeaReader(p_sentenceTypes=("GGA", "RMC", "GSA"))
+
+        def records() -> Iterator[NmeaRecord]:
+            while self.running:
+                try:
+                    sentence = self.urcQueue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                yield from reader.feed(sentence.encode())
+
+        yield from self._combine(records())
+
+    def _combine(self, p_records: Iterator[NmeaRecord]) -> Iterator[GnssPosition]:
+        """
+        Merge the GGA, RMC and GSA records of an epoch into one position.
+        """
+        gga: Optional[NmeaGga] = None
+        rmc: Optional[NmeaRmc] = None
+        fixType = 0
+        for record in p_records:
+            if not self.running:
+                return
+            if isinstance(record, NmeaGsa):
+                fixType = record.fixType if record.fixType > 1 else 0
+                continue
+            if isinstance(record, NmeaGga):
+                gga = record
+            elif isinstance(record, NmeaRmc):
+                rmc = record
+            if gga is None or rmc is None or gga.time != rmc.time:
+                continue
+
+            if gga.quality > 0 and gga.latitude is not None:
+                yield GnssPosition(
+                    gga.time,
+                    gga.latitude,
+                    gga.longitude,
+                    gga.hdop or 0.0,
+                    gga.altitude or 0.0,
+                    fixType or 3,
+                    rmc.course or 0.0,
+                    (rmc.speedKnots or 0.0) * _KNOTS_TO_KMH,
+                    rmc.speedKnots or 0.0,
+                    rmc.date,
+                    gga.satellites or 0,
+                )
+            gga = rmc = None
+
+    def _pollFixes(self, p_detectUrc: bool) -> Iterator[GnssPosition]:
+        """
+        Poll ``AT+QGPSLOC`` at the fix rate.
+
+        Without fix the interval grows up to 4 times the fix rate. When a poll returns the
+        same fix as the previous one, the polls were early and are delayed by a quarter
+        of the fix rate, so that they stay right after the receiver's fixes.
+        """
+        interval = float(self.fixRate)
+        nextPoll = time.monotonic()
+        lastUtc: Optional[float] = None
+        while self.running:
+            now = time.monotonic()
+            if nextPoll > now:
+                time.sleep(nextPoll - now)
+            else:
+                nextPoll = now
+            if not self.running:
+                return
+            if p_detectUrc and not self.urcQueue.empty():
+                self.source = SOURCE_URC
+                yield from self._urcFixes()
+                return
+
+            status, position = self.gnss.acquirePosition(2)
+            if status and position is None:
+                interval = min(interval * 1.5, 4.0 * self.fixRate)
+                nextPoll += interval
+                continue
+
+            interval = float(self.fixRate)
+            nextPoll += interval
+            if position is None:
+                continue
+            if position.utc == lastUtc:
+                nextPoll += self.fixRate / 4
+                continue
+            lastUtc = position.utc
+            yield position
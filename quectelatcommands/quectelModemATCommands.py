@@ -1,23 +1,71 @@
 #!/usr/bin/env python3
 
-from typing import Optional
+from contextlib import closing, contextmanager
+from typing import Any, Iterable, Iterator, Optional, Union
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    splitResponseFields,
+)
 from quectelatcommands.quectelSerial import QuectelSerial
+from quectelatcommands.quectelSmsPdu import (
+    SmsListEntry,
+    encodeSubmit,
+    parseListPdu,
+)
+from quectelatcommands.quectelSmsStream import (
+    QuectelSmsReassembler,
+    SmsMessage,
+    streamSms,
+)
+from quectelatcommands.quectelSnapshot import (
+    loadSnapshot,
+    restoreSnapshot,
+    saveSnapshot,
+    takeSnapshot,
+)
+
+# Maximum response time of AT+CMGS and AT+QCMGS, which depends on the network.
+# Unit: second.
+SMS_SEND_TIMEOUT = 120
 
 
 class QuectelModemATCommands:
     def __init__(
-        self, p_port: str = "/dev/ttyUSB2", p_baudrate: int = 115200, p_timeout: int = 1
+        self,
+        p_port: str = "/dev/ttyUSB2",
+        p_baudrate: int = 115200,
+        p_timeout: int = 1,
+        p_freshnessWindow: float = 0,
     ):
         """
         Quectel modem AT commands.
+
+        :param p_port: Serial port to connect to.
+        :type p_port: str
+        :param p_baudrate: Baudrate to use.
+        :type p_baudrate: int
+        :param p_timeout: Timeout for the serial connection.
+        :type p_timeout: int
+        :param p_freshnessWindow: Time during which the successful response of a read
+            command is given again without sending the command, until a write is sent.
+            Unit: second.
+        :type p_freshnessWindow: float
         """
-        self.serialPort = QuectelSerial(p_port, p_baudrate, p_timeout)
+        self.serialPort = QuectelSerial(
+            p_port, p_baudrate, p_timeout, p_freshnessWindow
+        )
+        self.capturedCommands: Optional[list[str]] = None
+        self.deviceInfo: Optional[dict] = None
 
-    def open(self):
+    def open(self, p_connection: Optional[Any] = None):
         """
         Open the serial connection.
+
+        :param p_connection: Already opened connection to use instead of the serial port,
+            e.g. a ``QuectelSimulatedSerial``.
+        :type p_connection: Optional[Any]
         """
-        self.serialPort.open()
+        self.serialPort.open(p_connection)
 
     def sendCommand(self, p_command: str) -> tuple[bool, list[str]]:
         """
@@ -29,15 +77,346 @@ class QuectelModemATCommands:
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
         """
+        if self.capturedCommands is not None:
+            self.capturedCommands.append(p_command)
+            return True, []
 
         return self.serialPort.sendCommand(p_command)
 
+    def sendCommandBatch(
+        self, p_commands: list[str], p_maxLineLength: int = 256
+    ) -> list[tuple[bool, list[str]]]:
+        """
+        Send several AT commands, the reads concatenated into as few command lines as
+        possible and the writes sent one by one.
+
+        :param p_commands: AT commands to send.
+        :type p_commands: list[str]
+        :param p_maxLineLength: Maximum length of a concatenated command line.
+        :type p_maxLineLength: int
+
+        :return: Status and response of each command, in the order of ``p_commands``.
+        :rtype: list[tuple[bool, list[str]]]
+        """
+        return self.serialPort.sendCommandBatch(p_commands, p_maxLineLength)
+
+    def sendCommandWithPayload(
+        self,
+        p_command: str,
+        p_payload: bytes,
+        p_prompt: str = "CONNECT",
+        p_timeout: float = 10,
+    ) -> tuple[bool, list[str]]:
+        """
+        Send an AT command that reads data after a prompt, e.g. a file upload.
+
+        :param p_command: AT command to send.
+        :type p_command: str
+        :param p_payload: Data written once the prompt is received.
+        :type p_payload: bytes
+        :param p_prompt: Start of the line asking for the data.
+        :type p_prompt: str
+        :param p_timeout: Maximum time to wait for the final result code. Unit: second.
+        :type p_timeout: float
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        return self.serialPort.sendCommandWithPayload(
+            p_command, p_payload, p_prompt, p_timeout
+        )
+
+    def streamCommand(self, p_command: str, p_timeout: float = 5) -> Iterator[str]:
+        """
+        Send an AT command and give its response lines as they are received.
+
+        :param p_command: AT command to send.
+        :type p_command: str
+        :param p_timeout: Maximum time to wait for each line. Unit: second.
+        :type p_timeout: float
+
+        :return: Response lines, ending with the final result code.
+        :rtype: Iterator[str]
+        """
+        if self.capturedCommands is not None:
+            self.capturedCommands.append(p_command)
+            return iter(())
+
+        return self.serialPort.streamCommand(p_command, p_timeout)
+
     def close(self):
         """
         Close the serial connection.
         """
         self.serialPort.close()
 
+    def probeDeviceInfo(self, p_withSupportedCommands: bool = False) -> dict:
+        """
+        Read the identity of the module and store it in ``deviceInfo``.
+
+        :param p_withSupportedCommands: Also read the list of supported commands (``AT+CLAC``).
+        :type p_withSupportedCommands: bool
+
+        :return: ``atPort``, ``baudrate``, and when available ``imei``, ``model``,
+            ``firmware`` and ``supportedCommands``.
+        :rtype: dict
+        """
+        info: dict = {
+            "atPort": self.serialPort.port,
+            "baudrate": self.serialPort.baudrate,
+        }
+
+        status, response = self.generalCommands209InternationalMobileEquipmentIdentity()
+        imeis = [line for line in response if line.isdigit()]
+        if status and imeis:
+            info["imei"] = imeis[0]
+
+        # ATI: manufacturer, model, "Revision: <firmware>"
+        status, response = (
+            self.generalCommands201DisplayProductIdentificationInformation()
+        )
+        if status and len(response) >= 3:
+            info["model"] = response[1]
+            info["firmware"] = response[2].replace("Revision:", "").strip()
+
+        if p_withSupportedCommands:
+            status, response = self.sendCommand("AT+CLAC")
+            if status:
+                info["supportedCommands"] = [
+                    line for line in response[:-1] if line.startswith("AT")
+                ]
+
+        self.deviceInfo = info
+        return info
+
+    def snapshot(self, p_fileName: str) -> tuple[bool, list[str]]:
+        """
+        Save every readable setting to a file, read in one batch of AT commands.
+
+        The settings are those returned by the ``*Read`` methods and the basic settings
+        displayed by ``AT&V`` (``generalCommands211DisplayCurrentConfiguration``). The file is
+        compact JSON, gzip-compressed if its name ends with ``.gz``.
+
+        :param p_fileName: Path of the snapshot file.
+        :type p_fileName: str
+
+        :return: Tuple containing the status of the snapshot and the captured commands.
+        :rtype: tuple[bool, list[str]]
+        """
+        snapshot = takeSnapshot(self, ["AT&V"])
+        saveSnapshot(snapshot, p_fileName)
+        return bool(snapshot["reads"]), list(snapshot["reads"])
+
+    def restore(self, p_fileName: str) -> tuple[bool, list[str]]:
+        """
+        Write back the settings of a file saved by ``snapshot``: the settings that differ
+        are written in concatenated command lines, see ``restoreSnapshot``.
+
+        :param p_fileName: Path of the snapshot file.
+        :type p_fileName: str
+
+        :return: Tuple containing the status of the writes and one line per write.
+        :rtype: tuple[bool, list[str]]
+        """
+        return restoreSnapshot(self, loadSnapshot(p_fileName))
+
+    @contextmanager
+    def messageFormat(self, p_mode: int) -> Iterator[tuple[bool, list[str]]]:
+        """
+        Select a message format (``AT+CMGF``) for the duration of a ``with`` block, the
+        previous one being selected again at the end, so that the consumers relying on
+        the other format keep working.
+
+        :param p_mode: 0 PDU mode, 1 text mode.
+        :type p_mode: int
+
+        :return: Tuple containing the status of the selection and the responses.
+        :rtype: Iterator[tuple[bool, list[str]]]
+        """
+        status, response = self.shortMessageServiceCommands902MessageFormatRead()
+        lines = findResponseLines(response, "+CMGF:") if status else []
+        fields = splitResponseFields(lines[0]) if lines else []
+        previous = int(fields[0]) if fields and fields[0].isdigit() else None
+        if previous == p_mode:
+            yield True, response
+            return
+
+        status, writeResponse = self.shortMessageServiceCommands902MessageFormatWrite(
+            p_mode
+        )
+        try:
+            yield status, response + writeResponse
+        finally:
+            if status and previous is not None:
+                self.shortMessageServiceCommands902MessageFormatWrite(previous)
+
+    def sendSms(
+        self, p_destination: str, p_text: Union[str, bytes], **p_options
+    ) -> tuple[bool, list[str]]:
+        """
+        Send a message in PDU mode, as a concatenated message when it does not fit in one.
+        The message format is restored afterwards, see ``messageFormat``.
+
+        :param p_destination: Destination number, ``+`` for an international number.
+        :type p_destination: str
+        :param p_text: Text, GSM 7 bit encoded when possible and UCS2 otherwise, or bytes
+            sent as 8 bit data.
+        :type p_text: Union[str, bytes]
+        :param p_options: Keyword arguments of ``encodeSubmit`` of ``quectelSmsPdu``,
+            e.g. ``p_statusReport=True``.
+
+        :return: Tuple containing the status of the sending and the response of each
+            part (``+CMGS: <mr>`` lines). Sending stops at the first failed part.
+        :rtype: tuple[bool, list[str]]
+        """
+        with self.messageFormat(0) as (status, response):
+            if not status:
+                return status, response
+
+            response = []
+            for length, pdu in encodeSubmit(p_destination, p_text, **p_options):
+                status, partResponse = (
+                    self.shortMessageServiceCommands908SendMessagesPduMode(length, pdu)
+                )
+                response += partResponse
+                if not status:
+                    break
+            return status, response
+
+    def listSms(self, p_stat: int = 4) -> tuple[bool, list[SmsListEntry]]:
+        """
+        List and decode the messages of the preferred storage, in PDU mode. The message
+        format is restored afterwards, see ``messageFormat``.
+
+        :param p_stat: 0 received unread, 1 received read, 2 stored unsent, 3 stored
+            sent, 4 all.
+        :type p_stat: int
+
+        :return: Tuple containing the status of the command and the messages.
+        :rtype: tuple[bool, list[SmsListEntry]]
+        """
+        with self.messageFormat(0) as (status, response):
+            if status:
+                status, response = self.sendCommand(f"AT+CMGL={p_stat}")
+        return status, parseListPdu(response) if status else []
+
+    def readSms(self, p_index: int) -> Optional[SmsListEntry]:
+        """
+        Read and decode a message, in PDU mode. The message format is restored
+        afterwards, see ``messageFormat``.
+
+        :param p_index: Storage index of the message.
+        :type p_index: int
+
+        :return: Message, None when the index is empty or on error.
+        :rtype: Optional[SmsListEntry]
+        """
+        with self.messageFormat(0) as (status, response):
+            if status:
+                status, response = self.shortMessageServiceCommands907ReadMessage(
+                    p_index
+                )
+        entries = parseListPdu(response) if status else []
+        return entries[0]._replace(index=p_index) if entries else None
+
+    def iterSms(self, p_stat: int = 4, p_maxPending: int = 64) -> Iterator[SmsMessage]:
+        """
+        List the messages of the preferred storage in PDU mode, reassembling the
+        concatenated ones, as the ``AT+CMGL`` response arrives.
+
+        The listing is not held in memory: only the concatenated messages waiting for
+        parts are, at most ``p_maxPending`` of them. The message format is restored once
+        the generator is exhausted or closed, see ``messageFormat``.
+
+        :param p_stat: 0 received unread, 1 received read, 2 stored unsent, 3 stored
+            sent, 4 all.
+        :type p_stat: int
+        :param p_maxPending: Maximum number of incomplete concatenated messages kept.
+        :type p_maxPending: int
+
+        :return: Messages, as soon as they are complete; the incomplete ones at the end.
+        :rtype: Iterator[SmsMessage]
+        """
+        with self.messageFormat(0) as (status, _):
+            if not status:
+                return
+            # Closed before the message format is restored, which needs the connection
+            with closing(self.streamCommand(f"AT+CMGL={p_stat}")) as lines:
+                yield from streamSms(lines, QuectelSmsReassembler(p_maxPending))
+
+    def iterConcatenatedSms(
+        self, p_indexes: Iterable[int], p_maxPending: int = 64
+    ) -> Iterator[SmsMessage]:
+        """
+        Read messages with ``AT+QCMGR`` in text mode, reassembling the concatenated ones
+        from their ``<uid>,<msg_seg>,<msg_total>``. The message format is restored once
+        the generator is exhausted or closed, see ``messageFormat``.
+
+        :param p_indexes: Storage indexes to read.
+        :type p_indexes: Iterable[int]
+        :param p_maxPending: Maximum number of incomplete concatenated messages kept.
+        :type p_maxPending: int
+
+        :return: Messages, as soon as they are complete; the incomplete ones at the end.
+        :rtype: Iterator[SmsMessage]
+        """
+        with self.messageFormat(1) as (status, _):
+            if not status:
+                return
+            reassembler = QuectelSmsReassembler(p_maxPending)
+            for index in p_indexes:
+                status, response = (
+                    self.shortMessageServiceCommands918ReadConcatenatedMessages(index)
+                )
+                if status:
+                    yield from streamSms(response, reassembler, index, False)
+            yield from reassembler.flush()
+
+    def updateSmsEventReporting(
+        self,
+        p_mode: Optional[int] = None,
+        p_mt: Optional[int] = None,
+        p_bm: Optional[int] = None,
+        p_ds: Optional[int] = None,
+        p_bfr: Optional[int] = None,
+    ) -> tuple[bool, list[str]]:
+        """
+        Change some ``AT+CNMI`` settings, the others being kept, so that the handlers
+        of different URCs (``+CMTI``, ``+CBM``, ``+CDS``) can be set up independently.
+
+        :param p_mode: <mode>, None to keep it. 0 is changed to 2 when URCs are enabled,
+            since they are only forwarded with modes 1 and 2.
+        :type p_mode: Optional[int]
+        :param p_mt: <mt>, None to keep it.
+        :type p_mt: Optional[int]
+        :param p_bm: <bm>, None to keep it.
+        :type p_bm: Optional[int]
+        :param p_ds: <ds>, None to keep it.
+        :type p_ds: Optional[int]
+        :param p_bfr: <bfr>, None to keep it.
+        :type p_bfr: Optional[int]
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        status, response = (
+            self.shortMessageServiceCommands913SmsEventReportingConfigurationRead()
+        )
+        if not status:
+            return status, response
+        lines = findResponseLines(response, "+CNMI:")
+        fields = splitResponseFields(lines[0]) if lines else []
+        settings = [int(field) if field.isdigit() else 0 for field in fields[:5]]
+        settings += [0] * (5 - len(settings))
+        for position, value in enumerate((p_mode, p_mt, p_bm, p_ds, p_bfr)):
+            if value is not None:
+                settings[position] = value
+        if not settings[0] and any(settings[1:4]):
+            settings[0] = 2
+        return self.shortMessageServiceCommands913SmsEventReportingConfigurationWrite(
+            *settings
+        )
+
     def freeAtCommand(self, p_command: str):
         """
         Free AT command.
@@ -766,7 +1145,7 @@ class QuectelModemATCommands:
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
         """
-        return self.sendCommand(f'AT+QCFG="band",{p_bandval},0x{p_ltebandval:X}')
+        return self.sendCommand(f'AT+QCFG="band",0x{p_bandval:X},0x{p_ltebandval:X}')
 
     def statusControlCommands40307SpecifyRiBehaviorWhenOtherUrcsArePresented(
         self, p_typeRI: str, p_pulse_duration: int, p_pulse_count: int
@@ -1791,17 +2170,21 @@ class QuectelModemATCommands:
         return self.sendCommand(f'AT+CPBF="{p_findtext}"')
 
     def phonebookCommands803ReadPhonebookEntries(
-        self, p_index: int
+        self, p_index: int, p_last: Optional[int] = None
     ) -> tuple[bool, list[str]]:
         """
         Phonebook commands 803: Read phonebook entries.
 
         :param p_index: Integer type. Value in the range of location numbers of phonebook memory.
         :type p_index: int
+        :param p_last: Integer type. Last location number of a range read from <index1>, None to read one entry.
+        :type p_last: Optional[int]
 
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
         """
+        if p_last is not None:
+            return self.sendCommand(f"AT+CPBR={p_index},{p_last}")
         return self.sendCommand(f"AT+CPBR={p_index}")
 
     def phonebookCommands804SelectPhonebookMemoryStorageRead(
@@ -1839,15 +2222,19 @@ class QuectelModemATCommands:
         return self.sendCommand(f'AT+CPBS="{p_storage}"')
 
     def phonebookCommands805WritePhonebookEntry(
-        self, p_index: int, p_number: str, p_type: int, p_text: str
+        self,
+        p_index: int,
+        p_number: Optional[str] = None,
+        p_type: int = 129,
+        p_text: str = "",
     ) -> tuple[bool, list[str]]:
         """
         Phonebook commands 805: Write phonebook entry.
 
         :param p_index: Integer type. Value in the range of location numbers of phonebook memory. If <index> is not given, the first free entry will be used. If <index> is given as the only parameter, the phonebook entry specified by location is deleted.
         :type p_index: int
-        :param p_number: String type. Phone number in format specified by <type>.
-        :type p_number: str
+        :param p_number: String type. Phone number in format specified by <type>. None deletes the entry.
+        :type p_number: Optional[str]
         :param p_type: Integer type. Type of address of octet (see 3GPP TS 24.008 subclause 10.5.4.7 for details):
 
             - **129** :             Unknown type (IDSN format)
@@ -1860,6 +2247,8 @@ class QuectelModemATCommands:
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
         """
+        if p_number is None:
+            return self.sendCommand(f"AT+CPBW={p_index}")
         return self.sendCommand(f'AT+CPBW={p_index},"{p_number}",{p_type},"{p_text}"')
 
     def shortMessageServiceCommands901SelectMessageServiceRead(
@@ -2061,15 +2450,22 @@ class QuectelModemATCommands:
         return self.sendCommand(f'AT+CMGS="{p_da}",{p_toda}{p_text}\x1A')
 
     def shortMessageServiceCommands908SendMessagesPduMode(
-        self,
+        self, p_length: int, p_pdu: str
     ) -> tuple[bool, list[str]]:
         """
         Short message service commands 908: Send messages PDU mode.
 
+        :param p_length: Integer type. Length of the actual TP data unit in octets (excluding the octets of SMSC address).
+        :type p_length: int
+        :param p_pdu: SMS-SUBMIT PDU in hexadecimal, e.g. from ``encodeSubmit`` of ``quectelSmsPdu``.
+        :type p_pdu: str
+
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
         """
-        return False, ["Not implemented"]
+        return self.sendCommandWithPayload(
+            f"AT+CMGS={p_length}", f"{p_pdu}\x1A".encode(), ">", SMS_SEND_TIMEOUT
+        )
 
     def shortMessageServiceCommands909SendMoreMessagesRead(
         self,
@@ -2139,15 +2535,29 @@ class QuectelModemATCommands:
         )
 
     def shortMessageServiceCommands910WriteMessageToMemoryPduMode(
-        self,
+        self, p_length: int, p_pdu: str, p_stat: int = 2
     ) -> tuple[bool, list[str]]:
         """
         Short message service commands 910: Write message to memory PDU mode.
 
+        :param p_length: Integer type. Length of the actual TP data unit in octets (excluding the octets of SMSC address).
+        :type p_length: int
+        :param p_pdu: SMS-SUBMIT or SMS-DELIVER PDU in hexadecimal.
+        :type p_pdu: str
+        :param p_stat: Integer type:
+
+            - **0** :       Received unread messages
+            - **1** :       Received read messages
+            - **2** :       Stored unsent messages
+            - **3** :       Stored sent messages
+        :type p_stat: int
+
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
         """
-        return False, ["Not implemented"]
+        return self.sendCommandWithPayload(
+            f"AT+CMGW={p_length},{p_stat}", f"{p_pdu}\x1A".encode(), ">"
+        )
 
     def shortMessageServiceCommands911SendMessageFromStorage(
         self, p_index: int, p_da: str, p_toda: int
@@ -2373,15 +2783,22 @@ class QuectelModemATCommands:
         )
 
     def shortMessageServiceCommands917SendConcatenatedMessagesPduMode(
-        self,
+        self, p_length: int, p_pdu: str
     ) -> tuple[bool, list[str]]:
         """
         Short message service commands 917: Send concatenated messages PDU mode.
 
+        :param p_length: Integer type. Length of the actual TP data unit in octets (excluding the octets of SMSC address).
+        :type p_length: int
+        :param p_pdu: SMS-SUBMIT PDU in hexadecimal, its user data header included.
+        :type p_pdu: str
+
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
         """
-        return False, ["Not implemented"]
+        return self.sendCommandWithPayload(
+            f"AT+QCMGS={p_length}", f"{p_pdu}\x1A".encode(), ">", SMS_SEND_TIMEOUT
+        )
 
     def shortMessageServiceCommands918ReadConcatenatedMessages(
         self, p_index: int
@@ -3452,6 +3869,463 @@ def free_at_command(ctx, command: str):
     client.close()
 
 
+@main.command("discover-ports")
+@click.pass_context
+@click.option(
+    "--probe-timeout",
+    type=float,
+    default=0.3,
+    help="Maximum time to probe a port, in seconds.",
+    show_default=True,
+)
+@click.option(
+    "--save/--no-save",
+    default=False,
+    help="Store the discovered ports in the device registry.",
+    show_default=True,
+)
+def discover_ports(ctx, probe_timeout: float, save: bool):
+    """Discover the AT, PPP, NMEA and DM ports of the attached modules."""
+    from quectelatcommands.quectelDeviceRegistry import QuectelDeviceRegistry
+    from quectelatcommands.quectelPortDiscovery import QuectelPortDiscovery
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    discovery = QuectelPortDiscovery(
+        client.serialPort.baudrate, probe_timeout, client.serialPort.timeout
+    )
+    modules = discovery.discover(p_registry=QuectelDeviceRegistry() if save else None)
+    for module in modules:
+        print(module["usbKey"])
+        for device, kind in module["ports"].items():
+            print(f"  {device}: {kind}")
+
+
+@main.command("send-sms")
+@click.pass_context
+@click.option(
+    "--destination",
+    "-d",
+    type=str,
+    required=True,
+    help="Destination number, + for an international number.",
+)
+@click.option("--text", "-x", type=str, required=True, help="SMS Text")
+@click.option(
+    "--status-report/--no-status-report",
+    default=False,
+    help="Request a status report.",
+    show_default=True,
+)
+def send_sms(ctx, destination: str, text: str, status_report: bool):
+    """Send a message in PDU mode, split into parts if needed."""
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    status, response = client.sendSms(destination, text, p_statusReport=status_report)
+    print(response if status else "Error")
+    client.close()
+
+
+@main.command("list-sms")
+@click.pass_context
+@click.option(
+    "--stat",
+    "-s",
+    type=int,
+    default=4,
+    help="0 received unread, 1 received read, 2 stored unsent, 3 stored sent, 4 all.",
+    show_default=True,
+)
+@click.option(
+    "--max-pending",
+    type=int,
+    default=64,
+    help="Maximum number of incomplete concatenated messages kept.",
+    show_default=True,
+)
+def list_sms(ctx, stat: int, max_pending: int):
+    """List and decode the messages in PDU mode."""
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    for message in client.iterSms(stat, max_pending):
+        indexes = ",".join(str(index) for index in message.indexes)
+        missing = "" if message.complete else f" (incomplete, {message.total} parts)"
+        print(f"{indexes}: {message.address} {message.timestamp}{missing}")
+        print(f"  {message.text if message.text is not None else message.data.hex()}")
+    client.close()
+
+
+@main.command("sms-inbox")
+@click.pass_context
+@click.option(
+    "--direct/--stored",
+    default=False,
+    help="Receive the messages with +CMT instead of storing them.",
+    show_default=True,
+)
+def sms_inbox(ctx, direct: bool):
+    """Print the received messages as they arrive, and delete them."""
+    from quectelatcommands.quectelSmsInbox import QuectelSmsInbox
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    inbox = QuectelSmsInbox(client, p_direct=direct)
+    status, response = inbox.start()
+    if not status:
+        print(response)
+        client.close()
+        return
+    try:
+        for message in inbox:
+            print(f"{message.address} {message.timestamp}: {message.text}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        inbox.stop()
+        client.close()
+
+
+@main.command("send-sms-burst")
+@click.pass_context
+@click.option(
+    "--destination",
+    "-d",
+    multiple=True,
+    required=True,
+    help="Destination number, repeated for each recipient.",
+)
+@click.option("--text", "-m", required=True, help="Text of the message.")
+@click.option(
+    "--keep-link",
+    "-k",
+    type=click.IntRange(0, 2),
+    default=1,
+    help="AT+CMMS mode during the burst.",
+    show_default=True,
+)
+@click.option(
+    "--report-timeout",
+    type=float,
+    default=60.0,
+    help="Time to wait for the status reports, in seconds.",
+    show_default=True,
+)
+def send_sms_burst(
+    ctx, destination: tuple[str, ...], text: str, keep_link: int, report_timeout: float
+):
+    """Send a message to several recipients over a kept link."""
+    from quectelatcommands.quectelSmsOutbox import QuectelSmsOutbox
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    with QuectelSmsOutbox(client, keep_link) as outbox:
+        ids = outbox.enqueueMany(destination, text)
+        report = outbox.run()
+        print(
+            f"{report['sent']} sent, {report['failed']} failed, "
+            f"{report['retries']} retries, {report['messagesPerMinute']:.1f} messages/min"
+        )
+        outbox.waitForReports(report_timeout)
+        for messageId in ids:
+            delivery = outbox.delivery(messageId)
+            print(f"{delivery.destination}: {delivery.state} {delivery.error or ''}")
+    client.close()
+
+
+@main.command("sms-outbox-benchmark")
+@click.option(
+    "--messages",
+    "-n",
+    type=int,
+    default=50,
+    help="Number of messages of each burst.",
+    show_default=True,
+)
+@click.option(
+    "--speed",
+    type=float,
+    default=20.0,
+    help="Simulated seconds per real second.",
+    show_default=True,
+)
+@click.option(
+    "--failure-rate",
+    type=float,
+    default=0.05,
+    help="Probability that sending a message fails.",
+    show_default=True,
+)
+def sms_outbox_benchmark(messages: int, speed: float, failure_rate: float):
+    """Measure the messages per minute for each AT+CMMS mode on a simulated module."""
+    from quectelatcommands.quectelSmsOutbox import benchmarkSmsOutbox
+
+    for keepLink, report in benchmarkSmsOutbox(messages, speed, failure_rate).items():
+        print(
+            f"AT+CMMS={keepLink}: {report['messagesPerMinute']:.1f} messages/min, "
+            f"{report['sent']} sent, {report['delivered']} delivered, "
+            f"{report['retries']} retries"
+        )
+
+
+@main.command("cell-broadcast")
+@click.pass_context
+@click.option(
+    "--channels",
+    "-c",
+    type=str,
+    default="4352-4359,4370-4399",
+    help="Message identifiers accepted.",
+    show_default=True,
+)
+@click.option(
+    "--dcss",
+    "-d",
+    type=str,
+    default="",
+    help="Data coding schemes accepted, empty for all.",
+)
+def cell_broadcast(ctx, channels: str, dcss: str):
+    """Print the cell broadcast messages as they arrive."""
+    from quectelatcommands.quectelCellBroadcast import QuectelCellBroadcast
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    broadcast = QuectelCellBroadcast()
+    messages = broadcast.subscribe()
+    status, response = broadcast.attach(client, channels, dcss)
+    if not status:
+        print(response)
+        client.close()
+        return
+    try:
+        while True:
+            message = messages.get()
+            print(
+                f"{message.messageId} #{message.messageCode}.{message.updateNumber} "
+                f"{message.language or ''}: {message.text}"
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broadcast.detach(client)
+        client.close()
+
+
+@main.command("sms-storage")
+@click.pass_context
+@click.option(
+    "--archive",
+    "-a",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Archive the received messages to this SQLite database and delete them.",
+)
+@click.option(
+    "--migrate",
+    "-m",
+    type=(str, str),
+    default=None,
+    help="Move every message of a storage to another one, e.g. SM ME.",
+)
+def sms_storage(ctx, archive: Optional[str], migrate: Optional[tuple[str, str]]):
+    """Show the message storage occupancy, archive or migrate the messages."""
+    from quectelatcommands.quectelSmsStorage import QuectelSmsStorage
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    storage = QuectelSmsStorage(client, archive or ":memory:")
+    status, response = storage.refresh()
+    if status and migrate is not None:
+        status, moved = storage.migrate(*migrate)
+        print(f"{moved} messages moved")
+    if status and archive is not None:
+        status, archived = storage.archive()
+        print(f"{archived} messages archived")
+    if not status:
+        print(response)
+    for usage in storage.usage.values():
+        print(f"{usage.storage}: {usage.used}/{usage.total}")
+    storage.close()
+    client.close()
+
+
+@main.command("watch-registration")
+@click.pass_context
+@click.option(
+    "--domain",
+    "-d",
+    type=click.Choice(["cs", "ps", "eps"]),
+    multiple=True,
+    default=("cs", "ps", "eps"),
+    help="Domains tracked.",
+    show_default=True,
+)
+def watch_registration(ctx, domain: tuple[str, ...]):
+    """Print the network registration changes as they are reported."""
+    from datetime import datetime
+    from quectelatcommands.quectelRegistration import QuectelRegistrationTracker
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    tracker = QuectelRegistrationTracker(client, domain)
+    status, response = tracker.start()
+    if not status:
+        print(response)
+        client.close()
+        return
+    count = 0
+    try:
+        while True:
+            count, transitions = tracker.waitForTransition(count)
+            for transition in transitions:
+                current = transition.current
+                print(
+                    f"{datetime.fromtimestamp(transition.timestamp):%H:%M:%S} "
+                    f"{transition.domain}: stat {current.stat} lac {current.lac} "
+                    f"ci {current.cellId} act {current.act}"
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracker.stop()
+        client.close()
+
+
+@main.command("watch-signal")
+@click.pass_context
+@click.option(
+    "--period",
+    "-t",
+    type=float,
+    default=5.0,
+    help="Printing period. Unit: second.",
+    show_default=True,
+)
+@click.option(
+    "--window",
+    "-w",
+    type=float,
+    default=300.0,
+    help="Window of the statistics. Unit: second.",
+    show_default=True,
+)
+def watch_signal(ctx, period: float, window: float):
+    """Print the signal quality and its statistics over a window."""
+    import time
+    from datetime import datetime
+    from quectelatcommands.quectelSignalSampler import QuectelSignalSampler
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    sampler = QuectelSignalSampler(client)
+    status, response = sampler.start()
+    if not status:
+        print(response)
+        client.close()
+        return
+    print("URCs" if sampler.urcs else "Polling AT+CSQ")
+    try:
+        while True:
+            sample = sampler.latest()
+            if sample is not None:
+                columns = []
+                for name, unit in (("rssi", "dBm"), ("rsrp", "dBm"), ("sinr", "dB")):
+                    stats = sampler.stats(name, window)
+                    columns.append(
+                        f"{name} {getattr(sample, name):.0f} {unit} "
+                        f"({stats.minimum:.0f}/{stats.mean:.1f}/{stats.maximum:.0f})"
+                    )
+                print(
+                    f"{datetime.fromtimestamp(sample.time):%H:%M:%S} "
+                    + ", ".join(columns)
+                )
+            time.sleep(period)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+        client.close()
+
+
+@main.command("watch-data-counter")
+@click.pass_context
+@click.option(
+    "--interval",
+    "-i",
+    type=float,
+    default=10.0,
+    help="Sampling interval. Unit: second.",
+    show_default=True,
+)
+@click.option(
+    "--window",
+    "-w",
+    type=float,
+    default=300.0,
+    help="Window of the mean rates. Unit: second.",
+    show_default=True,
+)
+@click.option(
+    "--auto-save",
+    "-a",
+    type=int,
+    default=3600,
+    help="Auto-save interval of the counters to NV, 0 to disable it. Unit: second.",
+    show_default=True,
+)
+def watch_data_counter(ctx, interval: float, window: float, auto_save: int):
+    """Print the packet data throughput as it is sampled."""
+    from datetime import datetime
+    from quectelatcommands.quectelPacketCounter import (
+        CounterSample,
+        QuectelPacketCounter,
+    )
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    monitor = QuectelPacketCounter(client, interval, p_autoSave=auto_save)
+
+    def printSample(p_sample: CounterSample):
+        txRate, rxRate = monitor.rates(window)
+        print(
+            f"{datetime.fromtimestamp(p_sample.time):%H:%M:%S} "
+            f"sent {p_sample.sent} B, received {p_sample.received} B, "
+            f"tx {p_sample.txRate / 1000:.1f} kB/s ({txRate / 1000:.1f}), "
+            f"rx {p_sample.rxRate / 1000:.1f} kB/s ({rxRate / 1000:.1f})"
+        )
+
+    monitor.addMetricsHandler(printSample)
+    status, response = monitor.start()
+    if not status:
+        print(response)
+        client.close()
+        return
+    try:
+        while monitor.worker is not None and monitor.worker.is_alive():
+            monitor.worker.join(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.stop()
+        client.close()
+
+
+@main.command("sms-pdu-benchmark")
+@click.option(
+    "--messages",
+    "-n",
+    type=int,
+    default=10000,
+    help="Number of messages of each kind.",
+    show_default=True,
+)
+def sms_pdu_benchmark(messages: int):
+    """Measure the throughput of the SMS PDU codec, in messages per second."""
+    from quectelatcommands.quectelSmsPdu import benchmarkSmsPdu
+
+    for name, rate in benchmarkSmsPdu(messages).items():
+        print(f"{name}: {rate:.0f} messages/s")
+
+
 @main.group()
 @click.pass_context
 def general_command(ctx):
@@ -6043,15 +6917,64 @@ def find_phonebook_entries(ctx, findtext: str):
     required=True,
     help="Index of the phonebook entry to read.",
 )
-def read_phonebook_entries(ctx, index: int):
+@click.option(
+    "--last",
+    "-l",
+    type=int,
+    default=None,
+    help="Last index of a range of entries to read.",
+)
+def read_phonebook_entries(ctx, index: int, last: Optional[int]):
     """Read Phonebook Entries."""
     client: QuectelModemATCommands = ctx.obj["client"]
     client.open()
-    status, response = client.phonebookCommands803ReadPhonebookEntries(index)
+    status, response = client.phonebookCommands803ReadPhonebookEntries(index, last)
     print(response if status else "Error")
     client.close()
 
 
+@phonebook_commands.command("search-phonebook")
+@click.pass_context
+@click.option(
+    "--storage", "-s", type=str, default=None, help="Phonebook storage, e.g. SM."
+)
+@click.option("--name", "-n", type=str, default=None, help="Prefix of the names.")
+@click.option("--number", "-u", type=str, default=None, help="Number to find.")
+@click.option(
+    "--chunk-size",
+    "-c",
+    type=int,
+    default=50,
+    help="Number of entries read by each AT+CPBR.",
+    show_default=True,
+)
+def search_phonebook(
+    ctx,
+    storage: Optional[str],
+    name: Optional[str],
+    number: Optional[str],
+    chunk_size: int,
+):
+    """Read the phonebook in ranges and search it locally."""
+    from quectelatcommands.quectelPhonebook import QuectelPhonebook
+
+    client: QuectelModemATCommands = ctx.obj["client"]
+    client.open()
+    phonebook = QuectelPhonebook(client, chunk_size)
+    status, response = phonebook.load(storage)
+    client.close()
+    if not status:
+        print(response)
+        return
+    entries = list(phonebook)
+    if name is not None:
+        entries = phonebook.findName(name)
+    if number is not None:
+        entries = [entry for entry in entries if entry in phonebook.findNumber(number)]
+    for entry in entries:
+        print(f"{entry.index}: {entry.text} {entry.number}")
+
+
 @phonebook_commands.group()
 @click.pass_context
 def select_phonebook_memory_storage(ctx):
@@ -6506,11 +7429,21 @@ def text_mode(ctx, da: str, toda: int, text: str):  # type: ignore[reportRedecla
 
 @send_messages.command("pdu-mode")
 @click.pass_context
-def pdu_mode(ctx):  # type: ignore[reportRedeclaration]
+@click.option(
+    "--length",
+    "-l",
+    type=int,
+    required=True,
+    help="Length of the TP data unit in octets, the SMSC address excluded.",
+)
+@click.option("--pdu", "-u", type=str, required=True, help="PDU in hexadecimal.")
+def pdu_mode(ctx, length: int, pdu: str):  # type: ignore[reportRedeclaration]
     """Send messages in PDU mode."""
     client: QuectelModemATCommands = ctx.obj["client"]
     client.open()
-    status, response = client.shortMessageServiceCommands908SendMessagesPduMode()
+    status, response = client.shortMessageServiceCommands908SendMessagesPduMode(
+        length, pdu
+    )
     print(response if status else "Error")
     client.close()
 
@@ -6645,12 +7578,33 @@ def text_mode(ctx, da: str, oa: str, tooa: int, toda: int, stat: str, text: str)
 
 @write_message_to_memory.command("pdu-mode")
 @click.pass_context
-def pdu_mode(ctx):  # type: ignore[reportRedeclaration]
+@click.option(
+    "--length",
+    "-l",
+    type=int,
+    required=True,
+    help="Length of the TP data unit in octets, the SMSC address excluded.",
+)
+@click.option("--pdu", "-u", type=str, required=True, help="PDU in hexadecimal.")
+@click.option(
+    "--stat",
+    "-s",
+    type=int,
+    default=2,
+    show_default=True,
+    help="""
+0                   Received unread messages
+1                   Received read messages
+2                   Stored unsent messages
+3                   Stored sent messages
+""",
+)
+def pdu_mode(ctx, length: int, pdu: str, stat: int):  # type: ignore[reportRedeclaration]
     """Write message to memory in PDU mode."""
     client: QuectelModemATCommands = ctx.obj["client"]
     client.open()
-    status, response = (
-        client.shortMessageServiceCommands910WriteMessageToMemoryPduMode()
+    status, response = client.shortMessageServiceCommands910WriteMessageToMemoryPduMode(
+        length, pdu, stat
     )
     print(response if status else "Error")
     client.close()
@@ -7131,12 +8085,22 @@ def text_mode(ctx, da: str, toda: int, uid: int, msgseg: int, msgtotal: int, tex
 
 @send_concatenated_messages.command("pdu-mode")
 @click.pass_context
-def pdu_mode(ctx):
+@click.option(
+    "--length",
+    "-l",
+    type=int,
+    required=True,
+    help="Length of the TP data unit in octets, the SMSC address excluded.",
+)
+@click.option("--pdu", "-u", type=str, required=True, help="PDU in hexadecimal.")
+def pdu_mode(ctx, length: int, pdu: str):
     """Send concatenated messages in PDU mode."""
     client: QuectelModemATCommands = ctx.obj["client"]
     client.open()
     status, response = (
-        client.shortMessageServiceCommands917SendConcatenatedMessagesPduMode()
+        client.shortMessageServiceCommands917SendConcatenatedMessagesPduMode(
+            length, pdu
+        )
     )
     print(response if status else "Error")
     client.close()
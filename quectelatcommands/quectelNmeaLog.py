@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+GGA_COLUMNS = (
+    "time",
+    "latitude",
+    "longitude",
+    "quality",
+    "satellites",
+    "hdop",
+    "altitude",
+    "geoidSeparation",
+)
+RMC_COLUMNS = ("time", "date", "valid", "latitude", "longitude", "speedKnots", "course")
+
+# Widest numeric field read, e.g. "01131.0000000"
+_FIELD_WIDTH = 16
+
+
+def _requireNumpy():
+    if np is None:
+        raise ImportError(
+            "numpy is required to decode NMEA logs: pip install quectelatcommands[numpy]"
+        )
+
+
+def _hexTable() -> "np.ndarray":
+    table = np.full(256, 255, dtype=np.uint8)
+    for value, character in enumerate(b"0123456789ABCDEF"):
+        table[character] = value
+    for value, character in enumerate(b"abcdef"):
+        table[character] = value + 10
+    return table
+
+
+def _parseDecimal(
+    p_buffer: "np.ndarray", p_starts: "np.ndarray", p_ends: "np.ndarray"
+) -> "np.ndarray":
+    """
+    Parse decimal fields, e.g. ``-12.5``, all at once.
+
+    The digits are accumulated column by column into an integer mantissa, then scaled
+    by the number of digits after the dot.
+
+    :param p_buffer: Raw bytes.
+    :type p_buffer: np.ndarray
+    :param p_starts: Index of the first character of every field.
+    :type p_starts: np.ndarray
+    :param p_ends: Index after the last character of every field.
+    :type p_ends: np.ndarray
+
+    :return: Values, NaN for the empty fields.
+    :rtype: np.ndarray
+    """
+    lengths = p_ends - p_starts
+    width = min(int(lengths.max(initial=0)), _FIELD_WIDTH)
+    last = len(p_buffer) - 1
+    mantissa = np.zeros(len(p_starts), dtype=np.int64)
+    fractionDigits = np.zeros(len(p_starts), dtype=np.int64)
+    afterDot = np.zeros(len(p_starts), dtype=bool)
+
+    for column in range(width):
+        inField = column < lengths
+        characters = p_buffer[np.minimum(p_starts + column, last)]
+        values = characters - np.uint8(0x30)
+        isDigit = inField & (values <= 9)
+        mantissa = np.where(isDigit, mantissa * 10 + values, mantissa)
+        fractionDigits += isDigit & afterDot
+        afterDot |= inField & (characters == 0x2E)
+
+    result = mantissa / np.power(10.0, fractionDigits)
+    negative = (lengths > 0) & (p_buffer[np.minimum(p_starts, last)] == 0x2D)
+    result[negative] = -result[negative]
+    result[lengths <= 0] = np.nan
+    return result
+
+
+class _Sentences:
+    def __init__(
+        self,
+        p_buffer: "np.ndarray",
+        p_index: dict[str, "np.ndarray"],
+        p_type: bytes,
+        p_fieldCount: int,
+    ):
+        """
+        Checksum-valid sentences of one type in a buffer, and the bounds of their fields.
+
+        :param p_buffer: Raw bytes.
+        :type p_buffer: np.ndarray
+        :param p_index: Index of the buffer, see ``_indexBuffer``.
+        :type p_index: dict[str, np.ndarray]
+        :param p_type: Sentence type, e.g. ``b"GGA"``.
+        :type p_type: bytes
+        :param p_fieldCount: Number of fields to locate after the address field.
+        :type p_fieldCount: int
+        """
+        self.buffer = p_buffer
+        size = len(p_buffer)
+        dollars = p_index["dollars"]
+        typed = (
+            (p_buffer[dollars + 3] == p_type[0])
+            & (p_buffer[dollars + 4] == p_type[1])
+            & (p_buffer[dollars + 5] == p_type[2])
+        )
+        dollars = dollars[typed]
+
+        newlines = p_index["newlines"]
+        nextNewline = np.searchsorted(newlines, dollars)
+        complete = nextNewline < len(newlines)
+        dollars = dollars[complete]
+        ends = newlines[nextNewline[complete]]
+        ends = ends - (p_buffer[ends - 1] == 0x0D)
+        stars = ends - 3
+
+        xor = p_index["xor"]
+        table = _hexTable()
+        safeStars = np.clip(stars, 1, size - 3)
+        high = table[p_buffer[safeStars + 1]]
+        low = table[p_buffer[safeStars + 2]]
+        valid = (
+            (stars > dollars + 6)
+            & (p_buffer[safeStars] == 0x2A)
+            & (high < 16)
+            & (low < 16)
+            & ((xor[safeStars - 1] ^ xor[dollars]) == high * 16 + low)
+        )
+
+        commas = p_index["commas"]
+        firstComma = np.searchsorted(commas, dollars)
+        lastComma = firstComma + p_fieldCount - 1
+        valid &= lastComma < len(commas)
+        valid &= commas[np.minimum(lastComma, len(commas) - 1)] < stars
+        valid &= commas[np.minimum(firstComma, len(commas) - 1)] == dollars + 6
+
+        self.stars = stars[valid]
+        self.firstComma = firstComma[valid]
+        self.commas = commas
+        self.count = int(valid.sum())
+
+    def bounds(self, p_field: int) -> tuple["np.ndarray", "np.ndarray"]:
+        """
+        Get the bounds of a field.
+
+        :param p_field: Field number, 1 for the field after the address.
+        :type p_field: int
+
+        :return: Start and end index of the field in every sentence.
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        last = len(self.commas) - 1
+        starts = self.commas[np.minimum(self.firstComma + p_field - 1, last)] + 1
+        nextComma = self.firstComma + p_field
+        ends = np.where(
+            nextComma <= last, self.commas[np.minimum(nextComma, last)], self.stars
+        )
+        return starts, np.minimum(ends, self.stars)
+
+    def decimal(self, p_field: int) -> "np.ndarray":
+        starts, ends = self.bounds(p_field)
+        return _parseDecimal(self.buffer, starts, ends)
+
+    def character(self, p_field: int) -> "np.ndarray":
+        starts, ends = self.bounds(p_field)
+        return np.where(ends > starts, self.buffer[starts], 0)
+
+    def time(self, p_field: int) -> "np.ndarray":
+        value = self.decimal(p_field)
+        return (value // 10000) * 3600 + (value // 100 % 100) * 60 + value % 100
+
+    def degrees(self, p_field: int) -> "np.ndarray":
+        value = self.decimal(p_field)
+        degrees = value // 100 + (value % 100) / 60
+        hemisphere = self.character(p_field + 1)
+        return np.where((hemisphere == 0x53) | (hemisphere == 0x57), -degrees, degrees)
+
+
+def _indexBuffer(p_buffer: "np.ndarray") -> dict[str, "np.ndarray"]:
+    """
+    Locate the sentence starts, line ends and commas of a buffer, shared by every
+    sentence type.
+
+    :param p_buffer: Raw bytes.
+    :type p_buffer: np.ndarray
+
+    :return: ``dollars``, ``newlines`` and ``commas`` positions, and ``xor``, the
+        running XOR of the bytes from which checksums are computed.
+    :rtype: dict[str, np.ndarray]
+    """
+    size = len(p_buffer)
+    dollars = np.flatnonzero(p_buffer == 0x24)
+    commas = np.flatnonzero(p_buffer == 0x2C)
+    return {
+        "dollars": dollars[dollars + 6 < size],
+        "newlines": np.flatnonzero(p_buffer == 0x0A),
+        # A sentinel keeps the lookups of a buffer without commas in range
+        "commas": commas if len(commas) else np.array([size], dtype=np.intp),
+        "xor": np.bitwise_xor.accumulate(p_buffer),
+    }
+
+
+def decodeNmeaBuffer(p_buffer: "np.ndarray") -> dict[str, dict[str, "np.ndarray"]]:
+    """
+    Decode the GGA and RMC sentences of a buffer into column arrays.
+
+    Sentences with a wrong checksum or too few fields are dropped.
+
+    :param p_buffer: Raw NMEA bytes, as ``uint8``, ending on a sentence boundary.
+    :type p_buffer: np.ndarray
+
+    :return: ``{"gga": {...}, "rmc": {...}}`` with one array per column of
+        ``GGA_COLUMNS`` and ``RMC_COLUMNS``. Times are seconds since midnight UTC,
+        coordinates signed decimal degrees, missing values NaN (or -1 for the integer
+        columns, NaT for the dates).
+    :rtype: dict[str, dict[str, np.ndarray]]
+    """
+    _requireNumpy()
+    if len(p_buffer) < 7:
+        return _emptyColumns()
+
+    index = _indexBuffer(p_buffer)
+    gga = _Sentences(p_buffer, index, b"GGA", 11)
+    satellites = gga.decimal(7)
+    rmc = _Sentences(p_buffer, index, b"RMC", 9)
+    date = rmc.decimal(9)
+    days = np.full(rmc.count, np.datetime64("NaT"), dtype="datetime64[D]")
+    known = ~np.isnan(date)
+    dateValue = date[known].astype(np.int64)
+    days[known] = (
+        (dateValue % 100 + 30).astype("datetime64[Y]").astype("datetime64[M]")
+        + (dateValue // 100 % 100 - 1)
+    ).astype("datetime64[D]") + (dateValue // 10000 - 1)
+
+    return {
+        "gga": {
+            "time": gga.time(1),
+            "latitude": gga.degrees(2),
+            "longitude": gga.degrees(4),
+            "quality": np.nan_to_num(gga.decimal(6), nan=-1).astype(np.int8),
+            "satellites": np.nan_to_num(satellites, nan=-1).astype(np.int16),
+            "hdop": gga.decimal(8).astype(np.float32),
+            "altitude": gga.decimal(9),
+            "geoidSeparation": gga.decimal(11).astype(np.float32),
+        },
+        "rmc": {
+            "time": rmc.time(1),
+            "date": days,
+            "valid": rmc.character(2) == 0x41,
+            "latitude": rmc.degrees(3),
+            "longitude": rmc.degrees(5),
+            "speedKnots": rmc.decimal(7).astype(np.float32),
+            "course": rmc.decimal(8).astype(np.float32),
+        },
+    }
+
+
+def _emptyColumns() -> dict[str, dict[str, "np.ndarray"]]:
+    return decodeNmeaBuffer(np.frombuffer(b"\n" * 7, dtype=np.uint8))
+
+
+def concatenateColumns(
+    p_parts: list[dict[str, dict[str, "np.ndarray"]]],
+) -> dict[str, dict[str, "np.ndarray"]]:
+    """
+    Concatenate the columns decoded from consecutive parts of a log.
+
+    :param p_parts: Results of ``decodeNmeaBuffer``, in log order.
+    :type p_parts: list[dict[str, dict[str, np.ndarray]]]
+
+    :return: Columns of the whole log.
+    :rtype: dict[str, dict[str, np.ndarray]]
+    """
+    _requireNumpy()
+    if not p_parts:
+        return _emptyColumns()
+    return {
+        sentence: {
+            column: np.concatenate([part[sentence][column] for part in p_parts])
+            for column in p_parts[0][sentence]
+        }
+        for sentence in p_parts[0]
+    }
+
+
+def _decodeFileRange(
+    p_fileName: str, p_start: int, p_end: int, p_chunkSize: int
+) -> dict[str, dict[str, "np.ndarray"]]:
+    return concatenateColumns(
+        list(QuectelNmeaLog(p_fileName).chunks(p_chunkSize, p_start, p_end))
+    )
+
+
+class QuectelNmeaLog:
+    def __init__(self, p_fileName: str):
+        """
+        Batch decoder of NMEA log files into NumPy column arrays.
+
+        The file is memory-mapped and decoded chunk by chunk, chunks ending on a sentence
+        boundary, so the memory used does not grow with the size of the file. Requires
+        ``numpy``.
+
+        :param p_fileName: Path of the NMEA log.
+        :type p_fileName: str
+        """
+        _requireNumpy()
+        self.fileName = p_fileName
+
+    def boundaries(self, p_parts: int) -> list[int]:
+        """
+        Split the file into parts starting at the beginning of a line.
+
+        :param p_parts: Number of parts.
+        :type p_parts: int
+
+        :return: ``p_parts + 1`` offsets or less, from 0 to the size of the file.
+        :rtype: list[int]
+        """
+        size = os.path.getsize(self.fileName)
+        if size == 0:
+            return [0, 0]
+
+        offsets = [0]
+        with open(self.fileName, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            for part in range(1, p_parts):
+                newline = mapped.find(b"\n", max(size * part // p_parts, offsets[-1]))
+                if newline < 0:
+                    break
+                if newline + 1 > offsets[-1]:
+                    offsets.append(newline + 1)
+        if offsets[-1] != size:
+            offsets.append(size)
+        return offsets
+
+    def chunks(
+        self,
+        p_chunkSize: int = 64 * 1024 * 1024,
+        p_start: int = 0,
+        p_end: Optional[int] = None,
+    ) -> Iterator[dict[str, dict[str, "np.ndarray"]]]:
+        """
+        Decode the file chunk by chunk.
+
+        :param p_chunkSize: Maximum size of a chunk in bytes, unless a line is longer.
+        :type p_chunkSize: int
+        :param p_start: Offset of the first byte to decode, at the beginning of a line.
+        :type p_start: int
+        :param p_end: Offset after the last byte to decode, the end of the file if None.
+        :type p_end: Optional[int]
+
+        :return: Generator of columns, see ``decodeNmeaBuffer``.
+        :rtype: Iterator[dict[str, dict[str, np.ndarray]]]
+        """
+        size = os.path.getsize(self.fileName)
+        end = size if p_end is None else min(p_end, size)
+        if end <= p_start:
+            return
+
+        with open(self.fileName, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            start = p_start
+            while start < end:
+                stop = min(start + p_chunkSize, end)
+                if stop < end:
+                    newline = mapped.rfind(b"\n", start, stop)
+                    if newline < 0:
+                        newline = mapped.find(b"\n", stop, end)
+                    stop = end if newline < 0 else newline + 1
+
+                buffer = np.frombuffer(
+                    mapped, dtype=np.uint8, count=stop - start, offset=start
+                )
+                columns = decodeNmeaBuffer(buffer)
+                # The columns are copies: the view must be gone before closing the map
+                del buffer
+                yield columns
+                start = stop
+
+    def decode(
+        self, p_processes: int = 1, p_chunkSize: int = 64 * 1024 * 1024
+    ) -> dict[str, dict[str, "np.ndarray"]]:
+        """
+        Decode the whole file.
+
+        :param p_processes: Number of processes, each one decoding a part of the file.
+            0 uses every core.
+        :type p_processes: int
+        :param p_chunkSize: Maximum size of a chunk in bytes.
+        :type p_chunkSize: int
+
+        :return: Columns of the whole file, see ``decodeNmeaBuffer``.
+        :rtype: dict[str, dict[str, np.ndarray]]
+        """
+        processes = p_processes or os.cpu_count() or 1
+        if processes == 1:
+            return concatenateColumns(list(self.chunks(p_chunkSize)))
+
+        offsets = self.boundaries(processes)
+        with ProcessPoolExecutor(max_workers=len(offsets) - 1) as executor:
+            parts = executor.map(
+                _decodeFileRange,
+                [self.fileName] * (len(offsets) - 1),
+                offsets[:-1],
+                offsets[1:],
+                [p_chunkSize] * (len(offsets) - 1),
+            )
+            return concatenateColumns(list(parts))
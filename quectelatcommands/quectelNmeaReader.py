@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+
+import datetime
+import serial
+from typing import Iterator, NamedTuple, Optional, Union
+
+NMEA_SENTENCE_TYPES = ("GGA", "RMC", "GSA", "GSV", "VTG")
+
+
+class NmeaGga(NamedTuple):
+    """
+    GGA sentence: fix data.
+    """
+
+    talker: str
+    time: Optional[float]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    quality: int
+    satellites: Optional[int]
+    hdop: Optional[float]
+    altitude: Optional[float]
+    geoidSeparation: Optional[float]
+
+
+class NmeaRmc(NamedTuple):
+    """
+    RMC sentence: recommended minimum data.
+    """
+
+    talker: str
+    time: Optional[float]
+    valid: bool
+    latitude: Optional[float]
+    longitude: Optional[float]
+    speedKnots: Optional[float]
+    course: Optional[float]
+    date: Optional[datetime.date]
+    mode: str
+
+
+class NmeaGsa(NamedTuple):
+    """
+    GSA sentence: DOP and satellites used in the fix.
+    """
+
+    talker: str
+    selectionMode: str
+    fixType: int
+    prns: tuple[int, ...]
+    pdop: Optional[float]
+    hdop: Optional[float]
+    vdop: Optional[float]
+    systemId: Optional[int]
+
+
+class NmeaGsv(NamedTuple):
+    """
+    GSV sentence: satellites in view, up to four per sentence.
+    """
+
+    talker: str
+    messageCount: int
+    messageNumber: int
+    satellitesInView: int
+    # (PRN, elevation, azimuth, SNR), None for the empty fields
+    satellites: tuple[tuple[int, Optional[int], Optional[int], Optional[int]], ...]
+    # Signal ID of the extended GSV sentence (NMEA 4.10), None otherwise
+    signalId: Optional[int]
+
+
+class NmeaVtg(NamedTuple):
+    """
+    VTG sentence: course and speed over ground.
+    """
+
+    talker: str
+    courseTrue: Optional[float]
+    courseMagnetic: Optional[float]
+    speedKnots: Optional[float]
+    speedKmh: Optional[float]
+    mode: str
+
+
+NmeaRecord = Union[NmeaGga, NmeaRmc, NmeaGsa, NmeaGsv, NmeaVtg]
+
+_HEX_DIGITS = b"0123456789ABCDEFabcdef"
+
+
+def nmeaChecksumValid(p_sentence: Union[bytes, bytearray, memoryview]) -> bool:
+    """
+    Check the ``*hh`` checksum of a sentence.
+
+    :param p_sentence: Sentence from ``$`` to the checksum, line ending excluded.
+    :type p_sentence: Union[bytes, bytearray, memoryview]
+
+    :return: True if the sentence has a checksum and it matches.
+    :rtype: bool
+    """
+    length = len(p_sentence)
+    if length < 4 or p_sentence[length - 3] != 0x2A:  # "*"
+        return False
+    high = p_sentence[length - 2]
+    low = p_sentence[length - 1]
+    if high not in _HEX_DIGITS or low not in _HEX_DIGITS:
+        return False
+
+    checksum = 0
+    for byte in p_sentence[1 : length - 3]:
+        checksum ^= byte
+    return checksum == int(bytes((high, low)), 16)
+
+
+def nmeaTime(p_field: str) -> Optional[float]:
+    """
+    Convert a ``hhmmss.ss`` field.
+
+    :param p_field: Time field.
+    :type p_field: str
+
+    :return: Seconds since midnight UTC, None if empty.
+    :rtype: Optional[float]
+    """
+    if len(p_field) < 6:
+        return None
+    return int(p_field[0:2]) * 3600 + int(p_field[2:4]) * 60 + float(p_field[4:])
+
+
+def nmeaDegrees(p_value: str, p_hemisphere: str) -> Optional[float]:
+    """
+    Convert a ``(d)ddmm.mmmm`` coordinate field to signed decimal degrees.
+
+    :param p_value: Coordinate field.
+    :type p_value: str
+    :param p_hemisphere: ``N``, ``S``, ``E`` or ``W``.
+    :type p_hemisphere: str
+
+    :return: Decimal degrees, negative in the southern and western hemispheres. None if
+        empty.
+    :rtype: Optional[float]
+    """
+    if not p_value:
+        return None
+    minutesStart = p_value.index(".") - 2 if "." in p_value else len(p_value) - 2
+    degrees = int(p_value[:minutesStart] or 0) + float(p_value[minutesStart:]) / 60
+    return -degrees if p_hemisphere in ("S", "W") else degrees
+
+
+def _float(p_field: str) -> Optional[float]:
+    return float(p_field) if p_field else None
+
+
+def _int(p_field: str) -> Optional[int]:
+    return int(p_field) if p_field else None
+
+
+def _parseGga(p_talker: str, p_fields: list[str]) -> NmeaGga:
+    return NmeaGga(
+        p_talker,
+        nmeaTime(p_fields[1]),
+        nmeaDegrees(p_fields[2], p_fields[3]),
+        nmeaDegrees(p_fields[4], p_fields[5]),
+        int(p_fields[6] or 0),
+        _int(p_fields[7]),
+        _float(p_fields[8]),
+        _float(p_fields[9]),
+        _float(p_fields[11]),
+    )
+
+
+def _parseRmc(p_talker: str, p_fields: list[str]) -> NmeaRmc:
+    date = p_fields[9]
+    return NmeaRmc(
+        p_talker,
+        nmeaTime(p_fields[1]),
+        p_fields[2] == "A",
+        nmeaDegrees(p_fields[3], p_fields[4]),
+        nmeaDegrees(p_fields[5], p_fields[6]),
+        _float(p_fields[7]),
+        _float(p_fields[8]),
+        (
+            datetime.date(2000 + int(date[4:6]), int(date[2:4]), int(date[0:2]))
+            if len(date) == 6
+            else None
+        ),
+        p_fields[12] if len(p_fields) > 12 else "",
+    )
+
+
+def _parseGsa(p_talker: str, p_fields: list[str]) -> NmeaGsa:
+    return NmeaGsa(
+        p_talker,
+        p_fields[1],
+        int(p_fields[2] or 1),
+        tuple(int(prn) for prn in p_fields[3:15] if prn),
+        _float(p_fields[15]),
+        _float(p_fields[16]),
+        _float(p_fields[17]),
+        _int(p_fields[18]) if len(p_fields) > 18 else None,
+    )
+
+
+def _parseGsv(p_talker: str, p_fields: list[str]) -> NmeaGsv:
+    satelliteFields = len(p_fields) - 4
+    # The extended GSV sentence ends with the signal ID after the satellite blocks
+    signalId = _int(p_fields[-1]) if satelliteFields % 4 == 1 else None
+    satellites = tuple(
+        (
+            int(p_fields[index]),
+            _int(p_fields[index + 1]),
+            _int(p_fields[index + 2]),
+            _int(p_fields[index + 3]),
+        )
+        for index in range(4, 4 + satelliteFields - satelliteFields % 4, 4)
+        if p_fields[index]
+    )
+    return NmeaGsv(
+        p_talker,
+        int(p_fields[1]),
+        int(p_fields[2]),
+        int(p_fields[3] or 0),
+        satellites,
+        signalId,
+    )
+
+
+def _parseVtg(p_talker: str, p_fields: list[str]) -> NmeaVtg:
+    return NmeaVtg(
+        p_talker,
+        _float(p_fields[1]),
+        _float(p_fields[3]),
+        _float(p_fields[5]),
+        _float(p_fields[7]),
+        p_fields[9] if len(p_fields) > 9 else "",
+    )
+
+
+_PARSERS = {
+    "GGA": (_parseGga, 12),
+    "RMC": (_parseRmc, 10),
+    "GSA": (_parseGsa, 18),
+    "GSV": (_parseGsv, 4),
+    "VTG": (_parseVtg, 8),
+}
+
+
+def parseNmeaSentence(
+    p_sentence: Union[bytes, bytearray, memoryview],
+) -> Optional[NmeaRecord]:
+    """
+    Parse a sentence whose checksum has been checked.
+
+    :param p_sentence: Sentence from ``$`` to the checksum, line ending excluded.
+    :type p_sentence: Union[bytes, bytearray, memoryview]
+
+    :return: Typed record, None for the unsupported or malformed sentences.
+    :rtype: Optional[NmeaRecord]
+    """
+    fields = bytes(p_sentence[1:-3]).decode("ascii", "replace").split(",")
+    address = fields[0]
+    parser = _PARSERS.get(address[2:5])
+    if parser is None or len(address) != 5 or len(fields) < parser[1]:
+        return None
+    try:
+        return parser[0](address[:2], fields)
+    except ValueError:
+        return None
+
+
+class QuectelNmeaReader:
+    def __init__(
+        self,
+        p_port: str = "/dev/ttyUSB1",
+        p_baudrate: int = 115200,
+        p_sentenceTypes: tuple[str, ...] = NMEA_SENTENCE_TYPES,
+    ):
+        """
+        Streaming reader of the NMEA port.
+
+        The NMEA sentences must be output on the USB NMEA port, see
+        ``QuectelGnssATCommands.configureGnss20201ConfigureOutputPortOfNmeaSentencesWrite("usbnmea")``.
+        Everything available is read at once into a buffer; checksums are checked on
+        views of the buffer and only the sentences of ``p_sentenceTypes`` are decoded.
+
+        :param p_port: NMEA serial port.
+        :type p_port: str
+        :param p_baudrate: Baudrate to use.
+        :type p_baudrate: int
+        :param p_sentenceTypes: Sentence types to decode, among ``GGA``, ``RMC``,
+            ``GSA``, ``GSV`` and ``VTG``.
+        :type p_sentenceTypes: tuple[str, ...]
+        """
+        self.port = p_port
+        self.baudrate = p_baudrate
+        self.sentenceTypes = {sentenceType.encode() for sentenceType in p_sentenceTypes}
+        self.buffer = bytearray()
+        self.checksumErrors = 0
+        self.running = False
+        self.serial_conn: Optional[serial.Serial] = None
+
+    def open(self):
+        """
+        Open the serial connection.
+        """
+        self.serial_conn = serial.Serial(self.port, self.baudrate, timeout=0.2)
+        self.buffer.clear()
+        self.running = True
+
+    def close(self):
+        """
+        Stop the ``records`` generator and close the serial connection.
+        """
+        self.running = False
+        if self.serial_conn is not None:
+            self.serial_conn.close()
+            self.serial_conn = None
+
+    def records(self) -> Iterator[NmeaRecord]:
+        """
+        Yield the records received on the NMEA port until ``close`` is called.
+
+        :return: Generator of typed records.
+        :rtype: Iterator[NmeaRecord]
+        """
+        while self.running and self.serial_conn is not None:
+            try:
+                data = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+            except (serial.SerialException, OSError, TypeError):
+                if not self.running:
+                    return
+                raise
+            if data:
+                yield from self.feed(data)
+
+    def feed(self, p_data: bytes) -> Iterator[NmeaRecord]:
+        """
+        Append data to the buffer and yield the records of the complete sentences.
+
+        :param p_data: Raw data read from the NMEA port or from a log.
+        :type p_data: bytes
+
+        :return: Generator of typed records.
+        :rtype: Iterator[NmeaRecord]
+        """
+        self.buffer += p_data
+        buffer = self.buffer
+        view = memoryview(buffer)
+        position = 0
+        try:
+            while True:
+                start = buffer.find(b"$", position)
+                if start < 0:
+                    position = len(buffer)
+                    break
+                end = buffer.find(b"\n", start)
+                if end < 0:
+                    position = start
+                    break
+                position = end + 1
+
+                stop = end - 1 if buffer[end - 1] == 0x0D else end
+                if bytes(view[start + 3 : start + 6]) not in self.sentenceTypes:
+                    continue
+                with view[start:stop] as sentence:
+                    if not nmeaChecksumValid(sentence):
+                        self.checksumErrors += 1
+                        continue
+                    record = parseNmeaSentence(sentence)
+                if record is not None:
+                    yield record
+        finally:
+            view.release()
+            del buffer[:position]
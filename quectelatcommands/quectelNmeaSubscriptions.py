@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+import itertools
+import threading
+from typing import Callable, NamedTuple, Optional
+from quectelatcommands.quectelConfigEngine import QuectelConfigEngine
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelNmeaReader import (
+    NmeaGga,
+    NmeaRecord,
+    NmeaRmc,
+)
+
+CONSTELLATIONS = ("gps", "glonass", "galileo", "beidou")
+
+# Bit of each sentence type in the output type mask of each constellation
+# (AT+QGPSCFG="<constellation>nmeatype"). GGA, RMC and VTG are only in the GPS mask.
+NMEA_TYPE_BITS = {
+    "gps": {"GGA": 1, "RMC": 2, "GSV": 4, "GSA": 8, "VTG": 16},
+    "glonass": {"GSV": 1, "GSA": 2, "GNS": 4},
+    "galileo": {"GSV": 1},
+    "beidou": {"GSA": 1, "GSV": 2},
+}
+
+# Output frequencies supported by AT+QGPSCFG="fixfreq". Unit: Hz.
+NMEA_FREQUENCIES = (1, 2, 5, 10)
+
+
+class NmeaSubscription(NamedTuple):
+    """
+    Sentence types and rate needed by a consumer of the NMEA stream.
+    """
+
+    sentenceTypes: frozenset[str]
+    # Unit: Hz
+    rate: float
+    constellations: frozenset[str]
+    handler: Optional[Callable[[NmeaRecord], None]]
+
+
+class QuectelNmeaSubscriptions:
+    def __init__(self, p_gnss: QuectelGnssATCommands, p_autoApply: bool = True):
+        """
+        Demand-driven NMEA output configuration.
+
+        Consumers declare the sentence types and the rate they need with ``subscribe``.
+        The union of the subscriptions gives the output type masks of each constellation
+        and the lowest supported output frequency that serves the fastest consumer;
+        they are written with ``QuectelConfigEngine``, so that only the settings that
+        differ from the module are written. With ``dispatch``, each consumer receives
+        its own sentence types at its own rate.
+
+        :param p_gnss: Opened GNSS client, on the AT port.
+        :type p_gnss: QuectelGnssATCommands
+        :param p_autoApply: Apply the configuration whenever the subscriptions change.
+        :type p_autoApply: bool
+        """
+        self.gnss = p_gnss
+        self.autoApply = p_autoApply
+        self.engine = QuectelConfigEngine(p_gnss=p_gnss)
+        self.lock = threading.Lock()
+        self.subscriptions: dict[int, NmeaSubscription] = {}
+        self.tokens = itertools.count(1)
+        # Configuration written by the last apply
+        self.applied: dict[str, int] = {}
+        # Epoch time of the last record delivered to each subscription, per sentence type
+        self.delivered: dict[int, dict[str, float]] = {}
+        self.epochTime: Optional[float] = None
+
+    def subscribe(
+        self,
+        p_sentenceTypes: tuple[str, ...],
+        p_rate: float = 1,
+        p_constellations: tuple[str, ...] = CONSTELLATIONS,
+        p_handler: Optional[Callable[[NmeaRecord], None]] = None,
+    ) -> int:
+        """
+        Declare the sentences needed by a consumer.
+
+        :param p_sentenceTypes: Sentence types, e.g. ``("RMC",)``. See ``NMEA_TYPE_BITS``.
+        :type p_sentenceTypes: tuple[str, ...]
+        :param p_rate: Number of epochs per second needed. Unit: Hz.
+        :type p_rate: float
+        :param p_constellations: Constellations whose GSV and GSA sentences are needed.
+        :type p_constellations: tuple[str, ...]
+        :param p_handler: Function called by ``dispatch`` with the records of the
+            subscription.
+        :type p_handler: Optional[Callable[[NmeaRecord], None]]
+
+        :raises ValueError: If a sentence type or a constellation is unknown, or if the
+            rate is not positive.
+
+        :return: Token to give to ``unsubscribe``.
+        :rtype: int
+        """
+        sentenceTypes = frozenset(name.upper() for name in p_sentenceTypes)
+        known = set().union(*NMEA_TYPE_BITS.values())
+        if not sentenceTypes <= known:
+            raise ValueError(f"Unknown sentence types: {sorted(sentenceTypes - known)}")
+        if not set(p_constellations) <= set(CONSTELLATIONS):
+            raise ValueError(f"Unknown constellations: {p_constellations}")
+        if p_rate <= 0:
+            raise ValueError(f"Rate must be positive: {p_rate}")
+
+        with self.lock:
+            token = next(self.tokens)
+            self.subscriptions[token] = NmeaSubscription(
+                sentenceTypes, p_rate, frozenset(p_constellations), p_handler
+            )
+            self.delivered[token] = {}
+        if self.autoApply:
+            self.apply()
+        return token
+
+    def unsubscribe(self, p_token: int):
+        """
+        Remove a subscription.
+
+        :param p_token: Token returned by ``subscribe``.
+        :type p_token: int
+        """
+        with self.lock:
+            self.subscriptions.pop(p_token, None)
+            self.delivered.pop(p_token, None)
+        if self.autoApply:
+            self.apply()
+
+    def configuration(self) -> dict[str, int]:
+        """
+        Compute the minimal output configuration serving every subscription.
+
+        :return: ``gnss`` section of a ``QuectelConfigEngine`` document: the
+            ``<constellation>nmeatype`` masks and ``fixfreq``.
+        :rtype: dict[str, int]
+        """
+        masks = dict.fromkeys(CONSTELLATIONS, 0)
+        rate = 0.0
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+        for subscription in subscriptions:
+            rate = max(rate, subscription.rate)
+            for constellation, bits in NMEA_TYPE_BITS.items():
+                # GGA, RMC and VTG are given by the GPS mask whatever the constellations
+                perConstellation = constellation in subscription.constellations
+                for sentenceType in subscription.sentenceTypes:
+                    if sentenceType in bits and (
+                        perConstellation or sentenceType not in ("GSV", "GSA")
+                    ):
+                        masks[constellation] |= bits[sentenceType]
+
+        frequency = next(
+            (value for value in NMEA_FREQUENCIES if value >= rate),
+            NMEA_FREQUENCIES[-1],
+        )
+        configuration = {
+            f"{constellation}nmeatype": mask for constellation, mask in masks.items()
+        }
+        configuration["fixfreq"] = frequency
+        return configuration
+
+    def sentenceTypes(self) -> tuple[str, ...]:
+        """
+        Get the sentence types needed by at least one subscription, e.g. for the
+        ``p_sentenceTypes`` of ``QuectelNmeaReader``.
+
+        :return: Sentence types, sorted.
+        :rtype: tuple[str, ...]
+        """
+        sentenceTypes: set[str] = set()
+        with self.lock:
+            for subscription in self.subscriptions.values():
+                sentenceTypes |= subscription.sentenceTypes
+        return tuple(sorted(sentenceTypes))
+
+    def apply(self, p_dryRun: bool = False) -> tuple[bool, list[str]]:
+        """
+        Write the settings of ``configuration`` that changed since the last apply.
+
+        The first apply reads every setting; the next ones only those that changed.
+
+        :param p_dryRun: Only report the writes that would be done.
+        :type p_dryRun: bool
+
+        :return: Tuple containing the status of the writes and one line per write.
+        :rtype: tuple[bool, list[str]]
+        """
+        configuration = self.configuration()
+        changed = {
+            key: value
+            for key, value in configuration.items()
+            if self.applied.get(key) != value
+        }
+        if not changed:
+            return True, []
+
+        status, report = self.engine.apply({"gnss": changed}, p_dryRun)
+        if status and not p_dryRun:
+            self.applied.update(changed)
+        return status, report
+
+    def dispatch(self, p_record: NmeaRecord):
+        """
+        Give a record to the handlers of the subscriptions that need it.
+
+        Each subscription receives at most ``rate`` epochs per second of each of its
+        sentence types, the epochs being timed by the GGA and RMC sentences.
+
+        :param p_record: Record from ``QuectelNmeaReader``.
+        :type p_record: NmeaRecord
+        """
+        if isinstance(p_record, (NmeaGga, NmeaRmc)) and p_record.time is not None:
+            self.epochTime = p_record.time
+        sentenceType = type(p_record).__name__[4:].upper()
+
+        # Half an output period, for the jitter of the epoch times
+        tolerance = 0.5 / self.applied.get("fixfreq", NMEA_FREQUENCIES[-1])
+        with self.lock:
+            subscriptions = list(self.subscriptions.items())
+        for token, subscription in subscriptions:
+            if (
+                subscription.handler is None
+                or sentenceType not in subscription.sentenceTypes
+            ):
+                continue
+            delivered = self.delivered.get(token)
+            if delivered is None:
+                continue
+
+            if self.epochTime is not None:
+                last = delivered.get(sentenceType)
+                # Seconds since midnight: a negative interval is a new day. The other
+                # sentences of a delivered epoch (GSV sets) are delivered too.
+                if (
+                    last is not None
+                    and 0
+                    < (self.epochTime - last) % 86400
+                    < 1 / subscription.rate - tolerance
+                ):
+                    continue
+                delivered[sentenceType] = self.epochTime
+
+            try:
+                subscription.handler(p_record)
+            except Exception as e:
+                print(e)
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from array import array
+from typing import Callable, NamedTuple, Optional
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    splitResponseFields,
+)
+
+# Range of the counters of AT+QGDCNT, which wrap around to 0
+COUNTER_MODULO = 2**32
+
+# AT+QAUGDCNT <value>: 0 disables the auto-save, otherwise 30 to 65535 seconds
+AUTO_SAVE_DISABLED = 0
+AUTO_SAVE_MIN = 30
+AUTO_SAVE_MAX = 65535
+
+
+class CounterSample(NamedTuple):
+    """
+    Packet data counters at a time, with the rates since the previous sample.
+    """
+
+    # time.time() of the sample
+    time: float
+    # Bytes sent and received since the monitor started, across resets and wraparounds
+    sent: int
+    received: int
+    # Since the previous sample. Unit: byte per second.
+    txRate: float
+    rxRate: float
+
+
+def parsePacketCounter(p_response: list[str]) -> Optional[tuple[int, int]]:
+    """
+    Parse the response of ``AT+QGDCNT?``.
+
+    :param p_response: Response, containing ``+QGDCNT: <bytes_sent>,<bytes_recv>``.
+    :type p_response: list[str]
+
+    :return: Bytes sent and received, None when missing.
+    :rtype: Optional[tuple[int, int]]
+    """
+    lines = findResponseLines(p_response, "+QGDCNT:")
+    fields = splitResponseFields(lines[0]) if lines else []
+    if len(fields) < 2 or not fields[0].isdigit() or not fields[1].isdigit():
+        return None
+    return int(fields[0]), int(fields[1])
+
+
+def counterDelta(
+    p_previous: int, p_current: int, p_modulo: int = COUNTER_MODULO
+) -> int:
+    """
+    Get the bytes counted between two readings of a counter.
+
+    A counter going backwards wrapped around when its previous value was in the upper
+    half of its range, and was reset otherwise, counting from 0 again.
+
+    :param p_previous: Previous reading.
+    :type p_previous: int
+    :param p_current: Current reading.
+    :type p_current: int
+    :param p_modulo: Range of the counter.
+    :type p_modulo: int
+
+    :return: Bytes counted.
+    :rtype: int
+    """
+    if p_current >= p_previous:
+        return p_current - p_previous
+    if p_previous >= p_modulo // 2:
+        return p_current + p_modulo - p_previous
+    return p_current
+
+
+class QuectelPacketCounter:
+    def __init__(
+        self,
+        p_modem: QuectelModemATCommands,
+        p_interval: float = 10.0,
+        p_capacity: int = 8640,
+        p_autoSave: Optional[int] = 3600,
+        p_modulo: int = COUNTER_MODULO,
+    ):
+        """
+        Throughput monitor of the packet data counters of ``AT+QGDCNT``.
+
+        Once ``start`` is called, a worker reads the counters every ``p_interval``
+        seconds. Each reading is turned into totals across resets and wraparounds (see
+        ``counterDelta``) and stored into preallocated arrays used as a ring of
+        ``p_capacity`` samples: a day at the default interval, in about 200 KB. The rates
+        over a window are computed from the totals of its ends, found by bisection.
+        Every sample is given to the metrics handlers, see ``addMetricsHandler``.
+
+        The monitor never saves the counters to NV itself: ``start`` sets the auto-save
+        interval of ``AT+QAUGDCNT`` to ``p_autoSave``, kept within 30 to 65535 seconds,
+        and only writes it when it differs, so that the NV writes stay bounded.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_interval: Sampling interval. Unit: second.
+        :type p_interval: float
+        :param p_capacity: Number of samples kept.
+        :type p_capacity: int
+        :param p_autoSave: Auto-save interval. 0 disables it, None keeps the setting of
+            the module. Unit: second.
+        :type p_autoSave: Optional[int]
+        :param p_modulo: Range of the counters.
+        :type p_modulo: int
+        """
+        self.modem = p_modem
+        self.interval = p_interval
+        self.capacity = p_capacity
+        self.autoSave = p_autoSave
+        self.modulo = p_modulo
+        self.lock = threading.Lock()
+        # time.time(), time.monotonic() and totals of the samples
+        self.times = array("d", bytes(array("d").itemsize * p_capacity))
+        self.monotonics = array("d", bytes(array("d").itemsize * p_capacity))
+        self.sent = array("Q", bytes(array("Q").itemsize * p_capacity))
+        self.received = array("Q", bytes(array("Q").itemsize * p_capacity))
+        # Position of the next sample, and number of samples kept
+        self.position = 0
+        self.count = 0
+        # Last reading of the counters, None before the first one
+        self.counters: Optional[tuple[int, int]] = None
+        self.last: Optional[CounterSample] = None
+        self.handlers: list[Callable[[CounterSample], None]] = []
+        self.wakeup = threading.Event()
+        self.running = False
+        self.worker: Optional[threading.Thread] = None
+        self.statistics = {"samples": 0, "failures": 0, "wraps": 0, "resets": 0}
+
+    def __enter__(self) -> "QuectelPacketCounter":
+        self.start()
+        return self
+
+    def __exit__(self, p_type, p_value, p_traceback):
+        self.stop()
+
+    def start(self) -> tuple[bool, list[str]]:
+        """
+        Set the auto-save interval, take a first sample and start the sampling worker.
+
+        :return: Tuple containing the status of the configuration and the responses.
+        :rtype: tuple[bool, list[str]]
+        """
+        response: list[str] = []
+        if self.autoSave is not None:
+            status, response = self.configureAutoSave(self.autoSave)
+            if not status:
+                return status, response
+
+        if self.sample() is None:
+            return False, response + ["Packet data counter unavailable"]
+
+        self.running = True
+        self.worker = threading.Thread(target=self._work, name="PacketCounterThread")
+        self.worker.start()
+        return True, response
+
+    def stop(self):
+        """
+        Stop the worker.
+        """
+        self.running = False
+        self.wakeup.set()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def configureAutoSave(self, p_seconds: int) -> tuple[bool, list[str]]:
+        """
+        Set the auto-save interval of ``AT+QAUGDCNT``, unless already set.
+
+        :param p_seconds: Interval, 0 to disable the auto-save. Brought within 30 to
+            65535 otherwise. Unit: second.
+        :type p_seconds: int
+
+        :return: Tuple containing the status of the commands and the responses.
+        :rtype: tuple[bool, list[str]]
+        """
+        if p_seconds != AUTO_SAVE_DISABLED:
+            p_seconds = min(max(p_seconds, AUTO_SAVE_MIN), AUTO_SAVE_MAX)
+        status, response = (
+            self.modem.packetDomainCommands1016AutoSavePacketDataCounterRead()
+        )
+        lines = findResponseLines(response, "+QAUGDCNT:")
+        fields = splitResponseFields(lines[0]) if status and lines else []
+        if fields and fields[0] == str(p_seconds):
+            return True, response
+        writeStatus, writeResponse = (
+            self.modem.packetDomainCommands1016AutoSavePacketDataCounterWrite(p_seconds)
+        )
+        return writeStatus, response + writeResponse
+
+    def reset(self) -> tuple[bool, list[str]]:
+        """
+        Reset the counters of the module with ``AT+QGDCNT=0``. The totals go on.
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        with self.lock:
+            status, response = (
+                self.modem.packetDomainCommands1015PacketDataCounterWrite(0)
+            )
+            if status:
+                self.statistics["resets"] += 1
+                if self.counters is not None:
+                    self.counters = (0, 0)
+        return status, response
+
+    def sample(self) -> Optional[CounterSample]:
+        """
+        Read the counters and store a sample.
+
+        :return: Sample, None when the counters could not be read.
+        :rtype: Optional[CounterSample]
+        """
+        with self.lock:
+            status, response = (
+                self.modem.packetDomainCommands1015PacketDataCounterRead()
+            )
+            counters = parsePacketCounter(response) if status else None
+            if counters is None:
+                self.statistics["failures"] += 1
+                return None
+            now = time.time()
+            monotonic = time.monotonic()
+
+            last = self.last
+            if self.counters is None or last is None:
+                sample = CounterSample(now, 0, 0, 0.0, 0.0)
+            else:
+                deltas = []
+                for previous, current in zip(self.counters, counters):
+                    deltas.append(counterDelta(previous, current, self.modulo))
+                    if current < previous:
+                        wrapped = previous >= self.modulo // 2
+                        self.statistics["wraps" if wrapped else "resets"] += 1
+                elapsed = (
+                    monotonic - self.monotonics[(self.position - 1) % self.capacity]
+                )
+                sample = CounterSample(
+                    now,
+                    last.sent + deltas[0],
+                    last.received + deltas[1],
+                    deltas[0] / elapsed if elapsed > 0 else 0.0,
+                    deltas[1] / elapsed if elapsed > 0 else 0.0,
+                )
+
+            position = self.position
+            self.times[position] = now
+            self.monotonics[position] = monotonic
+            self.sent[position] = sample.sent
+            self.received[position] = sample.received
+            self.position = (position + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.counters = counters
+            self.last = sample
+            self.statistics["samples"] += 1
+            handlers = list(self.handlers)
+
+        for handler in handlers:
+            handler(sample)
+        return sample
+
+    def latest(self) -> Optional[CounterSample]:
+        """
+        Get the newest sample.
+
+        :return: Sample, None before the first one.
+        :rtype: Optional[CounterSample]
+        """
+        with self.lock:
+            return self.last
+
+    def rates(self, p_window: float) -> tuple[float, float]:
+        """
+        Get the mean rates over a window ending with the newest sample.
+
+        :param p_window: Duration of the window, shortened to the samples kept. Unit:
+            second.
+        :type p_window: float
+
+        :return: Sent and received rates, 0 without two samples in the window. Unit: byte
+            per second.
+        :rtype: tuple[float, float]
+        """
+        with self.lock:
+            if self.count < 2:
+                return 0.0, 0.0
+            newest = (self.position - 1) % self.capacity
+            start = self.monotonics[newest] - p_window
+            # Oldest sample within the window, the ages being ordered by time
+            low, high = 1, self.count
+            while low < high:
+                age = (low + high + 1) // 2
+                position = (self.position - age) % self.capacity
+                if self.monotonics[position] >= start:
+                    low = age
+                else:
+                    high = age - 1
+            oldest = (self.position - low) % self.capacity
+            elapsed = self.monotonics[newest] - self.monotonics[oldest]
+            if elapsed <= 0:
+                return 0.0, 0.0
+            return (
+                (self.sent[newest] - self.sent[oldest]) / elapsed,
+                (self.received[newest] - self.received[oldest]) / elapsed,
+            )
+
+    def samples(self) -> dict:
+        """
+        Copy the samples kept, oldest first.
+
+        :return: ``count`` and one array per column: ``time`` (time.time()), ``sent``
+            and ``received`` (totals, in bytes).
+        :rtype: dict
+        """
+        with self.lock:
+            first = (self.position - self.count) % self.capacity
+            snapshot: dict = {"count": self.count}
+            for name, column in (
+                ("time", self.times),
+                ("sent", self.sent),
+                ("received", self.received),
+            ):
+                if first + self.count <= self.capacity:
+                    snapshot[name] = column[first : first + self.count]
+                else:
+                    snapshot[name] = column[first:] + column[: self.position]
+            return snapshot
+
+    def addMetricsHandler(self, p_handler: Callable[[CounterSample], None]):
+        """
+        Call a function with every sample, e.g. to export the rates to a metrics system.
+
+        The handler is called from the sampling worker and must return quickly.
+
+        :param p_handler: Function called with the sample.
+        :type p_handler: Callable[[CounterSample], None]
+        """
+        with self.lock:
+            self.handlers.append(p_handler)
+
+    def removeMetricsHandler(self, p_handler: Callable[[CounterSample], None]):
+        """
+        Stop calling a function added with ``addMetricsHandler``.
+
+        :param p_handler: Function to remove.
+        :type p_handler: Callable[[CounterSample], None]
+        """
+        with self.lock:
+            if p_handler in self.handlers:
+                self.handlers.remove(p_handler)
+
+    def _work(self):
+        """
+        Read the counters every interval.
+        """
+        while self.running:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if self.running:
+                self.sample()
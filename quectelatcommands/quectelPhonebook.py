@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+
+from typing import Iterator, NamedTuple, Optional
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    isCmeError,
+    splitResponseFields,
+)
+
+PHONEBOOK_ADDED = "added"
+PHONEBOOK_MODIFIED = "modified"
+PHONEBOOK_DELETED = "deleted"
+
+# <type> of the numbers
+TYPE_UNKNOWN = 129
+TYPE_INTERNATIONAL = 145
+
+# Error of AT+CPBR on a range without entries on some firmware versions
+CME_NOT_FOUND = 22
+CME_NOT_FOUND_TEXT = "not found"
+
+
+class PhonebookEntry(NamedTuple):
+    """
+    Phonebook entry, as given by ``AT+CPBR``.
+    """
+
+    index: int
+    number: str
+    type: int
+    text: str
+
+
+class PhonebookChange(NamedTuple):
+    """
+    Change of the index, by ``load`` or by a write.
+    """
+
+    # Version of the index after the change
+    version: int
+    index: int
+    # PHONEBOOK_ADDED, PHONEBOOK_MODIFIED or PHONEBOOK_DELETED
+    kind: str
+    # New entry, the previous one for PHONEBOOK_DELETED
+    entry: PhonebookEntry
+
+
+class _TrieNode:
+    __slots__ = ("children", "indexes")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        # Indexes of the entries whose keys go through the node
+        self.indexes: set[int] = set()
+
+
+def normalizeNumber(p_number: str) -> str:
+    """
+    Get the key of a number in the index: its digits, ``*`` and ``#``.
+
+    :param p_number: Number, e.g. ``+49 151 1234567``.
+    :type p_number: str
+
+    :return: Key, e.g. ``491511234567``.
+    :rtype: str
+    """
+    return "".join(character for character in p_number if character in "0123456789*#")
+
+
+def _nameKeys(p_text: str) -> set[str]:
+    """
+    Get the keys of a name in the trie: the name from the start of each word, so that
+    a prefix matches the first name as well as the last name.
+    """
+    text = " ".join(p_text.casefold().split())
+    keys = {text}
+    for position, character in enumerate(text):
+        if character == " ":
+            keys.add(text[position + 1 :])
+    return keys
+
+
+def parsePhonebookEntry(p_line: str) -> Optional[PhonebookEntry]:
+    """
+    Parse an entry of ``AT+CPBR``.
+
+    :param p_line: Response line, ``+CPBR: <index>,<number>,<type>,<text>``.
+    :type p_line: str
+
+    :return: Entry, None when malformed.
+    :rtype: Optional[PhonebookEntry]
+    """
+    fields = splitResponseFields(p_line)
+    if len(fields) < 4 or not fields[0].isdigit() or not fields[2].isdigit():
+        return None
+    return PhonebookEntry(int(fields[0]), fields[1], int(fields[2]), fields[3])
+
+
+class QuectelPhonebook:
+    def __init__(self, p_modem: QuectelModemATCommands, p_chunkSize: int = 50):
+        """
+        Local index of a phonebook storage, searched without the module.
+
+        ``load`` reads the whole storage with ``AT+CPBR=<first>,<last>`` ranges of
+        ``p_chunkSize`` entries, within the size given by ``AT+CPBS?``, instead of one
+        ``AT+CPBR`` per entry; it stops once the used entries are read. Names are
+        indexed by a prefix trie, case insensitive, and numbers by a hash of their digits,
+        so that lookups do not touch the UART. ``write`` and ``delete`` go through
+        ``AT+CPBW`` and update the index incrementally. Every change of the index is
+        numbered, see ``changesSince``.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_chunkSize: Number of entries read by each ``AT+CPBR``.
+        :type p_chunkSize: int
+        """
+        self.modem = p_modem
+        self.chunkSize = p_chunkSize
+        self.storage: Optional[str] = None
+        self.used = 0
+        self.total = 0
+        self.entries: dict[int, PhonebookEntry] = {}
+        self.root = _TrieNode()
+        self.numbers: dict[str, set[int]] = {}
+        self.version = 0
+        # Last change of each index
+        self.changes: dict[int, PhonebookChange] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[PhonebookEntry]:
+        return iter(sorted(self.entries.values()))
+
+    def load(self, p_storage: Optional[str] = None) -> tuple[bool, list[str]]:
+        """
+        Read the storage into the index. Entries changed since the previous load are
+        recorded as changes.
+
+        :param p_storage: Storage selected first, e.g. ``"SM"``. None for the current one.
+        :type p_storage: Optional[str]
+
+        :return: Tuple containing the status of the reading and the responses. The index
+            is unchanged on failure.
+        :rtype: tuple[bool, list[str]]
+        """
+        if p_storage is not None:
+            status, response = (
+                self.modem.phonebookCommands804SelectPhonebookMemoryStorageWrite(
+                    p_storage
+                )
+            )
+            if not status:
+                return status, response
+
+        status, response = (
+            self.modem.phonebookCommands804SelectPhonebookMemoryStorageRead()
+        )
+        lines = findResponseLines(response, "+CPBS:")
+        if not status or not lines:
+            return False, response
+        # +CPBS: <storage>,<used>,<total>
+        fields = splitResponseFields(lines[0])
+        if len(fields) < 3 or not fields[1].isdigit() or not fields[2].isdigit():
+            return False, response
+        storage, used, total = fields[0], int(fields[1]), int(fields[2])
+
+        entries: dict[int, PhonebookEntry] = {}
+        responses = list(response)
+        for first in range(1, total + 1, self.chunkSize):
+            if len(entries) >= used:
+                break
+            last = min(first + self.chunkSize - 1, total)
+            status, response = self.modem.phonebookCommands803ReadPhonebookEntries(
+                first, last
+            )
+            responses += response
+            if not status and not isCmeError(
+                response, CME_NOT_FOUND, CME_NOT_FOUND_TEXT
+            ):
+                return False, responses
+            for line in findResponseLines(response, "+CPBR:"):
+                entry = parsePhonebookEntry(line)
+                if entry is not None:
+                    entries[entry.index] = entry
+
+        if storage != self.storage:
+            for index in list(self.entries):
+                self._remove(index)
+        for index in [index for index in self.entries if index not in entries]:
+            self._remove(index)
+        for entry in entries.values():
+            if self.entries.get(entry.index) != entry:
+                self._put(entry)
+        self.storage, self.used, self.total = storage, len(entries), total
+        return True, responses
+
+    def get(self, p_index: int) -> Optional[PhonebookEntry]:
+        """
+        Get an entry.
+
+        :param p_index: Location number.
+        :type p_index: int
+
+        :return: Entry, None for a free location.
+        :rtype: Optional[PhonebookEntry]
+        """
+        return self.entries.get(p_index)
+
+    def findName(self, p_prefix: str) -> list[PhonebookEntry]:
+        """
+        Find the entries whose name, or a word of it, starts with a prefix.
+
+        :param p_prefix: Prefix, case insensitive, e.g. ``"jo"`` or ``"john sm"``.
+        :type p_prefix: str
+
+        :return: Entries, by index.
+        :rtype: list[PhonebookEntry]
+        """
+        node = self.root
+        for character in " ".join(p_prefix.casefold().split()):
+            child = node.children.get(character)
+            if child is None:
+                return []
+            node = child
+        return [self.entries[index] for index in sorted(node.indexes)]
+
+    def findNumber(self, p_number: str) -> list[PhonebookEntry]:
+        """
+        Find the entries of a number, whatever its formatting.
+
+        :param p_number: Number, e.g. ``+49 151 1234567``.
+        :type p_number: str
+
+        :return: Entries, by index.
+        :rtype: list[PhonebookEntry]
+        """
+        indexes = self.numbers.get(normalizeNumber(p_number), set())
+        return [self.entries[index] for index in sorted(indexes)]
+
+    def firstFreeIndex(self) -> Optional[int]:
+        """
+        Get the first free location of the storage.
+
+        :return: Location number, None when the storage is full or not loaded.
+        :rtype: Optional[int]
+        """
+        for index in range(1, self.total + 1):
+            if index not in self.entries:
+                return index
+        return None
+
+    def write(
+        self,
+        p_number: str,
+        p_text: str,
+        p_index: Optional[int] = None,
+        p_type: Optional[int] = None,
+    ) -> tuple[bool, list[str]]:
+        """
+        Write an entry with ``AT+CPBW`` and update the index, loaded first if needed to
+        find the first free location.
+
+        :param p_number: Number.
+        :type p_number: str
+        :param p_text: Name, in the character set of ``AT+CSCS``.
+        :type p_text: str
+        :param p_index: Location number, None for the first free one.
+        :type p_index: Optional[int]
+        :param p_type: <type> of the number, None for TYPE_INTERNATIONAL when it starts
+            with ``+`` and TYPE_UNKNOWN otherwise.
+        :type p_type: Optional[int]
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        if p_index is None and self.storage is None:
+            status, response = self.load()
+            if not status:
+                return status, response
+        index = p_index if p_index is not None else self.firstFreeIndex()
+        if index is None:
+            return False, ["Phonebook full"]
+        if p_type is None:
+            p_type = TYPE_INTERNATIONAL if p_number.startswith("+") else TYPE_UNKNOWN
+
+        status, response = self.modem.phonebookCommands805WritePhonebookEntry(
+            index, p_number, p_type, p_text
+        )
+        if status:
+            self._put(PhonebookEntry(index, p_number, p_type, p_text))
+            self.used = len(self.entries)
+        return status, response
+
+    def delete(self, p_index: int) -> tuple[bool, list[str]]:
+        """
+        Delete an entry with ``AT+CPBW`` and update the index.
+
+        :param p_index: Location number.
+        :type p_index: int
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        status, response = self.modem.phonebookCommands805WritePhonebookEntry(p_index)
+        if status:
+            self._remove(p_index)
+            self.used = len(self.entries)
+        return status, response
+
+    def changesSince(self, p_version: int = 0) -> list[PhonebookChange]:
+        """
+        Get the changes of the index after a version, e.g. to synchronize a copy.
+
+        :param p_version: Version already known, ``version`` when it was synchronized.
+        :type p_version: int
+
+        :return: Last change of each changed index, in order.
+        :rtype: list[PhonebookChange]
+        """
+        return sorted(
+            (change for change in self.changes.values() if change.version > p_version),
+            key=lambda change: change.version,
+        )
+
+    def _put(self, p_entry: PhonebookEntry):
+        previous = self.entries.get(p_entry.index)
+        if previous is not None:
+            self._unindex(previous)
+        self.entries[p_entry.index] = p_entry
+        for key in _nameKeys(p_entry.text):
+            node = self.root
+            node.indexes.add(p_entry.index)
+            for character in key:
+                node = node.children.setdefault(character, _TrieNode())
+                node.indexes.add(p_entry.index)
+        self.numbers.setdefault(normalizeNumber(p_entry.number), set()).add(
+            p_entry.index
+        )
+        kind = PHONEBOOK_ADDED if previous is None else PHONEBOOK_MODIFIED
+        self._change(p_entry.index, kind, p_entry)
+
+    def _remove(self, p_index: int):
+        entry = self.entries.pop(p_index, None)
+        if entry is None:
+            return
+        self._unindex(entry)
+        self._change(p_index, PHONEBOOK_DELETED, entry)
+
+    def _unindex(self, p_entry: PhonebookEntry):
+        for key in _nameKeys(p_entry.text):
+            path = [self.root]
+            for character in key:
+                child = path[-1].children.get(character)
+                if child is None:
+                    break
+                path.append(child)
+            for node in path:
+                node.indexes.discard(p_entry.index)
+            # Prune the branches left without entries
+            for position in range(len(path) - 1, 0, -1):
+                if path[position].indexes:
+                    break
+                del path[position - 1].children[key[position - 1]]
+
+        number = normalizeNumber(p_entry.number)
+        indexes = self.numbers.get(number)
+        if indexes is not None:
+            indexes.discard(p_entry.index)
+            if not indexes:
+                del self.numbers[number]
+
+    def _change(self, p_index: int, p_kind: str, p_entry: PhonebookEntry):
+        self.version += 1
+        self.changes[p_index] = PhonebookChange(self.version, p_index, p_kind, p_entry)
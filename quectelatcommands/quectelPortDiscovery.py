@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import re
+import time
+import serial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from quectelatcommands.quectelDeviceRegistry import (
+    QuectelDeviceRegistry,
+    listUsbSerialPorts,
+)
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+
+PORT_AT = "at"
+PORT_PPP = "ppp"
+PORT_NMEA = "nmea"
+PORT_DM = "dm"
+PORT_SILENT = "silent"
+PORT_BUSY = "busy"
+
+_NMEA_SENTENCE = re.compile(rb"\$[A-Z]{2}[A-Z]{3},[^\r\n]*\*[0-9A-F]{2}\r?\n")
+_AT_RESULT = re.compile(rb"\r\n(OK|ERROR|\+CME ERROR[^\r]*)\r\n")
+# QCDM/DIAG frames are HDLC-like and terminated by 0x7E
+_DM_FRAME = re.compile(rb"[\x00-\x08\x80-\xff].*\x7e", re.DOTALL)
+
+
+class QuectelPortDiscovery:
+    def __init__(
+        self,
+        p_baudrate: int = 115200,
+        p_probeTimeout: float = 0.3,
+        p_timeout: int = 1,
+    ):
+        """
+        Find the AT, PPP, NMEA and DM ports of the attached modules.
+
+        Every candidate port is probed concurrently: ``AT`` is written once and the
+        traffic received within ``p_probeTimeout`` tells the port type. AT-capable ports
+        answer ``OK``, the NMEA port streams sentences when GNSS is on and is silent
+        otherwise, the DM port answers with binary frames. The ports are then grouped per
+        physical module through their USB identity in sysfs.
+
+        :param p_baudrate: Baudrate of the created clients and of the probes.
+        :type p_baudrate: int
+        :param p_probeTimeout: Maximum time to probe a port. Unit: second.
+        :type p_probeTimeout: float
+        :param p_timeout: Timeout for the serial connection of the created clients.
+        :type p_timeout: int
+        """
+        self.baudrate = p_baudrate
+        self.probeTimeout = p_probeTimeout
+        self.timeout = p_timeout
+
+    def probePort(self, p_device: str) -> str:
+        """
+        Classify a serial port from the traffic it sends back to ``AT``.
+
+        :param p_device: Serial port, e.g. ``/dev/ttyUSB2``.
+        :type p_device: str
+
+        :return: ``at``, ``nmea``, ``dm``, ``silent`` or ``busy`` (port already opened by
+            another process or not accessible).
+        :rtype: str
+        """
+        try:
+            conn = serial.Serial(p_device, self.baudrate, timeout=0.02, exclusive=True)
+        except (serial.SerialException, OSError, ValueError):
+            return PORT_BUSY
+
+        data = bytearray()
+        try:
+            conn.reset_input_buffer()
+            conn.write(b"AT\r")
+            deadline = time.monotonic() + self.probeTimeout
+            while time.monotonic() < deadline:
+                data += conn.read(conn.in_waiting or 1)
+                if _AT_RESULT.search(data):
+                    return PORT_AT
+                if _NMEA_SENTENCE.search(data):
+                    return PORT_NMEA
+                if _DM_FRAME.search(data):
+                    return PORT_DM
+        except (serial.SerialException, OSError):
+            return PORT_BUSY
+        finally:
+            conn.close()
+
+        if any(byte < 0x09 or byte >= 0x80 for byte in data):
+            return PORT_DM
+        return PORT_SILENT
+
+    def discover(
+        self,
+        p_devices: Optional[list[str]] = None,
+        p_registry: Optional[QuectelDeviceRegistry] = None,
+    ) -> list[dict]:
+        """
+        Probe the candidate ports and group them per module.
+
+        Within a module, the AT-capable port with the lowest USB interface is the AT
+        command port and the next one is the PPP data port. When GNSS is off, a single
+        silent port is taken as the NMEA port.
+
+        :param p_devices: Ports to probe, all the USB serial ports if None.
+        :type p_devices: Optional[list[str]]
+        :param p_registry: Registry to store the ports of every module into.
+        :type p_registry: Optional[QuectelDeviceRegistry]
+
+        :return: One dictionary per module with ``usbKey``, ``ports`` (port to type),
+            ``atPort``, ``pppPort``, ``nmeaPort``, ``dmPort``, and the clients ``modem``
+            and ``gnss`` (not opened, None without AT port). GNSS AT commands are sent
+            on the AT port, so both clients share one serial connection, opened by the
+            first ``open`` and closed by the last ``close``; the NMEA sentences are read
+            on ``nmeaPort``.
+        :rtype: list[dict]
+        """
+        usbPorts = {port["device"]: port for port in listUsbSerialPorts()}
+        devices = p_devices if p_devices is not None else list(usbPorts)
+        if not devices:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(len(devices), 64)) as executor:
+            kinds = dict(zip(devices, executor.map(self.probePort, devices)))
+
+        groups: dict[str, list[str]] = {}
+        for device in devices:
+            usbKey = usbPorts[device]["usbKey"] if device in usbPorts else device
+            groups.setdefault(usbKey, []).append(device)
+
+        modules = []
+        for usbKey, groupDevices in groups.items():
+            groupDevices.sort(
+                key=lambda device: (
+                    int(usbPorts.get(device, {}).get("interface") or 0),
+                    device,
+                )
+            )
+            module = self._createModule(usbKey, groupDevices, kinds)
+            if p_registry is not None and module["atPort"] is not None:
+                p_registry.update(self._registryRecord(module, usbPorts))
+            modules.append(module)
+
+        return modules
+
+    def _createModule(
+        self, p_usbKey: str, p_devices: list[str], p_kinds: dict[str, str]
+    ) -> dict:
+        """
+        Assign the roles of the ports of a module and create its clients.
+
+        :param p_usbKey: USB identity of the module.
+        :type p_usbKey: str
+        :param p_devices: Ports of the module, sorted by USB interface.
+        :type p_devices: list[str]
+        :param p_kinds: Port to probed type.
+        :type p_kinds: dict[str, str]
+
+        :return: Module dictionary, see ``discover``.
+        :rtype: dict
+        """
+        ports = {device: p_kinds[device] for device in p_devices}
+        atPorts = [device for device in p_devices if ports[device] == PORT_AT]
+        for device in atPorts[1:2]:
+            ports[device] = PORT_PPP
+        silentPorts = [device for device in p_devices if ports[device] == PORT_SILENT]
+        if PORT_NMEA not in ports.values() and len(silentPorts) == 1:
+            ports[silentPorts[0]] = PORT_NMEA
+
+        def first(p_kind: str) -> Optional[str]:
+            return next(
+                (device for device in p_devices if ports[device] == p_kind), None
+            )
+
+        module: dict = {
+            "usbKey": p_usbKey,
+            "ports": ports,
+            "atPort": first(PORT_AT),
+            "pppPort": first(PORT_PPP),
+            "nmeaPort": first(PORT_NMEA),
+            "dmPort": first(PORT_DM),
+            "modem": None,
+            "gnss": None,
+        }
+        if module["atPort"] is not None:
+            module["modem"] = QuectelModemATCommands(
+                module["atPort"], self.baudrate, self.timeout
+            )
+            module["gnss"] = QuectelGnssATCommands(
+                module["atPort"], self.baudrate, self.timeout
+            )
+            # One reader of the AT port, so that the clients can be used together
+            module["gnss"].serialPort = module["modem"].serialPort
+        return module
+
+    def _registryRecord(self, p_module: dict, p_usbPorts: dict[str, dict]) -> dict:
+        """
+        Build the registry record of a discovered module.
+
+        :param p_module: Module dictionary, see ``discover``.
+        :type p_module: dict
+        :param p_usbPorts: Port to USB description, see ``listUsbSerialPorts``.
+        :type p_usbPorts: dict[str, dict]
+
+        :return: Device record.
+        :rtype: dict
+        """
+        record = {"usbKey": p_module["usbKey"], "baudrate": self.baudrate}
+        for role in ("at", "nmea"):
+            device = p_module[f"{role}Port"]
+            if device is None:
+                continue
+            record[f"{role}Port"] = device
+            if device in p_usbPorts:
+                record[f"{role}Interface"] = p_usbPorts[device]["interface"]
+        return record
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    splitResponseFields,
+)
+
+DOMAIN_CS = "cs"
+DOMAIN_PS = "ps"
+DOMAIN_EPS = "eps"
+
+# Result code prefix of each domain
+DOMAIN_PREFIXES = {DOMAIN_CS: "+CREG:", DOMAIN_PS: "+CGREG:", DOMAIN_EPS: "+CEREG:"}
+
+# <n> enabling the URCs with the location information
+REGISTRATION_URC_LOCATION = 2
+
+# <stat>
+STAT_NOT_REGISTERED = 0
+STAT_HOME = 1
+STAT_SEARCHING = 2
+STAT_DENIED = 3
+STAT_UNKNOWN = 4
+STAT_ROAMING = 5
+REGISTERED_STATS = (STAT_HOME, STAT_ROAMING)
+
+# <AcT>
+ACCESS_TECHNOLOGIES = {
+    0: "GSM",
+    2: "UTRAN",
+    3: "GSM EGPRS",
+    4: "UTRAN HSDPA",
+    5: "UTRAN HSUPA",
+    6: "UTRAN HSDPA HSUPA",
+    7: "E-UTRAN",
+    8: "eMTC",
+    9: "NB-IoT",
+}
+
+
+class DomainRegistration(NamedTuple):
+    """
+    Registration of a domain, as given by ``+CREG``, ``+CGREG`` or ``+CEREG``.
+    """
+
+    stat: int
+    # Location area code (tracking area code for EPS) and cell ID, in hexadecimal
+    lac: Optional[str]
+    cellId: Optional[str]
+    act: Optional[int]
+
+    @property
+    def registered(self) -> bool:
+        return self.stat in REGISTERED_STATS
+
+
+class RegistrationState(NamedTuple):
+    """
+    Registration merged from the domains.
+    """
+
+    registered: bool
+    roaming: bool
+    # Registration of each domain, None until reported
+    cs: Optional[DomainRegistration]
+    ps: Optional[DomainRegistration]
+    eps: Optional[DomainRegistration]
+    # Location of the most capable registered domain: EPS, then PS, then CS
+    lac: Optional[str]
+    cellId: Optional[str]
+    act: Optional[int]
+
+
+class RegistrationTransition(NamedTuple):
+    """
+    Change of the registration of a domain.
+    """
+
+    # time.time() and time.monotonic() of the change
+    timestamp: float
+    monotonic: float
+    domain: str
+    # None for the first report
+    previous: Optional[DomainRegistration]
+    current: DomainRegistration
+
+
+def parseRegistration(p_line: str) -> Optional[DomainRegistration]:
+    """
+    Parse a registration URC, ``+CREG: <stat>[,<lac>,<ci>[,<AcT>]]``, or read response,
+    ``+CREG: <n>,<stat>[,<lac>,<ci>[,<AcT>]]``, of ``+CREG``, ``+CGREG`` or ``+CEREG``.
+
+    :param p_line: Line.
+    :type p_line: str
+
+    :return: Registration, None when malformed.
+    :rtype: Optional[DomainRegistration]
+    """
+    fields = splitResponseFields(p_line, True)
+    # The location fields are quoted: the <stat> of a URC is followed by one
+    urc = len(fields) == 1 or fields[1].startswith('"')
+    fields = [field.strip('"') for field in (fields if urc else fields[1:])]
+    if not fields or not fields[0].isdigit():
+        return None
+    lac = fields[1] or None if len(fields) > 1 else None
+    cellId = fields[2] or None if len(fields) > 2 else None
+    act = int(fields[3]) if len(fields) > 3 and fields[3].isdigit() else None
+    return DomainRegistration(int(fields[0]), lac, cellId, act)
+
+
+class QuectelRegistrationTracker:
+    def __init__(
+        self,
+        p_modem: QuectelModemATCommands,
+        p_domains: tuple[str, ...] = (DOMAIN_CS, DOMAIN_PS, DOMAIN_EPS),
+        p_historySize: int = 1024,
+    ):
+        """
+        Network registration state machine, driven by the ``+CREG``, ``+CGREG`` and
+        ``+CEREG`` URCs instead of polling.
+
+        ``start`` enables the URCs with the location information and reads the current
+        registration once; the merged state is then only updated by the URCs, and the
+        threads waiting in ``waitForRegistered`` are woken up on change. Each change is
+        recorded with its time, and ``attachTimes`` gives how long each domain took to
+        register again.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_domains: Domains tracked: DOMAIN_CS, DOMAIN_PS and DOMAIN_EPS, e.g. without
+            DOMAIN_EPS for a module without LTE.
+        :type p_domains: tuple[str, ...]
+        :param p_historySize: Number of transitions kept.
+        :type p_historySize: int
+        """
+        self.modem = p_modem
+        self.domains = p_domains
+        self.condition = threading.Condition()
+        self.registrations: dict[str, DomainRegistration] = {}
+        self.history: deque[RegistrationTransition] = deque(maxlen=p_historySize)
+        # Number of transitions recorded, those dropped from the history included
+        self.transitionCount = 0
+        self.handlers = {
+            domain: (
+                lambda p_urc, p_domain=domain: self._onRegistration(p_domain, p_urc)
+            )
+            for domain in p_domains
+        }
+
+    def __enter__(self) -> "QuectelRegistrationTracker":
+        self.start()
+        return self
+
+    def __exit__(self, p_type, p_value, p_traceback):
+        self.stop()
+
+    def start(self) -> tuple[bool, list[str]]:
+        """
+        Enable the registration URCs and read the current registration.
+
+        :return: Tuple containing the status of the configuration and the responses.
+        :rtype: tuple[bool, list[str]]
+        """
+        for domain, handler in self.handlers.items():
+            self.modem.serialPort.addUrcHandler(DOMAIN_PREFIXES[domain], handler)
+
+        commands = {
+            DOMAIN_CS: (
+                self.modem.networkServiceCommands602DomainNetworkRegistrationStatusWrite,
+                self.modem.networkServiceCommands602DomainNetworkRegistrationStatusRead,
+            ),
+            DOMAIN_PS: (
+                self.modem.packetDomainCommands1011PsDomainNetworkRegistrationStatusWrite,
+                self.modem.packetDomainCommands1011PsDomainNetworkRegistrationStatusRead,
+            ),
+            DOMAIN_EPS: (
+                self.modem.packetDomainCommands1014EpsNetworkRegistrationStatusWrite,
+                self.modem.packetDomainCommands1014EpsNetworkRegistrationStatusRead,
+            ),
+        }
+        response: list[str] = []
+        status = True
+        for domain in self.domains:
+            write, read = commands[domain]
+            writeStatus, writeResponse = write(REGISTRATION_URC_LOCATION)
+            readStatus, readResponse = read()
+            status = status and writeStatus and readStatus
+            response += writeResponse + readResponse
+            for line in findResponseLines(readResponse, DOMAIN_PREFIXES[domain]):
+                self._onRegistration(domain, line)
+        if not status:
+            self.stop()
+        return status, response
+
+    def stop(self):
+        """
+        Stop tracking the URCs. They stay enabled on the module.
+        """
+        for domain, handler in self.handlers.items():
+            self.modem.serialPort.removeUrcHandler(DOMAIN_PREFIXES[domain], handler)
+
+    def registration(self, p_domain: str) -> Optional[DomainRegistration]:
+        """
+        Get the registration of a domain.
+
+        :param p_domain: DOMAIN_CS, DOMAIN_PS or DOMAIN_EPS.
+        :type p_domain: str
+
+        :return: Registration, None until reported.
+        :rtype: Optional[DomainRegistration]
+        """
+        with self.condition:
+            return self.registrations.get(p_domain)
+
+    def state(self) -> RegistrationState:
+        """
+        Get the registration merged from the domains.
+
+        :return: Registered when a domain is, roaming when a registered domain roams, and
+            the location of the most capable registered domain.
+        :rtype: RegistrationState
+        """
+        with self.condition:
+            registrations = dict(self.registrations)
+        registered = [
+            registrations[domain]
+            for domain in (DOMAIN_EPS, DOMAIN_PS, DOMAIN_CS)
+            if domain in registrations and registrations[domain].registered
+        ]
+        location = (
+            registered[0] if registered else DomainRegistration(0, None, None, None)
+        )
+        return RegistrationState(
+            bool(registered),
+            any(registration.stat == STAT_ROAMING for registration in registered),
+            registrations.get(DOMAIN_CS),
+            registrations.get(DOMAIN_PS),
+            registrations.get(DOMAIN_EPS),
+            location.lac,
+            location.cellId,
+            location.act,
+        )
+
+    def isRegistered(self, p_domain: Optional[str] = None) -> bool:
+        """
+        Tell whether a domain is registered.
+
+        :param p_domain: DOMAIN_CS, DOMAIN_PS or DOMAIN_EPS, None for any of them.
+        :type p_domain: Optional[str]
+
+        :return: True when registered, at home or roaming.
+        :rtype: bool
+        """
+        with self.condition:
+            return self._registered(p_domain)
+
+    def waitForRegistered(
+        self, p_timeout: Optional[float] = None, p_domain: Optional[str] = None
+    ) -> bool:
+        """
+        Wait until a domain is registered, woken up by the URCs.
+
+        :param p_timeout: Maximum time to wait. Unit: second. None waits until registered.
+        :type p_timeout: Optional[float]
+        :param p_domain: DOMAIN_CS, DOMAIN_PS or DOMAIN_EPS, None for any of them.
+        :type p_domain: Optional[str]
+
+        :return: True when registered, False on timeout.
+        :rtype: bool
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self._registered(p_domain), p_timeout
+            )
+
+    def waitForTransition(
+        self, p_count: int, p_timeout: Optional[float] = None
+    ) -> tuple[int, list[RegistrationTransition]]:
+        """
+        Wait until more transitions are recorded, e.g. to print them as they happen.
+
+        :param p_count: Number of transitions already known, 0 at first, then the number
+            returned by the previous call.
+        :type p_count: int
+        :param p_timeout: Maximum time to wait. Unit: second. None waits indefinitely.
+        :type p_timeout: Optional[float]
+
+        :return: Number of transitions recorded, and the new ones (empty on timeout).
+            Transitions dropped from the history are not given.
+        :rtype: tuple[int, list[RegistrationTransition]]
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.transitionCount > p_count, p_timeout)
+            new = min(self.transitionCount - p_count, len(self.history))
+            transitions = list(self.history)[len(self.history) - new :] if new else []
+            return self.transitionCount, transitions
+
+    def transitions(self) -> list[RegistrationTransition]:
+        """
+        Get the recorded transitions, oldest first.
+
+        :return: Transitions.
+        :rtype: list[RegistrationTransition]
+        """
+        with self.condition:
+            return list(self.history)
+
+    def attachTimes(self, p_domain: str) -> list[float]:
+        """
+        Get how long a domain took to register, from each loss of registration (or the
+        first report of a not registered state) to the next registration.
+
+        :param p_domain: DOMAIN_CS, DOMAIN_PS or DOMAIN_EPS.
+        :type p_domain: str
+
+        :return: Durations, in the order of the registrations. Unit: second.
+        :rtype: list[float]
+        """
+        durations = []
+        lostTime: Optional[float] = None
+        for transition in self.transitions():
+            if transition.domain != p_domain:
+                continue
+            wasRegistered = (
+                transition.previous is not None and transition.previous.registered
+            )
+            if transition.current.registered and lostTime is not None:
+                durations.append(transition.monotonic - lostTime)
+                lostTime = None
+            elif not transition.current.registered and (
+                wasRegistered or transition.previous is None
+            ):
+                lostTime = transition.monotonic
+        return durations
+
+    def _registered(self, p_domain: Optional[str]) -> bool:
+        domains = self.domains if p_domain is None else (p_domain,)
+        return any(
+            domain in self.registrations and self.registrations[domain].registered
+            for domain in domains
+        )
+
+    def _onRegistration(self, p_domain: str, p_urc: str):
+        registration = parseRegistration(p_urc)
+        if registration is None:
+            return
+        with self.condition:
+            previous = self.registrations.get(p_domain)
+            if registration == previous:
+                return
+            self.registrations[p_domain] = registration
+            self.history.append(
+                RegistrationTransition(
+                    time.time(), time.monotonic(), p_domain, previous, registration
+                )
+            )
+            self.transitionCount += 1
+            self.condition.notify_all()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import re
+
+_COMMAND_NAME = re.compile(r'^AT([+^][A-Z0-9&]+)(="([^"]*)")?', re.IGNORECASE)
+_SUB_COMMAND_READ = re.compile(r'^AT(\+\w+)="[^"]*"$', re.IGNORECASE)
+
+# Commands whose first parameter is a sub-command, read by AT+X="name". Other commands
+# with one quoted parameter, e.g. AT+CSCS="GSM", are writes.
+SUB_COMMAND_CONFIGURATIONS = ("+QCFG", "+QGPSCFG", "+QINDCFG", "+QURCCFG")
+
+
+def responsePrefix(p_command: str) -> str:
+    """
+    Get the prefix of the information response of an extended AT command.
+
+    For commands whose first parameter is a quoted sub-command (``AT+QCFG="band"``,
+    ``AT+QGPSCFG="outport"``, ...), the sub-command is part of the prefix.
+
+    :param p_command: AT command, e.g. ``AT+CGDCONT?`` or ``AT+QCFG="band"``.
+    :type p_command: str
+
+    :return: Response prefix, e.g. ``+CGDCONT:`` or ``+QCFG: "band"``.
+    :rtype: str
+    """
+    match = _COMMAND_NAME.match(p_command.strip())
+    if match is None:
+        return p_command.strip()
+
+    prefix = match.group(1).upper() + ":"
+    if match.group(3) is not None:
+        prefix += f' "{match.group(3)}"'
+    return prefix
+
+
+def isReadCommand(p_command: str) -> bool:
+    """
+    Tell whether an AT command only reads: a query (``AT+X?``), a test (``AT+X=?``) or
+    a sub-command read of ``SUB_COMMAND_CONFIGURATIONS`` (``AT+QCFG="band"``). Sending
+    it twice has no side effect.
+
+    :param p_command: AT command.
+    :type p_command: str
+
+    :return: True for a read.
+    :rtype: bool
+    """
+    command = p_command.strip()
+    if command.endswith("?"):
+        return True
+    match = _SUB_COMMAND_READ.match(command)
+    return match is not None and match.group(1).upper() in SUB_COMMAND_CONFIGURATIONS
+
+
+def splitResponseFields(p_line: str, p_keepQuotes: bool = False) -> list[str]:
+    """
+    Split the parameters of an information response line into fields.
+
+    The ``+NAME:`` prefix is dropped, commas between double quotes are kept and the
+    double quotes around a field are removed unless ``p_keepQuotes`` is set.
+
+    :param p_line: Response line, e.g. ``+CGDCONT: 1,"IP","internet","0.0.0.0",0,0``.
+    :type p_line: str
+    :param p_keepQuotes: Keep the double quotes, so that fields can be sent back as is.
+    :type p_keepQuotes: bool
+
+    :return: Fields of the line, e.g. ``["1", "IP", "internet", "0.0.0.0", "0", "0"]``.
+    :rtype: list[str]
+    """
+    line = p_line.strip()
+    if line[:1] in ("+", "^") and ":" in line:
+        line = line.split(":", 1)[1]
+
+    fields = []
+    current = []
+    quoted = False
+    for character in line:
+        if character == '"':
+            quoted = not quoted
+            if p_keepQuotes:
+                current.append(character)
+        elif character == "," and not quoted:
+            fields.append("".join(current).strip())
+            current = []
+        else:
+            current.append(character)
+    fields.append("".join(current).strip())
+
+    return fields
+
+
+def findResponseLines(p_response: list[str], p_prefix: str) -> list[str]:
+    """
+    Get the lines of a response starting with a prefix.
+
+    :param p_response: Response of an AT command.
+    :type p_response: list[str]
+    :param p_prefix: Prefix of the lines to keep, e.g. ``+CGDCONT:``.
+    :type p_prefix: str
+
+    :return: Matching lines.
+    :rtype: list[str]
+    """
+    return [line for line in p_response if line.startswith(p_prefix)]
+
+
+def isCmeError(p_response: list[str], p_code: int, p_text: str) -> bool:
+    """
+    Tell whether a response ends with a given ``+CME ERROR``, in the numeric format
+    (``AT+CMEE=1``) or the verbose one (``AT+CMEE=2``).
+
+    :param p_response: Response of a command.
+    :type p_response: list[str]
+    :param p_code: Error code, e.g. 516.
+    :type p_code: int
+    :param p_text: Verbose text of the error, case insensitive, e.g. ``"Not fixed now"``.
+    :type p_text: str
+
+    :return: True when the response holds the error.
+    :rtype: bool
+    """
+    for line in p_response:
+        if line.startswith("+CME ERROR:"):
+            error = line.split(":", 1)[1].strip()
+            if error == str(p_code) or error.casefold() == p_text.casefold():
+                return True
+    return False
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+from array import array
+from typing import Iterable, Iterator, Optional
+from quectelatcommands.quectelNmeaReader import (
+    NmeaGga,
+    NmeaGsa,
+    NmeaGsv,
+    NmeaRecord,
+    NmeaRmc,
+)
+
+CONSTELLATION_UNKNOWN = 0
+CONSTELLATION_GPS = 1
+CONSTELLATION_GLONASS = 2
+CONSTELLATION_GALILEO = 3
+CONSTELLATION_BEIDOU = 4
+CONSTELLATION_QZSS = 5
+
+TALKER_CONSTELLATIONS = {
+    "GP": CONSTELLATION_GPS,
+    "GL": CONSTELLATION_GLONASS,
+    "GA": CONSTELLATION_GALILEO,
+    "GB": CONSTELLATION_BEIDOU,
+    "BD": CONSTELLATION_BEIDOU,
+    "GQ": CONSTELLATION_QZSS,
+    "QZ": CONSTELLATION_QZSS,
+}
+
+# Column name to array type code. Unknown elevation, azimuth and SNR are -1.
+SATELLITE_COLUMNS = {
+    "prn": "H",
+    "constellation": "B",
+    "signalId": "B",
+    "elevation": "b",
+    "azimuth": "h",
+    "snr": "b",
+    "used": "B",
+}
+
+
+def prnConstellation(p_prn: int) -> int:
+    """
+    Get the constellation of a satellite from its NMEA PRN, for the ``GN`` sentences.
+
+    :param p_prn: Satellite PRN.
+    :type p_prn: int
+
+    :return: ``CONSTELLATION_*`` value.
+    :rtype: int
+    """
+    if p_prn <= 64:
+        return CONSTELLATION_GPS
+    if p_prn <= 96:
+        return CONSTELLATION_GLONASS
+    if 193 <= p_prn <= 200:
+        return CONSTELLATION_QZSS
+    if 201 <= p_prn <= 264 or 401 <= p_prn <= 437:
+        return CONSTELLATION_BEIDOU
+    if 301 <= p_prn <= 336:
+        return CONSTELLATION_GALILEO
+    return CONSTELLATION_UNKNOWN
+
+
+class QuectelSatelliteTable:
+    def __init__(self, p_capacity: int = 256):
+        """
+        Incremental aggregator of GSV and GSA sentences into one satellite table per epoch.
+
+        Records are written into preallocated arrays, one row per satellite and signal.
+        An epoch is complete when a constellation starts a new GSV set or reports a new
+        GSA sentence; the table is then given as a snapshot. The ``GN`` GSA sentences
+        without system ID (NMEA before 4.10), one per constellation, are told apart by
+        their rank among the consecutive GSA sentences.
+
+        :param p_capacity: Maximum number of rows per epoch. Rows beyond are dropped.
+        :type p_capacity: int
+        """
+        self.capacity = p_capacity
+        self.columns = {
+            name: array(typeCode, bytes(array(typeCode).itemsize * p_capacity))
+            for name, typeCode in SATELLITE_COLUMNS.items()
+        }
+        self.rows = 0
+        self.lastTime: Optional[float] = None
+        self.time: Optional[float] = None
+        self.empty = True
+        # (constellation, signal ID) of the GSV sets and (constellation, rank without
+        # system ID) of the GSA sentences already received in the epoch
+        self.gsvSets: set[tuple[int, int]] = set()
+        self.gsaSets: set[tuple[int, int]] = set()
+        # Number of GSA sentences since the last record of another type
+        self.gsaRank = 0
+        self.usedPrns: set[tuple[int, int]] = set()
+
+    def feed(self, p_record: NmeaRecord) -> Optional[dict]:
+        """
+        Add a record to the current epoch.
+
+        :param p_record: Record from ``QuectelNmeaReader``. GGA and RMC give the epoch
+            time, GSV and GSA the satellites; other records are ignored.
+        :type p_record: NmeaRecord
+
+        :return: Snapshot of the previous epoch when the record starts a new one, None
+            otherwise. See ``snapshot``.
+        :rtype: Optional[dict]
+        """
+        if not isinstance(p_record, NmeaGsa):
+            self.gsaRank = 0
+        if isinstance(p_record, NmeaGsv):
+            completed = self._startSet(
+                self.gsvSets,
+                (self._constellation(p_record.talker), p_record.signalId or 0),
+                p_record.messageNumber == 1,
+            )
+            self._addGsv(p_record)
+            return completed
+        if isinstance(p_record, NmeaGsa):
+            constellation = p_record.systemId or self._constellation(p_record.talker)
+            rank = self.gsaRank if constellation == CONSTELLATION_UNKNOWN else 0
+            self.gsaRank += 1
+            completed = self._startSet(self.gsaSets, (constellation, rank), True)
+            self._addGsa(p_record, constellation)
+            return completed
+        if isinstance(p_record, (NmeaGga, NmeaRmc)) and p_record.time is not None:
+            self.lastTime = p_record.time
+        return None
+
+    def epochs(self, p_records: Iterable[NmeaRecord]) -> Iterator[dict]:
+        """
+        Aggregate a stream of records.
+
+        :param p_records: Records, e.g. ``QuectelNmeaReader.records()``.
+        :type p_records: Iterable[NmeaRecord]
+
+        :return: Generator of snapshots, one per epoch.
+        :rtype: Iterator[dict]
+        """
+        for record in p_records:
+            snapshot = self.feed(record)
+            if snapshot is not None:
+                yield snapshot
+        snapshot = self.flush()
+        if snapshot is not None:
+            yield snapshot
+
+    def flush(self) -> Optional[dict]:
+        """
+        Complete the current epoch.
+
+        :return: Snapshot of the current epoch, None if it is empty.
+        :rtype: Optional[dict]
+        """
+        if self.empty:
+            return None
+        snapshot = self.snapshot()
+        self.empty = True
+        self.rows = 0
+        self.gsvSets.clear()
+        self.gsaSets.clear()
+        self.usedPrns.clear()
+        return snapshot
+
+    def snapshot(self) -> dict:
+        """
+        Copy the table of the current epoch.
+
+        :return: ``time`` (seconds since midnight UTC of the last GGA or RMC received
+            before the first GSV or GSA of the epoch, None if unknown), ``count`` and
+            one array per column of ``SATELLITE_COLUMNS``.
+        :rtype: dict
+        """
+        rows = self.rows
+        prns = self.columns["prn"]
+        constellations = self.columns["constellation"]
+        used = self.columns["used"]
+        for row in range(rows):
+            used[row] = (constellations[row], prns[row]) in self.usedPrns
+
+        snapshot: dict = {"time": self.time, "count": rows}
+        for name, column in self.columns.items():
+            snapshot[name] = column[:rows]
+        return snapshot
+
+    def _constellation(self, p_talker: str) -> int:
+        return TALKER_CONSTELLATIONS.get(p_talker, CONSTELLATION_UNKNOWN)
+
+    def _startSet(self, p_sets: set, p_key, p_starts: bool) -> Optional[dict]:
+        """
+        Register the start of a GSV set or a GSA sentence, completing the epoch when the
+        same one was already received.
+
+        :return: Snapshot of the completed epoch, None otherwise.
+        :rtype: Optional[dict]
+        """
+        completed = None
+        if p_starts:
+            if p_key in p_sets:
+                completed = self.flush()
+            p_sets.add(p_key)
+        if self.empty:
+            self.empty = False
+            self.time = self.lastTime
+        return completed
+
+    def _addGsv(self, p_record: NmeaGsv):
+        constellation = self._constellation(p_record.talker)
+        signalId = p_record.signalId or 0
+        prns = self.columns["prn"]
+        constellations = self.columns["constellation"]
+        signalIds = self.columns["signalId"]
+        elevations = self.columns["elevation"]
+        azimuths = self.columns["azimuth"]
+        snrs = self.columns["snr"]
+
+        for prn, elevation, azimuth, snr in p_record.satellites:
+            row = self.rows
+            if row >= self.capacity:
+                break
+            prns[row] = prn
+            constellations[row] = constellation or prnConstellation(prn)
+            signalIds[row] = signalId
+            elevations[row] = -1 if elevation is None else elevation
+            azimuths[row] = -1 if azimuth is None else azimuth
+            snrs[row] = -1 if snr is None else snr
+            self.rows = row + 1
+
+    def _addGsa(self, p_record: NmeaGsa, p_constellation: int):
+        for prn in p_record.prns:
+            self.usedPrns.add((p_constellation or prnConstellation(prn), prn))
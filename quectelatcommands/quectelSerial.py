@@ -1,12 +1,69 @@
 #!/usr/bin/env python3
 
+import queue
 import serial
 import threading
 import time
+from typing import Any, Callable, Iterator, Optional
+
+from quectelatcommands.quectelResponseParser import isReadCommand, responsePrefix
+
+# Final result codes of failed commands when AT+CMEE is 1 or 2, besides "ERROR"
+FINAL_ERROR_PREFIXES = ("+CME ERROR", "+CMS ERROR")
+
+# Execution commands that only read a state, besides the read commands ("AT+X?"). When
+# several threads send the same one at the same time, a single command is sent.
+COALESCED_COMMANDS = {
+    "ATI",
+    "AT+CGMI",
+    "AT+CGMM",
+    "AT+CGMR",
+    "AT+CGSN",
+    "AT+GSN",
+    "AT+CIMI",
+    "AT+QCCID",
+    "AT+CSQ",
+    "AT+QCSQ",
+    "AT+QNWINFO",
+    "AT+QSPN",
+    "AT+QTEMP",
+    "AT+CBC",
+    "AT+QGPSLOC=0",
+    "AT+QGPSLOC=1",
+    "AT+QGPSLOC=2",
+}
+
+
+def isFinalResultCode(p_line: str) -> bool:
+    """
+    Tell whether a response line is a final result code.
+
+    :param p_line: Response line.
+    :type p_line: str
+
+    :return: True for ``OK``, ``ERROR`` and the ``FINAL_ERROR_PREFIXES`` errors.
+    :rtype: bool
+    """
+    return p_line in ("OK", "ERROR") or p_line.startswith(FINAL_ERROR_PREFIXES)
+
+
+class _Flight:
+    def __init__(self):
+        """
+        Command in flight, whose result is shared by every thread sending it.
+        """
+        self.done = threading.Event()
+        self.result: tuple[bool, list[str]] = (False, [])
 
 
 class QuectelSerial:
-    def __init__(self, p_port: str, p_baudrate: int, p_timeout: int):
+    def __init__(
+        self,
+        p_port: str,
+        p_baudrate: int,
+        p_timeout: int,
+        p_freshnessWindow: float = 0,
+    ):
         """
         Initialize the QuectelSerial class.
 
@@ -16,19 +73,63 @@ class QuectelSerial:
         :type p_baudrate: int
         :param p_timeout: Timeout for the serial connection.
         :type p_timeout: int
+        :param p_freshnessWindow: Time during which the successful response of a read
+            command is given again without sending the command. Every other command
+            forgets the responses, since it may change what they read. Unit: second. 0
+            only shares the commands in flight.
+        :type p_freshnessWindow: float
         """
         self.port = p_port
         self.baudrate = p_baudrate
         self.timeout = p_timeout
+        self.freshnessWindow = p_freshnessWindow
+        # Number of clients that opened the connection, see open
+        self.openCount = 0
+        self.commandLock = threading.Lock()
+        self.flightLock = threading.Lock()
+        self.flights: dict[str, _Flight] = {}
+        self.recentResults: dict[str, tuple[float, tuple[bool, list[str]]]] = {}
+        # Incremented by every command that is not a read, so that a read sent before
+        # it is not kept in recentResults
+        self.writeGeneration = 0
+        self.urcHandlers: dict[str, list[Callable[[str], None]]] = {}
+        # Number of lines of the multi-line URCs, e.g. 2 for "+CMT:" and its PDU
+        self.urcLineCounts: dict[str, int] = {}
+        # Prefix and lines received so far of the multi-line URC being received
+        self.pendingUrc: Optional[tuple[str, list[str]]] = None
+        self.currentPrefixes: tuple[str, ...] = ()
+        # Line after which the payload of the command in flight is written
+        self.payloadPrompt = ""
+        self.promptReceived = threading.Event()
+        # Set by the receive thread on the final result code of the command in flight
+        self.responseReceived = threading.Event()
+        # Lines of the response of a streamed command, instead of ``response``
+        self.lineQueue: Optional[queue.Queue] = None
 
-    def open(self):
+    def open(self, p_connection: Optional[Any] = None):
         """
         Open the serial connection.
+
+        A connection shared by several clients, e.g. the modem and GNSS clients of
+        ``QuectelPortDiscovery``, is only opened by the first call, and only closed once
+        every ``open`` was followed by a ``close``.
+
+        :param p_connection: Already opened connection to use instead of the serial port,
+            with the ``readline``, ``read``, ``write`` and ``close`` methods of
+            ``serial.Serial``,
+            e.g. a ``QuectelSimulatedSerial``.
+        :type p_connection: Optional[Any]
         """
+        if self.openCount:
+            self.openCount += 1
+            return
         try:
-            self.serial_conn = serial.Serial(
-                self.port, self.baudrate, timeout=self.timeout
-            )
+            if p_connection is not None:
+                self.serial_conn = p_connection
+            else:
+                self.serial_conn = serial.Serial(
+                    self.port, self.baudrate, timeout=self.timeout
+                )
             self.currentCommand = ""
             self.waitForResponse = False
             self.response = []
@@ -36,6 +137,7 @@ class QuectelSerial:
             self.receiveThread = threading.Thread(target=self.readResponthThread)
             self.receiveThread.name = "SerialModemReceiveThread"
             self.receiveThread.start()
+            self.openCount = 1
         except Exception as e:
             print(e)
             self.close()
@@ -46,24 +148,277 @@ class QuectelSerial:
         """
         while self.receiveThreadAlive:
             try:
-                line = self.serial_conn.readline().decode().strip()
+                line = self._readLine().decode().strip()
+                if line != "" and self.dispatchUrc(line):
+                    continue
                 if line != "" and self.waitForResponse:
-                    if line == "OK" or line == "ERROR":
-                        self.response.append(line)
+                    if self.payloadPrompt and line.startswith(self.payloadPrompt):
+                        self.promptReceived.set()
+                        continue
+                    if isFinalResultCode(line):
+                        self._collect(line)
                         self.waitForResponse = False
+                        self.responseReceived.set()
 
                     if line not in self.currentCommand and self.waitForResponse == True:
-                        self.response.append(line)
+                        self._collect(line)
 
             except Exception as e:
                 pass
 
-    def sendCommand(self, p_command: str) -> tuple[bool, list[str]]:
+    def _collect(self, p_line: str):
+        """
+        Keep a line of the response of the command in flight.
+
+        :param p_line: Response line.
+        :type p_line: str
+        """
+        lineQueue = self.lineQueue
+        if lineQueue is not None:
+            lineQueue.put(p_line)
+        else:
+            self.response.append(p_line)
+
+    def _readLine(self) -> bytes:
+        """
+        Read a line, or the prompt of the payload of the command in flight.
+
+        The SMS prompt (``> ``) is not followed by a line ending: while it is awaited,
+        the bytes are read one by one so that it is not held until the read timeout.
+
+        :return: Line, with its line ending if any.
+        :rtype: bytes
+        """
+        if not self.payloadPrompt or self.promptReceived.is_set():
+            return self.serial_conn.readline()
+
+        prompt = self.payloadPrompt.encode()
+        line = bytearray()
+        while self.receiveThreadAlive:
+            character = self.serial_conn.read(1)
+            if not character:
+                if line or not self.waitForResponse:
+                    break
+                continue
+            line += character
+            if character == b"\n" or line.strip() == prompt:
+                break
+        return bytes(line)
+
+    def addUrcHandler(
+        self, p_prefix: str, p_handler: Callable[[str], None], p_lines: int = 1
+    ):
+        """
+        Call a function for every unsolicited result code starting with a prefix.
+
+        The handler is called from the receive thread and must return quickly. A line
+        with the prefix is still given to the command in flight when it is the response
+        prefix of that command, e.g. ``+CREG:`` during ``AT+CREG?``.
+
+        :param p_prefix: Prefix of the URC, e.g. ``+QGPSURC:``.
+        :type p_prefix: str
+        :param p_handler: Function called with the URC line.
+        :type p_handler: Callable[[str], None]
+        :param p_lines: Number of lines of the URC, e.g. 2 for ``+CMT: ,<length>``
+            followed by the PDU. The lines are given to the handler joined with ``\n``.
+        :type p_lines: int
+        """
+        self.urcHandlers.setdefault(p_prefix, []).append(p_handler)
+        if p_lines > 1:
+            self.urcLineCounts[p_prefix] = p_lines
+
+    def removeUrcHandler(self, p_prefix: str, p_handler: Callable[[str], None]):
+        """
+        Stop calling a function added with ``addUrcHandler``.
+
+        :param p_prefix: Prefix of the URC.
+        :type p_prefix: str
+        :param p_handler: Function to remove.
+        :type p_handler: Callable[[str], None]
+        """
+        handlers = self.urcHandlers.get(p_prefix, [])
+        if p_handler in handlers:
+            handlers.remove(p_handler)
+        if not handlers:
+            self.urcHandlers.pop(p_prefix, None)
+            self.urcLineCounts.pop(p_prefix, None)
+
+    def dispatchUrc(self, p_line: str) -> bool:
+        """
+        Give a received line to the URC handlers of its prefix.
+
+        :param p_line: Received line.
+        :type p_line: str
+
+        :return: True if the line was handled as a URC.
+        :rtype: bool
+        """
+        if self.pendingUrc is not None:
+            prefix, lines = self.pendingUrc
+            lines.append(p_line)
+            if len(lines) >= self.urcLineCounts.get(prefix, 1):
+                self.pendingUrc = None
+                self._callUrcHandlers(prefix, "\n".join(lines))
+            return True
+
+        if self.waitForResponse and p_line.startswith(self.currentPrefixes):
+            return False
+
+        handled = False
+        for prefix in list(self.urcHandlers):
+            if p_line.startswith(prefix):
+                if self.urcLineCounts.get(prefix, 1) > 1:
+                    self.pendingUrc = (prefix, [p_line])
+                    return True
+                self._callUrcHandlers(prefix, p_line)
+                handled = True
+        return handled
+
+    def _callUrcHandlers(self, p_prefix: str, p_urc: str):
+        """
+        Call the handlers of a prefix.
+
+        :param p_prefix: Prefix of the URC.
+        :type p_prefix: str
+        :param p_urc: URC, its lines joined with ``\n``.
+        :type p_urc: str
+        """
+        for handler in list(self.urcHandlers.get(p_prefix, [])):
+            try:
+                handler(p_urc)
+            except Exception as e:
+                print(e)
+
+    def isCoalesced(self, p_command: str) -> bool:
+        """
+        Tell whether a command only reads a state, so that it can be shared.
+
+        :param p_command: AT command.
+        :type p_command: str
+
+        :return: True for read commands and the commands of ``COALESCED_COMMANDS``.
+        :rtype: bool
+        """
+        command = p_command.strip().upper()
+        return command.endswith("?") or command in COALESCED_COMMANDS
+
+    def sendCommand(
+        self, p_command: str, p_timeout: float = 2
+    ) -> tuple[bool, list[str]]:
         """
         Send an AT command to the modem and return the response.
 
+        Commands from several threads are sent one at a time. An identical read command
+        that is already waiting or in flight is not sent again: its response is given to
+        every caller, as is a response younger than ``freshnessWindow`` when no other
+        command was sent since.
+
+        :param p_command: AT command to send.
+        :type p_command: str
+        :param p_timeout: Maximum time to wait for the final result code. Unit: second.
+        :type p_timeout: float
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        if not self.isCoalesced(p_command):
+            with self.commandLock:
+                try:
+                    return self._sendCommand(p_command, p_timeout)
+                finally:
+                    self._forgetRecentResults()
+
+        key = p_command.strip().upper()
+        with self.flightLock:
+            recent = self.recentResults.get(key)
+            if (
+                recent is not None
+                and time.monotonic() - recent[0] < self.freshnessWindow
+            ):
+                return recent[1][0], list(recent[1][1])
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            return flight.result[0], list(flight.result[1])
+
+        generation = self.writeGeneration
+        try:
+            with self.commandLock:
+                flight.result = self._sendCommand(p_command, p_timeout)
+        finally:
+            with self.flightLock:
+                del self.flights[key]
+                if (
+                    self.freshnessWindow > 0
+                    and flight.result[0]
+                    and generation == self.writeGeneration
+                ):
+                    self.recentResults[key] = (time.monotonic(), flight.result)
+            flight.done.set()
+
+        return flight.result[0], list(flight.result[1])
+
+    def sendCommandWithPayload(
+        self,
+        p_command: str,
+        p_payload: bytes,
+        p_prompt: str = "CONNECT",
+        p_timeout: float = 10,
+    ) -> tuple[bool, list[str]]:
+        """
+        Send an AT command that reads data after a prompt, e.g. a file upload.
+
+        :param p_command: AT command to send, e.g. ``AT+QFUPL="UFS:xtra2.bin",1024``.
+        :type p_command: str
+        :param p_payload: Data written once the prompt is received.
+        :type p_payload: bytes
+        :param p_prompt: Start of the line asking for the data.
+        :type p_prompt: str
+        :param p_timeout: Maximum time to wait for the final result code, the payload
+            transfer included. Unit: second.
+        :type p_timeout: float
+
+        :return: Tuple containing the status of the command and the response. The
+            payload is not written when the prompt is not received.
+        :rtype: tuple[bool, list[str]]
+        """
+        with self.commandLock:
+            try:
+                return self._sendCommand(p_command, p_timeout, p_payload, p_prompt)
+            finally:
+                self._forgetRecentResults()
+
+    def _forgetRecentResults(self):
+        """
+        Forget the responses kept for ``freshnessWindow``, after a command that may
+        have changed them.
+        """
+        with self.flightLock:
+            self.writeGeneration += 1
+            self.recentResults.clear()
+
+    def _sendCommand(
+        self,
+        p_command: str,
+        p_timeout: float,
+        p_payload: Optional[bytes] = None,
+        p_prompt: str = "",
+    ) -> tuple[bool, list[str]]:
+        """
+        Write an AT command and wait for its response.
+
         :param p_command: AT command to send.
         :type p_command: str
+        :param p_timeout: Maximum time to wait for the final result code. Unit: second.
+        :type p_timeout: float
+        :param p_payload: Data to write after the prompt, if any.
+        :type p_payload: Optional[bytes]
+        :param p_prompt: Start of the line asking for the payload.
+        :type p_prompt: str
 
         :return: Tuple containing the status of the command and the response.
         :rtype: tuple[bool, list[str]]
@@ -74,17 +429,21 @@ class QuectelSerial:
 
         # Ensure the command ends with '\r'
         self.currentCommand = p_command.rstrip() + "\r"
+        self.currentPrefixes = self._responsePrefixes(p_command)
 
+        self.payloadPrompt = p_prompt if p_payload is not None else ""
+        self.promptReceived.clear()
+        self.responseReceived.clear()
         self.waitForResponse = True
         self.serial_conn.write(self.currentCommand.encode())
 
         # Wait for a response with a timeout
-        timeout = 2
-        while self.waitForResponse and timeout > 0:
-            time.sleep(0.1)
-            timeout -= 0.1
-
-        if timeout <= 0:
+        deadline = time.monotonic() + p_timeout
+        if p_payload is not None:
+            if self.promptReceived.wait(p_timeout) and self.waitForResponse:
+                self.serial_conn.write(p_payload)
+            self.payloadPrompt = ""
+        if not self.responseReceived.wait(max(deadline - time.monotonic(), 0)):
             self.waitForResponse = False
 
         response = self.response
@@ -95,10 +454,168 @@ class QuectelSerial:
 
         return status, response
 
+    def _responsePrefixes(self, p_command: str) -> tuple[str, ...]:
+        """
+        Get the prefixes of the information responses of a command line, so that they
+        are not taken for URCs.
+
+        :param p_command: Command line, commands concatenated with ``;`` included.
+        :type p_command: str
+
+        :return: Prefixes, e.g. ``("+CMGL:",)``.
+        :rtype: tuple[str, ...]
+        """
+        return tuple(
+            responsePrefix("AT" + command).split(" ")[0]
+            for command in p_command.strip()[2:].split(";")
+            if command[:1] in ("+", "^")
+        )
+
+    def streamCommand(self, p_command: str, p_timeout: float = 5) -> Iterator[str]:
+        """
+        Send an AT command and give its response lines as they are received, e.g. to
+        process a long ``AT+CMGL`` listing without holding it in memory.
+
+        The connection is reserved until the generator is exhausted or closed. A generator
+        closed early still reads, and drops, the rest of the response, so that it does not
+        reach the next command.
+
+        :param p_command: AT command to send.
+        :type p_command: str
+        :param p_timeout: Maximum time to wait for each line. Unit: second.
+        :type p_timeout: float
+
+        :return: Response lines, ending with the final result code unless the response
+            times out.
+        :rtype: Iterator[str]
+        """
+        with self.commandLock:
+            lines: queue.Queue = queue.Queue()
+            self.response = []
+            self.currentCommand = p_command.rstrip() + "\r"
+            self.currentPrefixes = self._responsePrefixes(p_command)
+            self.lineQueue = lines
+            self.waitForResponse = True
+            # True once the final result code is received or the response timed out
+            done = False
+            try:
+                self.serial_conn.write(self.currentCommand.encode())
+                while not done:
+                    try:
+                        line = lines.get(timeout=p_timeout)
+                    except queue.Empty:
+                        done = True
+                        break
+                    done = isFinalResultCode(line)
+                    yield line
+            finally:
+                # Closed before the end: drop the rest of the response
+                while not done:
+                    try:
+                        done = isFinalResultCode(lines.get(timeout=p_timeout))
+                    except queue.Empty:
+                        done = True
+                self.waitForResponse = False
+                self.lineQueue = None
+                self._forgetRecentResults()
+
+    def sendCommandBatch(
+        self, p_commands: list[str], p_maxLineLength: int = 256
+    ) -> list[tuple[bool, list[str]]]:
+        """
+        Send several AT commands with as few round trips as possible.
+
+        Extended read commands (see ``isReadCommand``) are concatenated with ``;`` into
+        command lines of at most ``p_maxLineLength`` characters. The response lines are
+        given back to each command using their ``+<NAME>:`` prefix. Other commands, writes
+        included, are sent one by one in order: the modem stops executing a command line
+        at the first error, so every command of a command line that failed is sent again,
+        which is only harmless for reads.
+
+        :param p_commands: AT commands to send.
+        :type p_commands: list[str]
+        :param p_maxLineLength: Maximum length of a concatenated command line.
+        :type p_maxLineLength: int
+
+        :return: Status and response of each command, in the order of ``p_commands``.
+        :rtype: list[tuple[bool, list[str]]]
+        """
+        results: list[tuple[bool, list[str]]] = [(False, [])] * len(p_commands)
+        chunk: list[int] = []
+        chunkLength = 0
+
+        for index, command in enumerate(p_commands):
+            command = command.strip()
+            if not command.upper().startswith("AT+") or not isReadCommand(command):
+                # Sent alone, after the reads queued before it
+                if chunk:
+                    self._sendChunk(p_commands, chunk, results)
+                    chunk, chunkLength = [], 0
+                results[index] = self.sendCommand(command)
+                continue
+
+            # ";" separator plus the command without its "AT" prefix
+            length = len(command) - 1
+            if chunk and chunkLength + length > p_maxLineLength:
+                self._sendChunk(p_commands, chunk, results)
+                chunk, chunkLength = [], 0
+            chunk.append(index)
+            chunkLength += length
+
+        if chunk:
+            self._sendChunk(p_commands, chunk, results)
+
+        return results
+
+    def _sendChunk(
+        self,
+        p_commands: list[str],
+        p_chunk: list[int],
+        p_results: list[tuple[bool, list[str]]],
+    ):
+        """
+        Send the commands of ``p_chunk`` as one command line and dispatch the response.
+
+        :param p_commands: All the commands of the batch.
+        :type p_commands: list[str]
+        :param p_chunk: Indexes of the commands to send in ``p_commands``.
+        :type p_chunk: list[int]
+        :param p_results: Results of the batch, updated in place.
+        :type p_results: list[tuple[bool, list[str]]]
+        """
+        commands = [p_commands[index].strip() for index in p_chunk]
+        if len(commands) == 1:
+            p_results[p_chunk[0]] = self.sendCommand(commands[0])
+            return
+
+        line = commands[0] + "".join(";" + command[2:] for command in commands[1:])
+        status, response = self.sendCommand(line, max(2, 0.5 * len(commands)))
+        if not status:
+            for index, command in zip(p_chunk, commands):
+                p_results[index] = self.sendCommand(command)
+            return
+
+        prefixes = [responsePrefix(command) for command in commands]
+        lines: list[list[str]] = [[] for _ in commands]
+        current = 0
+        for responseLine in response[:-1]:
+            for candidate in range(current, len(commands)):
+                if responseLine.startswith(prefixes[candidate]):
+                    current = candidate
+                    break
+            lines[current].append(responseLine)
+
+        for index, commandLines in zip(p_chunk, lines):
+            p_results[index] = (True, commandLines + ["OK"])
+
     def close(self):
         """
         Close the serial connection.
         """
+        if self.openCount > 1:
+            self.openCount -= 1
+            return
+        self.openCount = 0
         self.receiveThreadAlive = False
         self.serial_conn.close()
         self.receiveThread.join()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+import time
+from array import array
+from typing import NamedTuple, Optional
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    splitResponseFields,
+)
+
+URC_CSQ = '+QIND: "csq"'
+URC_SQI = '+QIND: "SQI"'
+
+# Measurement columns of the samples. Unknown values are NaN.
+SIGNAL_COLUMNS = ("rssi", "ber", "rsrp", "rsrq", "sinr")
+
+# Origin of a sample
+SOURCE_POLL = 0
+SOURCE_CSQ = 1
+SOURCE_SQI = 2
+
+# <rssi> and <ber> of AT+CSQ when not known or not detectable
+CSQ_UNKNOWN = 99
+
+
+class SignalSample(NamedTuple):
+    """
+    Signal quality at a time. Each sample carries the last value reported of every
+    measurement, since the URCs only report changes.
+    """
+
+    # time.time() of the sample
+    time: float
+    # Unit: dBm
+    rssi: float
+    # <ber> of AT+CSQ, 0 to 7
+    ber: float
+    # Unit: dBm
+    rsrp: float
+    # Unit: dB
+    rsrq: float
+    # Unit: dB
+    sinr: float
+    # SOURCE_POLL, SOURCE_CSQ or SOURCE_SQI
+    source: int
+
+
+class SignalStats(NamedTuple):
+    """
+    Statistics of a measurement over a window. NaN when no value is known.
+    """
+
+    count: int
+    minimum: float
+    maximum: float
+    mean: float
+
+
+def rssiDbm(p_rssi: int) -> float:
+    """
+    Convert the ``<rssi>`` of ``AT+CSQ`` to dBm.
+
+    :param p_rssi: 0 (-113 dBm or less) to 31 (-51 dBm or greater), 99 when unknown.
+    :type p_rssi: int
+
+    :return: Received signal strength, NaN when unknown. Unit: dBm.
+    :rtype: float
+    """
+    if not 0 <= p_rssi <= 31:
+        return math.nan
+    return -113.0 + 2 * p_rssi
+
+
+def _integer(p_field: str) -> Optional[int]:
+    field = p_field.strip()
+    return int(field) if field.lstrip("-").isdigit() else None
+
+
+class SignalRing:
+    def __init__(self, p_capacity: int = 4096):
+        """
+        Ring buffer of signal samples, one preallocated array per column.
+
+        Appending is O(1) and overwrites the oldest sample once full, so that the memory
+        stays constant however long the sampling runs.
+
+        :param p_capacity: Number of samples kept.
+        :type p_capacity: int
+        """
+        self.capacity = p_capacity
+        self.times = array("d", bytes(array("d").itemsize * p_capacity))
+        self.columns = {
+            name: array("d", bytes(array("d").itemsize * p_capacity))
+            for name in SIGNAL_COLUMNS
+        }
+        self.sources = array("B", bytes(p_capacity))
+        # Position of the next sample, and number of samples kept
+        self.position = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, p_sample: SignalSample):
+        """
+        Add a sample, dropping the oldest one when full.
+
+        :param p_sample: Sample.
+        :type p_sample: SignalSample
+        """
+        position = self.position
+        self.times[position] = p_sample.time
+        for name, column in self.columns.items():
+            column[position] = getattr(p_sample, name)
+        self.sources[position] = p_sample.source
+        self.position = (position + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest(self) -> Optional[SignalSample]:
+        """
+        Get the newest sample.
+
+        :return: Sample, None when empty.
+        :rtype: Optional[SignalSample]
+        """
+        if not self.count:
+            return None
+        return self._sample((self.position - 1) % self.capacity)
+
+    def samples(self, p_since: Optional[float] = None) -> list[SignalSample]:
+        """
+        Get the samples, oldest first.
+
+        :param p_since: time.time() of the oldest sample given, None for all of them.
+        :type p_since: Optional[float]
+
+        :return: Samples.
+        :rtype: list[SignalSample]
+        """
+        samples = [self._sample(position) for position in self._window(p_since)]
+        samples.reverse()
+        return samples
+
+    def stats(self, p_column: str, p_since: Optional[float] = None) -> SignalStats:
+        """
+        Get the minimum, maximum and mean of a measurement, unknown values skipped.
+
+        :param p_column: Column of ``SIGNAL_COLUMNS``, e.g. ``"rsrp"``.
+        :type p_column: str
+        :param p_since: time.time() of the start of the window, None for all the samples.
+        :type p_since: Optional[float]
+
+        :return: Statistics.
+        :rtype: SignalStats
+        """
+        column = self.columns[p_column]
+        count = 0
+        total = 0.0
+        minimum = math.inf
+        maximum = -math.inf
+        for position in self._window(p_since):
+            value = column[position]
+            if value != value:
+                continue
+            count += 1
+            total += value
+            minimum = min(minimum, value)
+            maximum = max(maximum, value)
+        if not count:
+            return SignalStats(0, math.nan, math.nan, math.nan)
+        return SignalStats(count, minimum, maximum, total / count)
+
+    def _window(self, p_since: Optional[float]):
+        """
+        Give the positions of the samples from the newest one back to ``p_since``.
+        """
+        for age in range(1, self.count + 1):
+            position = (self.position - age) % self.capacity
+            if p_since is not None and self.times[position] < p_since:
+                return
+            yield position
+
+    def _sample(self, p_position: int) -> SignalSample:
+        return SignalSample(
+            self.times[p_position],
+            *(self.columns[name][p_position] for name in SIGNAL_COLUMNS),
+            self.sources[p_position],
+        )
+
+
+class QuectelSignalSampler:
+    def __init__(
+        self,
+        p_modem: QuectelModemATCommands,
+        p_capacity: int = 4096,
+        p_minInterval: float = 5.0,
+        p_maxInterval: float = 60.0,
+        p_threshold: float = 3.0,
+    ):
+        """
+        Signal quality sampler of a module, storing RSSI, BER, RSRP, RSRQ and SINR into a
+        ``SignalRing``.
+
+        ``start`` enables the ``+QIND: "csq"`` and ``+QIND: "SQI"`` URCs, which report
+        each change without commands. When they are not supported, ``AT+CSQ`` is polled
+        at an adaptive rate: the interval is halved, down to ``p_minInterval``, when the
+        RSSI moved by ``p_threshold`` or more since the previous poll, and doubled, up to
+        ``p_maxInterval``, when it did not. With the URCs, ``AT+CSQ`` is only polled when
+        nothing was reported for ``p_maxInterval``, so that a steady signal still gives
+        samples.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_capacity: Number of samples kept.
+        :type p_capacity: int
+        :param p_minInterval: Shortest polling interval. Unit: second.
+        :type p_minInterval: float
+        :param p_maxInterval: Longest polling interval. Unit: second.
+        :type p_maxInterval: float
+        :param p_threshold: RSSI change speeding up the polling. Unit: dB.
+        :type p_threshold: float
+        """
+        self.modem = p_modem
+        self.minInterval = p_minInterval
+        self.maxInterval = p_maxInterval
+        self.threshold = p_threshold
+        self.interval = p_minInterval
+        self.ring = SignalRing(p_capacity)
+        self.lock = threading.Lock()
+        # Last value reported of each measurement
+        self.values = {name: math.nan for name in SIGNAL_COLUMNS}
+        self.lastSampleTime = 0.0
+        # time.monotonic() of the last AT+CSQ, failed or not
+        self.lastPollTime = 0.0
+        # RSSI of the last poll, the interval adapting to its changes
+        self.polledRssi = math.nan
+        # True when the "csq" URC is enabled
+        self.urcs = False
+        self.wakeup = threading.Event()
+        self.running = False
+        self.worker: Optional[threading.Thread] = None
+        self.statistics = {"urcs": 0, "polls": 0, "failures": 0}
+
+    def __enter__(self) -> "QuectelSignalSampler":
+        self.start()
+        return self
+
+    def __exit__(self, p_type, p_value, p_traceback):
+        self.stop()
+
+    def start(self) -> tuple[bool, list[str]]:
+        """
+        Enable the URCs, take a first sample and start the sampling worker.
+
+        :return: Tuple containing the status of the first ``AT+CSQ`` and the responses.
+            The URCs failing to be enabled is not an error: ``AT+CSQ`` is polled instead.
+        :rtype: tuple[bool, list[str]]
+        """
+        serialPort = self.modem.serialPort
+        serialPort.addUrcHandler(URC_CSQ, self._onCsq)
+        serialPort.addUrcHandler(URC_SQI, self._onSqi)
+
+        csqStatus, csqResponse = (
+            self.modem.statusControlCommands40400ControlUrcIndication("csq", 1, 0)
+        )
+        sqiStatus, sqiResponse = (
+            self.modem.statusControlCommands40400ControlUrcIndication("sqi", 1, 0)
+        )
+        self.urcs = csqStatus
+        status, response = self.poll()
+        response = csqResponse + sqiResponse + response
+        if not status:
+            self._removeHandlers()
+            return status, response
+
+        self.running = True
+        self.worker = threading.Thread(target=self._work, name="SignalSamplerThread")
+        self.worker.start()
+        return status, response
+
+    def stop(self):
+        """
+        Stop the worker. The URCs stay enabled on the module.
+        """
+        self._removeHandlers()
+        self.running = False
+        self.wakeup.set()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def poll(self) -> tuple[bool, list[str]]:
+        """
+        Take a sample with ``AT+CSQ``.
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        status, response = self.modem.networkServiceCommands603SignalQualityReport()
+        lines = findResponseLines(response, "+CSQ:")
+        fields = splitResponseFields(lines[0]) if status and lines else []
+        if len(fields) < 2:
+            self.statistics["failures"] += 1
+            return False, response
+        self.statistics["polls"] += 1
+        values = self._csqValues(fields[0], fields[1])
+        self.polledRssi = values["rssi"]
+        self._add(SOURCE_POLL, values)
+        return True, response
+
+    def latest(self) -> Optional[SignalSample]:
+        """
+        Get the newest sample.
+
+        :return: Sample, None before the first one.
+        :rtype: Optional[SignalSample]
+        """
+        with self.lock:
+            return self.ring.latest()
+
+    def samples(self, p_window: Optional[float] = None) -> list[SignalSample]:
+        """
+        Get the samples of a window, oldest first.
+
+        :param p_window: Duration of the window, ending now. None for all the samples.
+            Unit: second.
+        :type p_window: Optional[float]
+
+        :return: Samples.
+        :rtype: list[SignalSample]
+        """
+        with self.lock:
+            return self.ring.samples(self._since(p_window))
+
+    def stats(self, p_column: str, p_window: Optional[float] = None) -> SignalStats:
+        """
+        Get the minimum, maximum and mean of a measurement over a window.
+
+        :param p_column: Column of ``SIGNAL_COLUMNS``, e.g. ``"rsrp"``.
+        :type p_column: str
+        :param p_window: Duration of the window, ending now. None for all the samples.
+            Unit: second.
+        :type p_window: Optional[float]
+
+        :return: Statistics.
+        :rtype: SignalStats
+        """
+        with self.lock:
+            return self.ring.stats(p_column, self._since(p_window))
+
+    def _since(self, p_window: Optional[float]) -> Optional[float]:
+        return None if p_window is None else time.time() - p_window
+
+    def _removeHandlers(self):
+        serialPort = self.modem.serialPort
+        serialPort.removeUrcHandler(URC_CSQ, self._onCsq)
+        serialPort.removeUrcHandler(URC_SQI, self._onSqi)
+
+    def _csqValues(self, p_rssi: str, p_ber: str) -> dict[str, float]:
+        rssi = _integer(p_rssi)
+        ber = _integer(p_ber)
+        return {
+            "rssi": rssiDbm(rssi) if rssi is not None else math.nan,
+            "ber": float(ber) if ber is not None and ber != CSQ_UNKNOWN else math.nan,
+        }
+
+    def _add(self, p_source: int, p_values: dict[str, float]):
+        with self.lock:
+            self.values.update(p_values)
+            self.ring.append(
+                SignalSample(
+                    time.time(),
+                    *(self.values[name] for name in SIGNAL_COLUMNS),
+                    p_source,
+                )
+            )
+            self.lastSampleTime = time.monotonic()
+
+    def _onCsq(self, p_urc: str):
+        # +QIND: "csq",<rssi>,<ber>
+        fields = splitResponseFields(p_urc)
+        if len(fields) < 3:
+            return
+        self.statistics["urcs"] += 1
+        self._add(SOURCE_CSQ, self._csqValues(fields[1], fields[2]))
+
+    def _onSqi(self, p_urc: str):
+        # +QIND: "SQI",<RSRP>,<RSRQ>,<SINR>
+        fields = splitResponseFields(p_urc)
+        if len(fields) < 4:
+            return
+        values = [_integer(field) for field in fields[1:4]]
+        self.statistics["urcs"] += 1
+        self._add(
+            SOURCE_SQI,
+            {
+                name: float(value) if value is not None else math.nan
+                for name, value in zip(("rsrp", "rsrq", "sinr"), values)
+            },
+        )
+
+    def _work(self):
+        """
+        Poll ``AT+CSQ`` when due.
+        """
+        while self.running:
+            if self.urcs:
+                # Only poll when the URCs were silent for the longest interval, and not
+                # again within the interval after a poll, even a failed one
+                with self.lock:
+                    due = max(
+                        self.lastSampleTime + self.maxInterval,
+                        self.lastPollTime + self.interval,
+                    )
+                delay = due - time.monotonic()
+            else:
+                delay = self.interval
+            if delay > 0:
+                self.wakeup.wait(delay)
+                self.wakeup.clear()
+                if self.urcs:
+                    continue
+            if not self.running:
+                break
+
+            previous = self.polledRssi
+            self.lastPollTime = time.monotonic()
+            if not self.poll()[0]:
+                continue
+            current = self.polledRssi
+            if abs(current - previous) >= self.threshold or (
+                math.isnan(current) != math.isnan(previous)
+            ):
+                self.interval = max(self.interval / 2, self.minInterval)
+            else:
+                self.interval = min(self.interval * 2, self.maxInterval)
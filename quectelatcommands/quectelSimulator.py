@@ -0,0 +1,813 @@
+#!/usr/bin/env python3
+
+import fnmatch
+import random
+import threading
+import time
+from typing import Callable, Optional
+from quectelatcommands.quectelResponseParser import splitResponseFields
+from quectelatcommands.quectelSmsPdu import SmsPdu, decodePdu, encodeStatusReport
+from quectelatcommands.quectelXtraManager import qfuplChecksum
+
+# Typical time to first fix of the EC2x GNSS engine, without and with gpsOneXTRA.
+# Unit: second.
+TTFF_SECONDS = {
+    "cold": (35.0, 18.0),
+    "warm": (26.0, 3.0),
+    "hot": (2.2, 1.8),
+}
+
+CME_SESSION_ONGOING = "+CME ERROR: 504"
+CME_SESSION_NOT_ACTIVE = "+CME ERROR: 505"
+CME_NOT_FIXED = "+CME ERROR: 516"
+CME_FILE_NOT_FOUND = "+CME ERROR: 405"
+CME_INVALID_INDEX = "+CME ERROR: 21"
+CMS_NETWORK_TIMEOUT = "+CMS ERROR: 332"
+CMS_INVALID_PDU = "+CMS ERROR: 304"
+CMS_INVALID_INDEX = "+CMS ERROR: 321"
+CMS_MEMORY_FULL = "+CMS ERROR: 322"
+
+# Time to send a message: radio link setup, unless kept by AT+CMMS, then the
+# submission itself. Unit: simulated second.
+SMS_LINK_SETUP_SECONDS = 1.2
+SMS_SUBMIT_SECONDS = 0.35
+# Time the link is kept after a message with AT+CMMS 1 or 2 (1 to 5 s on the modules)
+CMMS_WINDOW_SECONDS = 3.0
+# Time between a message and its status report
+SMS_DELIVERY_SECONDS = 2.0
+# Time the module takes to restart after AT+CFUN=1,1. Unit: simulated second.
+REBOOT_SECONDS = 8.0
+# Settings that only take effect once the module restarts
+REBOOT_SETTINGS = ("+QGPSXTRA", '+QGPSCFG="gnssconfig"', '+QGPSCFG="agpsposmode"')
+# Number of messages of each message storage
+SMS_STORAGE_SIZES = {"SM": 50, "ME": 255}
+# Number of entries of each phonebook storage
+PHONEBOOK_SIZE = 250
+
+
+class QuectelSimulatedSerial:
+    def __init__(
+        self,
+        p_speed: float = 1.0,
+        p_seed: Optional[int] = None,
+        p_latitude: float = 48.117300,
+        p_longitude: float = 11.516667,
+        p_smsFailureRate: float = 0.0,
+    ):
+        """
+        Stand-in for the serial connection of a module, answering AT commands.
+
+        It can be given to ``open`` of ``QuectelModemATCommands`` and
+        ``QuectelGnssATCommands``. Writes of ``AT+X=...`` are stored and given back by
+        ``AT+X?`` (and ``AT+X="name"`` for the sub-commands), so that configuration code
+        runs unchanged. GNSS is simulated: ``AT+QGPS``, ``AT+QGPSEND``, ``AT+QGPSDEL``,
+        ``AT+QGPSLOC`` and ``AT+QGPSXTRADATA``, with a time to first fix depending on the
+        start type, gpsOneXTRA, the AGPS mode and the constellations; as on a module,
+        these three settings only take effect after a restart by ``AT+CFUN=1,1``. Files
+        can be uploaded with ``AT+QFUPL``, listed with ``AT+QFLST`` and deleted with
+        ``AT+QFDEL``. Messages are sent in PDU mode with ``AT+CMGS``, a link setup time
+        being saved while ``AT+CMMS`` keeps the link, and reported with ``+CDS`` when
+        requested. ``receiveSms`` stores messages read with ``AT+CMGR`` and ``AT+CMGL``,
+        written with ``AT+CMGW`` and deleted with ``AT+CMGD``, in the ``"SM"`` or
+        ``"ME"`` storages selected by ``AT+CPMS``; they are reported as set by
+        ``AT+CNMI``, as are the cell broadcast pages of ``receiveCellBroadcast``.
+        Phonebook entries are written with ``AT+CPBW`` and read with ``AT+CPBR``, in the
+        storage of ``AT+CPBS``.
+        ``setRegistration`` changes the network registration given by ``AT+CREG``,
+        ``AT+CGREG`` and ``AT+CEREG``, and ``setSignal`` the signal quality given by
+        ``AT+CSQ``. ``transferData`` counts bytes in the packet data counters of
+        ``AT+QGDCNT``.
+
+        :param p_speed: Simulated seconds per real second, e.g. 100 to run a cold start
+            in a fraction of a second.
+        :type p_speed: float
+        :param p_seed: Seed of the time to first fix jitter.
+        :type p_seed: Optional[int]
+        :param p_latitude: Latitude of the simulated position. Unit: degree.
+        :type p_latitude: float
+        :param p_longitude: Longitude of the simulated position. Unit: degree.
+        :type p_longitude: float
+        :param p_smsFailureRate: Probability that sending a message fails with a network
+            timeout.
+        :type p_smsFailureRate: float
+        """
+        self.port = "simulator"
+        self.baudrate = 115200
+        self.speed = p_speed
+        self.random = random.Random(p_seed)
+        self.latitude = p_latitude
+        self.longitude = p_longitude
+        self.buffer = bytearray()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.settings: dict[str, str] = {
+            '+QGPSCFG="gnssconfig"': "1",
+            '+QGPSCFG="agpsposmode"': "33488767",
+            "+QGPSXTRA": "1",
+            "+QAUGDCNT": "0",
+        }
+        # Values of REBOOT_SETTINGS in effect, from the last restart
+        self.bootSettings = {name: self.settings[name] for name in REBOOT_SETTINGS}
+        # Simulated time until which the module restarts and does not answer
+        self.rebootEnd = 0.0
+        self.handlers: dict[str, Callable[[str, str], list[str]]] = {
+            "+CFUN": self._cfun,
+            "+QGPS": self._qgps,
+            "+QGPSEND": self._qgpsEnd,
+            "+QGPSDEL": self._qgpsDel,
+            "+QGPSLOC": self._qgpsLoc,
+            "+QGPSXTRADATA": self._qgpsXtraData,
+            "+QFUPL": self._qfupl,
+            "+QFDEL": self._qfdel,
+            "+QFLST": self._qflst,
+            "+CMGS": self._cmgs,
+            "+CMGR": self._cmgr,
+            "+CMGL": self._cmgl,
+            "+CMGD": self._cmgd,
+            "+CMGW": self._cmgw,
+            "+CPMS": self._cpms,
+            "+CPBS": self._cpbs,
+            "+CREG": self._registration,
+            "+CGREG": self._registration,
+            "+CEREG": self._registration,
+            "+CPBR": self._cpbr,
+            "+CSQ": self._csq,
+            "+QGDCNT": self._qgdcnt,
+            "+CPBW": self._cpbw,
+        }
+        self.gnssOnTime: Optional[float] = None
+        self.ttff = 0.0
+        # Assistance data: "cold", "warm" or "hot"
+        self.startType = "cold"
+        self.xtraValid = True
+        self.xtraInjectionTime = time.gmtime()
+        # Module file system, file name to content
+        self.files: dict[str, bytes] = {}
+        # Name and size of the file being uploaded
+        self.upload: Optional[tuple[str, int]] = None
+        self.uploadData = bytearray()
+        self.smsFailureRate = p_smsFailureRate
+        # TPDU length of the message being submitted, after the "> " prompt
+        self.submit: Optional[int] = None
+        self.submitData = bytearray()
+        self.messageReference = 0
+        # Simulated time until which the link is kept by AT+CMMS
+        self.linkExpiry: Optional[float] = None
+        self.sentMessages: list[SmsPdu] = []
+        # Message storage name to index to <stat> and PDU
+        self.smsStorages: dict[str, dict[int, tuple[int, str]]] = {
+            storage: {} for storage in SMS_STORAGE_SIZES
+        }
+        # <mem1> read and deleted, <mem2> written, <mem3> received, set by AT+CPMS
+        self.smsMemories = ["SM", "SM", "SM"]
+        # AT+CMGS or AT+CMGW of the message being submitted, and the <stat> of AT+CMGW
+        self.submitCommand = "+CMGS"
+        self.submitStat = 2
+        # <stat>, <lac> or <tac>, <ci> and <AcT> of AT+CREG, AT+CGREG and AT+CEREG
+        self.registrations: dict[str, tuple[int, str, str, int]] = {
+            name: (1, "1A2B", "01A2B3C4", 7) for name in ("+CREG", "+CGREG", "+CEREG")
+        }
+        # Phonebook storage name to index to number, type and text
+        self.phonebooks: dict[str, dict[int, tuple[str, int, str]]] = {"SM": {}}
+        self.phonebookStorage = "SM"
+        # <rssi> and <ber> of AT+CSQ, and RSRP, RSRQ and SINR of +QIND: "SQI"
+        self.signal = (20, 0, -95, -10, 12)
+        # Bytes sent and received of AT+QGDCNT, and number of saves to NV by AT+QGDCNT=1
+        self.dataCounters = [0, 0]
+        self.dataCounterSaves = 0
+
+    def now(self) -> float:
+        """
+        Get the simulated time.
+
+        :return: Simulated seconds since an arbitrary origin.
+        :rtype: float
+        """
+        return time.monotonic() * self.speed
+
+    def expectedTtff(self) -> float:
+        """
+        Get the time to first fix of the next GNSS start, without jitter.
+
+        :return: Time to first fix. Unit: simulated second.
+        :rtype: float
+        """
+        withoutXtra, withXtra = TTFF_SECONDS[self.startType]
+        xtra = self.xtraValid and self.bootSettings["+QGPSXTRA"] == "1"
+        ttff = withXtra if xtra else withoutXtra
+
+        if self.startType != "hot":
+            agpsMode = int(self.bootSettings['+QGPSCFG="agpsposmode"'] or 0)
+            # MS-based modes use the ephemeris given by the network
+            if agpsMode & ((1 << 1) | (1 << 8)):
+                ttff *= 0.7
+            if self.bootSettings['+QGPSCFG="gnssconfig"'] != "0":
+                ttff *= 0.85
+        return ttff
+
+    def write(self, p_data: bytes) -> int:
+        """
+        Answer an AT command line.
+
+        :param p_data: Command line, ending with ``\\r``.
+        :type p_data: bytes
+
+        :return: Number of bytes written.
+        :rtype: int
+        """
+        if self.now() < self.rebootEnd:
+            # Restarting: nothing is answered
+            return len(p_data)
+        if self.upload is not None:
+            self._receiveUpload(p_data)
+            return len(p_data)
+        if self.submit is not None:
+            self._receiveSubmit(p_data)
+            return len(p_data)
+
+        line = p_data.decode(errors="replace").strip()
+        self.push([line] + self.execute(line))
+        if self.submit is not None:
+            # The prompt has no line ending
+            with self.condition:
+                self.buffer += b"\r\n> "
+                self.condition.notify_all()
+        return len(p_data)
+
+    def execute(self, p_line: str) -> list[str]:
+        """
+        Execute an AT command line, commands concatenated with ``;`` included.
+
+        :param p_line: Command line, e.g. ``AT+QGPSDEL=0;+QGPS=1``.
+        :type p_line: str
+
+        :return: Response lines, the final result code included.
+        :rtype: list[str]
+        """
+        if not p_line.upper().startswith("AT"):
+            return ["ERROR"]
+
+        response: list[str] = []
+        for command in p_line[2:].split(";"):
+            if not command:
+                continue
+            lines = self.executeCommand(command)
+            if lines and (lines[-1] == "ERROR" or lines[-1].startswith("+CME ERROR")):
+                return response + lines
+            response += lines
+        if self.upload is not None or self.submit is not None:
+            # The final result code is sent once the data is received
+            return response
+        return response + ["OK"]
+
+    def executeCommand(self, p_command: str) -> list[str]:
+        """
+        Execute one command, without its ``AT`` prefix.
+
+        :param p_command: Command, e.g. ``+QGPSCFG="gnssconfig",1``.
+        :type p_command: str
+
+        :return: Response lines, ending with an error result code on failure.
+        :rtype: list[str]
+        """
+        if p_command[:1] not in ("+", "^"):
+            # Basic commands (E0, V1, &W, ...) are accepted
+            return []
+
+        name, _, parameters = p_command.partition("=")
+        if name.endswith("?"):
+            name, parameters = name[:-1], "?"
+        name = name.upper()
+
+        handler = self.handlers.get(name)
+        if handler is not None:
+            return handler(name, parameters)
+
+        fields = splitResponseFields(parameters, True) if parameters else []
+        if fields and fields[0].startswith('"') and parameters != "?":
+            # Sub-command: AT+X="name" reads, AT+X="name",value writes
+            key = f"{name}={fields[0]}"
+            if len(fields) == 1:
+                value = self.settings.get(key)
+                return [f"{name}: {fields[0]},{value}"] if value is not None else []
+            self.settings[key] = ",".join(fields[1:])
+            return []
+        if parameters == "?":
+            value = self.settings.get(name)
+            return [f"{name}: {value}"] if value is not None else []
+        if parameters:
+            self.settings[name] = parameters
+        return []
+
+    def receiveSms(self, p_pdus: list[str]):
+        """
+        Receive messages from the network, reported as set by ``AT+CNMI``.
+
+        :param p_pdus: SMS-DELIVER PDUs, e.g. from ``encodeDeliver``.
+        :type p_pdus: list[str]
+        """
+        for pdu in p_pdus:
+            length = len(pdu) // 2 - 1 - int(pdu[:2], 16)
+            if self._cnmi(1) == "2":
+                self.push([f"+CMT: ,{length}", pdu])
+                continue
+
+            storage = self.smsMemories[2]
+            index = self._store(storage, 0, pdu)
+            if index is None:
+                if self.settings.get('+QINDCFG="smsfull"', "0").startswith("1"):
+                    self.push([f'+QIND: "smsfull","{storage}"'])
+                continue
+            if self._cnmi(1) == "1":
+                self.push([f'+CMTI: "{storage}",{index}'])
+
+    def receiveCellBroadcast(self, p_pdus: list[str]):
+        """
+        Receive cell broadcast pages from the network, reported with ``+CBM`` when set
+        by ``AT+CNMI``.
+
+        :param p_pdus: Pages, e.g. from ``encodeCbsPages``.
+        :type p_pdus: list[str]
+        """
+        if self._cnmi(2) not in ("2", "3"):
+            return
+        for pdu in p_pdus:
+            self.push([f"+CBM: {len(pdu) // 2}", pdu])
+
+    def setRegistration(
+        self,
+        p_stat: int,
+        p_lac: str = "1A2B",
+        p_cellId: str = "01A2B3C4",
+        p_act: int = 7,
+        p_commands: tuple[str, ...] = ("+CREG", "+CGREG", "+CEREG"),
+    ):
+        """
+        Change the network registration, reported as set by ``AT+CREG``, ``AT+CGREG``
+        and ``AT+CEREG``.
+
+        :param p_stat: 0 not registered, 1 registered home, 2 searching, 3 denied,
+            4 unknown, 5 registered roaming.
+        :type p_stat: int
+        :param p_lac: Location or tracking area code, in hexadecimal.
+        :type p_lac: str
+        :param p_cellId: Cell ID, in hexadecimal.
+        :type p_cellId: str
+        :param p_act: Access technology, e.g. 0 GSM, 2 UTRAN, 7 E-UTRAN.
+        :type p_act: int
+        :param p_commands: Domains changed, e.g. ``("+CEREG",)``.
+        :type p_commands: tuple[str, ...]
+        """
+        for name in p_commands:
+            registration = (p_stat, p_lac, p_cellId, p_act)
+            if self.registrations.get(name) == registration:
+                continue
+            self.registrations[name] = registration
+            n = self.settings.get(name, "0")
+            if n == "1":
+                self.push([f"{name}: {p_stat}"])
+            elif n == "2":
+                self.push([f"{name}: {self._registrationFields(name)}"])
+
+    def setSignal(
+        self,
+        p_rssi: int,
+        p_ber: int = 0,
+        p_rsrp: int = -95,
+        p_rsrq: int = -10,
+        p_sinr: int = 12,
+    ):
+        """
+        Change the signal quality, reported with ``+QIND: "csq"`` and ``+QIND: "SQI"``
+        when enabled by ``AT+QINDCFG``.
+
+        :param p_rssi: <rssi> of AT+CSQ, 0 to 31, 99 when unknown.
+        :type p_rssi: int
+        :param p_ber: <ber> of AT+CSQ, 0 to 7, 99 when unknown.
+        :type p_ber: int
+        :param p_rsrp: Reference signal received power. Unit: dBm.
+        :type p_rsrp: int
+        :param p_rsrq: Reference signal received quality. Unit: dB.
+        :type p_rsrq: int
+        :param p_sinr: Signal to interference plus noise ratio. Unit: dB.
+        :type p_sinr: int
+        """
+        previous = self.signal
+        self.signal = (p_rssi, p_ber, p_rsrp, p_rsrq, p_sinr)
+        if previous[:2] != self.signal[:2] and self.settings.get(
+            '+QINDCFG="csq"', "0"
+        ).startswith("1"):
+            self.push([f'+QIND: "csq",{p_rssi},{p_ber}'])
+        if previous[2:] != self.signal[2:] and self.settings.get(
+            '+QINDCFG="sqi"', "0"
+        ).startswith("1"):
+            self.push([f'+QIND: "SQI",{p_rsrp},{p_rsrq},{p_sinr}'])
+
+    def transferData(self, p_sent: int, p_received: int):
+        """
+        Count bytes in the packet data counters, wrapping around at 2**32.
+
+        :param p_sent: Bytes sent.
+        :type p_sent: int
+        :param p_received: Bytes received.
+        :type p_received: int
+        """
+        self.dataCounters = [
+            (counter + count) % 2**32
+            for counter, count in zip(self.dataCounters, (p_sent, p_received))
+        ]
+
+    def later(self, p_delay: float, p_function: Callable[[], None]):
+        """
+        Call a function after a simulated time, e.g. to answer a command.
+
+        :param p_delay: Delay. Unit: simulated second.
+        :type p_delay: float
+        :param p_function: Function to call, from a timer thread.
+        :type p_function: Callable[[], None]
+        """
+        timer = threading.Timer(p_delay / self.speed, p_function)
+        timer.daemon = True
+        timer.start()
+
+    def push(self, p_lines: list[str]):
+        """
+        Queue lines to be read, e.g. unsolicited result codes.
+
+        :param p_lines: Lines, without line endings.
+        :type p_lines: list[str]
+        """
+        with self.condition:
+            for line in p_lines:
+                self.buffer += f"\r\n{line}\r\n".encode()
+            self.condition.notify_all()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.buffer)
+
+    def readline(self) -> bytes:
+        with self.condition:
+            deadline = time.monotonic() + 0.1
+            while b"\n" not in self.buffer and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            end = self.buffer.find(b"\n") + 1 or len(self.buffer)
+            line = bytes(self.buffer[:end])
+            del self.buffer[:end]
+            return line
+
+    def read(self, p_size: int = 1) -> bytes:
+        with self.condition:
+            if not self.buffer and not self.closed:
+                self.condition.wait(0.1)
+            data = bytes(self.buffer[:p_size])
+            del self.buffer[:p_size]
+            return data
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def _cfun(self, p_name: str, p_parameters: str) -> list[str]:
+        if p_parameters == "?":
+            return ["+CFUN: 1"]
+        if p_parameters.replace(" ", "") != "1,1":
+            return []
+        # Restart once the command is answered: the GNSS session ends and the
+        # settings of REBOOT_SETTINGS take effect
+        self.rebootEnd = self.now() + REBOOT_SECONDS
+        self.gnssOnTime = None
+        self.bootSettings = {name: self.settings[name] for name in REBOOT_SETTINGS}
+        self.later(REBOOT_SECONDS, lambda: self.push(["RDY"]))
+        return []
+
+    def _qgps(self, p_name: str, p_parameters: str) -> list[str]:
+        if p_parameters == "?":
+            return [f"+QGPS: {int(self.gnssOnTime is not None)}"]
+        if self.gnssOnTime is not None:
+            return [CME_SESSION_ONGOING]
+        self.gnssOnTime = self.now()
+        self.ttff = self.expectedTtff() * self.random.lognormvariate(0, 0.15)
+        return []
+
+    def _qgpsEnd(self, p_name: str, p_parameters: str) -> list[str]:
+        if self.gnssOnTime is None:
+            return [CME_SESSION_NOT_ACTIVE]
+        if self.now() - self.gnssOnTime >= self.ttff:
+            self.startType = "hot"
+        self.gnssOnTime = None
+        return []
+
+    def _qgpsDel(self, p_name: str, p_parameters: str) -> list[str]:
+        if self.gnssOnTime is not None:
+            return [CME_SESSION_ONGOING]
+        if p_parameters == "0":
+            self.startType = "cold"
+        elif p_parameters == "2" and self.startType == "hot":
+            self.startType = "warm"
+        elif p_parameters == "3":
+            self.xtraValid = False
+        return []
+
+    def _qgpsLoc(self, p_name: str, p_parameters: str) -> list[str]:
+        if self.gnssOnTime is None:
+            return [CME_SESSION_NOT_ACTIVE]
+        if self.now() - self.gnssOnTime < self.ttff:
+            return [CME_NOT_FIXED]
+
+        utc = time.strftime("%H%M%S.000", time.gmtime())
+        date = time.strftime("%d%m%y", time.gmtime())
+        latitude, longitude = self._coordinates(p_parameters or "0")
+        return [
+            f"+QGPSLOC: {utc},{latitude},{longitude},0.9,120.0,3,0.00,0.0,0.0,{date},09"
+        ]
+
+    def _coordinates(self, p_mode: str) -> tuple[str, str]:
+        if p_mode == "2":
+            return f"{self.latitude:.5f}", f"{self.longitude:.5f}"
+
+        values = []
+        for value, width, letters in (
+            (self.latitude, 2, "NS"),
+            (self.longitude, 3, "EW"),
+        ):
+            degrees = int(abs(value))
+            minutes = (abs(value) - degrees) * 60
+            letter = letters[value < 0]
+            if p_mode == "1":
+                values.append(f"{degrees:0{width}d}{minutes:09.6f},{letter}")
+            else:
+                values.append(f"{degrees:0{width}d}{minutes:07.4f}{letter}")
+        return values[0], values[1]
+
+    def _qgpsXtraData(self, p_name: str, p_parameters: str) -> list[str]:
+        if p_parameters != "?" and p_parameters.strip('"') not in self.files:
+            return [CME_FILE_NOT_FOUND]
+        if p_parameters == "?":
+            if not self.xtraValid:
+                return ['+QGPSXTRADATA: 0,"1980/01/05,23:59:48"']
+            injected = time.strftime("%Y/%m/%d,%H:%M:%S", self.xtraInjectionTime)
+            return [f'+QGPSXTRADATA: 10080,"{injected}"']
+        self.xtraValid = True
+        self.xtraInjectionTime = time.gmtime()
+        return []
+
+    def _qfupl(self, p_name: str, p_parameters: str) -> list[str]:
+        fields = splitResponseFields(p_parameters)
+        if len(fields) < 2 or not fields[1].isdigit():
+            return ["ERROR"]
+        self.upload = (fields[0], int(fields[1]))
+        self.uploadData = bytearray()
+        return ["CONNECT"]
+
+    def _receiveUpload(self, p_data: bytes):
+        name, size = self.upload
+        self.uploadData += p_data
+        if len(self.uploadData) < size:
+            return
+        data = bytes(self.uploadData[:size])
+        self.files[name] = data
+        self.upload = None
+        self.push([f"+QFUPL: {size},{qfuplChecksum(data):x}", "OK"])
+
+    def _cnmi(self, p_field: int) -> str:
+        fields = self.settings.get("+CNMI", "").split(",")
+        return fields[p_field] if p_field < len(fields) else "0"
+
+    def _cmgs(self, p_name: str, p_parameters: str) -> list[str]:
+        if not p_parameters.isdigit() or self.settings.get("+CMGF", "0") != "0":
+            return ["ERROR"]
+        self.submit = int(p_parameters)
+        self.submitCommand = p_name
+        self.submitData = bytearray()
+        return []
+
+    def _cmgw(self, p_name: str, p_parameters: str) -> list[str]:
+        fields = splitResponseFields(p_parameters)
+        if not fields[0].isdigit() or self.settings.get("+CMGF", "0") != "0":
+            return ["ERROR"]
+        self.submitStat = int(fields[1]) if len(fields) > 1 and fields[1] else 2
+        return self._cmgs(p_name, fields[0])
+
+    def _receiveSubmit(self, p_data: bytes):
+        self.submitData += p_data
+        end = self.submitData.find(b"\x1a")
+        if end < 0:
+            return
+        pdu = self.submitData[:end].decode(errors="replace")
+        self.submit = None
+        self.submitData = bytearray()
+        try:
+            message = decodePdu(pdu)
+        except ValueError:
+            self.push([CMS_INVALID_PDU])
+            return
+        if self.submitCommand == "+CMGW":
+            index = self._store(self.smsMemories[1], self.submitStat, pdu)
+            self.push(
+                [f"+CMGW: {index}", "OK"] if index is not None else [CMS_MEMORY_FULL]
+            )
+            return
+
+        linkKept = self.linkExpiry is not None and self.now() < self.linkExpiry
+        delay = SMS_SUBMIT_SECONDS + (0 if linkKept else SMS_LINK_SETUP_SECONDS)
+        failed = self.random.random() < self.smsFailureRate
+        self.messageReference = (self.messageReference + 1) % 256
+        reference = self.messageReference
+        self.later(delay, lambda: self._submitted(message, reference, failed))
+
+    def _submitted(self, p_message: SmsPdu, p_reference: int, p_failed: bool):
+        mode = self.settings.get("+CMMS", "0")
+        if mode in ("1", "2"):
+            self.linkExpiry = self.now() + CMMS_WINDOW_SECONDS
+            self.later(CMMS_WINDOW_SECONDS, self._releaseLink)
+        else:
+            self.linkExpiry = None
+        if p_failed:
+            self.push([CMS_NETWORK_TIMEOUT])
+            return
+
+        self.sentMessages.append(p_message)
+        self.push([f"+CMGS: {p_reference}", "OK"])
+        if p_message.statusReport and self._cnmi(3) == "1":
+            report = encodeStatusReport(p_reference, p_message.address)
+            self.later(
+                SMS_DELIVERY_SECONDS,
+                lambda: self.push([f"+CDS: {len(report) // 2 - 1}", report]),
+            )
+
+    def _releaseLink(self):
+        if self.linkExpiry is None or self.now() < self.linkExpiry - 0.01:
+            return
+        self.linkExpiry = None
+        # Mode 1 falls back to 0 once the link is released
+        if self.settings.get("+CMMS") == "1":
+            self.settings["+CMMS"] = "0"
+
+    def _store(self, p_storage: str, p_stat: int, p_pdu: str) -> Optional[int]:
+        """
+        Store a message at the first free index of a storage.
+
+        :return: Index, None when the storage is full.
+        """
+        messages = self.smsStorages[p_storage]
+        for index in range(SMS_STORAGE_SIZES[p_storage]):
+            if index not in messages:
+                messages[index] = (p_stat, p_pdu)
+                return index
+        return None
+
+    def _storedMessage(self, p_index: int, p_prefix: str) -> list[str]:
+        messages = self.smsStorages[self.smsMemories[0]]
+        stat, pdu = messages[p_index]
+        if stat == 0:
+            messages[p_index] = (1, pdu)
+        length = len(pdu) // 2 - 1 - int(pdu[:2], 16)
+        return [f"{p_prefix}{stat},,{length}", pdu]
+
+    def _cmgr(self, p_name: str, p_parameters: str) -> list[str]:
+        storage = self.smsMemories[0]
+        if (
+            not p_parameters.isdigit()
+            or int(p_parameters) >= SMS_STORAGE_SIZES[storage]
+        ):
+            return [CMS_INVALID_INDEX]
+        if int(p_parameters) not in self.smsStorages[storage]:
+            return []
+        return self._storedMessage(int(p_parameters), "+CMGR: ")
+
+    def _cmgl(self, p_name: str, p_parameters: str) -> list[str]:
+        stat = int(p_parameters) if p_parameters.isdigit() else 4
+        messages = self.smsStorages[self.smsMemories[0]]
+        lines = []
+        for index in sorted(messages):
+            if stat == 4 or messages[index][0] == stat:
+                lines += self._storedMessage(index, f"+CMGL: {index},")
+        return lines
+
+    def _cmgd(self, p_name: str, p_parameters: str) -> list[str]:
+        fields = splitResponseFields(p_parameters)
+        delflag = int(fields[1]) if len(fields) > 1 and fields[1] else 0
+        messages = self.smsStorages[self.smsMemories[0]]
+        if delflag == 0:
+            messages.pop(int(fields[0]), None)
+            return []
+        # <stat> deleted by each <delflag>
+        deleted = {1: (1,), 2: (1, 3), 3: (1, 2, 3), 4: (0, 1, 2, 3)}[delflag]
+        for index, (stat, _) in list(messages.items()):
+            if stat in deleted:
+                del messages[index]
+        return []
+
+    def _cpms(self, p_name: str, p_parameters: str) -> list[str]:
+        if p_parameters != "?":
+            storages = [field.strip('"') for field in p_parameters.split(",")]
+            if not all(storage in SMS_STORAGE_SIZES for storage in storages[:3]):
+                return ["ERROR"]
+            # Omitted storages are kept
+            self.smsMemories[: len(storages)] = storages[:3]
+        counts = [
+            f"{len(self.smsStorages[storage])},{SMS_STORAGE_SIZES[storage]}"
+            for storage in self.smsMemories
+        ]
+        if p_parameters != "?":
+            return ["+CPMS: " + ",".join(counts)]
+        return [
+            "+CPMS: "
+            + ",".join(
+                f'"{storage}",{count}'
+                for storage, count in zip(self.smsMemories, counts)
+            )
+        ]
+
+    def _registrationFields(self, p_name: str) -> str:
+        stat, lac, cellId, act = self.registrations[p_name]
+        if stat not in (1, 5):
+            return str(stat)
+        return f'{stat},"{lac}","{cellId}",{act}'
+
+    def _registration(self, p_name: str, p_parameters: str) -> list[str]:
+        if p_parameters == "?":
+            n = self.settings.get(p_name, "0")
+            if n == "2":
+                return [f"{p_name}: {n},{self._registrationFields(p_name)}"]
+            return [f"{p_name}: {n},{self.registrations[p_name][0]}"]
+        if p_parameters not in ("0", "1", "2"):
+            return ["ERROR"]
+        self.settings[p_name] = p_parameters
+        return []
+
+    def _csq(self, p_name: str, p_parameters: str) -> list[str]:
+        if p_parameters:
+            return ["ERROR"]
+        return [f"+CSQ: {self.signal[0]},{self.signal[1]}"]
+
+    def _qgdcnt(self, p_name: str, p_parameters: str) -> list[str]:
+        if p_parameters == "?":
+            return [f"+QGDCNT: {self.dataCounters[0]},{self.dataCounters[1]}"]
+        if p_parameters == "0":
+            self.dataCounters = [0, 0]
+        elif p_parameters == "1":
+            self.dataCounterSaves += 1
+        else:
+            return ["ERROR"]
+        return []
+
+    def _cpbs(self, p_name: str, p_parameters: str) -> list[str]:
+        if p_parameters == "?":
+            used = len(self.phonebooks[self.phonebookStorage])
+            return [f'+CPBS: "{self.phonebookStorage}",{used},{PHONEBOOK_SIZE}']
+        self.phonebookStorage = p_parameters.strip('"')
+        self.phonebooks.setdefault(self.phonebookStorage, {})
+        return []
+
+    def _cpbr(self, p_name: str, p_parameters: str) -> list[str]:
+        fields = splitResponseFields(p_parameters)
+        if not all(field.isdigit() for field in fields) or len(fields) > 2:
+            return ["ERROR"]
+        first = int(fields[0])
+        last = int(fields[-1])
+        if not 1 <= first <= last <= PHONEBOOK_SIZE:
+            return [CME_INVALID_INDEX]
+        phonebook = self.phonebooks[self.phonebookStorage]
+        return [
+            f'+CPBR: {index},"{number}",{numberType},"{text}"'
+            for index, (number, numberType, text) in sorted(phonebook.items())
+            if first <= index <= last
+        ]
+
+    def _cpbw(self, p_name: str, p_parameters: str) -> list[str]:
+        fields = splitResponseFields(p_parameters)
+        phonebook = self.phonebooks[self.phonebookStorage]
+        if fields[0]:
+            index = int(fields[0]) if fields[0].isdigit() else 0
+        else:
+            free = set(range(1, PHONEBOOK_SIZE + 1)) - set(phonebook)
+            index = min(free) if free else 0
+        if not 1 <= index <= PHONEBOOK_SIZE:
+            return [CME_INVALID_INDEX]
+        if len(fields) == 1:
+            phonebook.pop(index, None)
+            return []
+        numberType = int(fields[2]) if len(fields) > 2 and fields[2] else 129
+        phonebook[index] = (fields[1], numberType, fields[3] if len(fields) > 3 else "")
+        return []
+
+    def _qfdel(self, p_name: str, p_parameters: str) -> list[str]:
+        name = p_parameters.strip('"')
+        if name not in self.files:
+            return [CME_FILE_NOT_FOUND]
+        del self.files[name]
+        return []
+
+    def _qflst(self, p_name: str, p_parameters: str) -> list[str]:
+        pattern = p_parameters.strip('"') or "*"
+        return [
+            f'+QFLST: "{name}",{len(data)}'
+            for name, data in self.files.items()
+            if fnmatch.fnmatch(name, pattern)
+        ]
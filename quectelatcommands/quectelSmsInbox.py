@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack
+from typing import Iterator, Optional
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    splitResponseFields,
+)
+from quectelatcommands.quectelSmsPdu import SMS_STATUS_REPORT, SmsPdu, decodePdu
+from quectelatcommands.quectelSmsStream import (
+    QuectelSmsReassembler,
+    SmsMessage,
+    SmsPart,
+    iterSmsParts,
+    smsPart,
+)
+
+# AT+CNMI: buffer the URCs while the link is reserved, +CMTI for the stored messages,
+# +CMT for the messages routed directly, +CDS for the status reports
+CNMI_MODE = 2
+CNMI_MT_STORED = 1
+CNMI_MT_DIRECT = 2
+CNMI_DS_DIRECT = 1
+
+URC_STORED = "+CMTI:"
+URC_DIRECT = "+CMT:"
+URC_STATUS_REPORT = "+CDS:"
+URC_STORAGE_FULL = '+QIND: "smsfull"'
+
+_EVENT_INDEX = "index"
+_EVENT_PDU = "pdu"
+_EVENT_DRAIN = "drain"
+_EVENT_STOP = "stop"
+
+
+class QuectelSmsInbox:
+    def __init__(
+        self,
+        p_modem: QuectelModemATCommands,
+        p_queueSize: int = 64,
+        p_deleteBatch: int = 16,
+        p_maxPending: int = 64,
+        p_dedupeSize: int = 256,
+        p_direct: bool = False,
+    ):
+        """
+        Push-based reception of the messages.
+
+        ``AT+CNMI`` makes the module report each received message: ``+CMTI`` gives the
+        storage index of a stored message, which is read with ``AT+CMGR`` (or ``+CMT``
+        gives the message itself with ``p_direct``), and ``+CDS`` gives the status
+        reports. Storage full (``+QIND: "smsfull"``) drains the unread messages at once.
+
+        The messages are read by a worker thread, reassembled when concatenated, and put
+        in a bounded queue read with ``get`` or by iterating. When the consumer is late,
+        the queue fills up and the worker stops reading: the messages wait in the module
+        storage. The messages are only deleted once queued, by sweeps of one batch of
+        ``AT+CMGD=<index>`` commands, once ``p_deleteBatch`` parts were queued or when
+        there is nothing else to do: the other messages of the storage are kept, as are
+        the parts of concatenated messages waiting for the others. The indexes read and
+        not deleted yet are kept, so that an index reported twice is not read twice;
+        recent messages are kept too, so that a message received twice is given once.
+
+        The inbox selects PDU mode and sets ``AT+CNMI`` and the storage full URC while
+        it runs: ``stop`` writes their previous values back.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_queueSize: Maximum number of messages waiting for the consumer.
+        :type p_queueSize: int
+        :param p_deleteBatch: Number of queued message parts triggering a deletion sweep.
+        :type p_deleteBatch: int
+        :param p_maxPending: Maximum number of incomplete concatenated messages kept.
+        :type p_maxPending: int
+        :param p_dedupeSize: Number of recent message parts remembered.
+        :type p_dedupeSize: int
+        :param p_direct: Route the messages directly with ``+CMT`` instead of storing
+            them. They cannot wait in the storage then: when the queue is full, they wait
+            in memory.
+        :type p_direct: bool
+        """
+        self.modem = p_modem
+        self.deleteBatch = p_deleteBatch
+        self.dedupeSize = p_dedupeSize
+        self.direct = p_direct
+        self.messages: queue.Queue[SmsMessage] = queue.Queue(maxsize=p_queueSize)
+        self.statusReports: queue.Queue[SmsPdu] = queue.Queue(maxsize=p_queueSize)
+        self.events: queue.Queue[tuple[str, object]] = queue.Queue()
+        # Set by storage full: the drain is done before the pending events
+        self.drainRequested = threading.Event()
+        self.reassembler = QuectelSmsReassembler(p_maxPending)
+        # Storage indexes read and not deleted yet, and those of the queued messages
+        self.readIndexes: set[int] = set()
+        self.queuedIndexes: set[int] = set()
+        self.recentParts: OrderedDict[tuple, None] = OrderedDict()
+        self.running = False
+        self.worker: Optional[threading.Thread] = None
+        # Writes back the settings changed by start()
+        self.restore = ExitStack()
+        self.statistics = {
+            "received": 0,
+            "duplicates": 0,
+            "sweeps": 0,
+            "drains": 0,
+            "dropped": 0,
+            "droppedStatusReports": 0,
+        }
+
+    def __enter__(self) -> "QuectelSmsInbox":
+        self.start()
+        return self
+
+    def __exit__(self, p_type, p_value, p_traceback):
+        self.stop()
+
+    def start(self, p_drain: bool = True) -> tuple[bool, list[str]]:
+        """
+        Configure the reporting of the messages and start the worker.
+
+        :param p_drain: Read the messages already stored.
+        :type p_drain: bool
+
+        :return: Tuple containing the status of the configuration and the responses.
+        :rtype: tuple[bool, list[str]]
+        """
+        serialPort = self.modem.serialPort
+        serialPort.addUrcHandler(URC_STORED, self._onStored)
+        serialPort.addUrcHandler(URC_DIRECT, self._onDirect, 2)
+        serialPort.addUrcHandler(URC_STATUS_REPORT, self._onStatusReport, 2)
+        serialPort.addUrcHandler(URC_STORAGE_FULL, self._onStorageFull)
+
+        status, response = self.restore.enter_context(self.modem.messageFormat(0))
+        self._saveReporting()
+        for commandStatus, commandResponse in (
+            self.modem.statusControlCommands40400ControlUrcIndication("smsfull", 1, 0),
+            self.modem.shortMessageServiceCommands913SmsEventReportingConfigurationWrite(
+                CNMI_MODE,
+                CNMI_MT_DIRECT if self.direct else CNMI_MT_STORED,
+                0,
+                CNMI_DS_DIRECT,
+                0,
+            ),
+        ):
+            status = status and commandStatus
+            response += commandResponse
+        if not status:
+            self._removeHandlers()
+            self.restore.close()
+            return status, response
+
+        self.running = True
+        self.worker = threading.Thread(target=self._work, name="SmsInboxThread")
+        self.worker.start()
+        if p_drain:
+            self.requestDrain()
+        return status, response
+
+    def stop(self):
+        """
+        Stop the worker and write back the settings changed by ``start``. Incomplete
+        concatenated messages are queued if there is room.
+        """
+        self._removeHandlers()
+        self.running = False
+        self.events.put((_EVENT_STOP, None))
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+        self.restore.close()
+        for message in self.reassembler.flush():
+            try:
+                self.messages.put_nowait(message)
+            except queue.Full:
+                self.statistics["dropped"] += 1
+
+    def get(self, p_timeout: Optional[float] = None) -> Optional[SmsMessage]:
+        """
+        Get the next received message.
+
+        :param p_timeout: Maximum time to wait. Unit: second. None waits until a message
+            is received.
+        :type p_timeout: Optional[float]
+
+        :return: Message, None on timeout.
+        :rtype: Optional[SmsMessage]
+        """
+        try:
+            return self.messages.get(timeout=p_timeout)
+        except queue.Empty:
+            return None
+
+    def __iter__(self) -> Iterator[SmsMessage]:
+        """
+        Yield the received messages until ``stop`` is called.
+        """
+        while self.running or not self.messages.empty():
+            message = self.get(0.5)
+            if message is not None:
+                yield message
+
+    def requestDrain(self):
+        """
+        Read every unread message of the storage, before the pending reports.
+        """
+        self.drainRequested.set()
+        # Wakes the worker up
+        self.events.put((_EVENT_DRAIN, None))
+
+    def _saveReporting(self):
+        """
+        Read the ``AT+CNMI`` and storage full URC settings, to write them back on
+        ``stop``.
+        """
+        (cnmiStatus, cnmi), (smsfullStatus, smsfull) = self.modem.sendCommandBatch(
+            ["AT+CNMI?", 'AT+QINDCFG="smsfull"']
+        )
+        lines = (
+            findResponseLines(smsfull, '+QINDCFG: "smsfull"') if smsfullStatus else []
+        )
+        fields = splitResponseFields(lines[0]) if lines else []
+        if len(fields) >= 2 and fields[1].isdigit():
+            self.restore.callback(
+                self.modem.statusControlCommands40400ControlUrcIndication,
+                "smsfull",
+                int(fields[1]),
+                0,
+            )
+
+        # Registered last, so written back first: the reports stop before the format
+        # changes
+        lines = findResponseLines(cnmi, "+CNMI:") if cnmiStatus else []
+        fields = splitResponseFields(lines[0]) if lines else []
+        if len(fields) == 5 and all(field.isdigit() for field in fields):
+            self.restore.callback(
+                self.modem.shortMessageServiceCommands913SmsEventReportingConfigurationWrite,
+                *(int(field) for field in fields),
+            )
+
+    def _removeHandlers(self):
+        serialPort = self.modem.serialPort
+        serialPort.removeUrcHandler(URC_STORED, self._onStored)
+        serialPort.removeUrcHandler(URC_DIRECT, self._onDirect)
+        serialPort.removeUrcHandler(URC_STATUS_REPORT, self._onStatusReport)
+        serialPort.removeUrcHandler(URC_STORAGE_FULL, self._onStorageFull)
+
+    def _onStored(self, p_urc: str):
+        # +CMTI: <mem>,<index>
+        fields = splitResponseFields(p_urc)
+        if len(fields) >= 2 and fields[1].isdigit():
+            self.events.put((_EVENT_INDEX, int(fields[1])))
+
+    def _onDirect(self, p_urc: str):
+        # +CMT: [<alpha>],<length>\n<pdu>
+        self.events.put((_EVENT_PDU, p_urc.split("\n")[-1]))
+
+    def _onStatusReport(self, p_urc: str):
+        # +CDS: <length>\n<pdu>
+        try:
+            report = decodePdu(p_urc.split("\n")[-1])
+        except ValueError:
+            return
+        if report.type != SMS_STATUS_REPORT:
+            return
+        try:
+            self.statusReports.put_nowait(report)
+        except queue.Full:
+            self.statistics["droppedStatusReports"] += 1
+
+    def _onStorageFull(self, p_urc: str):
+        self.requestDrain()
+
+    def _work(self):
+        """
+        Read the reported messages, queue them and sweep the queued ones.
+        """
+        while self.running:
+            if self.drainRequested.is_set():
+                self.drainRequested.clear()
+                self._drain()
+            try:
+                kind, value = self.events.get(timeout=1)
+            except queue.Empty:
+                # Nothing else to do: delete what was read
+                self._sweep()
+                continue
+
+            if kind == _EVENT_INDEX:
+                self._fetch(value)
+            elif kind == _EVENT_PDU:
+                self._receivePdu(value)
+            if len(self.queuedIndexes) >= self.deleteBatch:
+                self._sweep()
+
+    def _fetch(self, p_index: int):
+        if p_index in self.readIndexes:
+            self.statistics["duplicates"] += 1
+            return
+        status, response = self.modem.shortMessageServiceCommands907ReadMessage(p_index)
+        if not status:
+            return
+        for part in iterSmsParts(response, p_index):
+            # An empty index is not remembered: a report of it may be stale, the
+            # message deleted by a sweep, and the index reused by the next message
+            self.readIndexes.add(p_index)
+            self._receive(part)
+
+    def _receivePdu(self, p_pdu: str):
+        try:
+            message = decodePdu(p_pdu)
+        except ValueError:
+            return
+        self._receive(smsPart(message, None, 0))
+
+    def _drain(self):
+        """
+        Read every unread message of the storage, e.g. when it is full.
+        """
+        self.statistics["drains"] += 1
+        # The listing is read completely before queueing, to free the connection
+        parts = [
+            part
+            for part in iterSmsParts(self.modem.streamCommand("AT+CMGL=0"))
+            if part.index not in self.readIndexes
+        ]
+        for part in parts:
+            if part.index is not None:
+                self.readIndexes.add(part.index)
+            self._receive(part)
+        self._sweep()
+
+    def _receive(self, p_part: SmsPart):
+        key = (
+            p_part.address,
+            p_part.timestamp,
+            p_part.reference,
+            p_part.sequence,
+            p_part.text,
+            p_part.data,
+        )
+        if key in self.recentParts:
+            self.statistics["duplicates"] += 1
+            return
+        self.recentParts[key] = None
+        while len(self.recentParts) > self.dedupeSize:
+            self.recentParts.popitem(last=False)
+
+        for message in self.reassembler.add(p_part):
+            self.statistics["received"] += 1
+            # Blocks while the consumer is late: the next messages stay in storage
+            while True:
+                try:
+                    self.messages.put(message, timeout=0.5)
+                    self.queuedIndexes.update(message.indexes)
+                    break
+                except queue.Full:
+                    if not self.running:
+                        self.statistics["dropped"] += 1
+                        break
+
+    def _sweep(self):
+        """
+        Delete the queued messages with one batch of commands. The indexes whose deletion
+        failed are tried again by the next sweep.
+        """
+        if not self.queuedIndexes:
+            return
+        indexes = sorted(self.queuedIndexes)
+        results = self.modem.sendCommandBatch([f"AT+CMGD={index}" for index in indexes])
+        for index, (status, _) in zip(indexes, results):
+            if status:
+                self.queuedIndexes.discard(index)
+                self.readIndexes.discard(index)
+        self.statistics["sweeps"] += 1
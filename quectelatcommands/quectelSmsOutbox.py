@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import ExitStack
+from typing import Iterable, NamedTuple, Optional, Union
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import splitResponseFields
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+from quectelatcommands.quectelSmsPdu import SMS_STATUS_REPORT, decodePdu, encodeSubmit
+
+SMS_QUEUED = "queued"
+SMS_SENT = "sent"
+SMS_DELIVERED = "delivered"
+SMS_FAILED = "failed"
+
+URC_STATUS_REPORT = "+CDS:"
+
+# Shortest time the modules keep the link after a message with AT+CMMS, after which
+# mode 1 falls back to 0. Unit: second.
+KEEP_LINK_WINDOW = 1.0
+
+# TP-Status ranges: delivered below 0x20, still trying below 0x40, failed above
+_STATUS_TEMPORARY = 0x20
+_STATUS_PERMANENT = 0x40
+
+
+class SmsDelivery(NamedTuple):
+    """
+    State of a message of the outbound queue.
+    """
+
+    id: int
+    destination: str
+    # SMS_QUEUED, SMS_SENT, SMS_DELIVERED or SMS_FAILED
+    state: str
+    # TP-Message-Reference of each part sent
+    references: tuple[int, ...]
+    attempts: int
+    # time.monotonic() of the sending of the last part and of the last status report
+    sentTime: Optional[float]
+    deliveredTime: Optional[float]
+    error: Optional[str]
+
+
+def _addressKey(p_address: str) -> str:
+    return p_address.lstrip("+")
+
+
+class QuectelSmsOutbox:
+    def __init__(
+        self,
+        p_modem: QuectelModemATCommands,
+        p_keepLink: int = 1,
+        p_statusReport: bool = True,
+        p_maxAttempts: int = 3,
+        p_backoff: float = 5.0,
+        p_backoffFactor: float = 2.0,
+        p_timeScale: float = 1.0,
+        p_maxDeliveries: int = 1024,
+    ):
+        """
+        Outbound message queue sending bursts over a link kept by ``AT+CMMS``.
+
+        Without ``AT+CMMS``, the module sets the radio link up for every ``AT+CMGS``.
+        The queue enables it (``shortMessageServiceCommands909SendMoreMessagesWrite``)
+        and sends the messages back to back, within the time the link is kept. Bodies
+        are encoded to PDUs when queued; the message reference of each part is kept to
+        match the status reports (``+CDS``). A failed message is sent again, from its
+        failed part, after an exponential backoff. The encoded parts of a message are
+        dropped once it is sent or failed, and only the last ``p_maxDeliveries`` final
+        states are kept, so that a long-running outbox does not grow.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_keepLink: ``AT+CMMS`` mode during a burst: 0 disabled, 1 until the link
+            is released (enabled again after a pause), 2 until the end of the burst.
+        :type p_keepLink: int
+        :param p_statusReport: Request a status report for every message.
+        :type p_statusReport: bool
+        :param p_maxAttempts: Number of attempts before a message fails.
+        :type p_maxAttempts: int
+        :param p_backoff: Delay before the second attempt. Unit: second.
+        :type p_backoff: float
+        :param p_backoffFactor: Factor applied to the delay at every attempt.
+        :type p_backoffFactor: float
+        :param p_timeScale: Simulated seconds per real second when the client is opened
+            on a ``QuectelSimulatedSerial``, applied to the delays and the report.
+        :type p_timeScale: float
+        :param p_maxDeliveries: Number of final states (delivered, failed, or sent
+            without status report) kept for ``delivery``, the oldest being forgotten.
+        :type p_maxDeliveries: int
+        """
+        self.modem = p_modem
+        self.keepLink = p_keepLink
+        self.statusReport = p_statusReport
+        self.maxAttempts = p_maxAttempts
+        self.backoff = p_backoff
+        self.backoffFactor = p_backoffFactor
+        self.timeScale = p_timeScale
+        self.maxDeliveries = p_maxDeliveries
+        self.condition = threading.Condition()
+        self.ids = itertools.count(1)
+        self.deliveries: dict[int, SmsDelivery] = {}
+        # Messages in a final state, oldest first
+        self.finished: OrderedDict[int, None] = OrderedDict()
+        # Pre-encoded parts, TPDU length and PDU, and the number of parts sent
+        self.pdus: dict[int, list[tuple[int, str]]] = {}
+        self.partsSent: dict[int, int] = {}
+        self.nextAttempt: dict[int, float] = {}
+        self.queue: deque[int] = deque()
+        # (message reference, destination) to the message, until its status report
+        self.references: dict[tuple[int, str], int] = {}
+        # References of each message waiting for their status report
+        self.pendingReports: dict[int, set[int]] = {}
+        self.lastSendTime: Optional[float] = None
+        self.retries = 0
+        # Selects the previous message format again on close()
+        self.restore = ExitStack()
+
+    def __enter__(self) -> "QuectelSmsOutbox":
+        self.open()
+        return self
+
+    def __exit__(self, p_type, p_value, p_traceback):
+        self.close()
+
+    def open(self) -> tuple[bool, list[str]]:
+        """
+        Select the PDU mode until ``close`` and route the status reports to ``+CDS``,
+        the other ``AT+CNMI`` settings being kept.
+
+        :return: Tuple containing the status of the configuration and the responses.
+        :rtype: tuple[bool, list[str]]
+        """
+        self.modem.serialPort.addUrcHandler(URC_STATUS_REPORT, self._onStatusReport, 2)
+        status, response = self.restore.enter_context(self.modem.messageFormat(0))
+        if not status or not self.statusReport:
+            return status, response
+
+        return self.modem.updateSmsEventReporting(p_ds=1)
+
+    def close(self):
+        """
+        Stop matching the status reports and select the previous message format again.
+        """
+        self.modem.serialPort.removeUrcHandler(URC_STATUS_REPORT, self._onStatusReport)
+        self.restore.close()
+
+    def enqueue(
+        self, p_destination: str, p_text: Union[str, bytes], **p_options
+    ) -> int:
+        """
+        Encode a message and queue it.
+
+        :param p_destination: Destination number, ``+`` for an international number.
+        :type p_destination: str
+        :param p_text: Text, or bytes sent as 8 bit data.
+        :type p_text: Union[str, bytes]
+        :param p_options: Keyword arguments of ``encodeSubmit``.
+
+        :raises ValueError: If the message cannot be encoded.
+
+        :return: Identifier of the message, see ``delivery``.
+        :rtype: int
+        """
+        pdus = encodeSubmit(
+            p_destination, p_text, p_statusReport=self.statusReport, **p_options
+        )
+        with self.condition:
+            messageId = next(self.ids)
+            self.pdus[messageId] = pdus
+            self.partsSent[messageId] = 0
+            self.nextAttempt[messageId] = 0.0
+            self.deliveries[messageId] = SmsDelivery(
+                messageId, p_destination, SMS_QUEUED, (), 0, None, None, None
+            )
+            self.queue.append(messageId)
+        return messageId
+
+    def enqueueMany(
+        self, p_destinations: Iterable[str], p_text: Union[str, bytes], **p_options
+    ) -> list[int]:
+        """
+        Queue the same message for several recipients, e.g. an alert.
+
+        :param p_destinations: Destination numbers.
+        :type p_destinations: Iterable[str]
+        :param p_text: Text, or bytes sent as 8 bit data.
+        :type p_text: Union[str, bytes]
+        :param p_options: Keyword arguments of ``encodeSubmit``.
+
+        :return: Identifiers of the messages.
+        :rtype: list[int]
+        """
+        return [
+            self.enqueue(destination, p_text, **p_options)
+            for destination in p_destinations
+        ]
+
+    def delivery(self, p_id: int) -> Optional[SmsDelivery]:
+        """
+        Get the state of a message.
+
+        :param p_id: Identifier returned by ``enqueue``.
+        :type p_id: int
+
+        :return: State, None for an unknown identifier or a forgotten final state.
+        :rtype: Optional[SmsDelivery]
+        """
+        with self.condition:
+            return self.deliveries.get(p_id)
+
+    def run(self, p_timeout: Optional[float] = None) -> dict:
+        """
+        Send the queued messages, waiting for the retries.
+
+        :param p_timeout: Maximum duration of the burst, None to send every message.
+            Unit: second.
+        :type p_timeout: Optional[float]
+
+        :return: ``sent`` and ``failed`` messages, ``retries``, ``elapsed`` time (in
+            simulated seconds with ``p_timeScale``) and ``messagesPerMinute``.
+        :rtype: dict
+        """
+        start = time.monotonic()
+        deadline = None if p_timeout is None else start + p_timeout / self.timeScale
+        sent = failed = 0
+        retries = self.retries
+        if self.keepLink:
+            self.modem.shortMessageServiceCommands909SendMoreMessagesWrite(
+                self.keepLink
+            )
+            self.lastSendTime = time.monotonic()
+
+        while self.queue and (deadline is None or time.monotonic() < deadline):
+            now = time.monotonic()
+            messageId = min(self.queue, key=lambda queued: self.nextAttempt[queued])
+            if self.nextAttempt[messageId] > now:
+                wait = self.nextAttempt[messageId] - now
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                time.sleep(wait)
+                continue
+
+            state = self._send(messageId)
+            if state != SMS_QUEUED:
+                self.queue.remove(messageId)
+                del self.pdus[messageId]
+                del self.partsSent[messageId]
+                del self.nextAttempt[messageId]
+                sent += state == SMS_SENT
+                failed += state == SMS_FAILED
+                if state == SMS_FAILED or not self.statusReport:
+                    with self.condition:
+                        self._finish(messageId)
+
+        if self.keepLink == 2:
+            self.modem.shortMessageServiceCommands909SendMoreMessagesWrite(0)
+        elapsed = (time.monotonic() - start) * self.timeScale
+        return {
+            "sent": sent,
+            "failed": failed,
+            "retries": self.retries - retries,
+            "elapsed": elapsed,
+            "messagesPerMinute": 60 * sent / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def waitForReports(self, p_timeout: float) -> bool:
+        """
+        Wait for the status reports of the sent messages.
+
+        :param p_timeout: Maximum time to wait. Unit: second.
+        :type p_timeout: float
+
+        :return: True if every report was received.
+        :rtype: bool
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.pendingReports, p_timeout / self.timeScale
+            )
+
+    def _send(self, p_id: int) -> str:
+        """
+        Send the parts of a message not sent yet.
+
+        :return: New state: SMS_SENT, SMS_FAILED, or SMS_QUEUED for a retry.
+        """
+        if (
+            self.keepLink == 1
+            and self.lastSendTime is not None
+            and (time.monotonic() - self.lastSendTime) * self.timeScale
+            > KEEP_LINK_WINDOW
+        ):
+            # The link was released: mode 1 fell back to 0
+            self.modem.shortMessageServiceCommands909SendMoreMessagesWrite(1)
+
+        with self.condition:
+            delivery = self.deliveries[p_id]._replace(
+                attempts=self.deliveries[p_id].attempts + 1
+            )
+            self.deliveries[p_id] = delivery
+
+        parts = self.pdus[p_id]
+        while self.partsSent[p_id] < len(parts):
+            length, pdu = parts[self.partsSent[p_id]]
+            status, response = (
+                self.modem.shortMessageServiceCommands908SendMessagesPduMode(
+                    length, pdu
+                )
+            )
+            self.lastSendTime = time.monotonic()
+            lines = [line for line in response if line.startswith("+CMGS:")]
+            if not status or not lines:
+                return self._fail(p_id, response[-1] if response else "timeout")
+
+            reference = int(splitResponseFields(lines[0])[0])
+            with self.condition:
+                delivery = self.deliveries[p_id]
+                delivery = delivery._replace(
+                    references=delivery.references + (reference,)
+                )
+                # Sent along with the last reference, so that its status report, which
+                # may arrive as soon as the lock is released, finds the message sent
+                if (
+                    self.partsSent[p_id] + 1 == len(parts)
+                    and delivery.state == SMS_QUEUED
+                ):
+                    delivery = delivery._replace(
+                        state=SMS_SENT, sentTime=self.lastSendTime
+                    )
+                self.deliveries[p_id] = delivery
+                if self.statusReport:
+                    key = (reference, _addressKey(delivery.destination))
+                    self.references[key] = p_id
+                    self.pendingReports.setdefault(p_id, set()).add(reference)
+            self.partsSent[p_id] += 1
+
+        return SMS_SENT
+
+    def _fail(self, p_id: int, p_error: str) -> str:
+        with self.condition:
+            delivery = self.deliveries[p_id]._replace(error=p_error)
+            if delivery.attempts >= self.maxAttempts:
+                self.deliveries[p_id] = delivery._replace(state=SMS_FAILED)
+                return SMS_FAILED
+            self.deliveries[p_id] = delivery
+
+        self.retries += 1
+        delay = self.backoff * self.backoffFactor ** (delivery.attempts - 1)
+        self.nextAttempt[p_id] = time.monotonic() + delay / self.timeScale
+        return SMS_QUEUED
+
+    def _onStatusReport(self, p_urc: str):
+        # +CDS: <length>\n<pdu>
+        try:
+            report = decodePdu(p_urc.split("\n")[-1])
+        except ValueError:
+            return
+        if report.type != SMS_STATUS_REPORT or report.status is None:
+            return
+        if report.status >= _STATUS_TEMPORARY and report.status < _STATUS_PERMANENT:
+            # The service centre is still trying
+            return
+
+        with self.condition:
+            key = (report.reference, _addressKey(report.address))
+            messageId = self.references.pop(key, None)
+            if messageId is None:
+                return
+            pending = self.pendingReports.get(messageId, set())
+            pending.discard(report.reference)
+            delivery = self.deliveries[messageId]
+            if report.status >= _STATUS_PERMANENT:
+                self.deliveries[messageId] = delivery._replace(
+                    state=SMS_FAILED, error=f"TP-Status {report.status:#04x}"
+                )
+            elif not pending and delivery.state == SMS_SENT:
+                self.deliveries[messageId] = delivery._replace(
+                    state=SMS_DELIVERED, deliveredTime=time.monotonic()
+                )
+            if not pending:
+                self.pendingReports.pop(messageId, None)
+                self._finish(messageId)
+            self.condition.notify_all()
+
+    def _finish(self, p_id: int):
+        """
+        Record that a message reached its final state, forgetting the oldest final
+        states beyond ``p_maxDeliveries``. Called with the condition held.
+        """
+        self.finished[p_id] = None
+        while len(self.finished) > self.maxDeliveries:
+            messageId, _ = self.finished.popitem(last=False)
+            delivery = self.deliveries.pop(messageId)
+            # A failed message may still wait for the reports of its first parts
+            for reference in self.pendingReports.pop(messageId, ()):
+                self.references.pop(
+                    (reference, _addressKey(delivery.destination)), None
+                )
+
+
+def benchmarkSmsOutbox(
+    p_messages: int = 50,
+    p_speed: float = 20.0,
+    p_failureRate: float = 0.05,
+    p_seed: Optional[int] = 1,
+) -> dict[int, dict]:
+    """
+    Measure the sending throughput against a simulated module, for each ``AT+CMMS``
+    mode.
+
+    :param p_messages: Number of messages of each burst.
+    :type p_messages: int
+    :param p_speed: Simulated seconds per real second.
+    :type p_speed: float
+    :param p_failureRate: Probability that sending a message fails.
+    :type p_failureRate: float
+    :param p_seed: Seed of the failures.
+    :type p_seed: Optional[int]
+
+    :return: Report of ``run`` by ``AT+CMMS`` mode, with the number of ``delivered``
+        messages.
+    :rtype: dict[int, dict]
+    """
+    results = {}
+    destinations = [f"+491512345{index:04d}" for index in range(p_messages)]
+    for keepLink in (0, 1, 2):
+        modem = QuectelModemATCommands("simulator")
+        modem.open(
+            QuectelSimulatedSerial(p_speed, p_seed, p_smsFailureRate=p_failureRate)
+        )
+        with QuectelSmsOutbox(
+            modem, keepLink, p_backoff=2.0, p_timeScale=p_speed
+        ) as outbox:
+            ids = outbox.enqueueMany(destinations, "Alert: test message, please ignore")
+            report = outbox.run()
+            outbox.waitForReports(10.0)
+            report["delivered"] = sum(
+                outbox.delivery(messageId).state == SMS_DELIVERED for messageId in ids
+            )
+        modem.close()
+        results[keepLink] = report
+    return results
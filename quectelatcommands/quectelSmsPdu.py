@@ -0,0 +1,886 @@
+#!/usr/bin/env python3
+
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, NamedTuple, Optional, Union
+
+# GSM 7 bit default alphabet (3GPP TS 23.038 6.2.1), indexed by septet. 0x1B escapes
+# to the extension table.
+GSM7_ALPHABET = (
+    "@£$¥èéùìòÇ\nØø\rÅå"
+    "Δ_ΦΓΛΩΠΨΣΘΞ\x1bÆæßÉ"
+    " !\"#¤%&'()*+,-./"
+    "0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNO"
+    "PQRSTUVWXYZÄÖÑÜ§"
+    "¿abcdefghijklmno"
+    "pqrstuvwxyzäöñüà"
+)
+GSM7_ESCAPE = 0x1B
+
+# GSM 7 bit default alphabet extension table, septet following the escape to character
+GSM7_EXTENSION = {
+    0x0A: "\f",
+    0x14: "^",
+    0x28: "{",
+    0x29: "}",
+    0x2F: "\\",
+    0x3C: "[",
+    0x3D: "~",
+    0x3E: "]",
+    0x40: "|",
+    0x65: "€",
+}
+
+# Character to septets, escape included for the extension table
+GSM7_ENCODE = {
+    **{
+        character: bytes((septet,))
+        for septet, character in enumerate(GSM7_ALPHABET)
+        if septet != GSM7_ESCAPE
+    },
+    **{
+        character: bytes((GSM7_ESCAPE, septet))
+        for septet, character in GSM7_EXTENSION.items()
+    },
+}
+
+# Septet to character; an escaped septet missing from the extension table is read as
+# the default alphabet character
+GSM7_DECODE = tuple(GSM7_ALPHABET)
+GSM7_DECODE_EXTENSION = tuple(
+    GSM7_EXTENSION.get(septet, GSM7_ALPHABET[septet]) for septet in range(128)
+)
+
+# TP-Message-Type-Indicator of the messages received from the service centre
+SMS_DELIVER = "deliver"
+SMS_SUBMIT = "submit"
+SMS_STATUS_REPORT = "status-report"
+MESSAGE_TYPES = {0: SMS_DELIVER, 1: SMS_SUBMIT, 2: SMS_STATUS_REPORT}
+
+# Data coding schemes
+ENCODING_GSM7 = "gsm7"
+ENCODING_8BIT = "8bit"
+ENCODING_UCS2 = "ucs2"
+ENCODING_DCS = {ENCODING_GSM7: 0x00, ENCODING_8BIT: 0x04, ENCODING_UCS2: 0x08}
+
+# Type of address: international number, national number, alphanumeric
+TYPE_INTERNATIONAL = 0x91
+TYPE_NATIONAL = 0x81
+TYPE_ALPHANUMERIC = 0xD0
+
+# Information element identifiers of the user data header
+IEI_CONCATENATED_8BIT = 0x00
+IEI_CONCATENATED_16BIT = 0x08
+
+# Maximum user data per message: septets for GSM 7 bit, octets otherwise
+USER_DATA_SEPTETS = 160
+USER_DATA_OCTETS = 140
+# Length of the user data header of a concatenated message, 8 bit reference
+CONCATENATED_HEADER_OCTETS = 6
+
+# Semi-octet digits of the addresses (3GPP TS 23.040 9.1.2.3)
+BCD_DIGITS = "0123456789*#abc"
+
+_concatenationReferences = itertools.count(random.randrange(256))
+
+
+class SmsPdu(NamedTuple):
+    """
+    Decoded SMS-DELIVER, SMS-SUBMIT or SMS-STATUS-REPORT.
+    """
+
+    type: str
+    # Service centre address, None when not given in the PDU
+    smsc: Optional[str]
+    # Originating, destination or recipient address, depending on the type
+    address: str
+    addressType: int
+    # TP-Message-Reference, for SMS-SUBMIT and SMS-STATUS-REPORT
+    reference: Optional[int]
+    pid: int
+    dcs: int
+    # Decoded text, None for 8 bit data
+    text: Optional[str]
+    # User data without the user data header
+    data: bytes
+    # Information elements of the user data header, identifier to data
+    header: dict[int, bytes]
+    # Service centre time stamp
+    timestamp: Optional[datetime]
+    # Discharge time and TP-Status of SMS-STATUS-REPORT
+    dischargeTime: Optional[datetime]
+    status: Optional[int]
+    # Status report requested (SMS-SUBMIT) or to be returned (SMS-DELIVER)
+    statusReport: bool
+
+    @property
+    def concatenation(self) -> Optional[tuple[int, int, int]]:
+        """
+        Concatenation information of the user data header.
+
+        :return: Reference, number of parts and sequence number (from 1), or None
+            when the message is not concatenated.
+        :rtype: Optional[tuple[int, int, int]]
+        """
+        element = self.header.get(IEI_CONCATENATED_8BIT)
+        if element is not None and len(element) == 3:
+            return element[0], element[1], element[2]
+        element = self.header.get(IEI_CONCATENATED_16BIT)
+        if element is not None and len(element) == 4:
+            return (element[0] << 8) | element[1], element[2], element[3]
+        return None
+
+
+class SmsListEntry(NamedTuple):
+    """
+    Message of a ``AT+CMGL`` or ``AT+CMGR`` response in PDU mode.
+    """
+
+    # Storage index, None for AT+CMGR
+    index: Optional[int]
+    # 0 received unread, 1 received read, 2 stored unsent, 3 stored sent
+    stat: int
+    # TPDU length given by the module, in octets
+    length: int
+    # None when the PDU cannot be decoded
+    message: Optional[SmsPdu]
+    pdu: str
+
+
+def packSeptets(p_septets: bytes, p_header: bytes = b"") -> bytes:
+    """
+    Pack GSM 7 bit septets into octets, after a user data header.
+
+    The header is followed by fill bits up to a septet boundary, so that the text
+    starts on a septet.
+
+    :param p_septets: Septets, one per byte.
+    :type p_septets: bytes
+    :param p_header: User data header, its length octet included.
+    :type p_header: bytes
+
+    :return: Packed user data.
+    :rtype: bytes
+    """
+    start = -(-len(p_header) * 8 // 7) * 7
+    value = 0
+    # 8 septets are 7 octets: pack them by groups of 56 bits
+    for offset in range(0, len(p_septets), 8):
+        group = p_septets[offset : offset + 8]
+        groupValue = 0
+        for position, septet in enumerate(group):
+            groupValue |= septet << (7 * position)
+        value |= groupValue << (7 * offset)
+    value = int.from_bytes(p_header, "little") | (value << start)
+    return value.to_bytes(-(-(start + 7 * len(p_septets)) // 8), "little")
+
+
+def unpackSeptets(p_data: bytes, p_count: int, p_headerLength: int = 0) -> bytes:
+    """
+    Unpack GSM 7 bit septets from octets.
+
+    :param p_data: Packed user data.
+    :type p_data: bytes
+    :param p_count: Number of septets of the user data, the header included.
+    :type p_count: int
+    :param p_headerLength: Length of the user data header in octets, its length octet
+        included.
+    :type p_headerLength: int
+
+    :return: Septets after the header, one per byte.
+    :rtype: bytes
+    """
+    start = -(-p_headerLength * 8 // 7)
+    value = int.from_bytes(p_data, "little") >> (7 * start)
+    septets = bytearray()
+    # 7 octets are 8 septets: unpack them by groups of 56 bits
+    for _ in range(start, p_count, 8):
+        group = value & 0xFFFFFFFFFFFFFF
+        value >>= 56
+        septets += bytes(
+            (
+                group & 0x7F,
+                (group >> 7) & 0x7F,
+                (group >> 14) & 0x7F,
+                (group >> 21) & 0x7F,
+                (group >> 28) & 0x7F,
+                (group >> 35) & 0x7F,
+                (group >> 42) & 0x7F,
+                (group >> 49) & 0x7F,
+            )
+        )
+    return bytes(septets[: max(p_count - start, 0)])
+
+
+def gsm7Encode(p_text: str) -> Optional[bytes]:
+    """
+    Convert a text to GSM 7 bit default alphabet septets.
+
+    :param p_text: Text.
+    :type p_text: str
+
+    :return: Septets, one per byte, or None when a character is not in the alphabet.
+    :rtype: Optional[bytes]
+    """
+    try:
+        return b"".join([GSM7_ENCODE[character] for character in p_text])
+    except KeyError:
+        return None
+
+
+def gsm7Decode(p_septets: bytes) -> str:
+    """
+    Convert GSM 7 bit default alphabet septets to a text.
+
+    :param p_septets: Septets, one per byte.
+    :type p_septets: bytes
+
+    :return: Text.
+    :rtype: str
+    """
+    if GSM7_ESCAPE not in p_septets:
+        return "".join([GSM7_DECODE[septet] for septet in p_septets])
+
+    characters = []
+    escaped = False
+    for septet in p_septets:
+        if escaped:
+            characters.append(GSM7_DECODE_EXTENSION[septet])
+            escaped = False
+        elif septet == GSM7_ESCAPE:
+            escaped = True
+        else:
+            characters.append(GSM7_DECODE[septet])
+    return "".join(characters)
+
+
+def dcsEncoding(p_dcs: int) -> str:
+    """
+    Get the alphabet of a data coding scheme (3GPP TS 23.038 4).
+
+    :param p_dcs: TP-Data-Coding-Scheme.
+    :type p_dcs: int
+
+    :return: ``ENCODING_GSM7``, ``ENCODING_8BIT`` or ``ENCODING_UCS2``.
+    :rtype: str
+    """
+    group = p_dcs >> 4
+    if group <= 0x07:
+        # General data coding, automatic deletion
+        alphabet = (p_dcs >> 2) & 0x03
+        return (ENCODING_GSM7, ENCODING_8BIT, ENCODING_UCS2, ENCODING_GSM7)[alphabet]
+    if group == 0x0E:
+        return ENCODING_UCS2
+    if group == 0x0F:
+        return ENCODING_8BIT if p_dcs & 0x04 else ENCODING_GSM7
+    return ENCODING_GSM7
+
+
+def _encodeAddress(p_address: str, p_type: Optional[int] = None) -> bytes:
+    """
+    Encode a TP address: length in digits, type of address and semi-octets.
+    """
+    if p_type is None:
+        if p_address.startswith("+"):
+            p_type = TYPE_INTERNATIONAL
+        elif p_address.lstrip("*#").isdigit() or p_address == "":
+            p_type = TYPE_NATIONAL
+        else:
+            p_type = TYPE_ALPHANUMERIC
+    if p_type & 0x70 == 0x50:
+        septets = gsm7Encode(p_address)
+        if septets is None:
+            raise ValueError(f"Address not in the GSM 7 bit alphabet: {p_address}")
+        data = packSeptets(septets)
+        # Number of useful semi-octets
+        return bytes((-(-len(septets) * 7 // 4), p_type)) + data
+
+    digits = p_address.lstrip("+")
+    return bytes((len(digits), p_type)) + _encodeSemiOctets(digits)
+
+
+def _encodeSemiOctets(p_digits: str) -> bytes:
+    try:
+        values = [BCD_DIGITS.index(digit) for digit in p_digits.lower()]
+    except ValueError:
+        raise ValueError(f"Invalid address digits: {p_digits}")
+    if len(values) % 2:
+        # Filler of an odd number of digits
+        values.append(0x0F)
+    return bytes(
+        values[position] | (values[position + 1] << 4)
+        for position in range(0, len(values), 2)
+    )
+
+
+def _decodeSemiOctets(p_data: bytes, p_count: int) -> str:
+    digits = []
+    for octet in p_data:
+        digits.append(BCD_DIGITS[octet & 0x0F] if octet & 0x0F != 0x0F else "")
+        digits.append(BCD_DIGITS[octet >> 4] if octet >> 4 != 0x0F else "")
+    return "".join(digits[:p_count])
+
+
+def _decodeAddress(p_pdu: bytes, p_offset: int) -> tuple[str, int, int]:
+    """
+    Decode a TP address.
+
+    :return: Address, type of address and offset after the address.
+    """
+    count = p_pdu[p_offset]
+    addressType = p_pdu[p_offset + 1]
+    end = p_offset + 2 + (count + 1) // 2
+    data = p_pdu[p_offset + 2 : end]
+    if addressType & 0x70 == 0x50:
+        address = gsm7Decode(unpackSeptets(data, count * 4 // 7))
+    else:
+        address = _decodeSemiOctets(data, count)
+        if addressType & 0x70 == 0x10:
+            address = "+" + address
+    return address, addressType, end
+
+
+def _decodeTimestamp(p_data: bytes) -> Optional[datetime]:
+    """
+    Decode a 7 octet service centre time stamp (3GPP TS 23.040 9.2.3.11).
+    """
+    values = [(octet & 0x0F) * 10 + (octet >> 4) for octet in p_data[:6]]
+    zone = p_data[6]
+    quarters = (zone & 0x07) * 10 + (zone >> 4)
+    if zone & 0x08:
+        quarters = -quarters
+    try:
+        # Two digit year: 90-99 are the last century
+        return datetime(
+            values[0] + (1900 if values[0] >= 90 else 2000),
+            values[1],
+            values[2],
+            values[3],
+            values[4],
+            values[5],
+            tzinfo=timezone(timedelta(minutes=15 * quarters)),
+        )
+    except ValueError:
+        return None
+
+
+def _encodeTimestamp(p_timestamp: datetime) -> bytes:
+    offset = p_timestamp.utcoffset() or timedelta()
+    quarters = int(offset.total_seconds() // 900)
+    values = (
+        p_timestamp.year % 100,
+        p_timestamp.month,
+        p_timestamp.day,
+        p_timestamp.hour,
+        p_timestamp.minute,
+        p_timestamp.second,
+    )
+    zone = ((abs(quarters) % 10) << 4) | (abs(quarters) // 10)
+    if quarters < 0:
+        zone |= 0x08
+    return bytes(((value % 10) << 4) | (value // 10) for value in values) + bytes(
+        (zone,)
+    )
+
+
+def _relativeValidity(p_minutes: int) -> int:
+    """
+    Encode a relative validity period (3GPP TS 23.040 9.2.3.12.1).
+    """
+    if p_minutes <= 720:
+        return max(p_minutes // 5 - 1, 0)
+    if p_minutes <= 1440:
+        return 143 + (p_minutes - 720) // 30
+    if p_minutes <= 30 * 1440:
+        return 166 + p_minutes // 1440
+    return min(192 + p_minutes // (7 * 1440), 255)
+
+
+def _encodeText(p_text: Union[str, bytes], p_encoding: str) -> tuple[str, bytes]:
+    """
+    Encode the text of a message.
+
+    :return: Encoding and user data, septets for GSM 7 bit.
+    """
+    if isinstance(p_text, bytes):
+        return ENCODING_8BIT, p_text
+
+    if p_encoding in ("auto", ENCODING_GSM7):
+        septets = gsm7Encode(p_text)
+        if septets is not None:
+            return ENCODING_GSM7, septets
+        if p_encoding == ENCODING_GSM7:
+            raise ValueError("Text not in the GSM 7 bit default alphabet")
+    return ENCODING_UCS2, p_text.encode("utf-16-be")
+
+
+def splitUserData(p_data: bytes, p_encoding: str) -> list[bytes]:
+    """
+    Split encoded user data into the parts of a concatenated message.
+
+    Escape sequences of GSM 7 bit and UTF-16 surrogate pairs are not split.
+
+    :param p_data: Septets for GSM 7 bit, octets otherwise.
+    :type p_data: bytes
+    :param p_encoding: ``ENCODING_GSM7``, ``ENCODING_8BIT`` or ``ENCODING_UCS2``.
+    :type p_encoding: str
+
+    :return: User data of each part, a single one when the message is not split.
+    :rtype: list[bytes]
+    """
+    if p_encoding == ENCODING_GSM7:
+        single = USER_DATA_SEPTETS
+        size = USER_DATA_SEPTETS - -(-CONCATENATED_HEADER_OCTETS * 8 // 7)
+    else:
+        single = USER_DATA_OCTETS
+        size = USER_DATA_OCTETS - CONCATENATED_HEADER_OCTETS
+        if p_encoding == ENCODING_UCS2:
+            size -= size % 2
+    if len(p_data) <= single:
+        return [p_data]
+
+    parts = []
+    start = 0
+    while start < len(p_data):
+        end = min(start + size, len(p_data))
+        if end < len(p_data):
+            if p_encoding == ENCODING_GSM7 and p_data[end - 1] == GSM7_ESCAPE:
+                end -= 1
+            elif p_encoding == ENCODING_UCS2 and 0xD8 <= p_data[end - 2] <= 0xDB:
+                end -= 2
+        parts.append(p_data[start:end])
+        start = end
+    return parts
+
+
+def _userData(p_data: bytes, p_encoding: str, p_header: bytes) -> tuple[int, bytes]:
+    """
+    Build the user data of a part.
+
+    :return: TP-User-Data-Length and TP-User-Data.
+    """
+    if p_encoding == ENCODING_GSM7:
+        data = packSeptets(p_data, p_header)
+        return -(-len(p_header) * 8 // 7) + len(p_data), data
+    return len(p_header) + len(p_data), p_header + p_data
+
+
+def _concatenationHeader(p_reference: int, p_total: int, p_sequence: int) -> bytes:
+    return bytes((5, IEI_CONCATENATED_8BIT, 3, p_reference & 0xFF, p_total, p_sequence))
+
+
+def encodeSubmit(
+    p_destination: str,
+    p_text: Union[str, bytes],
+    p_encoding: str = "auto",
+    p_smsc: Optional[str] = None,
+    p_reference: int = 0,
+    p_statusReport: bool = False,
+    p_validity: Optional[int] = None,
+    p_concatenationReference: Optional[int] = None,
+    p_destinationType: Optional[int] = None,
+) -> list[tuple[int, str]]:
+    """
+    Encode a message as SMS-SUBMIT PDUs, split into a concatenated message when it
+    does not fit in one.
+
+    :param p_destination: Destination number, ``+`` for an international number.
+    :type p_destination: str
+    :param p_text: Text, or bytes to send as 8 bit data.
+    :type p_text: Union[str, bytes]
+    :param p_encoding: ``auto`` (GSM 7 bit when possible, UCS2 otherwise),
+        ``ENCODING_GSM7`` or ``ENCODING_UCS2``.
+    :type p_encoding: str
+    :param p_smsc: Service centre address, None to use the one stored in the module.
+    :type p_smsc: Optional[str]
+    :param p_reference: TP-Message-Reference. 0 lets the module choose it.
+    :type p_reference: int
+    :param p_statusReport: Request a status report.
+    :type p_statusReport: bool
+    :param p_validity: Relative validity period, None for none. Unit: minute.
+    :type p_validity: Optional[int]
+    :param p_concatenationReference: Reference of the concatenated message, None for
+        the next one of a counter.
+    :type p_concatenationReference: Optional[int]
+    :param p_destinationType: Type of address, None to deduce it from the number.
+    :type p_destinationType: Optional[int]
+
+    :raises ValueError: If the address or the text cannot be encoded, or if the
+        message needs more than 255 parts.
+
+    :return: TPDU length (for ``AT+CMGS=<length>``) and hexadecimal PDU of each part.
+    :rtype: list[tuple[int, str]]
+    """
+    encoding, data = _encodeText(p_text, p_encoding)
+    parts = splitUserData(data, encoding)
+    if len(parts) > 255:
+        raise ValueError(f"Message too long: {len(parts)} parts")
+
+    smsc = b"\x00"
+    if p_smsc:
+        address = _encodeAddress(p_smsc)
+        # The length of the service centre address is in octets, type included
+        smsc = bytes(((address[0] + 1) // 2 + 1,)) + address[1:]
+    destination = _encodeAddress(p_destination, p_destinationType)
+    firstOctet = 0x01
+    if p_validity is not None:
+        firstOctet |= 0x10
+    if p_statusReport:
+        firstOctet |= 0x20
+    validity = b"" if p_validity is None else bytes((_relativeValidity(p_validity),))
+    dcs = ENCODING_DCS[encoding]
+
+    reference = 0
+    if len(parts) > 1:
+        reference = (
+            p_concatenationReference
+            if p_concatenationReference is not None
+            else next(_concatenationReferences)
+        )
+
+    pdus = []
+    for sequence, part in enumerate(parts, 1):
+        header = b""
+        octet = firstOctet
+        if len(parts) > 1:
+            header = _concatenationHeader(reference, len(parts), sequence)
+            octet |= 0x40
+        length, userData = _userData(part, encoding, header)
+        tpdu = (
+            bytes((octet, p_reference & 0xFF))
+            + destination
+            + bytes((0x00, dcs))
+            + validity
+            + bytes((length,))
+            + userData
+        )
+        pdus.append((len(tpdu), (smsc + tpdu).hex().upper()))
+    return pdus
+
+
+def encodeDeliver(
+    p_originator: str,
+    p_text: Union[str, bytes],
+    p_timestamp: Optional[datetime] = None,
+    p_encoding: str = "auto",
+    p_smsc: Optional[str] = None,
+    p_concatenationReference: Optional[int] = None,
+) -> list[str]:
+    """
+    Encode a message as SMS-DELIVER PDUs, e.g. to simulate received messages.
+
+    :param p_originator: Originating address: number, or alphanumeric sender.
+    :type p_originator: str
+    :param p_text: Text, or bytes for 8 bit data.
+    :type p_text: Union[str, bytes]
+    :param p_timestamp: Service centre time stamp, None for now.
+    :type p_timestamp: Optional[datetime]
+    :param p_encoding: ``auto``, ``ENCODING_GSM7`` or ``ENCODING_UCS2``.
+    :type p_encoding: str
+    :param p_smsc: Service centre address.
+    :type p_smsc: Optional[str]
+    :param p_concatenationReference: Reference of the concatenated message.
+    :type p_concatenationReference: Optional[int]
+
+    :return: Hexadecimal PDU of each part, service centre address included.
+    :rtype: list[str]
+    """
+    encoding, data = _encodeText(p_text, p_encoding)
+    parts = splitUserData(data, encoding)
+    smsc = b"\x00"
+    if p_smsc:
+        address = _encodeAddress(p_smsc)
+        smsc = bytes(((address[0] + 1) // 2 + 1,)) + address[1:]
+    originator = _encodeAddress(p_originator)
+    timestamp = _encodeTimestamp(
+        p_timestamp or datetime.now(timezone.utc).replace(microsecond=0)
+    )
+    reference = (
+        p_concatenationReference
+        if p_concatenationReference is not None
+        else next(_concatenationReferences)
+    )
+
+    pdus = []
+    for sequence, part in enumerate(parts, 1):
+        header = b""
+        # TP-More-Messages-to-Send is set when there are none
+        octet = 0x04
+        if len(parts) > 1:
+            header = _concatenationHeader(reference, len(parts), sequence)
+            octet |= 0x40
+        length, userData = _userData(part, encoding, header)
+        tpdu = (
+            bytes((octet,))
+            + originator
+            + bytes((0x00, ENCODING_DCS[encoding]))
+            + timestamp
+            + bytes((length,))
+            + userData
+        )
+        pdus.append((smsc + tpdu).hex().upper())
+    return pdus
+
+
+def encodeStatusReport(
+    p_reference: int,
+    p_recipient: str,
+    p_status: int = 0,
+    p_timestamp: Optional[datetime] = None,
+    p_dischargeTime: Optional[datetime] = None,
+) -> str:
+    """
+    Encode an SMS-STATUS-REPORT PDU, e.g. to simulate delivery reports.
+
+    :param p_reference: TP-Message-Reference of the reported SMS-SUBMIT.
+    :type p_reference: int
+    :param p_recipient: Recipient address of the reported message.
+    :type p_recipient: str
+    :param p_status: TP-Status: 0x00-0x1F delivered, 0x20-0x3F still trying,
+        0x40-0x7F permanent error.
+    :type p_status: int
+    :param p_timestamp: Service centre time stamp of the reported message, None for now.
+    :type p_timestamp: Optional[datetime]
+    :param p_dischargeTime: Time of the delivery, None for now.
+    :type p_dischargeTime: Optional[datetime]
+
+    :return: Hexadecimal PDU, empty service centre address included.
+    :rtype: str
+    """
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    tpdu = (
+        bytes((0x06, p_reference & 0xFF))
+        + _encodeAddress(p_recipient)
+        + _encodeTimestamp(p_timestamp or now)
+        + _encodeTimestamp(p_dischargeTime or now)
+        + bytes((p_status,))
+    )
+    return (b"\x00" + tpdu).hex().upper()
+
+
+def _decodeUserData(
+    p_pdu: bytes, p_offset: int, p_dcs: int, p_hasHeader: bool
+) -> tuple[Optional[str], bytes, dict[int, bytes]]:
+    length = p_pdu[p_offset]
+    userData = p_pdu[p_offset + 1 :]
+    encoding = dcsEncoding(p_dcs)
+
+    header: dict[int, bytes] = {}
+    headerLength = 0
+    if p_hasHeader and userData:
+        headerLength = userData[0] + 1
+        position = 1
+        while position + 1 < headerLength:
+            identifier = userData[position]
+            size = userData[position + 1]
+            header[identifier] = bytes(userData[position + 2 : position + 2 + size])
+            position += 2 + size
+
+    if encoding == ENCODING_GSM7:
+        septets = unpackSeptets(userData, length, headerLength)
+        return gsm7Decode(septets), septets, header
+
+    data = bytes(userData[headerLength:length])
+    if encoding == ENCODING_UCS2:
+        return data.decode("utf-16-be", errors="replace"), data, header
+    return None, data, header
+
+
+def decodePdu(p_pdu: str, p_hasSmsc: bool = True) -> SmsPdu:
+    """
+    Decode an SMS-DELIVER, SMS-SUBMIT or SMS-STATUS-REPORT PDU.
+
+    :param p_pdu: Hexadecimal PDU, as given by ``AT+CMGL``, ``AT+CMGR`` and ``+CMT``.
+    :type p_pdu: str
+    :param p_hasSmsc: The PDU starts with the service centre address.
+    :type p_hasSmsc: bool
+
+    :raises ValueError: If the PDU is malformed.
+
+    :return: Decoded message.
+    :rtype: SmsPdu
+    """
+    try:
+        pdu = bytes.fromhex(p_pdu.strip())
+        smsc = None
+        offset = 0
+        if p_hasSmsc:
+            length = pdu[0]
+            if length:
+                smsc = _decodeSemiOctets(pdu[2 : 1 + length], 2 * (length - 1))
+                if pdu[1] & 0x70 == 0x10:
+                    smsc = "+" + smsc
+            offset = 1 + length
+
+        firstOctet = pdu[offset]
+        messageType = MESSAGE_TYPES.get(firstOctet & 0x03)
+        if messageType is None:
+            raise ValueError(f"Reserved message type: {firstOctet & 0x03}")
+        hasHeader = bool(firstOctet & 0x40)
+        statusReport = bool(firstOctet & 0x20)
+        offset += 1
+
+        if messageType == SMS_STATUS_REPORT:
+            reference = pdu[offset]
+            address, addressType, offset = _decodeAddress(pdu, offset + 1)
+            timestamp = _decodeTimestamp(pdu[offset : offset + 7])
+            dischargeTime = _decodeTimestamp(pdu[offset + 7 : offset + 14])
+            status = pdu[offset + 14]
+            return SmsPdu(
+                messageType,
+                smsc,
+                address,
+                addressType,
+                reference,
+                0,
+                0,
+                None,
+                b"",
+                {},
+                timestamp,
+                dischargeTime,
+                status,
+                statusReport,
+            )
+
+        reference = None
+        if messageType == SMS_SUBMIT:
+            reference = pdu[offset]
+            offset += 1
+        address, addressType, offset = _decodeAddress(pdu, offset)
+        pid, dcs = pdu[offset], pdu[offset + 1]
+        offset += 2
+
+        timestamp = None
+        if messageType == SMS_DELIVER:
+            timestamp = _decodeTimestamp(pdu[offset : offset + 7])
+            offset += 7
+        else:
+            validityFormat = (firstOctet >> 3) & 0x03
+            offset += (0, 7, 1, 7)[validityFormat]
+
+        text, data, header = _decodeUserData(pdu, offset, dcs, hasHeader)
+        return SmsPdu(
+            messageType,
+            smsc,
+            address,
+            addressType,
+            reference,
+            pid,
+            dcs,
+            text,
+            data if text is None else b"",
+            header,
+            timestamp,
+            None,
+            None,
+            statusReport,
+        )
+    except IndexError:
+        raise ValueError(f"Truncated PDU: {p_pdu}")
+
+
+def decodePdus(p_pdus: Iterable[str], p_hasSmsc: bool = True) -> list[Optional[SmsPdu]]:
+    """
+    Decode PDUs in bulk.
+
+    :param p_pdus: Hexadecimal PDUs.
+    :type p_pdus: Iterable[str]
+    :param p_hasSmsc: The PDUs start with the service centre address.
+    :type p_hasSmsc: bool
+
+    :return: Decoded message of each PDU, None for the malformed ones.
+    :rtype: list[Optional[SmsPdu]]
+    """
+    messages: list[Optional[SmsPdu]] = []
+    for pdu in p_pdus:
+        try:
+            messages.append(decodePdu(pdu, p_hasSmsc))
+        except ValueError:
+            messages.append(None)
+    return messages
+
+
+def encodeSubmits(
+    p_messages: Iterable[tuple[str, Union[str, bytes]]], **p_options
+) -> list[list[tuple[int, str]]]:
+    """
+    Encode messages in bulk as SMS-SUBMIT PDUs.
+
+    :param p_messages: Destination and text of each message.
+    :type p_messages: Iterable[tuple[str, Union[str, bytes]]]
+    :param p_options: Keyword arguments of ``encodeSubmit``.
+
+    :return: Parts of each message, see ``encodeSubmit``.
+    :rtype: list[list[tuple[int, str]]]
+    """
+    return [
+        encodeSubmit(destination, text, **p_options) for destination, text in p_messages
+    ]
+
+
+def parseListPdu(p_response: list[str]) -> list[SmsListEntry]:
+    """
+    Parse the messages of a ``AT+CMGL`` or ``AT+CMGR`` response in PDU mode.
+
+    Each message is a ``+CMGL: <index>,<stat>,[<alpha>],<length>`` or
+    ``+CMGR: <stat>,[<alpha>],<length>`` line followed by the PDU line.
+
+    :param p_response: Response lines.
+    :type p_response: list[str]
+
+    :return: Messages, in the order of the response.
+    :rtype: list[SmsListEntry]
+    """
+    entries = []
+    lines = iter(p_response)
+    for line in lines:
+        if not line.startswith(("+CMGL:", "+CMGR:")):
+            continue
+        fields = line.split(":", 1)[1].split(",")
+        pdu = next(lines, "")
+        try:
+            index = int(fields[0]) if line.startswith("+CMGL:") else None
+            stat = int(fields[1 if index is not None else 0])
+            length = int(fields[-1])
+        except ValueError:
+            continue
+        try:
+            message: Optional[SmsPdu] = decodePdu(pdu)
+        except ValueError:
+            message = None
+        entries.append(SmsListEntry(index, stat, length, message, pdu))
+    return entries
+
+
+def benchmarkSmsPdu(p_messages: int = 10000) -> dict[str, float]:
+    """
+    Measure the encoding and decoding throughput of the codec.
+
+    :param p_messages: Number of messages of each kind.
+    :type p_messages: int
+
+    :return: Messages per second, for each kind and direction.
+    :rtype: dict[str, float]
+    """
+    samples = {
+        "gsm7": "Meeting moved to 10:30, room B [2nd floor] - bring the €50 receipts!",
+        "ucs2": "Встреча перенесена на 10:30 😀",
+        "concatenated": "Long message that needs several parts. " * 10,
+    }
+    results: dict[str, float] = {}
+    for name, text in samples.items():
+        start = time.perf_counter()
+        for _ in range(p_messages):
+            encodeSubmit("+4915123456789", text, p_concatenationReference=1)
+        results[f"encode {name}"] = p_messages / (time.perf_counter() - start)
+
+        pdus = encodeDeliver("+4915123456789", text, p_concatenationReference=1)
+        batch = pdus * p_messages
+        start = time.perf_counter()
+        decodePdus(batch)
+        results[f"decode {name}"] = p_messages / (time.perf_counter() - start)
+    return results
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    splitResponseFields,
+)
+from quectelatcommands.quectelSmsPdu import SmsListEntry, parseListPdu
+from quectelatcommands.quectelSmsStream import smsPart
+
+URC_STORED = "+CMTI:"
+URC_STORAGE_FULL = '+QIND: "smsfull"'
+
+# AT+CMGD <delflag> deleting every message of <mem1> but the unread ones
+DELFLAG_READ_SENT_UNSENT = 3
+# AT+CMGD <delflag> deleting every message of <mem1>
+DELFLAG_ALL = 4
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    storage TEXT NOT NULL,
+    storageIndex INTEGER,
+    stat INTEGER NOT NULL,
+    address TEXT,
+    timestamp TEXT,
+    reference INTEGER,
+    total INTEGER,
+    sequence INTEGER,
+    text TEXT,
+    data BLOB,
+    pdu TEXT NOT NULL UNIQUE,
+    archivedTime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messagesAddress ON messages (address);
+"""
+
+
+class StorageUsage(NamedTuple):
+    """
+    Occupancy of a message storage, as given by ``AT+CPMS``.
+    """
+
+    storage: str
+    used: int
+    total: int
+
+    @property
+    def free(self) -> int:
+        return max(self.total - self.used, 0)
+
+    @property
+    def occupancy(self) -> float:
+        """
+        Used fraction of the storage, 1.0 when full.
+        """
+        return self.used / self.total if self.total else 1.0
+
+
+class ArchivedSms(NamedTuple):
+    """
+    Message of the local archive. Concatenated messages are archived by part.
+    """
+
+    id: int
+    storage: str
+    index: Optional[int]
+    stat: int
+    address: Optional[str]
+    # ISO 8601 service centre time stamp
+    timestamp: Optional[str]
+    # Reference, number of parts and sequence number of a concatenated message
+    reference: Optional[int]
+    total: Optional[int]
+    sequence: Optional[int]
+    text: Optional[str]
+    data: Optional[bytes]
+    pdu: str
+    # time.time() of the archiving
+    archivedTime: float
+
+
+def parsePreferredStorage(
+    p_response: list[str], p_storages: Optional[list[str]] = None
+) -> list[StorageUsage]:
+    """
+    Parse the ``+CPMS:`` line of ``AT+CPMS?`` or ``AT+CPMS=``.
+
+    :param p_response: Response, ``+CPMS: <mem1>,<used1>,<total1>,...`` for the read
+        command or ``+CPMS: <used1>,<total1>,...`` for the write command.
+    :type p_response: list[str]
+    :param p_storages: Storages selected by the write command, whose response does not
+        name them.
+    :type p_storages: Optional[list[str]]
+
+    :return: Occupancy of ``<mem1>``, ``<mem2>`` and ``<mem3>``, empty when malformed.
+    :rtype: list[StorageUsage]
+    """
+    lines = findResponseLines(p_response, "+CPMS:")
+    if not lines:
+        return []
+    fields = splitResponseFields(lines[0])
+    named = bool(fields) and not fields[0].isdigit()
+    step = 3 if named else 2
+    usages = []
+    for position in range(0, len(fields) - step + 1, step):
+        if named:
+            storage, used, total = fields[position : position + 3]
+        else:
+            storages = p_storages or []
+            number = position // step
+            storage = storages[number] if number < len(storages) else ""
+            used, total = fields[position : position + 2]
+        if not used.isdigit() or not total.isdigit():
+            return []
+        usages.append(StorageUsage(storage, int(used), int(total)))
+    return usages
+
+
+class QuectelSmsStorage:
+    def __init__(
+        self,
+        p_modem: QuectelModemATCommands,
+        p_archivePath: str = ":memory:",
+        p_batchSize: int = 100,
+        p_highWatermark: float = 0.8,
+    ):
+        """
+        Message storage manager: occupancy of the storages, migration between them, and
+        archiving to a local SQLite database.
+
+        The occupancy given by ``AT+CPMS`` is cached and updated without commands: each
+        ``+CMTI`` counts a received message and ``+QIND: "smsfull"`` marks the storage
+        full. Once ``start`` is called, a worker archives the storage of the received
+        messages (``<mem3>``) when its occupancy reaches ``p_highWatermark``, so that it
+        never fills up under heavy inbound load.
+
+        ``archive`` lists the messages with one ``AT+CMGL``, inserts them in batches of
+        ``p_batchSize`` rows (one transaction per batch, a message archived twice being
+        ignored), then deletes them with one ``AT+CMGD``: the messages received meanwhile
+        are unread, so they are kept. ``migrate`` moves the messages of a storage to
+        another one with ``AT+CMGW``, the received ones being routed to the destination
+        meanwhile. Neither should run with ``QuectelSmsInbox``, which deletes the
+        messages it reads.
+
+        :param p_modem: Opened modem client.
+        :type p_modem: QuectelModemATCommands
+        :param p_archivePath: Path of the SQLite database, ``:memory:`` for an archive
+            lost on exit.
+        :type p_archivePath: str
+        :param p_batchSize: Number of messages inserted by each transaction.
+        :type p_batchSize: int
+        :param p_highWatermark: Occupancy of ``<mem3>`` triggering an archiving.
+        :type p_highWatermark: float
+        """
+        self.modem = p_modem
+        self.batchSize = p_batchSize
+        self.highWatermark = p_highWatermark
+        self.lock = threading.Lock()
+        self.database = sqlite3.connect(p_archivePath, check_same_thread=False)
+        self.database.executescript(ARCHIVE_SCHEMA)
+        # <mem1>, <mem2> and <mem3>
+        self.memories: list[str] = []
+        self.usage: dict[str, StorageUsage] = {}
+        self.archiveRequested = threading.Event()
+        self.running = False
+        self.worker: Optional[threading.Thread] = None
+        self.statistics = {"archived": 0, "migrated": 0, "archivings": 0}
+
+    def __enter__(self) -> "QuectelSmsStorage":
+        self.start()
+        return self
+
+    def __exit__(self, p_type, p_value, p_traceback):
+        self.stop()
+
+    def refresh(self) -> tuple[bool, list[str]]:
+        """
+        Read the selected storages and their occupancy with ``AT+CPMS?``.
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        status, response = (
+            self.modem.shortMessageServiceCommands904PreferredMessageStorageRead()
+        )
+        usages = parsePreferredStorage(response) if status else []
+        if status and len(usages) == 3:
+            self._update(usages)
+        return status and len(usages) == 3, response
+
+    def select(
+        self, p_mem1: str, p_mem2: Optional[str] = None, p_mem3: Optional[str] = None
+    ) -> tuple[bool, list[str]]:
+        """
+        Select the storages with ``AT+CPMS``, updating their occupancy.
+
+        :param p_mem1: Storage read and deleted, ``"SM"`` or ``"ME"``.
+        :type p_mem1: str
+        :param p_mem2: Storage written and sent, None for ``p_mem1``.
+        :type p_mem2: Optional[str]
+        :param p_mem3: Storage of the received messages, None for ``p_mem2``.
+        :type p_mem3: Optional[str]
+
+        :return: Tuple containing the status of the command and the response.
+        :rtype: tuple[bool, list[str]]
+        """
+        mem2 = p_mem2 if p_mem2 is not None else p_mem1
+        memories = [p_mem1, mem2, p_mem3 if p_mem3 is not None else mem2]
+        status, response = (
+            self.modem.shortMessageServiceCommands904PreferredMessageStorageWrite(
+                *memories
+            )
+        )
+        if status:
+            usages = parsePreferredStorage(response, memories)
+            if len(usages) == 3:
+                self._update(usages)
+            else:
+                self.memories = memories
+        return status, response
+
+    def storageUsage(self, p_storage: Optional[str] = None) -> Optional[StorageUsage]:
+        """
+        Get the cached occupancy of a storage.
+
+        :param p_storage: Storage, None for the storage of the received messages.
+        :type p_storage: Optional[str]
+
+        :return: Occupancy, None when unknown.
+        :rtype: Optional[StorageUsage]
+        """
+        with self.lock:
+            if p_storage is None:
+                if len(self.memories) < 3:
+                    return None
+                p_storage = self.memories[2]
+            return self.usage.get(p_storage)
+
+    def start(self) -> tuple[bool, list[str]]:
+        """
+        Track the received messages and start the worker archiving ``<mem3>`` above the
+        high watermark.
+
+        :return: Tuple containing the status of the configuration and the responses.
+        :rtype: tuple[bool, list[str]]
+        """
+        serialPort = self.modem.serialPort
+        serialPort.addUrcHandler(URC_STORED, self._onStored)
+        serialPort.addUrcHandler(URC_STORAGE_FULL, self._onStorageFull)
+
+        response: list[str] = []
+        status = True
+        for commandStatus, commandResponse in (
+            self.modem.statusControlCommands40400ControlUrcIndication("smsfull", 1, 0),
+            self.refresh(),
+        ):
+            status = status and commandStatus
+            response += commandResponse
+        if not status:
+            self._removeHandlers()
+            return status, response
+
+        self.running = True
+        self.worker = threading.Thread(target=self._work, name="SmsStorageThread")
+        self.worker.start()
+        usage = self.storageUsage()
+        if usage is not None and usage.occupancy >= self.highWatermark:
+            self.archiveRequested.set()
+        return status, response
+
+    def stop(self):
+        """
+        Stop the worker.
+        """
+        self._removeHandlers()
+        self.running = False
+        self.archiveRequested.set()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def close(self):
+        """
+        Stop the worker and close the archive.
+        """
+        self.stop()
+        with self.lock:
+            self.database.close()
+
+    def archive(
+        self, p_storage: Optional[str] = None, p_delete: bool = True
+    ) -> tuple[bool, int]:
+        """
+        Archive the messages of a storage into the local database.
+
+        :param p_storage: Storage, None for the storage of the received messages.
+        :type p_storage: Optional[str]
+        :param p_delete: Delete the archived messages from the storage.
+        :type p_delete: bool
+
+        :return: Tuple containing the status of the archiving and the number of messages
+            archived.
+        :rtype: tuple[bool, int]
+        """
+        if len(self.memories) < 3 and not self.refresh()[0]:
+            return False, 0
+        memories = list(self.memories)
+        storage = p_storage if p_storage is not None else memories[2]
+        if storage != memories[0] and not self.select(storage, *memories[1:])[0]:
+            return False, 0
+
+        status, entries = self._list()
+        archived = 0
+        if status:
+            self.statistics["archivings"] += 1
+            for offset in range(0, len(entries), self.batchSize):
+                self._insert(storage, entries[offset : offset + self.batchSize])
+            archived = len(entries)
+            self.statistics["archived"] += archived
+            if p_delete and entries:
+                # The messages received after the listing are unread: they are kept
+                status, _ = self.modem.shortMessageServiceCommands905DeleteMessage(
+                    0, DELFLAG_READ_SENT_UNSENT
+                )
+
+        # Read while the storage is selected, the others are counted by the selection
+        self.refresh()
+        if storage != memories[0]:
+            self.select(*memories)
+        return status, archived
+
+    def migrate(self, p_source: str, p_destination: str) -> tuple[bool, int]:
+        """
+        Move every message of a storage to another one, e.g. from ``"SM"`` to ``"ME"``.
+
+        The received messages are stored in the destination during the migration, then
+        the source is emptied with one ``AT+CMGD``. The selected storages are restored at
+        the end.
+
+        :param p_source: Storage emptied.
+        :type p_source: str
+        :param p_destination: Storage the messages are written to.
+        :type p_destination: str
+
+        :return: Tuple containing the status of the migration and the number of messages
+            moved. On failure, e.g. when the destination is full, the moved messages are
+            left in the source too.
+        :rtype: tuple[bool, int]
+        """
+        if len(self.memories) < 3 and not self.refresh()[0]:
+            return False, 0
+        memories = list(self.memories)
+        if not self.select(p_source, p_destination, p_destination)[0]:
+            return False, 0
+
+        status, entries = self._list()
+        moved = 0
+        for entry in entries if status else []:
+            status, _ = (
+                self.modem.shortMessageServiceCommands910WriteMessageToMemoryPduMode(
+                    entry.length, entry.pdu, entry.stat
+                )
+            )
+            if not status:
+                break
+            moved += 1
+        if status and entries:
+            status, _ = self.modem.shortMessageServiceCommands905DeleteMessage(
+                0, DELFLAG_ALL
+            )
+        self.statistics["migrated"] += moved if status else 0
+
+        self.refresh()
+        self.select(*memories)
+        return status, moved
+
+    def archivedMessages(
+        self, p_address: Optional[str] = None, p_limit: int = 100
+    ) -> list[ArchivedSms]:
+        """
+        Get archived messages, the most recently archived first.
+
+        :param p_address: Originator or destination address, None for every message.
+        :type p_address: Optional[str]
+        :param p_limit: Maximum number of messages.
+        :type p_limit: int
+
+        :return: Messages.
+        :rtype: list[ArchivedSms]
+        """
+        query = "SELECT * FROM messages"
+        parameters: tuple = ()
+        if p_address is not None:
+            query += " WHERE address = ?"
+            parameters = (p_address,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self.lock:
+            rows = self.database.execute(query, parameters + (p_limit,)).fetchall()
+        return [ArchivedSms(*row) for row in rows]
+
+    def _list(self) -> tuple[bool, list[SmsListEntry]]:
+        """
+        List every message of ``<mem1>`` in PDU mode, marking the unread ones read. The
+        message format is restored afterwards, see ``messageFormat``.
+        """
+        with self.modem.messageFormat(0) as (status, _):
+            if not status:
+                return False, []
+            lines = list(self.modem.streamCommand("AT+CMGL=4", 30))
+        if not lines or lines[-1] != "OK":
+            return False, []
+        return True, parseListPdu(lines)
+
+    def _insert(self, p_storage: str, p_entries: list[SmsListEntry]):
+        now = time.time()
+        rows = []
+        for entry in p_entries:
+            if entry.message is None:
+                rows.append(
+                    (p_storage, entry.index, entry.stat)
+                    + (None,) * 7
+                    + (entry.pdu, now)
+                )
+                continue
+            part = smsPart(entry.message, entry.index, entry.stat)
+            concatenated = part.reference is not None
+            rows.append(
+                (
+                    p_storage,
+                    entry.index,
+                    entry.stat,
+                    part.address,
+                    part.timestamp.isoformat() if part.timestamp else None,
+                    part.reference,
+                    part.total if concatenated else None,
+                    part.sequence if concatenated else None,
+                    part.text,
+                    part.data,
+                    entry.pdu,
+                    now,
+                )
+            )
+        with self.lock:
+            with self.database:
+                self.database.executemany(
+                    "INSERT OR IGNORE INTO messages (storage, storageIndex, stat, "
+                    "address, timestamp, reference, total, sequence, text, data, pdu, "
+                    "archivedTime) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    def _update(self, p_usages: list[StorageUsage]):
+        with self.lock:
+            self.memories = [usage.storage for usage in p_usages]
+            for usage in p_usages:
+                self.usage[usage.storage] = usage
+
+    def _removeHandlers(self):
+        serialPort = self.modem.serialPort
+        serialPort.removeUrcHandler(URC_STORED, self._onStored)
+        serialPort.removeUrcHandler(URC_STORAGE_FULL, self._onStorageFull)
+
+    def _onStored(self, p_urc: str):
+        # +CMTI: <mem>,<index>
+        fields = splitResponseFields(p_urc)
+        with self.lock:
+            usage = self.usage.get(fields[0])
+            if usage is None:
+                return
+            usage = usage._replace(used=min(usage.used + 1, usage.total))
+            self.usage[usage.storage] = usage
+        if usage.occupancy >= self.highWatermark:
+            self.archiveRequested.set()
+
+    def _onStorageFull(self, p_urc: str):
+        # +QIND: "smsfull",<storage>
+        fields = splitResponseFields(p_urc)
+        with self.lock:
+            usage = self.usage.get(fields[1]) if len(fields) > 1 else None
+            if usage is not None:
+                self.usage[usage.storage] = usage._replace(used=usage.total)
+        self.archiveRequested.set()
+
+    def _work(self):
+        """
+        Archive ``<mem3>`` when requested by the URCs.
+        """
+        while self.running:
+            self.archiveRequested.wait()
+            self.archiveRequested.clear()
+            if self.running:
+                self.archive()
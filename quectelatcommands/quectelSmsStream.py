@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, NamedTuple, Optional
+from quectelatcommands.quectelResponseParser import splitResponseFields
+from quectelatcommands.quectelSerial import isFinalResultCode
+from quectelatcommands.quectelSmsPdu import SmsPdu, decodePdu
+
+# <stat> of the text mode, indexed by the <stat> of the PDU mode
+TEXT_STATS = ("REC UNREAD", "REC READ", "STO UNSENT", "STO SENT", "ALL")
+
+# Header lines of the messages of AT+CMGL, AT+CMGR and AT+QCMGR
+MESSAGE_HEADERS = ("+CMGL:", "+CMGR:", "+QCMGR:")
+
+# Service centre time stamp of the text mode, e.g. "26/10/19,12:34:56+08"
+_TEXT_TIMESTAMP = re.compile(
+    r"^(\d{2})/(\d{2})/(\d{2}),(\d{2}):(\d{2}):(\d{2})([+-]\d{1,2})$"
+)
+
+
+class SmsPart(NamedTuple):
+    """
+    Stored message, or part of a concatenated message.
+    """
+
+    # Storage index, None when not given by the response
+    index: Optional[int]
+    # 0 received unread, 1 received read, 2 stored unsent, 3 stored sent
+    stat: int
+    address: str
+    timestamp: Optional[datetime]
+    # Reference of the concatenated message, None when not concatenated
+    reference: Optional[int]
+    # Number of parts and sequence number, from 1
+    total: int
+    sequence: int
+    # Decoded text, None for 8 bit data
+    text: Optional[str]
+    data: bytes
+
+
+class SmsMessage(NamedTuple):
+    """
+    Message reassembled from its parts.
+    """
+
+    # Storage indexes of the parts, to delete them
+    indexes: tuple[int, ...]
+    stat: int
+    address: str
+    # Time stamp of the first part
+    timestamp: Optional[datetime]
+    # Text, None for 8 bit data
+    text: Optional[str]
+    data: bytes
+    total: int
+    # False when parts are missing: the parts received are joined in order
+    complete: bool
+
+
+def parseTextTimestamp(p_timestamp: str) -> Optional[datetime]:
+    """
+    Parse a service centre time stamp of the text mode.
+
+    :param p_timestamp: Time stamp, e.g. ``26/10/19,12:34:56+08``, time zone in
+        quarters of an hour.
+    :type p_timestamp: str
+
+    :return: Time stamp, None when malformed.
+    :rtype: Optional[datetime]
+    """
+    match = _TEXT_TIMESTAMP.match(p_timestamp.strip('"'))
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, zone = match.groups()
+    try:
+        return datetime(
+            2000 + int(year),
+            int(month),
+            int(day),
+            int(hour),
+            int(minute),
+            int(second),
+            tzinfo=timezone(timedelta(minutes=15 * int(zone))),
+        )
+    except ValueError:
+        return None
+
+
+def _stat(p_field: str) -> int:
+    field = p_field.strip('"')
+    return int(field) if field.isdigit() else TEXT_STATS.index(field)
+
+
+def smsPart(p_message: SmsPdu, p_index: Optional[int], p_stat: int) -> SmsPart:
+    """
+    Get the part of a decoded PDU, e.g. of a ``+CMT`` URC.
+
+    :param p_message: Decoded PDU.
+    :type p_message: SmsPdu
+    :param p_index: Storage index, None for a message not stored.
+    :type p_index: Optional[int]
+    :param p_stat: 0 received unread, 1 received read, 2 stored unsent, 3 stored sent.
+    :type p_stat: int
+
+    :return: Part, with the concatenation information of the user data header.
+    :rtype: SmsPart
+    """
+    reference, total, sequence = p_message.concatenation or (None, 1, 1)
+    return SmsPart(
+        p_index,
+        p_stat,
+        p_message.address,
+        p_message.timestamp,
+        reference,
+        total,
+        sequence,
+        p_message.text,
+        p_message.data,
+    )
+
+
+def _parsePdu(p_header: str, p_pdu: str, p_index: Optional[int]) -> Optional[SmsPart]:
+    """
+    Parse a message of the PDU mode: ``+CMGL: <index>,<stat>,[<alpha>],<length>`` or
+    ``+CMGR: <stat>,[<alpha>],<length>``, then the PDU.
+    """
+    fields = splitResponseFields(p_header)
+    try:
+        if p_header.startswith("+CMGL:"):
+            index: Optional[int] = int(fields[0])
+            fields = fields[1:]
+        else:
+            index = p_index
+        stat = int(fields[0])
+        message = decodePdu(p_pdu)
+    except (ValueError, IndexError):
+        return None
+    return smsPart(message, index, stat)
+
+
+def _parseText(
+    p_header: str, p_body: list[str], p_index: Optional[int]
+) -> Optional[SmsPart]:
+    """
+    Parse a message of the text mode: ``+CMGL``, ``+CMGR`` or ``+QCMGR`` header, then
+    the text lines.
+    """
+    fields = splitResponseFields(p_header)
+    try:
+        index = p_index
+        if p_header.startswith("+CMGL:"):
+            index = int(fields[0])
+            fields = fields[1:]
+        stat = _stat(fields[0])
+
+        reference: Optional[int] = None
+        total = sequence = 1
+        if p_header.startswith("+QCMGR:") and len(fields) >= 6:
+            uid, segment, segments = (int(field) for field in fields[-3:])
+            if segments > 1 and segment > 0:
+                reference, total, sequence = uid, segments, segment
+    except (ValueError, IndexError):
+        return None
+
+    # The time stamp follows the address and the alpha of received messages
+    timestamp = parseTextTimestamp(fields[3]) if len(fields) > 3 else None
+    address = fields[1] if len(fields) > 1 else ""
+    return SmsPart(
+        index,
+        stat,
+        address,
+        timestamp,
+        reference,
+        total,
+        sequence,
+        "\n".join(p_body),
+        b"",
+    )
+
+
+def iterSmsParts(
+    p_lines: Iterable[str], p_index: Optional[int] = None
+) -> Iterator[SmsPart]:
+    """
+    Parse the messages of ``AT+CMGL``, ``AT+CMGR`` or ``AT+QCMGR`` responses as their
+    lines arrive, in PDU or text mode.
+
+    A message of the PDU mode is given as soon as its PDU line is received; one of the
+    text mode, whose text may span several lines, when the next header or the final
+    result code is received.
+
+    :param p_lines: Response lines, e.g. from ``streamCommand``.
+    :type p_lines: Iterable[str]
+    :param p_index: Storage index of the messages of ``AT+CMGR`` and ``AT+QCMGR``,
+        whose responses do not give it.
+    :type p_index: Optional[int]
+
+    :return: Messages, malformed ones skipped.
+    :rtype: Iterator[SmsPart]
+    """
+    header: Optional[str] = None
+    pduMode = False
+    body: list[str] = []
+    for line in p_lines:
+        if line.startswith(MESSAGE_HEADERS) or isFinalResultCode(line):
+            if header is not None and not pduMode:
+                part = _parseText(header, body, p_index)
+                if part is not None:
+                    yield part
+            header, body = None, []
+            if isFinalResultCode(line):
+                continue
+            header = line
+            fields = splitResponseFields(line)
+            # The <stat> of the PDU mode is an integer, that of the text mode a string
+            statIndex = 1 if line.startswith("+CMGL:") else 0
+            stat = fields[statIndex] if len(fields) > statIndex else ""
+            pduMode = not line.startswith("+QCMGR:") and stat.isdigit()
+        elif header is not None and pduMode:
+            part = _parsePdu(header, line, p_index)
+            if part is not None:
+                yield part
+            header = None
+        elif header is not None:
+            body.append(line)
+
+    if header is not None and not pduMode:
+        part = _parseText(header, body, p_index)
+        if part is not None:
+            yield part
+
+
+class QuectelSmsReassembler:
+    def __init__(self, p_maxPending: int = 64):
+        """
+        Reassemble concatenated messages, from the reference of their user data header
+        (PDU mode) or the ``<uid>,<msg_seg>,<msg_total>`` of ``AT+QCMGR`` (text mode).
+
+        At most ``p_maxPending`` concatenated messages wait for their missing parts: the
+        oldest one is given incomplete when another one arrives, so that memory stays
+        bounded whatever the number of stored messages.
+
+        :param p_maxPending: Maximum number of incomplete concatenated messages kept.
+        :type p_maxPending: int
+        """
+        self.maxPending = p_maxPending
+        # (address, reference, total) to the parts received, by sequence number
+        self.pending: OrderedDict[tuple[str, int, int], dict[int, SmsPart]] = (
+            OrderedDict()
+        )
+
+    def add(self, p_part: SmsPart) -> list[SmsMessage]:
+        """
+        Add a message or a part.
+
+        :param p_part: Message or part.
+        :type p_part: SmsPart
+
+        :return: Messages completed by the part, and those evicted incomplete.
+        :rtype: list[SmsMessage]
+        """
+        if p_part.reference is None or p_part.total <= 1:
+            return [self._assemble([p_part], 1)]
+
+        key = (p_part.address, p_part.reference, p_part.total)
+        parts = self.pending.setdefault(key, {})
+        parts[p_part.sequence] = p_part
+        if len(parts) >= p_part.total:
+            del self.pending[key]
+            return [self._assemble(list(parts.values()), p_part.total)]
+
+        evicted = []
+        while len(self.pending) > self.maxPending:
+            (_, _, total), oldest = self.pending.popitem(last=False)
+            evicted.append(self._assemble(list(oldest.values()), total))
+        return evicted
+
+    def flush(self) -> list[SmsMessage]:
+        """
+        Give the concatenated messages still waiting for parts, incomplete.
+
+        :return: Incomplete messages, oldest first.
+        :rtype: list[SmsMessage]
+        """
+        messages = [
+            self._assemble(list(parts.values()), total)
+            for (_, _, total), parts in self.pending.items()
+        ]
+        self.pending.clear()
+        return messages
+
+    def _assemble(self, p_parts: list[SmsPart], p_total: int) -> SmsMessage:
+        parts = sorted(p_parts, key=lambda part: part.sequence)
+        texts = [part.text for part in parts]
+        first = parts[0]
+        return SmsMessage(
+            tuple(part.index for part in parts if part.index is not None),
+            first.stat,
+            first.address,
+            first.timestamp,
+            "".join(texts) if None not in texts else None,
+            b"".join(part.data for part in parts),
+            p_total,
+            len(parts) == p_total,
+        )
+
+
+def streamSms(
+    p_lines: Iterable[str],
+    p_reassembler: Optional[QuectelSmsReassembler] = None,
+    p_index: Optional[int] = None,
+    p_flush: bool = True,
+) -> Iterator[SmsMessage]:
+    """
+    Parse and reassemble the messages of ``AT+CMGL``, ``AT+CMGR`` or ``AT+QCMGR``
+    responses as their lines arrive.
+
+    :param p_lines: Response lines, e.g. from ``streamCommand``.
+    :type p_lines: Iterable[str]
+    :param p_reassembler: Reassembler to use, e.g. to join the parts read by several
+        commands. None for a new one.
+    :type p_reassembler: Optional[QuectelSmsReassembler]
+    :param p_index: Storage index of the message of ``AT+CMGR`` and ``AT+QCMGR``.
+    :type p_index: Optional[int]
+    :param p_flush: Give the incomplete messages at the end of the lines.
+    :type p_flush: bool
+
+    :return: Messages, as soon as they are complete.
+    :rtype: Iterator[SmsMessage]
+    """
+    reassembler = (
+        p_reassembler if p_reassembler is not None else QuectelSmsReassembler()
+    )
+    for part in iterSmsParts(p_lines, p_index):
+        yield from reassembler.add(part)
+    if p_flush:
+        yield from reassembler.flush()
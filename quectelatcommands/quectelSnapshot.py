@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+import gzip
+import json
+import re
+from collections import deque
+from typing import Any, Callable, Union
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    responsePrefix,
+    splitResponseFields,
+)
+
+SNAPSHOT_VERSION = 1
+
+# Read commands that are settings and how their response is written back: number of
+# leading fields of the first line, "lines" to write every response line as is, or
+# "storages" to write the storage names of AT+CPMS? without their occupancy.
+# Reads that change the radio, the link or the network state (AT+CFUN?, AT+IPR?,
+# AT+COPS?, AT+CGATT?, AT+CGACT?, AT+QGPS?, ...) are captured but never replayed.
+RESTORE_RULES: dict[str, Union[int, str]] = {
+    "AT+CMEE?": 1,
+    "AT+CSCS?": 1,
+    "AT+IFC?": 2,
+    "AT+CREG?": 1,
+    "AT+CGREG?": 1,
+    "AT+CEREG?": 1,
+    "AT+CTZU?": 1,
+    "AT+CTZR?": 1,
+    "AT+COLP?": 1,
+    "AT^DSCI?": 1,
+    "AT+CPBS?": 1,
+    "AT+CSMS?": 1,
+    "AT+CMGF?": 1,
+    "AT+CPMS?": "storages",
+    "AT+CSCA?": 2,
+    "AT+CNMI?": 5,
+    "AT+CSCB?": 3,
+    "AT+CSDH?": 1,
+    "AT+CSMP?": 4,
+    "AT+CGDCONT?": "lines",
+    "AT+CGQREQ?": "lines",
+    "AT+CGQMIN?": "lines",
+    "AT+CGEQREQ?": "lines",
+    "AT+CGEQMIN?": "lines",
+    "AT+CGEREP?": 2,
+    "AT+CGSMS?": 1,
+    "AT+QAUGDCNT?": 1,
+    "AT+QCEERCATCFG?": 1,
+    "AT+QSCLK?": 1,
+    "AT+QSIMDET?": 2,
+    "AT+QSIMSTAT?": 1,
+    "AT+QGPSXTRA?": 1,
+    "AT+QGPSSUPLURL?": 1,
+}
+
+# Basic settings of AT&V that can be written back. E, Q, V, S3 and S4 are left out:
+# the serial layer relies on verbose result codes and on the line termination.
+RESTORABLE_BASIC_SETTINGS = ("&C", "&D", "X", "S0", "S6", "S7", "S8", "S10")
+
+_SUB_COMMAND_READ = re.compile(r'^AT\+\w+="[^"]*"$')
+
+
+def captureReadCommands(p_client: Any) -> dict[str, str]:
+    """
+    Get the AT command sent by every ``*Read`` method of a client, without sending it.
+
+    Only queries (``AT+X?``) and sub-command reads (``AT+X="name"``) are kept, so that
+    taking a snapshot never changes a setting.
+
+    :param p_client: QuectelModemATCommands or QuectelGnssATCommands.
+    :type p_client: Any
+
+    :return: Method name to AT command.
+    :rtype: dict[str, str]
+    """
+    commands = {}
+    p_client.capturedCommands = []
+    try:
+        for name in sorted(dir(p_client)):
+            if not name.endswith("Read") or not callable(getattr(p_client, name)):
+                continue
+            del p_client.capturedCommands[:]
+            getattr(p_client, name)()
+            if len(p_client.capturedCommands) != 1:
+                continue
+            command = p_client.capturedCommands[0].strip()
+            if command.endswith("?") or _SUB_COMMAND_READ.match(command):
+                commands[name] = command
+    finally:
+        p_client.capturedCommands = None
+
+    return commands
+
+
+def takeSnapshot(p_client: Any, p_extraCommands: list[str]) -> dict:
+    """
+    Read every setting of a client in one batch.
+
+    :param p_client: Opened QuectelModemATCommands or QuectelGnssATCommands.
+    :type p_client: Any
+    :param p_extraCommands: Additional commands to capture, e.g. ``AT&V``.
+    :type p_extraCommands: list[str]
+
+    :return: Snapshot, with the response of every command.
+    :rtype: dict
+    """
+    commands = captureReadCommands(p_client)
+    allCommands = list(dict.fromkeys(list(commands.values()) + p_extraCommands))
+    results = dict(zip(allCommands, p_client.sendCommandBatch(allCommands)))
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "class": type(p_client).__name__,
+        "reads": {
+            command: response
+            for command, (status, response) in results.items()
+            if status
+        },
+    }
+
+
+def saveSnapshot(p_snapshot: dict, p_fileName: str):
+    """
+    Write a snapshot to a compact JSON file, gzip-compressed if the name ends with ``.gz``.
+
+    :param p_snapshot: Snapshot to write.
+    :type p_snapshot: dict
+    :param p_fileName: Path of the file.
+    :type p_fileName: str
+    """
+    data = json.dumps(p_snapshot, separators=(",", ":")).encode()
+    opener: Callable = gzip.open if p_fileName.endswith(".gz") else open
+    with opener(p_fileName, "wb") as f:
+        f.write(data)
+
+
+def loadSnapshot(p_fileName: str) -> dict:
+    """
+    Read a snapshot written by ``saveSnapshot``.
+
+    :param p_fileName: Path of the file.
+    :type p_fileName: str
+
+    :raises ValueError: If the snapshot version is not supported.
+
+    :return: Snapshot.
+    :rtype: dict
+    """
+    opener: Callable = gzip.open if p_fileName.endswith(".gz") else open
+    with opener(p_fileName, "rb") as f:
+        snapshot = json.loads(f.read())
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {snapshot.get('version')}")
+    return snapshot
+
+
+def parseConfiguration(p_response: list[str]) -> dict[str, str]:
+    """
+    Parse the response of ``AT&V``.
+
+    Both one setting per line (``&C: 1``) and several settings per line separated by
+    ``;`` are accepted.
+
+    :param p_response: Response of ``AT&V``.
+    :type p_response: list[str]
+
+    :return: Setting name to value, e.g. ``{"&C": "1", "S0": "0"}``.
+    :rtype: dict[str, str]
+    """
+    settings = {}
+    for line in p_response:
+        for item in line.split(";"):
+            name, separator, value = item.partition(":")
+            if separator and name.strip():
+                settings[name.strip().upper()] = value.strip()
+    return settings
+
+
+def restoreCommands(p_snapshot: dict) -> list[str]:
+    """
+    Build the write commands that bring a modem back to a snapshot.
+
+    :param p_snapshot: Snapshot, as returned by ``takeSnapshot``.
+    :type p_snapshot: dict
+
+    :return: AT commands to send.
+    :rtype: list[str]
+    """
+    commands = []
+    for command, response in p_snapshot["reads"].items():
+        prefix = responsePrefix(command)
+        lines = findResponseLines(response, prefix.split(" ")[0])
+
+        if _SUB_COMMAND_READ.match(command):
+            if lines:
+                parameters = lines[0].split(":", 1)[1].strip()
+                commands.append(f"{command.split('=')[0]}={parameters}")
+            continue
+
+        rule = RESTORE_RULES.get(command)
+        if rule is None or not lines:
+            continue
+        writeCommand = command[:-1] + "="
+        if rule == "lines":
+            for line in lines:
+                commands.append(writeCommand + line.split(":", 1)[1].strip())
+        elif rule == "storages":
+            fields = splitResponseFields(lines[0], True)
+            commands.append(writeCommand + ",".join(fields[0::3]))
+        else:
+            fields = splitResponseFields(lines[0], True)
+            commands.append(writeCommand + ",".join(fields[: int(rule)]))
+
+    configuration = parseConfiguration(p_snapshot["reads"].get("AT&V", []))
+    basic = "".join(
+        (
+            f"{name}={configuration[name]}"
+            if name.startswith("S")
+            else name + configuration[name]
+        )
+        for name in RESTORABLE_BASIC_SETTINGS
+        if configuration.get(name, "").isdigit()
+    )
+    if basic:
+        commands.append("AT" + basic)
+
+    return commands
+
+
+def _currentWrites(p_client: Any, p_reads: list[str]) -> dict[str, list[str]]:
+    """
+    Read settings in one batch and get the writes that would restore their current
+    values, an empty list for a failed read.
+    """
+    results = p_client.sendCommandBatch(p_reads)
+    return {
+        read: restoreCommands({"reads": {read: response}}) if status else []
+        for read, (status, response) in zip(p_reads, results)
+    }
+
+
+def restoreSnapshot(
+    p_client: Any, p_snapshot: dict, p_maxLineLength: int = 256
+) -> tuple[bool, list[str]]:
+    """
+    Write a snapshot back to a client.
+
+    The current settings are read in one batch and only the writes that change them are
+    sent, concatenated with ``;`` into command lines of at most ``p_maxLineLength``
+    characters. The modem stops executing a command line at its first error: the
+    settings of a failed line are read again, each write being reported from the state
+    read, and the writes after the failed one are sent in the next line. No write is sent
+    twice.
+
+    :param p_client: Opened QuectelModemATCommands or QuectelGnssATCommands.
+    :type p_client: Any
+    :param p_snapshot: Snapshot, as returned by ``takeSnapshot`` or ``loadSnapshot``.
+    :type p_snapshot: dict
+    :param p_maxLineLength: Maximum length of a concatenated command line.
+    :type p_maxLineLength: int
+
+    :return: Tuple containing the status of the writes and one line per write, the
+        writes of the settings already in the snapshot state included.
+    :rtype: tuple[bool, list[str]]
+    """
+    # (write, read command of the setting), in the order of restoreCommands
+    plan = [
+        (write, read)
+        for read, response in p_snapshot["reads"].items()
+        for write in restoreCommands({"reads": {read: response}})
+    ]
+    reads = list(dict.fromkeys(read for _, read in plan))
+    current = _currentWrites(p_client, reads)
+    statuses: dict[int, bool] = {}
+    pending: deque[int] = deque()
+    for index, (write, read) in enumerate(plan):
+        if write in current[read]:
+            statuses[index] = True
+        else:
+            pending.append(index)
+
+    while pending:
+        line = [pending.popleft()]
+        length = len(plan[line[0]][0])
+        # ";" separator plus the command without its "AT" prefix
+        while pending and length + len(plan[pending[0]][0]) - 1 <= p_maxLineLength:
+            length += len(plan[pending[0]][0]) - 1
+            line.append(pending.popleft())
+
+        writes = [plan[index][0] for index in line]
+        status, _ = p_client.serialPort.sendCommand(
+            writes[0] + "".join(";" + write[2:] for write in writes[1:]),
+            max(2, 0.5 * len(writes)),
+        )
+        if status or len(line) == 1:
+            statuses.update((index, status) for index in line)
+            continue
+
+        # The writes before the failed one were executed, those after it were not
+        after = _currentWrites(p_client, list(dict.fromkeys(plan[i][1] for i in line)))
+        failed = False
+        notExecuted = []
+        for index in line:
+            write, read = plan[index]
+            if write in after[read]:
+                statuses[index] = True
+            elif not failed:
+                statuses[index] = False
+                failed = True
+            else:
+                notExecuted.append(index)
+        pending.extendleft(reversed(notExecuted))
+
+    report = [
+        f"{write} {'OK' if statuses[index] else 'ERROR'}"
+        for index, (write, _) in enumerate(plan)
+    ]
+    return all(statuses.values()), report
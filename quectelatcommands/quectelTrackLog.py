@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+
+import datetime
+import glob
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Iterator, NamedTuple, Optional, TextIO
+from quectelatcommands.quectelGnssPosition import GnssPosition
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Segment header: magic, version, record size, capacity, count
+TRACK_HEADER = struct.Struct("<4sHHII")
+TRACK_MAGIC = b"QTRK"
+TRACK_VERSION = 1
+
+# Fix record: time (seconds since the epoch, UTC), latitude, longitude (degree),
+# altitude (meter), speed (km/h), HDOP, satellites, fix type and padding
+TRACK_RECORD = struct.Struct("<dddfffBBxx")
+
+TRACK_COLUMNS = (
+    "time",
+    "latitude",
+    "longitude",
+    "altitude",
+    "speedKmh",
+    "hdop",
+    "satellites",
+    "fix",
+)
+
+if np is not None:
+    TRACK_DTYPE = np.dtype(
+        {
+            "names": list(TRACK_COLUMNS),
+            "formats": ["<f8", "<f8", "<f8", "<f4", "<f4", "<f4", "u1", "u1"],
+            "offsets": [0, 8, 16, 24, 28, 32, 36, 37],
+            "itemsize": TRACK_RECORD.size,
+        }
+    )
+
+
+class TrackRecord(NamedTuple):
+    """
+    Fix stored in a track log.
+    """
+
+    # Seconds since the epoch, UTC
+    time: float
+    latitude: float
+    longitude: float
+    altitude: float
+    speedKmh: float
+    hdop: float
+    satellites: int
+    fix: int
+
+
+def positionTime(p_position: GnssPosition) -> float:
+    """
+    Get the time of a position in seconds since the epoch.
+
+    :param p_position: Position, the current UTC date being used when it has no date.
+    :type p_position: GnssPosition
+
+    :return: Seconds since the epoch, UTC. The current time if the position has no time.
+    :rtype: float
+    """
+    if p_position.utc is None:
+        return time.time()
+    date = p_position.date or datetime.datetime.now(datetime.timezone.utc).date()
+    midnight = datetime.datetime(
+        date.year, date.month, date.day, tzinfo=datetime.timezone.utc
+    )
+    return midnight.timestamp() + p_position.utc
+
+
+def _segmentFileNames(p_directory: str) -> list[str]:
+    return sorted(glob.glob(os.path.join(p_directory, "track-*.bin")))
+
+
+def _isoTime(p_time: float) -> str:
+    return (
+        datetime.datetime.fromtimestamp(p_time, datetime.timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+class QuectelTrackWriter:
+    def __init__(
+        self,
+        p_directory: str,
+        p_segmentRecords: int = 65536,
+        p_maxSegments: int = 16,
+    ):
+        """
+        Append-only log of fixes in fixed-width binary records.
+
+        Records are written into memory-mapped segment files of ``p_segmentRecords``
+        records (``track-00000001.bin``, ...), preallocated when created. When the last
+        segment is full a new one is started, and the oldest ones are deleted beyond
+        ``p_maxSegments``, so that the log has a bounded size. The record count in the
+        segment header is updated after each record, so that readers only see complete
+        records.
+
+        :param p_directory: Directory of the segment files.
+        :type p_directory: str
+        :param p_segmentRecords: Number of records per segment.
+        :type p_segmentRecords: int
+        :param p_maxSegments: Maximum number of segments kept, 0 for no limit.
+        :type p_maxSegments: int
+        """
+        self.directory = p_directory
+        self.segmentRecords = p_segmentRecords
+        self.maxSegments = p_maxSegments
+        self.file = None
+        self.map: Optional[mmap.mmap] = None
+        self.segment = 0
+        self.count = 0
+        self.capacity = 0
+
+    def __enter__(self) -> "QuectelTrackWriter":
+        self.open()
+        return self
+
+    def __exit__(self, p_type, p_value, p_traceback):
+        self.close()
+
+    def open(self):
+        """
+        Open the last segment, or create the first one.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fileNames = _segmentFileNames(self.directory)
+        if not fileNames:
+            self._createSegment(1)
+            return
+
+        fileName = fileNames[-1]
+        self.segment = int(os.path.basename(fileName)[6:-4])
+        self.file = open(fileName, "r+b")
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        _, _, _, self.capacity, self.count = TRACK_HEADER.unpack_from(self.map, 0)
+
+    def close(self):
+        """
+        Flush and close the current segment.
+        """
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def flush(self):
+        """
+        Write the current segment to the disk.
+        """
+        if self.map is not None:
+            self.map.flush()
+
+    def append(self, p_position: GnssPosition, p_time: Optional[float] = None):
+        """
+        Append a fix.
+
+        :param p_position: Fix, e.g. from ``QuectelGnssSession.fixes()``.
+        :type p_position: GnssPosition
+        :param p_time: Time of the fix, in seconds since the epoch.
+            ``positionTime(p_position)`` if None.
+        :type p_time: Optional[float]
+        """
+        self.appendRecord(
+            TrackRecord(
+                positionTime(p_position) if p_time is None else p_time,
+                p_position.latitude,
+                p_position.longitude,
+                p_position.altitude,
+                p_position.speedKmh,
+                p_position.hdop,
+                p_position.satellites,
+                p_position.fix,
+            )
+        )
+
+    def appendRecord(self, p_record: TrackRecord):
+        """
+        Append a record.
+
+        :param p_record: Record.
+        :type p_record: TrackRecord
+        """
+        if self.count >= self.capacity:
+            self.close()
+            self._createSegment(self.segment + 1)
+
+        TRACK_RECORD.pack_into(
+            self.map, TRACK_HEADER.size + self.count * TRACK_RECORD.size, *p_record
+        )
+        self.count += 1
+        TRACK_HEADER.pack_into(
+            self.map,
+            0,
+            TRACK_MAGIC,
+            TRACK_VERSION,
+            TRACK_RECORD.size,
+            self.capacity,
+            self.count,
+        )
+
+    def _createSegment(self, p_segment: int):
+        fileName = os.path.join(self.directory, f"track-{p_segment:08d}.bin")
+        size = TRACK_HEADER.size + self.segmentRecords * TRACK_RECORD.size
+        with open(fileName + ".tmp", "wb") as f:
+            f.write(
+                TRACK_HEADER.pack(
+                    TRACK_MAGIC,
+                    TRACK_VERSION,
+                    TRACK_RECORD.size,
+                    self.segmentRecords,
+                    0,
+                )
+            )
+            f.truncate(size)
+        os.replace(fileName + ".tmp", fileName)
+
+        self.segment = p_segment
+        self.capacity = self.segmentRecords
+        self.count = 0
+        self.file = open(fileName, "r+b")
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+        if self.maxSegments > 0:
+            for oldFileName in _segmentFileNames(self.directory)[: -self.maxSegments]:
+                os.remove(oldFileName)
+
+
+class QuectelTrackReader:
+    def __init__(self, p_directory: str):
+        """
+        Reader of the track log written by ``QuectelTrackWriter``, which may still be
+        appending.
+
+        :param p_directory: Directory of the segment files.
+        :type p_directory: str
+        """
+        self.directory = p_directory
+
+    def segments(self) -> list[tuple[str, int]]:
+        """
+        List the segments, oldest first.
+
+        :return: File name and number of records of each segment.
+        :rtype: list[tuple[str, int]]
+        """
+        segments = []
+        for fileName in _segmentFileNames(self.directory):
+            with open(fileName, "rb") as f:
+                header = f.read(TRACK_HEADER.size)
+            if len(header) < TRACK_HEADER.size:
+                continue
+            magic, _, recordSize, _, count = TRACK_HEADER.unpack(header)
+            if magic == TRACK_MAGIC and recordSize == TRACK_RECORD.size:
+                segments.append((fileName, count))
+        return segments
+
+    def arrays(self) -> Iterator["np.ndarray"]:
+        """
+        Map each segment as a structured array, without copying. Requires ``numpy``.
+
+        :return: Generator of read-only arrays of ``TRACK_DTYPE``, one per segment.
+        :rtype: Iterator[np.ndarray]
+        """
+        if np is None:
+            raise ImportError(
+                "numpy is required to map the track: pip install quectelatcommands[numpy]"
+            )
+        for fileName, count in self.segments():
+            if count:
+                yield np.memmap(
+                    fileName,
+                    dtype=TRACK_DTYPE,
+                    mode="r",
+                    offset=TRACK_HEADER.size,
+                    shape=(count,),
+                )
+
+    def read(
+        self, p_start: Optional[float] = None, p_end: Optional[float] = None
+    ) -> "np.ndarray":
+        """
+        Read the records of a time range into one array. Requires ``numpy``.
+
+        :param p_start: First time, in seconds since the epoch. None for no limit.
+        :type p_start: Optional[float]
+        :param p_end: Time after the last record. None for no limit.
+        :type p_end: Optional[float]
+
+        :return: Array of ``TRACK_DTYPE``.
+        :rtype: np.ndarray
+        """
+        parts = []
+        for array in self.arrays():
+            mask = np.ones(len(array), dtype=bool)
+            if p_start is not None:
+                mask &= array["time"] >= p_start
+            if p_end is not None:
+                mask &= array["time"] < p_end
+            parts.append(array[mask])
+        if not parts:
+            return np.empty(0, dtype=TRACK_DTYPE)
+        return np.concatenate(parts, dtype=TRACK_DTYPE)
+
+    def records(
+        self, p_start: Optional[float] = None, p_end: Optional[float] = None
+    ) -> Iterator[TrackRecord]:
+        """
+        Iterate over the records of a time range, one segment mapped at a time.
+
+        :param p_start: First time, in seconds since the epoch. None for no limit.
+        :type p_start: Optional[float]
+        :param p_end: Time after the last record. None for no limit.
+        :type p_end: Optional[float]
+
+        :return: Generator of records.
+        :rtype: Iterator[TrackRecord]
+        """
+        for fileName, count in self.segments():
+            if not count:
+                continue
+            with open(fileName, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as segment:
+                end = TRACK_HEADER.size + count * TRACK_RECORD.size
+                with memoryview(segment)[TRACK_HEADER.size : end] as view:
+                    for values in TRACK_RECORD.iter_unpack(view):
+                        if (p_start is None or values[0] >= p_start) and (
+                            p_end is None or values[0] < p_end
+                        ):
+                            yield TrackRecord(*values)
+
+    def exportGpx(
+        self,
+        p_file: TextIO,
+        p_start: Optional[float] = None,
+        p_end: Optional[float] = None,
+        p_name: str = "track",
+    ) -> int:
+        """
+        Write the track as GPX 1.1, one point at a time.
+
+        :param p_file: Text file to write to.
+        :type p_file: TextIO
+        :param p_start: First time, in seconds since the epoch. None for no limit.
+        :type p_start: Optional[float]
+        :param p_end: Time after the last record. None for no limit.
+        :type p_end: Optional[float]
+        :param p_name: Name of the track.
+        :type p_name: str
+
+        :return: Number of points written.
+        :rtype: int
+        """
+        p_file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<gpx version="1.1" creator="quectelatcommands" '
+            'xmlns="http://www.topografix.com/GPX/1/1">\n'
+            f"<trk><name>{p_name}</name><trkseg>\n"
+        )
+        count = 0
+        for record in self.records(p_start, p_end):
+            p_file.write(
+                f'<trkpt lat="{record.latitude:.7f}" lon="{record.longitude:.7f}">'
+                f"<ele>{record.altitude:.1f}</ele>"
+                f"<time>{_isoTime(record.time)}</time>"
+                f"<fix>{'3d' if record.fix == 3 else '2d'}</fix>"
+                f"<sat>{record.satellites}</sat>"
+                f"<hdop>{record.hdop:.1f}</hdop></trkpt>\n"
+            )
+            count += 1
+        p_file.write("</trkseg></trk>\n</gpx>\n")
+        return count
+
+    def exportGeoJson(
+        self,
+        p_file: TextIO,
+        p_start: Optional[float] = None,
+        p_end: Optional[float] = None,
+    ) -> int:
+        """
+        Write the track as a GeoJSON LineString feature, one point at a time.
+
+        The times are given in the ``coordTimes`` property, written in a second pass over
+        the log.
+
+        :param p_file: Text file to write to.
+        :type p_file: TextIO
+        :param p_start: First time, in seconds since the epoch. None for no limit.
+        :type p_start: Optional[float]
+        :param p_end: Time after the last record. None for no limit.
+        :type p_end: Optional[float]
+
+        :return: Number of points written.
+        :rtype: int
+        """
+        p_file.write(
+            '{"type":"Feature","geometry":{"type":"LineString","coordinates":['
+        )
+        count = 0
+        for record in self.records(p_start, p_end):
+            p_file.write(
+                f"{',' if count else ''}\n"
+                f"[{record.longitude:.7f},{record.latitude:.7f},{record.altitude:.1f}]"
+            )
+            count += 1
+        p_file.write(']},"properties":{"coordTimes":[')
+        for index, record in enumerate(self.records(p_start, p_end)):
+            if index == count:
+                # Records appended since the first pass
+                break
+            p_file.write(f"{',' if index else ''}\n{json.dumps(_isoTime(record.time))}")
+        p_file.write("]}}\n")
+        return count
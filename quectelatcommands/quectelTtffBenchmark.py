@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+import itertools
+import json
+import os
+import statistics
+import time
+from typing import Any, Optional
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+
+# Start performed after each AT+QGPSDEL type
+DELETE_TYPE_STARTS = {0: "cold", 1: "hot", 2: "warm", 3: "xtra-deleted"}
+
+_CONFIGURATION_KEYS = ("deleteType", "xtra", "agpsMode", "constellations")
+
+# Time to wait after AT+CFUN=1,1 before trying to reach the module again. Unit: second.
+REBOOT_DELAY = 5.0
+
+# Maximum time to wait for the answer to AT after a reboot. Unit: second.
+PROBE_TIMEOUT = 2.0
+
+
+class QuectelTtffBenchmark:
+    def __init__(
+        self,
+        p_gnss: QuectelGnssATCommands,
+        p_resultsFileName: str,
+        p_runs: int = 5,
+        p_fixTimeout: float = 120.0,
+        p_pollInterval: float = 1.0,
+        p_timeScale: float = 1.0,
+        p_xtraDataFileName: Optional[str] = None,
+        p_connection: Optional[Any] = None,
+        p_rebootTimeout: float = 60.0,
+    ):
+        """
+        Time to first fix benchmark across start types and assistance options.
+
+        Every run turns GNSS off, deletes assistance data (``AT+QGPSDEL``), turns GNSS on
+        and polls ``AT+QGPSLOC`` until the first fix. Each run is appended to the results
+        file as one JSON line, so that an interrupted benchmark keeps its results.
+
+        The gpsOneXTRA, AGPS mode and constellation settings only take effect after a
+        restart, so the module is rebooted with ``AT+CFUN=1,1`` whenever they change, and
+        the client opened again once the module answers.
+
+        :param p_gnss: Opened GNSS client, on the AT port.
+        :type p_gnss: QuectelGnssATCommands
+        :param p_resultsFileName: Path of the results file (JSON lines).
+        :type p_resultsFileName: str
+        :param p_runs: Number of runs per configuration.
+        :type p_runs: int
+        :param p_fixTimeout: Maximum time to wait for a fix. Unit: second.
+        :type p_fixTimeout: float
+        :param p_pollInterval: Interval between two ``AT+QGPSLOC``. Unit: second.
+        :type p_pollInterval: float
+        :param p_timeScale: Simulated seconds per real second when the client is opened on
+            a ``QuectelSimulatedSerial``, 1 for a module.
+        :type p_timeScale: float
+        :param p_xtraDataFileName: gpsOneXTRA data file of the module, e.g.
+            ``RAM:xtra2.bin``, injected again after each run of delete type 3 so that
+            the next runs are assisted. Without it, the runs after delete type 3 have
+            no gpsOneXTRA data.
+        :type p_xtraDataFileName: Optional[str]
+        :param p_connection: Connection the client was opened with, e.g. a
+            ``QuectelSimulatedSerial``, used again after a reboot. None for the serial
+            port, which is closed during the reboot and opened again once it reappears.
+        :type p_connection: Optional[Any]
+        :param p_rebootTimeout: Maximum time for the module to answer after a reboot.
+            Unit: second.
+        :type p_rebootTimeout: float
+        """
+        self.gnss = p_gnss
+        self.resultsFileName = p_resultsFileName
+        self.runs = p_runs
+        self.fixTimeout = p_fixTimeout
+        self.pollInterval = p_pollInterval
+        self.timeScale = p_timeScale
+        self.xtraDataFileName = p_xtraDataFileName
+        self.connection = p_connection
+        self.rebootTimeout = p_rebootTimeout
+
+    @staticmethod
+    def configurations(
+        p_deleteTypes: tuple[int, ...] = (0, 1, 2, 3),
+        p_xtra: tuple[int, ...] = (0, 1),
+        p_agpsModes: tuple[Optional[int], ...] = (None,),
+        p_constellations: tuple[Optional[int], ...] = (None,),
+    ) -> list[dict]:
+        """
+        Build the configurations to measure.
+
+        :param p_deleteTypes: ``AT+QGPSDEL`` types.
+        :type p_deleteTypes: tuple[int, ...]
+        :param p_xtra: gpsOneXTRA settings, see
+            ``gnssGeneralCommands21000EnableDisableGpsOneXtraAssistanceWrite``.
+        :type p_xtra: tuple[int, ...]
+        :param p_agpsModes: AGPS modes, see
+            ``configureGnss20214ConfigureAgpsPositioningModeWrite``. None keeps the
+            current one.
+        :type p_agpsModes: tuple[Optional[int], ...]
+        :param p_constellations: Constellation sets, see
+            ``configureGnss20207ConfigureSupportedGnssConstellationsWrite``. None keeps
+            the current one.
+        :type p_constellations: tuple[Optional[int], ...]
+
+        :return: Every combination, the delete type varying fastest.
+        :rtype: list[dict]
+        """
+        return [
+            {
+                "deleteType": deleteType,
+                "xtra": xtra,
+                "agpsMode": agpsMode,
+                "constellations": constellations,
+            }
+            for xtra, agpsMode, constellations, deleteType in itertools.product(
+                p_xtra, p_agpsModes, p_constellations, p_deleteTypes
+            )
+        ]
+
+    def applyConfiguration(self, p_configuration: dict) -> bool:
+        """
+        Write the assistance options of a configuration, GNSS being off, and reboot the
+        module so that they take effect.
+
+        :param p_configuration: Configuration, see ``configurations``.
+        :type p_configuration: dict
+
+        :return: True if every write and the reboot succeeded.
+        :rtype: bool
+        """
+        self.gnss.gnssGeneralCommands20500TurnOffGnssWrite()
+        statuses = [
+            self.gnss.gnssGeneralCommands21000EnableDisableGpsOneXtraAssistanceWrite(
+                p_configuration["xtra"]
+            )[0]
+        ]
+        if p_configuration["agpsMode"] is not None:
+            statuses.append(
+                self.gnss.configureGnss20214ConfigureAgpsPositioningModeWrite(
+                    p_configuration["agpsMode"]
+                )[0]
+            )
+        if p_configuration["constellations"] is not None:
+            statuses.append(
+                self.gnss.configureGnss20207ConfigureSupportedGnssConstellationsWrite(
+                    p_configuration["constellations"]
+                )[0]
+            )
+        return all(statuses) and self.reboot()
+
+    def reboot(self) -> bool:
+        """
+        Reboot the module with ``AT+CFUN=1,1`` and wait until it answers ``AT`` again.
+
+        :return: True if the module answers before ``p_rebootTimeout``.
+        :rtype: bool
+        """
+        self.gnss.sendCommand("AT+CFUN=1,1")
+        if self.connection is None:
+            # The USB serial port disappears while the module restarts
+            self.gnss.close()
+        time.sleep(REBOOT_DELAY / self.timeScale)
+        deadline = time.monotonic() + self.rebootTimeout / self.timeScale
+        while time.monotonic() < deadline:
+            # A probe sent while the module restarts is not answered: its timeout is
+            # scaled as the deadline, so that a fast simulator is probed again in time
+            if self._reopen(PROBE_TIMEOUT / self.timeScale):
+                return True
+            time.sleep(1.0 / self.timeScale)
+        return False
+
+    def _reopen(self, p_timeout: float) -> bool:
+        """
+        Try to reach the module once after a reboot, opening the serial port again.
+        """
+        if self.connection is not None:
+            return self.gnss.serialPort.sendCommand("AT", p_timeout)[0]
+        if not os.path.exists(self.gnss.serialPort.port):
+            return False
+        try:
+            self.gnss.open()
+            if self.gnss.serialPort.sendCommand("AT", p_timeout)[0]:
+                return True
+        except Exception:
+            pass
+        self.gnss.close()
+        return False
+
+    def measure(self, p_deleteType: int) -> Optional[float]:
+        """
+        Measure one time to first fix.
+
+        :param p_deleteType: ``AT+QGPSDEL`` type.
+        :type p_deleteType: int
+
+        :return: Time to first fix, None without fix before the timeout. Unit: second.
+        :rtype: Optional[float]
+        """
+        self.gnss.gnssGeneralCommands20500TurnOffGnssWrite()
+        self.gnss.gnssGeneralCommands20300DeleteAssistanceData(p_deleteType)
+        start = time.monotonic()
+        status, _ = self.gnss.gnssGeneralCommands20400TurnOnGnssWrite(
+            1, None, None, None, None
+        )
+        if not status:
+            return None
+
+        try:
+            deadline = start + self.fixTimeout / self.timeScale
+            while True:
+                # The fix was available when the poll was sent: its round trip is not
+                # part of the time to first fix
+                polled = time.monotonic()
+                if polled >= deadline:
+                    return None
+                status, position = self.gnss.acquirePosition(2)
+                if position is not None:
+                    return (polled - start) * self.timeScale
+                time.sleep(self.pollInterval / self.timeScale)
+        finally:
+            self.gnss.gnssGeneralCommands20500TurnOffGnssWrite()
+
+    def run(self, p_configurations: Optional[list[dict]] = None) -> list[dict]:
+        """
+        Measure every configuration and append the runs to the results file.
+
+        A configuration whose options cannot be applied is not measured: a single row
+        with an ``error`` and no ``run`` is appended instead.
+
+        :param p_configurations: Configurations, ``configurations()`` if None.
+        :type p_configurations: Optional[list[dict]]
+
+        :return: Summary of the runs, see ``summarize``.
+        :rtype: list[dict]
+        """
+        results = []
+        applied: Optional[tuple] = None
+        with open(self.resultsFileName, "a") as f:
+            for configuration in p_configurations or self.configurations():
+                options = (
+                    configuration["xtra"],
+                    configuration["agpsMode"],
+                    configuration["constellations"],
+                )
+                if options != applied:
+                    if not self.applyConfiguration(configuration):
+                        # The runs would measure whatever settings are in effect: record
+                        # the failure instead, and apply again for the next configuration
+                        applied = None
+                        result = dict(
+                            configuration,
+                            start=DELETE_TYPE_STARTS.get(configuration["deleteType"]),
+                            run=None,
+                            ttff=None,
+                            timestamp=time.time(),
+                            error="configuration not applied",
+                        )
+                        f.write(json.dumps(result) + "\n")
+                        f.flush()
+                        results.append(result)
+                        continue
+                    applied = options
+
+                for run in range(self.runs):
+                    ttff = self.measure(configuration["deleteType"])
+                    if configuration["deleteType"] == 3 and self.xtraDataFileName:
+                        self.gnss.gnssGeneralCommands21200InjectGpsOneXtraDataFileWrite(
+                            self.xtraDataFileName
+                        )
+                    result = dict(
+                        configuration,
+                        start=DELETE_TYPE_STARTS.get(configuration["deleteType"]),
+                        run=run,
+                        ttff=ttff,
+                        timestamp=time.time(),
+                    )
+                    f.write(json.dumps(result) + "\n")
+                    f.flush()
+                    results.append(result)
+        return self.summarize(results)
+
+    @staticmethod
+    def loadResults(p_fileName: str) -> list[dict]:
+        """
+        Read a results file.
+
+        :param p_fileName: Path of the results file.
+        :type p_fileName: str
+
+        :return: One dictionary per run.
+        :rtype: list[dict]
+        """
+        with open(p_fileName, "r") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    @staticmethod
+    def summarize(p_results: list[dict]) -> list[dict]:
+        """
+        Compute the time to first fix distribution of every configuration.
+
+        :param p_results: Runs, from ``run`` or ``loadResults``.
+        :type p_results: list[dict]
+
+        :return: One dictionary per configuration with ``runs``, ``fixes``, ``errors``
+            (rows of a configuration that could not be applied), and the
+            ``min``, ``median``, ``p90``, ``max`` and ``mean`` time to first fix of the
+            runs with a fix (None without any), sorted by median.
+        :rtype: list[dict]
+        """
+        groups: dict[tuple, list[dict]] = {}
+        for result in p_results:
+            key = tuple(result.get(name) for name in _CONFIGURATION_KEYS)
+            groups.setdefault(key, []).append(result)
+
+        summary = []
+        for key, rows in groups.items():
+            runs = [row for row in rows if not row.get("error")]
+            ttffs = sorted(run["ttff"] for run in runs if run["ttff"] is not None)
+            entry: dict = dict(zip(_CONFIGURATION_KEYS, key))
+            entry["start"] = DELETE_TYPE_STARTS.get(entry["deleteType"])
+            entry["runs"] = len(runs)
+            entry["fixes"] = len(ttffs)
+            entry["errors"] = len(rows) - len(runs)
+            entry["min"] = ttffs[0] if ttffs else None
+            entry["median"] = statistics.median(ttffs) if ttffs else None
+            entry["p90"] = (
+                statistics.quantiles(ttffs, n=10, method="inclusive")[-1]
+                if len(ttffs) >= 2
+                else (ttffs[0] if ttffs else None)
+            )
+            entry["max"] = ttffs[-1] if ttffs else None
+            entry["mean"] = statistics.fmean(ttffs) if ttffs else None
+            summary.append(entry)
+
+        return sorted(
+            summary,
+            key=lambda entry: (
+                entry["median"] is None,
+                entry["median"] or 0.0,
+            ),
+        )
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+
+import datetime
+import functools
+import hashlib
+import operator
+import os
+import sys
+import time
+import urllib.request
+from array import array
+from typing import Optional
+from quectelatcommands.quectelDeviceRegistry import (
+    QuectelDeviceRegistry,
+    defaultRegistryFileName,
+)
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelResponseParser import (
+    findResponseLines,
+    splitResponseFields,
+)
+
+XTRA_URLS = (
+    "http://xtrapath1.izatcloud.net/xtra2.bin",
+    "http://xtrapath2.izatcloud.net/xtra2.bin",
+    "http://xtrapath3.izatcloud.net/xtra2.bin",
+)
+
+XTRA_STEPS = ("download", "upload", "time", "data")
+
+# Duration of the steps before they are measured on the module. Unit: second. The
+# upload duration is computed from the file size and the baud rate.
+DEFAULT_STEP_SECONDS = {"download": 2.0, "time": 0.5, "data": 1.5}
+
+
+def defaultXtraCacheDir() -> str:
+    """
+    Get the default directory of the gpsOneXTRA file cache.
+
+    :return: ``xtra`` directory next to the device registry file.
+    :rtype: str
+    """
+    return os.path.join(os.path.dirname(defaultRegistryFileName()), "xtra")
+
+
+def parseXtraData(p_response: list[str]) -> Optional[datetime.datetime]:
+    """
+    Get the expiry of the injected gpsOneXTRA data from the response of
+    ``AT+QGPSXTRADATA?``.
+
+    :param p_response: Response, e.g. ``+QGPSXTRADATA: 10080,"2024/11/22,01:39:20"``
+        (validity in minutes and injection time, UTC).
+    :type p_response: list[str]
+
+    :return: Expiry time (UTC, naive), None if no valid data is injected.
+    :rtype: Optional[datetime.datetime]
+    """
+    for line in findResponseLines(p_response, "+QGPSXTRADATA:"):
+        fields = splitResponseFields(line)
+        if len(fields) < 2 or not fields[0].isdigit() or int(fields[0]) == 0:
+            return None
+        try:
+            injected = datetime.datetime.strptime(fields[1], "%Y/%m/%d,%H:%M:%S")
+        except ValueError:
+            return None
+        return injected + datetime.timedelta(minutes=int(fields[0]))
+    return None
+
+
+def qfuplChecksum(p_data: bytes) -> int:
+    """
+    Compute the checksum returned by ``AT+QFUPL`` (in hexadecimal): XOR of the 16-bit
+    big-endian words, an odd last byte being padded with 0.
+
+    :param p_data: Uploaded data.
+    :type p_data: bytes
+
+    :return: Checksum.
+    :rtype: int
+    """
+    words = array("H", p_data + b"\0" * (len(p_data) % 2))
+    if sys.byteorder == "little":
+        words.byteswap()
+    return functools.reduce(operator.xor, words, 0)
+
+
+class QuectelXtraManager:
+    def __init__(
+        self,
+        p_gnss: QuectelGnssATCommands,
+        p_moduleFileName: str = "UFS:xtra2.bin",
+        p_cacheDir: Optional[str] = None,
+        p_registry: Optional[QuectelDeviceRegistry] = None,
+        p_deviceKey: Optional[str] = None,
+        p_urls: tuple[str, ...] = XTRA_URLS,
+        p_downloadInterval: float = 86400,
+        p_margin: float = 3600,
+    ):
+        """
+        Keep the gpsOneXTRA assistance data of a module valid with as little work as
+        possible.
+
+        ``ensure`` reads ``AT+QGPSXTRADATA?`` and does nothing while the injected data is
+        valid. Otherwise the XTRA file is taken from a local cache (downloaded at most
+        every ``p_downloadInterval``), uploaded to the module only if the module does not
+        hold the same file yet, and the time and data are injected.
+
+        Cached files are named by the SHA-256 of their content. With a registry, the
+        digest of the file uploaded to each module and the measured duration of every
+        step are stored in the device record, so that the upload is done once per module
+        and file, and the saved time is computed from measurements. Without registry,
+        the file is uploaded whenever the data has to be injected.
+
+        :param p_gnss: Opened GNSS client, on the AT port.
+        :type p_gnss: QuectelGnssATCommands
+        :param p_moduleFileName: Name of the XTRA file on the module. UFS keeps it across
+            reboots, RAM does not.
+        :type p_moduleFileName: str
+        :param p_cacheDir: Cache directory, ``defaultXtraCacheDir()`` if None.
+        :type p_cacheDir: Optional[str]
+        :param p_registry: Registry storing the per-module state.
+        :type p_registry: Optional[QuectelDeviceRegistry]
+        :param p_deviceKey: IMEI or USB key of the module, read with ``AT+CGSN`` if None.
+        :type p_deviceKey: Optional[str]
+        :param p_urls: Download URLs of the XTRA file, tried in order.
+        :type p_urls: tuple[str, ...]
+        :param p_downloadInterval: Age of the cached file after which a new one is
+            downloaded. Unit: second.
+        :type p_downloadInterval: float
+        :param p_margin: Data expiring within this time is injected again. Unit: second.
+        :type p_margin: float
+        """
+        self.gnss = p_gnss
+        self.moduleFileName = p_moduleFileName
+        self.cacheDir = p_cacheDir or defaultXtraCacheDir()
+        self.registry = p_registry
+        self.deviceKey = p_deviceKey
+        self.urls = p_urls
+        self.downloadInterval = p_downloadInterval
+        self.margin = p_margin
+        self.stepSeconds: dict[str, float] = {}
+
+    def readExpiry(self) -> Optional[datetime.datetime]:
+        """
+        Read the expiry of the data injected in the module.
+
+        :return: Expiry time (UTC, naive), None if no valid data is injected.
+        :rtype: Optional[datetime.datetime]
+        """
+        status, response = (
+            self.gnss.gnssGeneralCommands21200InjectGpsOneXtraDataFileRead()
+        )
+        return parseXtraData(response) if status else None
+
+    def cachedDigest(self) -> Optional[str]:
+        """
+        Get the digest of the latest cached XTRA file.
+
+        :return: SHA-256 of the file, None if the cache is empty.
+        :rtype: Optional[str]
+        """
+        try:
+            with open(os.path.join(self.cacheDir, "latest"), "r") as f:
+                digest = f.read().strip()
+        except OSError:
+            return None
+        return digest if os.path.exists(self.cachePath(digest)) else None
+
+    def cachePath(self, p_digest: str) -> str:
+        """
+        Get the path of a cached XTRA file.
+
+        :param p_digest: SHA-256 of the file.
+        :type p_digest: str
+
+        :return: Path of the file.
+        :rtype: str
+        """
+        return os.path.join(self.cacheDir, p_digest + ".bin")
+
+    def store(self, p_data: bytes) -> str:
+        """
+        Add an XTRA file to the cache and make it the latest one.
+
+        :param p_data: Content of the file.
+        :type p_data: bytes
+
+        :return: SHA-256 of the file.
+        :rtype: str
+        """
+        digest = hashlib.sha256(p_data).hexdigest()
+        os.makedirs(self.cacheDir, exist_ok=True)
+        path = self.cachePath(digest)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(p_data)
+            os.replace(path + ".tmp", path)
+
+        with open(os.path.join(self.cacheDir, "latest.tmp"), "w") as f:
+            f.write(digest)
+        os.replace(
+            os.path.join(self.cacheDir, "latest.tmp"),
+            os.path.join(self.cacheDir, "latest"),
+        )
+        return digest
+
+    def download(self, p_timeout: float = 30) -> Optional[str]:
+        """
+        Download the XTRA file into the cache.
+
+        :param p_timeout: Timeout of each download. Unit: second.
+        :type p_timeout: float
+
+        :return: SHA-256 of the file, None if every URL failed.
+        :rtype: Optional[str]
+        """
+        for url in self.urls:
+            try:
+                with urllib.request.urlopen(url, timeout=p_timeout) as response:
+                    return self.store(response.read())
+            except OSError as e:
+                print(e)
+        return None
+
+    def upload(self, p_digest: str) -> bool:
+        """
+        Upload a cached XTRA file to the module, replacing the previous one.
+
+        :param p_digest: SHA-256 of the file.
+        :type p_digest: str
+
+        :return: True if the module received the whole file with a matching checksum.
+        :rtype: bool
+        """
+        with open(self.cachePath(p_digest), "rb") as f:
+            data = f.read()
+
+        self.gnss.sendCommand(f'AT+QFDEL="{self.moduleFileName}"')
+        timeout = self._uploadSeconds(len(data)) + 5
+        status, response = self.gnss.sendCommandWithPayload(
+            f'AT+QFUPL="{self.moduleFileName}",{len(data)},{int(timeout)}',
+            data,
+            p_timeout=timeout,
+        )
+        lines = findResponseLines(response, "+QFUPL:")
+        if not status or not lines:
+            return False
+        fields = splitResponseFields(lines[0])
+        return fields[:2] == [str(len(data)), f"{qfuplChecksum(data):x}"]
+
+    def injectTime(self) -> bool:
+        """
+        Inject the current UTC time, required before the data.
+
+        :return: True on success.
+        :rtype: bool
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        status, _ = self.gnss.gnssGeneralCommands21100InjectGpsOneXtraTime(
+            0, now.strftime("%Y/%m/%d,%H:%M:%S"), 1, 1, 3500
+        )
+        return status
+
+    def injectData(self) -> bool:
+        """
+        Inject the XTRA file of the module.
+
+        :return: True on success.
+        :rtype: bool
+        """
+        status, _ = self.gnss.gnssGeneralCommands21200InjectGpsOneXtraDataFileWrite(
+            self.moduleFileName
+        )
+        return status
+
+    def ensure(self) -> dict:
+        """
+        Make sure that the module has valid gpsOneXTRA data, doing only the expired steps.
+
+        :return: Report with ``valid`` (True when the module holds valid data at the
+            end), ``expiry``, ``steps`` (duration of each step of ``XTRA_STEPS`` that
+            was run, in seconds), ``skipped`` (steps not needed), ``elapsed`` and
+            ``saved`` (expected duration of the skipped steps, in seconds).
+            ``rebootRequired`` is True when gpsOneXTRA had to be enabled first.
+        :rtype: dict
+        """
+        start = time.monotonic()
+        record = self._deviceRecord()
+        self.stepSeconds.update(record.get("xtraSeconds", {}))
+        steps: dict[str, float] = {}
+        report: dict = {"valid": False, "expiry": None, "rebootRequired": False}
+
+        status, response = (
+            self.gnss.gnssGeneralCommands21000EnableDisableGpsOneXtraAssistanceRead()
+        )
+        enabled = [
+            splitResponseFields(line)[:1]
+            for line in findResponseLines(response, "+QGPSXTRA:")
+        ]
+        if status and enabled == [["0"]]:
+            self.gnss.gnssGeneralCommands21000EnableDisableGpsOneXtraAssistanceWrite(1)
+            report["rebootRequired"] = True
+            return self._report(report, steps, start, record)
+
+        expiry = self.readExpiry()
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if expiry is not None and expiry - now > datetime.timedelta(
+            seconds=self.margin
+        ):
+            report.update(valid=True, expiry=expiry)
+            return self._report(report, steps, start, record)
+
+        digest = self.cachedDigest()
+        latest = os.path.join(self.cacheDir, "latest")
+        if (
+            digest is None
+            or time.time() - os.path.getmtime(latest) > self.downloadInterval
+        ):
+            stepStart = time.monotonic()
+            digest = self.download() or digest
+            steps["download"] = time.monotonic() - stepStart
+        if digest is None:
+            return self._report(report, steps, start, record)
+
+        if record.get("xtraDigest") != digest and not self._upload(
+            digest, steps, record
+        ):
+            return self._report(report, steps, start, record)
+
+        stepStart = time.monotonic()
+        if not self.injectTime():
+            return self._report(report, steps, start, record)
+        steps["time"] = time.monotonic() - stepStart
+
+        stepStart = time.monotonic()
+        injected = self.injectData()
+        if not injected and "upload" not in steps:
+            # The file of the module was removed since it was uploaded
+            injected = self._upload(digest, steps, record) and self.injectData()
+            stepStart += steps.get("upload", 0.0)
+        if not injected:
+            return self._report(report, steps, start, record)
+        steps["data"] = time.monotonic() - stepStart
+
+        expiry = self.readExpiry()
+        report.update(valid=expiry is not None, expiry=expiry)
+        return self._report(report, steps, start, record)
+
+    def _deviceRecord(self) -> dict:
+        """
+        Get the registry record of the module, an empty one without registry.
+        """
+        if self.registry is None:
+            return {}
+        if self.deviceKey is None:
+            status, response = self.gnss.sendCommand("AT+CGSN")
+            lines = [line for line in response if line.isdigit()]
+            if not status or not lines:
+                return {}
+            self.deviceKey = lines[0]
+        record = self.registry.get(self.deviceKey)
+        if record is not None:
+            return dict(record)
+        return {"imei" if self.deviceKey.isdigit() else "usbKey": self.deviceKey}
+
+    def _upload(self, p_digest: str, p_steps: dict[str, float], p_record: dict) -> bool:
+        stepStart = time.monotonic()
+        if not self.upload(p_digest):
+            return False
+        p_steps["upload"] = time.monotonic() - stepStart
+        p_record["xtraDigest"] = p_digest
+        return True
+
+    def _uploadSeconds(self, p_size: int) -> float:
+        # 10 bits per byte on the UART, USB being faster
+        return p_size * 10 / self.gnss.serialPort.baudrate
+
+    def _report(
+        self, p_report: dict, p_steps: dict[str, float], p_start: float, p_record: dict
+    ) -> dict:
+        """
+        Complete a report of ``ensure`` and store the state of the module.
+        """
+        self.stepSeconds.update(p_steps)
+        skipped = (
+            [step for step in XTRA_STEPS if step not in p_steps]
+            if p_report["valid"]
+            else []
+        )
+        saved = 0.0
+        for step in skipped:
+            if step in self.stepSeconds:
+                saved += self.stepSeconds[step]
+            elif step == "upload":
+                digest = self.cachedDigest()
+                if digest is not None:
+                    saved += self._uploadSeconds(
+                        os.path.getsize(self.cachePath(digest))
+                    )
+            else:
+                saved += DEFAULT_STEP_SECONDS[step]
+
+        if (
+            self.registry is not None
+            and p_steps
+            and (p_record.get("imei") or p_record.get("usbKey"))
+        ):
+            p_record["xtraSeconds"] = self.stepSeconds
+            self.registry.update(p_record)
+
+        p_report.update(
+            steps=p_steps,
+            skipped=skipped,
+            elapsed=time.monotonic() - p_start,
+            saved=saved,
+        )
+        return p_report
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import pytest
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+
+# Simulated seconds per real second
+SIMULATOR_SPEED = 50.0
+
+
+@pytest.fixture
+def simulator() -> QuectelSimulatedSerial:
+    return QuectelSimulatedSerial(SIMULATOR_SPEED, 1)
+
+
+@pytest.fixture
+def modem(simulator: QuectelSimulatedSerial):
+    client = QuectelModemATCommands("simulator")
+    client.open(simulator)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def storedIndexes(modem: QuectelModemATCommands):
+    """
+    Get the indexes of the messages of the preferred storage.
+    """
+
+    def indexes() -> list[int]:
+        status, entries = modem.listSms()
+        assert status
+        return [entry.index for entry in entries]
+
+    return indexes
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import pytest
+from quectelatcommands.quectelCellBroadcast import (
+    DCS_GSM7,
+    DCS_UCS2,
+    QuectelCellBroadcast,
+    decodeCbmUrc,
+    decodeCbsPdu,
+    encodeCbsPages,
+)
+
+
+def test_gsm7PagesRoundTrip():
+    text = "Alert " * 40
+    pages = encodeCbsPages(4370, 0x3001, text)
+    decoded = [page for pdu in pages for page in decodeCbsPdu(pdu)]
+    assert [(page.page, page.pages) for page in decoded] == [(1, 3), (2, 3), (3, 3)]
+    assert {(page.messageId, page.serial, page.dcs) for page in decoded} == {
+        (4370, 0x3001, DCS_GSM7)
+    }
+    assert "".join(page.text for page in decoded) == text
+
+
+def test_ucs2PageRoundTrip():
+    (pdu,) = encodeCbsPages(4371, 0x1002, "Внимание")
+    (page,) = decodeCbsPdu(pdu)
+    assert page.dcs == DCS_UCS2
+    assert page.text == "Внимание"
+
+
+def test_decodeCbmUrc():
+    (pdu,) = encodeCbsPages(50, 0x0010, "Hello")
+    (page,) = decodeCbmUrc(f"+CBM: {len(pdu) // 2}\n{pdu}")
+    assert (page.messageId, page.text) == (50, "Hello")
+
+
+def test_tooManyPages():
+    with pytest.raises(ValueError):
+        encodeCbsPages(50, 0x0010, "x" * 94 * 16)
+
+
+def test_truncatedPdu():
+    with pytest.raises(ValueError):
+        decodeCbsPdu("0011")
+
+
+def test_completeCopyAfterIncompleteMessage(modem, simulator):
+    broadcast = QuectelCellBroadcast()
+    assert broadcast.attach(modem)[0]
+    subscriber = broadcast.subscribe()
+    pages = encodeCbsPages(4370, 0x3001, "Alert " * 40)
+    marker = encodeCbsPages(4371, 0x3001, "marker")
+
+    simulator.receiveCellBroadcast(pages[:1])
+    simulator.receiveCellBroadcast(marker)
+    assert subscriber.get(timeout=5).text == "marker"
+    broadcast.flush()
+    assert not subscriber.get(timeout=5).complete
+
+    # The repetition completes the message, given once more; the next one is dropped
+    simulator.receiveCellBroadcast(pages)
+    message = subscriber.get(timeout=5)
+    assert message.complete and message.text == "Alert " * 40
+    simulator.receiveCellBroadcast(pages)
+    simulator.receiveCellBroadcast(encodeCbsPages(4371, 0x3002, "end"))
+    assert subscriber.get(timeout=5).text == "end"
+    assert broadcast.statistics["duplicates"] == 3
+    broadcast.detach(modem)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+from quectelatcommands.quectelConfigEngine import QuectelConfigEngine
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+
+BAND_DOCUMENT = {"modem": {"band": {"bandval": "0x93", "ltebandval": "0x80800C5"}}}
+
+
+def test_bandRoundTrip(
+    simulator: QuectelSimulatedSerial, modem: QuectelModemATCommands
+):
+    engine = QuectelConfigEngine(modem)
+    status, report = engine.apply(BAND_DOCUMENT)
+    assert status and len(report) == 1
+    assert simulator.settings['+QCFG="band"'] == "0x93,0x80800C5"
+    assert engine.readCurrent(BAND_DOCUMENT)[("modem", "band")] == {
+        "bandval": 0x93,
+        "ltebandval": 0x80800C5,
+    }
+    assert engine.diff(BAND_DOCUMENT) == []
+
+
+def test_partialBandKeepsCurrentValue(
+    simulator: QuectelSimulatedSerial, modem: QuectelModemATCommands
+):
+    simulator.settings['+QCFG="band"'] = "0x93,0x80800C5"
+    status, _ = QuectelConfigEngine(modem).apply({"modem": {"band": {"ltebandval": 1}}})
+    assert status
+    assert simulator.settings['+QCFG="band"'] == "0x93,0x1"
+
+
+def test_partialBandWithUnknownCurrentValue(modem: QuectelModemATCommands):
+    status, report = QuectelConfigEngine(modem).apply(
+        {"modem": {"band": {"ltebandval": 1}}}
+    )
+    assert not status
+    assert report[0].endswith("ERROR: missing bandval")
+
+
+def test_dryRunWritesNothing(
+    simulator: QuectelSimulatedSerial, modem: QuectelModemATCommands
+):
+    status, report = QuectelConfigEngine(modem).apply(BAND_DOCUMENT, True)
+    assert status and len(report) == 1
+    assert '+QCFG="band"' not in simulator.settings
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import pytest
+from quectelatcommands.quectelDeviceRegistry import QuectelDeviceRegistry
+
+
+def test_updateMergesByImeiAndUsbKey(tmp_path):
+    fileName = str(tmp_path / "devices.jsonl")
+    registry = QuectelDeviceRegistry(fileName)
+    registry.update({"usbKey": "2c7c:0125:1-1.2", "atPort": "/dev/ttyUSB2"})
+    record = registry.update(
+        {"usbKey": "2c7c:0125:1-1.2", "imei": "861234567890123", "model": "EC25"}
+    )
+    assert record["key"] == "2c7c:0125:1-1.2"
+    assert registry.get("861234567890123")["atPort"] == "/dev/ttyUSB2"
+
+    # The latest line of a device overrides the previous ones
+    reloaded = QuectelDeviceRegistry(fileName)
+    assert reloaded.get("2c7c:0125:1-1.2")["model"] == "EC25"
+
+
+def test_updateNeedsAnIdentity(tmp_path):
+    registry = QuectelDeviceRegistry(str(tmp_path / "devices.jsonl"))
+    with pytest.raises(ValueError):
+        registry.update({"model": "EC25"})
+
+
+def test_truncatedLineIsSkipped(tmp_path):
+    fileName = tmp_path / "devices.jsonl"
+    fileName.write_text('{"key":"1","imei":"1","model":"EC25"}\n{"key":"2","im')
+    registry = QuectelDeviceRegistry(str(fileName))
+    assert list(registry.devices) == ["1"]
+
+
+def test_compactKeepsRecordsOfOtherProcesses(tmp_path):
+    fileName = str(tmp_path / "devices.jsonl")
+    registry = QuectelDeviceRegistry(fileName)
+    other = QuectelDeviceRegistry(fileName)
+    registry.update({"imei": "1", "model": "EC25"})
+    other.update({"imei": "2", "model": "EG25"})
+    registry.update({"imei": "1", "revision": "EC25EFAR06A06M4G"})
+
+    registry.compact()
+    with open(fileName) as f:
+        assert len(f.readlines()) == 2
+    assert QuectelDeviceRegistry(fileName).get("2")["model"] == "EG25"
+    assert registry.get("1")["revision"] == "EC25EFAR06A06M4G"
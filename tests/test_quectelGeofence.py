@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import math
+import pytest
+from quectelatcommands.quectelGeofence import (
+    GEOFENCE_ENTER,
+    GEOFENCE_EXIT,
+    QuectelGeofenceEngine,
+    benchmarkGeofences,
+    pointInPolygon,
+)
+
+SQUARE = [(48.0, 11.0), (48.0, 11.02), (48.02, 11.02), (48.02, 11.0)]
+TRIANGLE = [(48.01, 11.01), (48.01, 11.05), (48.05, 11.01)]
+
+
+@pytest.fixture
+def engine() -> QuectelGeofenceEngine:
+    engine = QuectelGeofenceEngine()
+    engine.addFence("square", SQUARE)
+    engine.addFence("triangle", TRIANGLE)
+    return engine
+
+
+def track(p_count: int) -> list[tuple[float, float]]:
+    # A diagonal through the square, then the triangle, then out of both
+    return [(47.99 + 0.001 * step, 10.99 + 0.001 * step) for step in range(p_count)]
+
+
+def test_pointInPolygon():
+    latitudes = [vertex[0] for vertex in TRIANGLE]
+    longitudes = [vertex[1] for vertex in TRIANGLE]
+    assert pointInPolygon(48.02, 11.02, latitudes, longitudes)
+    assert not pointInPolygon(48.04, 11.04, latitudes, longitudes)
+
+
+def test_addFenceNeedsThreeVertices(engine):
+    with pytest.raises(ValueError):
+        engine.addFence("line", SQUARE[:2])
+
+
+def test_updateEvents(engine):
+    assert engine.locate(48.015, 11.015) == ["square", "triangle"]
+    events = []
+    for latitude, longitude in track(60):
+        events += engine.update(latitude, longitude, p_trackerId="car")
+    assert [(event.fenceId, event.kind) for event in events] == [
+        ("square", GEOFENCE_ENTER),
+        ("triangle", GEOFENCE_ENTER),
+        ("square", GEOFENCE_EXIT),
+        ("triangle", GEOFENCE_EXIT),
+    ]
+    assert {event.trackerId for event in events} == {"car"}
+
+
+def test_removeAndReplaceFence(engine):
+    assert engine.update(48.015, 11.005)[0].fenceId == "square"
+    engine.removeFence("square")
+    # No exit event for a removed fence
+    assert engine.update(47.0, 11.0) == []
+    engine.addFence("triangle", SQUARE)
+    assert len(engine) == 1
+    assert engine.locate(48.005, 11.005) == ["triangle"]
+
+
+def test_replayBatchMatchesUpdate(engine):
+    np = pytest.importorskip("numpy")
+    positions = track(60)
+    expected = []
+    for index, (latitude, longitude) in enumerate(positions):
+        expected += engine.update(latitude, longitude, float(index), "update")
+
+    latitudes = np.array([position[0] for position in positions])
+    longitudes = np.array([position[1] for position in positions])
+    # Split in two batches, the second one continuing the state of the first
+    events = engine.replayBatch(latitudes[:25], longitudes[:25], p_trackerId="batch")
+    events += [
+        event._replace(utc=event.utc + 25)
+        for event in engine.replayBatch(
+            latitudes[25:], longitudes[25:], p_trackerId="batch"
+        )
+    ]
+    assert [event._replace(trackerId="update") for event in events] == expected
+
+
+def test_benchmark():
+    result = benchmarkGeofences(p_fenceCount=200, p_rate=10, p_seconds=10)
+    assert result["fixes"] == 100
+    assert math.isfinite(result["mean"]) and result["p99"] >= 0
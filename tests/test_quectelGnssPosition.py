@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import datetime
+import pytest
+from quectelatcommands.quectelGnssPosition import (
+    decodeQgpslocBatch,
+    decodeQgpslocResponse,
+    parseQgpsloc,
+)
+
+# The same position in the three display modes
+LINES = {
+    0: "+QGPSLOC: 013921.000,3151.6630N,11711.9736W,0.7,70.3,3,0.00,0.0,0.0,221124,09",
+    1: "+QGPSLOC: 013921.000,3151.6630,N,11711.9736,W,0.7,70.3,3,0.00,0.0,0.0,221124,09",
+    2: "+QGPSLOC: 013921.000,31.86105,-117.19956,0.7,70.3,3,0.00,0.0,0.0,221124,09",
+}
+
+
+@pytest.mark.parametrize("p_mode", [0, 1, 2])
+def test_parseEveryMode(p_mode):
+    position = parseQgpsloc(LINES[p_mode], p_mode)
+    assert position.utc == pytest.approx(1 * 3600 + 39 * 60 + 21)
+    assert position.latitude == pytest.approx(31.86105, abs=1e-5)
+    assert position.longitude == pytest.approx(-117.19956, abs=1e-5)
+    assert (position.fix, position.satellites) == (3, 9)
+    assert position.date == datetime.date(2024, 11, 22)
+
+
+def test_parseMalformed():
+    assert parseQgpsloc("+QGPSLOC: 013921.000,31.86105", 2) is None
+    assert parseQgpsloc(LINES[2].replace("70.3", "x"), 2) is None
+
+
+def test_decodeResponse():
+    status, position = decodeQgpslocResponse(True, [LINES[2], "OK"], 2)
+    assert status and position.altitude == 70.3
+    # Not fixed yet, in the numeric and the verbose formats
+    assert decodeQgpslocResponse(False, ["+CME ERROR: 516"], 2) == (True, None)
+    assert decodeQgpslocResponse(False, ["+CME ERROR: Not fixed now"], 2) == (
+        True,
+        None,
+    )
+    assert decodeQgpslocResponse(False, ["+CME ERROR: 505"], 2) == (False, None)
+
+
+@pytest.mark.parametrize("p_mode", [0, 1, 2])
+def test_batchMatchesLines(p_mode):
+    np = pytest.importorskip("numpy")
+    lines = [LINES[p_mode]] * 3 + ["+QGPSLOC: 1,2", LINES[p_mode].replace("70.3", "x")]
+    columns = decodeQgpslocBatch(lines, p_mode)
+    position = parseQgpsloc(LINES[p_mode], p_mode)
+    assert len(columns["utc"]) == 3
+    assert np.allclose(columns["utc"], position.utc)
+    assert np.allclose(columns["latitude"], position.latitude)
+    assert np.allclose(columns["longitude"], position.longitude)
+    assert columns["date"][0] == np.datetime64("2024-11-22")
+    assert list(columns["satellites"]) == [9] * 3
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import datetime
+from functools import reduce
+import pytest
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelGnssSession import SOURCE_POLL, QuectelGnssSession
+from quectelatcommands.quectelNmeaReader import QuectelNmeaReader
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+
+
+def sentence(p_body: str) -> bytes:
+    checksum = reduce(lambda value, character: value ^ ord(character), p_body, 0)
+    return f"${p_body}*{checksum:02X}\r\n".encode()
+
+
+def epoch(p_time: str, p_quality: int = 1) -> bytes:
+    return (
+        sentence(
+            f"GPGGA,{p_time},4807.038,N,01131.000,E,{p_quality},08,0.9,545.4,M,46.9,M,,"
+        )
+        + sentence("GNGSA,A,2,01,02,03,,,,,,,,,,1.5,0.9,1.2")
+        + sentence(f"GNRMC,{p_time},A,4807.038,N,01131.000,E,10.0,84.4,230326,,,A")
+    )
+
+
+@pytest.fixture
+def gnss():
+    # A fast simulator, so that the first fix comes with the first polls
+    client = QuectelGnssATCommands("simulator")
+    client.open(QuectelSimulatedSerial(500.0, 1))
+    yield client
+    client.close()
+
+
+def test_combineEpochs(gnss):
+    session = QuectelGnssSession(gnss)
+    session.running = True
+    data = epoch("123519.00") + epoch("123520.00", p_quality=0) + epoch("123521.00")
+    records = QuectelNmeaReader(p_sentenceTypes=("GGA", "RMC", "GSA")).feed(data)
+    positions = list(session._combine(records))
+
+    # The epoch without fix is skipped
+    assert [position.utc for position in positions] == [45319.0, 45321.0]
+    assert positions[0].latitude == pytest.approx(48.1173)
+    assert (positions[0].fix, positions[0].satellites) == (2, 8)
+    assert positions[0].speedKmh == pytest.approx(18.52)
+    assert positions[0].date == datetime.date(2026, 3, 23)
+
+
+def test_pollFixes(gnss):
+    with QuectelGnssSession(gnss, p_source=SOURCE_POLL) as session:
+        assert session.running
+        position = next(session.fixes())
+    assert position.fix == 3 and position.satellites == 9
+    assert not session.running
+
+
+def test_startWithOngoingSession(gnss):
+    assert gnss.gnssGeneralCommands20400TurnOnGnssWrite(1, 30, 50, 0, 1)[0]
+    session = QuectelGnssSession(gnss)
+    status, response = session.start()
+    assert status and response[-1] == "+CME ERROR: 504"
+    assert session.stop()[0]
+
+
+def test_urcSentencesAreQueued(gnss):
+    session = QuectelGnssSession(gnss)
+    session._onUrc('+QGPSURC: "NMEA","$GPGGA,123519.00,,,,,0,00,,,,,,,*5A"')
+    session._onUrc("+QGPSURC: no sentence")
+    assert session.urcQueue.qsize() == 1
+    assert session.urcQueue.get().startswith("$GPGGA")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+from functools import reduce
+import pytest
+from quectelatcommands.quectelNmeaReader import NmeaGga, NmeaRmc, QuectelNmeaReader
+
+np = pytest.importorskip("numpy")
+from quectelatcommands.quectelNmeaLog import QuectelNmeaLog, decodeNmeaBuffer
+
+
+def sentence(p_body: str) -> bytes:
+    checksum = reduce(lambda value, character: value ^ ord(character), p_body, 0)
+    return f"${p_body}*{checksum:02X}\r\n".encode()
+
+
+def logData(p_epochs: int) -> bytes:
+    data = b""
+    for second in range(p_epochs):
+        time = f"1235{second % 60:02d}.00"
+        data += sentence(
+            f"GPGGA,{time},4807.{second:03d},S,01131.000,E,1,08,0.9,545.4,M,46.9,M,,"
+        )
+        data += sentence(f"GNRMC,{time},A,4807.038,N,01131.000,W,1.5,84.4,230326,,,A")
+        data += sentence("GPGSV,1,1,01,01,40,100,45")
+    return data
+
+
+def test_decodeMatchesReader():
+    data = logData(20)
+    columns = decodeNmeaBuffer(np.frombuffer(data, dtype=np.uint8))
+    records = list(QuectelNmeaReader(p_sentenceTypes=("GGA", "RMC")).feed(data))
+    ggas = [record for record in records if isinstance(record, NmeaGga)]
+    rmcs = [record for record in records if isinstance(record, NmeaRmc)]
+
+    assert len(columns["gga"]["time"]) == len(ggas) == 20
+    assert np.allclose(columns["gga"]["time"], [gga.time for gga in ggas])
+    assert np.allclose(columns["gga"]["latitude"], [gga.latitude for gga in ggas])
+    assert list(columns["gga"]["satellites"]) == [8] * 20
+    assert np.allclose(columns["rmc"]["longitude"], [rmc.longitude for rmc in rmcs])
+    assert columns["rmc"]["valid"].all()
+    assert columns["rmc"]["date"][0] == np.datetime64("2026-03-23")
+
+
+def test_wrongChecksumIsDropped():
+    data = bytearray(logData(2))
+    # Corrupt the first GGA sentence
+    data[10:11] = b"9"
+    columns = decodeNmeaBuffer(np.frombuffer(bytes(data), dtype=np.uint8))
+    assert len(columns["gga"]["time"]) == 1
+    assert len(columns["rmc"]["time"]) == 2
+
+
+def test_chunksAndProcesses(tmp_path):
+    fileName = tmp_path / "nmea.log"
+    fileName.write_bytes(logData(200))
+    log = QuectelNmeaLog(str(fileName))
+    whole = log.decode()
+    chunked = log.decode(p_chunkSize=1000)
+    parallel = log.decode(p_processes=2, p_chunkSize=1000)
+    for columns in (chunked, parallel):
+        assert np.array_equal(columns["gga"]["time"], whole["gga"]["time"])
+        assert np.array_equal(columns["rmc"]["course"], whole["rmc"]["course"])
+    assert len(whole["gga"]["time"]) == 200
+
+
+def test_emptyFile(tmp_path):
+    fileName = tmp_path / "empty.log"
+    fileName.write_bytes(b"")
+    assert len(QuectelNmeaLog(str(fileName)).decode()["rmc"]["time"]) == 0
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import datetime
+from functools import reduce
+import pytest
+from quectelatcommands.quectelNmeaReader import (
+    NmeaGga,
+    NmeaGsv,
+    NmeaRmc,
+    QuectelNmeaReader,
+    nmeaChecksumValid,
+    nmeaDegrees,
+    nmeaTime,
+    parseNmeaSentence,
+)
+
+GGA = "GPGGA,123519.00,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,"
+RMC = "GNRMC,123519.00,A,4807.038,N,01131.000,W,022.4,084.4,230326,,,A"
+
+
+def sentence(p_body: str) -> bytes:
+    checksum = reduce(lambda value, character: value ^ ord(character), p_body, 0)
+    return f"${p_body}*{checksum:02X}".encode()
+
+
+def test_checksum():
+    assert nmeaChecksumValid(sentence(GGA))
+    assert not nmeaChecksumValid(sentence(GGA)[:-1] + b"0")
+    assert not nmeaChecksumValid(b"$GPGGA")
+
+
+def test_fields():
+    assert nmeaTime("123519.50") == pytest.approx(45319.5)
+    assert nmeaTime("") is None
+    assert nmeaDegrees("4807.038", "N") == pytest.approx(48.1173)
+    assert nmeaDegrees("01131.000", "W") == pytest.approx(-11.516667)
+    assert nmeaDegrees("", "N") is None
+
+
+def test_parseGgaAndRmc():
+    gga = parseNmeaSentence(sentence(GGA))
+    assert isinstance(gga, NmeaGga)
+    assert (gga.talker, gga.quality, gga.satellites, gga.altitude) == (
+        "GP",
+        1,
+        8,
+        545.4,
+    )
+    rmc = parseNmeaSentence(sentence(RMC))
+    assert isinstance(rmc, NmeaRmc)
+    assert rmc.valid and rmc.date == datetime.date(2026, 3, 23)
+    assert rmc.longitude == pytest.approx(-11.516667)
+
+
+def test_parseExtendedGsv():
+    gsv = parseNmeaSentence(sentence("GAGSV,1,1,01,301,40,100,45,7"))
+    assert isinstance(gsv, NmeaGsv)
+    assert (gsv.satellites, gsv.signalId) == (((301, 40, 100, 45),), 7)
+
+
+def test_parseUnsupportedOrMalformed():
+    assert parseNmeaSentence(sentence("GPZDA,123519.00,23,03,1994,,")) is None
+    assert parseNmeaSentence(sentence("GPGGA,1")) is None
+
+
+def test_feedSplitSentences():
+    reader = QuectelNmeaReader(p_sentenceTypes=("GGA",))
+    data = b"\r\n".join(
+        [sentence(GGA), sentence(RMC), sentence(GGA)[:-1] + b"0", sentence(GGA)]
+    )
+    data += b"\r\n"
+    records = list(reader.feed(data[:30])) + list(reader.feed(data[30:]))
+    # RMC is not decoded, the sentence with a wrong checksum is counted
+    assert [type(record) for record in records] == [NmeaGga, NmeaGga]
+    assert reader.checksumErrors == 1
+    assert not reader.buffer
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+from functools import reduce
+import pytest
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelNmeaReader import parseNmeaSentence
+from quectelatcommands.quectelNmeaSubscriptions import QuectelNmeaSubscriptions
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+
+
+def sentence(p_body: str) -> bytes:
+    checksum = reduce(lambda value, character: value ^ ord(character), p_body, 0)
+    return f"${p_body}*{checksum:02X}".encode()
+
+
+def rmc(p_time: str):
+    return parseNmeaSentence(
+        sentence(f"GNRMC,{p_time},A,4807.038,N,01131.000,W,1.5,84.4,230326,,,A")
+    )
+
+
+@pytest.fixture
+def gnss(simulator: QuectelSimulatedSerial):
+    client = QuectelGnssATCommands("simulator")
+    client.open(simulator)
+    yield client
+    client.close()
+
+
+def test_configurationIsTheUnion(gnss):
+    subscriptions = QuectelNmeaSubscriptions(gnss, p_autoApply=False)
+    subscriptions.subscribe(("RMC",), p_rate=2)
+    subscriptions.subscribe(("GGA", "GSV"), p_constellations=("gps", "galileo"))
+    assert subscriptions.configuration() == {
+        "gpsnmeatype": 1 | 2 | 4,
+        "glonassnmeatype": 0,
+        "galileonmeatype": 1,
+        "beidounmeatype": 0,
+        "fixfreq": 2,
+    }
+    assert subscriptions.sentenceTypes() == ("GGA", "GSV", "RMC")
+
+    # The frequency serves the fastest consumer
+    subscriptions.subscribe(("VTG",), p_rate=3)
+    assert subscriptions.configuration()["fixfreq"] == 5
+
+
+def test_subscribeRejectsInvalidRequests(gnss):
+    subscriptions = QuectelNmeaSubscriptions(gnss, p_autoApply=False)
+    with pytest.raises(ValueError):
+        subscriptions.subscribe(("ZDA",))
+    with pytest.raises(ValueError):
+        subscriptions.subscribe(("GSV",), p_constellations=("navic",))
+    with pytest.raises(ValueError):
+        subscriptions.subscribe(("RMC",), p_rate=0)
+    assert not subscriptions.subscriptions
+
+
+def test_applyWritesOnlyChanges(simulator, gnss):
+    subscriptions = QuectelNmeaSubscriptions(gnss)
+    token = subscriptions.subscribe(("RMC",), p_rate=2)
+    assert simulator.settings['+QGPSCFG="gpsnmeatype"'] == "2"
+    assert simulator.settings['+QGPSCFG="fixfreq"'] == "2"
+
+    subscriptions.subscribe(("GSV",), p_constellations=("galileo",))
+    subscriptions.unsubscribe(token)
+    assert subscriptions.applied["fixfreq"] == 1
+    assert simulator.settings['+QGPSCFG="galileonmeatype"'] == "1"
+    # Nothing changed since the last apply
+    assert subscriptions.apply() == (True, [])
+
+
+def test_dispatchAtTheRateOfEachConsumer(gnss):
+    subscriptions = QuectelNmeaSubscriptions(gnss, p_autoApply=False)
+    fast: list = []
+    slow: list = []
+    subscriptions.subscribe(("RMC",), p_rate=2, p_handler=fast.append)
+    subscriptions.subscribe(("RMC",), p_rate=0.5, p_handler=slow.append)
+    subscriptions.applied["fixfreq"] = 2
+    times = ["235958.00", "235958.50", "235959.00", "235959.50", "000000.00"]
+    for time in times:
+        subscriptions.dispatch(rmc(time))
+
+    assert len(fast) == 5
+    # Every 2 seconds, across midnight
+    assert [record.time for record in slow] == [86398.0, 0.0]
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+from quectelatcommands.quectelPacketCounter import (
+    COUNTER_MODULO,
+    counterDelta,
+    parsePacketCounter,
+)
+
+
+def test_counterDeltaIncreasing():
+    assert counterDelta(100, 250) == 150
+    assert counterDelta(7, 7) == 0
+
+
+def test_counterDeltaWrap():
+    assert counterDelta(COUNTER_MODULO - 10, 5) == 15
+    assert counterDelta(250, 4, 256) == 10
+
+
+def test_counterDeltaReset():
+    # Going backwards from the lower half of the range is a reset, counting from 0
+    assert counterDelta(1000, 40) == 40
+    assert counterDelta(100, 4, 256) == 4
+
+
+def test_parsePacketCounter():
+    assert parsePacketCounter(["+QGDCNT: 1234,56789", "OK"]) == (1234, 56789)
+    assert parsePacketCounter(["OK"]) is None
+    assert parsePacketCounter(["+QGDCNT: -1,2", "OK"]) is None
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import pytest
+from quectelatcommands.quectelPhonebook import (
+    PHONEBOOK_ADDED,
+    PHONEBOOK_DELETED,
+    PHONEBOOK_MODIFIED,
+    TYPE_INTERNATIONAL,
+    QuectelPhonebook,
+    normalizeNumber,
+)
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+
+
+@pytest.fixture
+def executed(simulator: QuectelSimulatedSerial) -> list[str]:
+    """
+    Record the command lines executed by the simulator.
+    """
+    lines: list[str] = []
+    execute = simulator.execute
+
+    def recordingExecute(p_line: str) -> list[str]:
+        lines.append(p_line)
+        return execute(p_line)
+
+    simulator.execute = recordingExecute
+    return lines
+
+
+@pytest.fixture
+def filled(simulator: QuectelSimulatedSerial) -> QuectelSimulatedSerial:
+    simulator.phonebooks["SM"] = {
+        1: ("+491511234567", 145, "John Smith"),
+        2: ("0301234567", 129, "Joan Miller"),
+        60: ("+49 151 1234567", 145, "Office"),
+    }
+    return simulator
+
+
+def test_normalizeNumber():
+    assert normalizeNumber("+49 (151) 123-4567") == "491511234567"
+    assert normalizeNumber("*100#") == "*100#"
+
+
+def test_loadStopsOnceTheUsedEntriesAreRead(filled, modem, executed):
+    phonebook = QuectelPhonebook(modem, p_chunkSize=50)
+    assert phonebook.load()[0]
+    assert (len(phonebook), phonebook.used, phonebook.total) == (3, 3, 250)
+    # 2 ranges of the 5 of the storage
+    assert [line for line in executed if line.startswith("AT+CPBR")] == [
+        "AT+CPBR=1,50",
+        "AT+CPBR=51,100",
+    ]
+
+
+def test_findNameAndNumber(filled, modem):
+    phonebook = QuectelPhonebook(modem)
+    assert phonebook.load()[0]
+    assert [entry.index for entry in phonebook.findName("JO")] == [1, 2]
+    assert [entry.index for entry in phonebook.findName("smi")] == [1]
+    assert [entry.index for entry in phonebook.findName("john  s")] == [1]
+    assert phonebook.findName("x") == []
+    assert [entry.index for entry in phonebook.findNumber("+491511234567")] == [1, 60]
+
+
+def test_writeBeforeLoad(filled, modem):
+    phonebook = QuectelPhonebook(modem)
+    # The storage is loaded first to find the first free location
+    assert phonebook.write("+33 1 23 45 67 89", "Paris")[0]
+    entry = phonebook.get(3)
+    assert entry.type == TYPE_INTERNATIONAL and entry.text == "Paris"
+    assert filled.phonebooks["SM"][3] == ("+33 1 23 45 67 89", 145, "Paris")
+    assert phonebook.findName("par") == [entry]
+
+
+def test_changesSince(filled, modem):
+    phonebook = QuectelPhonebook(modem)
+    assert phonebook.load()[0]
+    version = phonebook.version
+
+    assert phonebook.write("0301234567", "Joan Smith", p_index=2)[0]
+    assert phonebook.delete(60)[0]
+    assert [entry.index for entry in phonebook.findName("smi")] == [1, 2]
+    assert phonebook.findNumber("+491511234567") == [phonebook.get(1)]
+    changes = phonebook.changesSince(version)
+    assert [(change.index, change.kind) for change in changes] == [
+        (2, PHONEBOOK_MODIFIED),
+        (60, PHONEBOOK_DELETED),
+    ]
+
+    # An entry added on the module is found by the next load
+    filled.phonebooks["SM"][4] = ("112", 129, "Emergency")
+    version = phonebook.version
+    assert phonebook.load()[0]
+    assert [
+        (change.index, change.kind) for change in phonebook.changesSince(version)
+    ] == [(4, PHONEBOOK_ADDED)]
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+from quectelatcommands.quectelPortDiscovery import (
+    PORT_AT,
+    PORT_DM,
+    PORT_NMEA,
+    PORT_PPP,
+    PORT_SILENT,
+    QuectelPortDiscovery,
+)
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+
+DEVICES = ["/dev/ttyUSB0", "/dev/ttyUSB1", "/dev/ttyUSB2", "/dev/ttyUSB3"]
+
+
+def _module() -> dict:
+    kinds = dict(zip(DEVICES, (PORT_DM, PORT_SILENT, PORT_AT, PORT_AT)))
+    return QuectelPortDiscovery()._createModule("1-1", DEVICES, kinds)
+
+
+def test_roles():
+    module = _module()
+    assert module["dmPort"] == "/dev/ttyUSB0"
+    assert module["nmeaPort"] == "/dev/ttyUSB1"
+    assert module["atPort"] == "/dev/ttyUSB2"
+    assert module["pppPort"] == "/dev/ttyUSB3"
+    assert module["ports"]["/dev/ttyUSB1"] == PORT_NMEA
+    assert module["ports"]["/dev/ttyUSB3"] == PORT_PPP
+
+
+def test_clientsShareTheAtPort():
+    module = _module()
+    modem, gnss = module["modem"], module["gnss"]
+    assert gnss.serialPort is modem.serialPort
+
+    simulator = QuectelSimulatedSerial(50.0, 1)
+    modem.open(simulator)
+    gnss.open(simulator)
+    try:
+        assert modem.sendCommand("AT+CSQ")[0]
+        assert gnss.sendCommand("AT+QGPS?")[1][0].startswith("+QGPS:")
+        gnss.close()
+        # Still open for the modem client
+        assert modem.sendCommand("AT+CSQ")[1][0].startswith("+CSQ:")
+    finally:
+        modem.close()
+    assert modem.serialPort.openCount == 0
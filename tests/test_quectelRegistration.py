@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+from quectelatcommands.quectelRegistration import (
+    STAT_ROAMING,
+    STAT_SEARCHING,
+    parseRegistration,
+)
+
+
+def test_parseUrc():
+    registration = parseRegistration('+CREG: 1,"1A2B","01C3D4E5",7')
+    assert registration == (1, "1A2B", "01C3D4E5", 7)
+    assert registration.registered
+
+
+def test_parseReadResponse():
+    registration = parseRegistration('+CEREG: 2,5,"1A2B","01C3D4E5",9')
+    assert registration == (STAT_ROAMING, "1A2B", "01C3D4E5", 9)
+    assert registration.registered
+
+
+def test_parseWithoutLocation():
+    assert parseRegistration("+CGREG: 0,2") == (STAT_SEARCHING, None, None, None)
+    assert parseRegistration("+CREG: 2") == (STAT_SEARCHING, None, None, None)
+    assert not parseRegistration("+CREG: 2").registered
+
+
+def test_parseMalformed():
+    assert parseRegistration("+CREG: x") is None
+    assert parseRegistration("+CREG:") is None
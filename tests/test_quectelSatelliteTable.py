@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+from functools import reduce
+from quectelatcommands.quectelNmeaReader import parseNmeaSentence
+from quectelatcommands.quectelSatelliteTable import (
+    CONSTELLATION_GLONASS,
+    CONSTELLATION_GPS,
+    QuectelSatelliteTable,
+)
+
+
+def records(p_bodies: list[str]) -> list:
+    """
+    Parse sentences given without ``$`` and checksum.
+    """
+    sentences = []
+    for body in p_bodies:
+        checksum = reduce(lambda value, character: value ^ ord(character), body, 0)
+        sentences.append(parseNmeaSentence(f"${body}*{checksum:02X}".encode()))
+    return sentences
+
+
+def epoch(p_time: str, p_gsaSystemIds: tuple[str, str]) -> list[str]:
+    gpsSystemId, glonassSystemId = p_gsaSystemIds
+    return [
+        f"GPGGA,{p_time},4807.038,N,01131.000,E,1,05,0.9,545.4,M,46.9,M,,",
+        f"GNGSA,A,3,01,02,03,,,,,,,,,,1.5,0.9,1.2{gpsSystemId}",
+        f"GNGSA,A,3,65,66,,,,,,,,,,,1.5,0.9,1.2{glonassSystemId}",
+        "GPGSV,1,1,03,01,40,100,45,02,30,200,40,03,20,300,35",
+        "GLGSV,1,1,02,65,50,050,42,66,10,010,30",
+    ]
+
+
+def test_nmea40GnGsaEpochs():
+    # NMEA 4.0: the GN GSA sentences have no system ID
+    table = QuectelSatelliteTable()
+    snapshots = list(
+        table.epochs(
+            records(epoch("120000.00", ("", "")) + epoch("120001.00", ("", "")))
+        )
+    )
+    assert [snapshot["time"] for snapshot in snapshots] == [43200.0, 43201.0]
+    for snapshot in snapshots:
+        assert snapshot["count"] == 5
+        assert list(snapshot["used"]) == [1] * 5
+        assert (
+            list(snapshot["constellation"])
+            == [CONSTELLATION_GPS] * 3 + [CONSTELLATION_GLONASS] * 2
+        )
+
+
+def test_nmea41GsaEpochs():
+    table = QuectelSatelliteTable()
+    sentences = epoch("120000.00", (",1", ",2")) + epoch("120001.00", (",1", ",2"))
+    assert len(list(table.epochs(records(sentences)))) == 2
+
+
+def test_capacity():
+    table = QuectelSatelliteTable(p_capacity=4)
+    (snapshot,) = table.epochs(records(epoch("120000.00", ("", ""))))
+    assert snapshot["count"] == 4
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+import pytest
+from quectelatcommands.quectelSerial import QuectelSerial
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+
+
+@pytest.fixture
+def serialPort(simulator: QuectelSimulatedSerial):
+    port = QuectelSerial("simulator", 115200, 1, p_freshnessWindow=60.0)
+    port.open(simulator)
+    yield port
+    port.close()
+
+
+@pytest.fixture
+def executed(simulator: QuectelSimulatedSerial) -> list[str]:
+    """
+    Record the command lines executed by the simulator.
+    """
+    lines: list[str] = []
+    execute = simulator.execute
+
+    def recordingExecute(p_line: str) -> list[str]:
+        lines.append(p_line)
+        return execute(p_line)
+
+    simulator.execute = recordingExecute
+    return lines
+
+
+def test_concurrentReadsAreSentOnce(simulator, serialPort, executed):
+    csq = simulator.handlers["+CSQ"]
+
+    def slowCsq(p_name: str, p_parameters: str) -> list[str]:
+        time.sleep(0.2)
+        return csq(p_name, p_parameters)
+
+    simulator.handlers["+CSQ"] = slowCsq
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(serialPort.sendCommand("AT+CSQ"))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8 and all(status for status, _ in results)
+    assert len({tuple(response) for _, response in results}) == 1
+    assert executed.count("AT+CSQ") == 1
+
+
+def test_freshResponseIsGivenAgain(serialPort, executed):
+    assert serialPort.sendCommand("AT+CMEE?") == serialPort.sendCommand("AT+CMEE?")
+    assert executed == ["AT+CMEE?"]
+
+
+def test_writeForgetsRecentResponses(serialPort, executed):
+    assert serialPort.sendCommand("AT+CMEE=1")[0]
+    assert serialPort.sendCommand("AT+CMEE?")[1][0] == "+CMEE: 1"
+    assert serialPort.sendCommand("AT+CMEE=2")[0]
+    assert serialPort.sendCommand("AT+CMEE?")[1][0] == "+CMEE: 2"
+    assert executed.count("AT+CMEE?") == 2
+
+
+def test_writesAreNeverCoalesced(serialPort, executed):
+    for _ in range(2):
+        assert serialPort.sendCommand("AT+CMEE=1")[0]
+    assert executed == ["AT+CMEE=1", "AT+CMEE=1"]
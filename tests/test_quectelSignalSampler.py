@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import math
+import time
+from quectelatcommands.quectelSignalSampler import (
+    SOURCE_POLL,
+    QuectelSignalSampler,
+    SignalRing,
+    SignalSample,
+    rssiDbm,
+)
+
+
+def test_rssiDbm():
+    assert rssiDbm(0) == -113
+    assert rssiDbm(31) == -51
+    assert math.isnan(rssiDbm(99))
+
+
+def test_ringKeepsNewest():
+    ring = SignalRing(3)
+    for second in range(5):
+        ring.append(
+            SignalSample(float(second), -80.0 - second, 0.0, -100.0, -10.0, 5.0, 0)
+        )
+    assert len(ring) == 3
+    assert [sample.time for sample in ring.samples()] == [2.0, 3.0, 4.0]
+    assert ring.stats("rssi").minimum == -84.0
+
+
+def test_failedPollsBackOff(modem, simulator):
+    with QuectelSignalSampler(modem, p_minInterval=0.05, p_maxInterval=0.2) as sampler:
+        assert sampler.urcs
+        assert sampler.latest().source == SOURCE_POLL
+        simulator.handlers["+CSQ"] = lambda p_name, p_parameters: ["ERROR"]
+        time.sleep(1.0)
+    # One retry per interval at most, instead of polling without waiting
+    assert 1 <= sampler.statistics["failures"] <= 25
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+from quectelatcommands.quectelSmsInbox import QuectelSmsInbox
+from quectelatcommands.quectelSmsPdu import encodeDeliver
+
+
+def test_inboxReceivesAndDeletesOnlyQueued(modem, simulator, storedIndexes):
+    simulator.receiveSms(encodeDeliver("+33600000000", "read elsewhere"))
+    assert modem.readSms(0).message.text == "read elsewhere"
+
+    with QuectelSmsInbox(modem, p_deleteBatch=1) as inbox:
+        simulator.receiveSms(encodeDeliver("+33611111111", "hello"))
+        message = inbox.get(10)
+        assert (message.address, message.text) == ("+33611111111", "hello")
+
+        parts = encodeDeliver("+33622222222", "long " * 80)
+        simulator.receiveSms(parts[:1])
+        simulator.receiveSms(parts[1:])
+        message = inbox.get(10)
+        assert message.text == "long " * 80
+        assert message.complete
+
+        # Every queued part is deleted, the message read by another consumer is kept
+        for _ in range(50):
+            if storedIndexes() == [0]:
+                break
+            inbox.get(0.1)
+        assert storedIndexes() == [0]
+    assert inbox.statistics["received"] == 2
+
+
+def test_inboxRestoresSettings(modem, simulator):
+    assert modem.shortMessageServiceCommands902MessageFormatWrite(1)[0]
+    assert modem.sendCommand("AT+CNMI=1,0,0,0,0")[0]
+    assert modem.statusControlCommands40400ControlUrcIndication("smsfull", 0, 0)[0]
+
+    with QuectelSmsInbox(modem):
+        assert simulator.settings["+CMGF"] == "0"
+        assert simulator.settings["+CNMI"] == "2,1,0,1,0"
+    assert simulator.settings["+CMGF"] == "1"
+    assert simulator.settings["+CNMI"] == "1,0,0,0,0"
+    assert simulator.settings['+QINDCFG="smsfull"'].startswith("0")
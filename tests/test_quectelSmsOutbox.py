@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+from quectelatcommands.quectelSmsOutbox import (
+    SMS_DELIVERED,
+    SMS_FAILED,
+    QuectelSmsOutbox,
+)
+
+
+def test_outboxDeliversWithStatusReports(modem, simulator):
+    assert modem.shortMessageServiceCommands902MessageFormatWrite(1)[0]
+    with QuectelSmsOutbox(
+        modem, p_keepLink=1, p_backoff=2.0, p_timeScale=simulator.speed
+    ) as outbox:
+        ids = outbox.enqueueMany(
+            ["+4915100000001", "+4915100000002"], "Test message, please ignore"
+        )
+        longId = outbox.enqueue("+4915100000003", "x" * 300)
+        report = outbox.run()
+        assert (report["sent"], report["failed"]) == (3, 0)
+        assert outbox.waitForReports(10.0)
+
+        for messageId in ids + [longId]:
+            assert outbox.delivery(messageId).state == SMS_DELIVERED
+        assert len(outbox.delivery(longId).references) == 2
+        # The encoded parts are dropped once sent
+        assert not outbox.pdus and not outbox.partsSent and not outbox.nextAttempt
+    # The text mode selected before the outbox is selected again on close
+    assert simulator.settings["+CMGF"] == "1"
+
+
+def test_outboxFailsAfterMaxAttempts(simulator, modem):
+    simulator.smsFailureRate = 1.0
+    with QuectelSmsOutbox(
+        modem, p_maxAttempts=2, p_backoff=1.0, p_timeScale=simulator.speed
+    ) as outbox:
+        messageId = outbox.enqueue("+4915100000001", "never sent")
+        report = outbox.run()
+        assert report["failed"] == 1
+        delivery = outbox.delivery(messageId)
+        assert (delivery.state, delivery.attempts) == (SMS_FAILED, 2)
+
+
+def test_outboxForgetsOldestFinalStates(modem, simulator):
+    with QuectelSmsOutbox(
+        modem, p_timeScale=simulator.speed, p_maxDeliveries=2
+    ) as outbox:
+        ids = outbox.enqueueMany(
+            [f"+491510000000{index}" for index in range(3)], "Test message"
+        )
+        outbox.run()
+        assert outbox.waitForReports(10.0)
+        assert len(outbox.deliveries) == 2
+        assert sum(outbox.delivery(messageId) is None for messageId in ids) == 1
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+from datetime import datetime, timedelta, timezone
+from quectelatcommands.quectelSmsPdu import (
+    ENCODING_GSM7,
+    ENCODING_UCS2,
+    GSM7_ESCAPE,
+    SMS_DELIVER,
+    SMS_STATUS_REPORT,
+    decodePdu,
+    encodeDeliver,
+    encodeSubmit,
+    gsm7Encode,
+    parseListPdu,
+    splitUserData,
+)
+
+# SMS-DELIVER "How are you?" from +31641600986 through the service centre +31624000000
+DELIVER_PDU = (
+    "07911326040000F0040B911346610089F60000208062917314080CC8F71D14969741F977FD07"
+)
+# SMS-STATUS-REPORT of the message reference 13 sent to +31628870634, delivered
+STATUS_REPORT_PDU = "07911326040000F0060D0B911326880736F4111011719551401110117195714000"
+
+
+def test_decodeDeliver():
+    message = decodePdu(DELIVER_PDU)
+    assert message.type == SMS_DELIVER
+    assert message.smsc == "+31624000000"
+    assert message.address == "+31641600986"
+    assert message.text == "How are you?"
+    assert message.concatenation is None
+    # Time zone 0x08: sign bit set, 0 quarters of an hour
+    assert message.timestamp == datetime(2002, 8, 26, 19, 37, 41, tzinfo=timezone.utc)
+
+
+def test_decodeStatusReport():
+    report = decodePdu(STATUS_REPORT_PDU)
+    assert report.type == SMS_STATUS_REPORT
+    assert report.reference == 13
+    assert report.address == "+31628870634"
+    assert report.status == 0
+    zone = timezone(timedelta(hours=1))
+    assert report.timestamp == datetime(2011, 1, 11, 17, 59, 15, tzinfo=zone)
+    assert report.dischargeTime == datetime(2011, 1, 11, 17, 59, 17, tzinfo=zone)
+
+
+def test_deliverRoundTrip():
+    (pdu,) = encodeDeliver("+4915123456789", "Grüße {1} €")
+    message = decodePdu(pdu)
+    assert message.address == "+4915123456789"
+    assert message.text == "Grüße {1} €"
+
+
+def test_gsm7EscapeNotSplit():
+    # The escape of "€" would be the last septet of the first part
+    text = "a" * 152 + "€" + "b" * 20
+    septets = gsm7Encode(text)
+    parts = splitUserData(septets, ENCODING_GSM7)
+    assert len(parts) == 2
+    assert parts[0][-1] != GSM7_ESCAPE
+    assert b"".join(parts) == septets
+
+    texts = [decodePdu(pdu).text for _, pdu in encodeSubmit("+33612345678", text)]
+    assert texts[1].startswith("€")
+    assert "".join(texts) == text
+
+
+def test_ucs2SurrogatePairNotSplit():
+    # The high surrogate of the emoji would be the last code unit of the first part
+    text = "a" * 66 + "\U0001F600" + "b" * 10
+    data = text.encode("utf-16-be")
+    parts = splitUserData(data, ENCODING_UCS2)
+    assert len(parts) == 2
+    assert not 0xD8 <= parts[0][-2] <= 0xDB
+    assert b"".join(parts) == data
+
+    texts = [decodePdu(pdu).text for _, pdu in encodeSubmit("+33612345678", text)]
+    assert texts == ["a" * 66, "\U0001F600" + "b" * 10]
+
+
+def test_concatenatedSubmit():
+    pdus = encodeSubmit("+33612345678", "x" * 400, p_concatenationReference=42)
+    messages = [decodePdu(pdu) for _, pdu in pdus]
+    assert [message.concatenation for message in messages] == [
+        (42, 3, 1),
+        (42, 3, 2),
+        (42, 3, 3),
+    ]
+    assert "".join(message.text for message in messages) == "x" * 400
+
+
+def test_parseListPdu():
+    entries = parseListPdu(
+        [f"+CMGL: 3,1,,{(len(DELIVER_PDU) - 16) // 2}", DELIVER_PDU, "OK"]
+    )
+    assert len(entries) == 1
+    assert entries[0].index == 3
+    assert entries[0].stat == 1
+    assert entries[0].message.text == "How are you?"
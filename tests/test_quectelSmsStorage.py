@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+from quectelatcommands.quectelSmsPdu import encodeDeliver
+from quectelatcommands.quectelSmsStorage import QuectelSmsStorage
+
+
+def test_storageArchivesAndMigrates(modem, simulator, storedIndexes):
+    storage = QuectelSmsStorage(modem)
+    try:
+        assert storage.refresh()[0]
+        simulator.receiveSms(encodeDeliver("+33611111111", "first"))
+        simulator.receiveSms(encodeDeliver("+33622222222", "second " * 30))
+        assert modem.listSms()[0]
+
+        status, archived = storage.archive()
+        assert (status, archived) == (True, 3)
+        assert storedIndexes() == []
+        texts = {message.text for message in storage.archivedMessages()}
+        assert "first" in texts
+        assert storage.archivedMessages("+33622222222")[0].total == 2
+
+        # Archiving twice keeps one row per message
+        simulator.receiveSms(encodeDeliver("+33633333333", "third"))
+        modem.listSms()
+        assert storage.archive(p_delete=False) == (True, 1)
+        assert storage.archive() == (True, 1)
+        assert len(storage.archivedMessages()) == 4
+
+        simulator.receiveSms(encodeDeliver("+33644444444", "moved"))
+        memories = list(storage.memories)
+        status, moved = storage.migrate(memories[0], "ME")
+        assert (status, moved) == (True, 1)
+        assert storage.memories == memories
+        assert storage.storageUsage("ME").used == 1
+    finally:
+        storage.close()
+
+
+def test_archiveKeepsMessageFormat(modem, simulator):
+    assert modem.shortMessageServiceCommands902MessageFormatWrite(1)[0]
+    simulator.receiveSms(encodeDeliver("+33611111111", "first"))
+    storage = QuectelSmsStorage(modem)
+    try:
+        assert storage.archive() == (True, 1)
+    finally:
+        storage.close()
+    assert simulator.settings["+CMGF"] == "1"
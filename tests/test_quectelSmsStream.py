@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+from quectelatcommands.quectelSmsPdu import encodeDeliver
+from quectelatcommands.quectelSmsStream import (
+    QuectelSmsReassembler,
+    SmsPart,
+    iterSmsParts,
+    streamSms,
+)
+
+
+def _listing(p_pdus: list[str], p_first: int = 0) -> list[str]:
+    lines = []
+    for index, pdu in enumerate(p_pdus, p_first):
+        lines += [f"+CMGL: {index},0,,{len(pdu) // 2 - 1}", pdu]
+    return lines + ["OK"]
+
+
+def _part(p_reference, p_total, p_sequence, p_text, p_address="+1") -> SmsPart:
+    return SmsPart(
+        p_sequence, 0, p_address, None, p_reference, p_total, p_sequence, p_text, b""
+    )
+
+
+def test_iterSmsPartsPduMode():
+    pdus = encodeDeliver("+33611111111", "y" * 200, p_concatenationReference=7)
+    parts = list(iterSmsParts(_listing(pdus, 4)))
+    assert [part.index for part in parts] == [4, 5]
+    assert [(part.reference, part.total, part.sequence) for part in parts] == [
+        (7, 2, 1),
+        (7, 2, 2),
+    ]
+    assert parts[0].address == "+33611111111"
+
+
+def test_iterSmsPartsIsLazy():
+    def lines():
+        yield from _listing(encodeDeliver("+1", "first"))[:2]
+        raise AssertionError("read past the first message")
+
+    assert next(iterSmsParts(lines())).text == "first"
+
+
+def test_iterSmsPartsTextMode():
+    lines = [
+        '+CMGL: 1,"REC UNREAD","+33611111111",,"26/10/19,12:34:56+08"',
+        "first line",
+        "second line",
+        '+CMGL: 2,"REC READ","+33622222222",,"26/10/19,12:35:00+08"',
+        "other",
+        "OK",
+    ]
+    parts = list(iterSmsParts(lines))
+    assert [(part.index, part.stat, part.text) for part in parts] == [
+        (1, 0, "first line\nsecond line"),
+        (2, 1, "other"),
+    ]
+    assert parts[0].timestamp.utcoffset().total_seconds() == 2 * 3600
+
+
+def test_iterSmsPartsSkipsMalformed():
+    lines = ["+CMGL: 0,0,,12", "00ZZ", *_listing(encodeDeliver("+1", "ok"), 1)]
+    assert [part.text for part in iterSmsParts(lines)] == ["ok"]
+
+
+def test_streamSmsReassembles():
+    pdus = encodeDeliver("+33611111111", "z" * 400, p_concatenationReference=9)
+    single = encodeDeliver("+33622222222", "single")
+    # Parts out of order, interleaved with another message
+    lines = _listing([pdus[2], single[0], pdus[0], pdus[1]])
+    messages = list(streamSms(lines))
+    assert [message.text for message in messages] == ["single", "z" * 400]
+    assert messages[1].indexes == (2, 3, 0)
+    assert messages[1].complete
+
+
+def test_reassemblerEvictsOldest():
+    reassembler = QuectelSmsReassembler(p_maxPending=1)
+    assert reassembler.add(_part(1, 2, 1, "a")) == []
+    (evicted,) = reassembler.add(_part(2, 2, 1, "b"))
+    assert (evicted.text, evicted.complete) == ("a", False)
+    (message,) = reassembler.add(_part(2, 2, 2, "c"))
+    assert (message.text, message.complete) == ("bc", True)
+    assert reassembler.flush() == []
+
+
+def test_reassemblerKeysByAddress():
+    reassembler = QuectelSmsReassembler()
+    assert reassembler.add(_part(1, 2, 1, "a", "+1")) == []
+    assert reassembler.add(_part(1, 2, 2, "b", "+2")) == []
+    flushed = reassembler.flush()
+    assert sorted(message.address for message in flushed) == ["+1", "+2"]
+    assert not any(message.complete for message in flushed)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import pytest
+from quectelatcommands.quectelModemATCommands import QuectelModemATCommands
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+from quectelatcommands.quectelSnapshot import (
+    loadSnapshot,
+    parseConfiguration,
+    restoreCommands,
+    restoreSnapshot,
+    saveSnapshot,
+    takeSnapshot,
+)
+
+
+@pytest.fixture
+def commandLines(simulator: QuectelSimulatedSerial) -> list[str]:
+    """
+    Record the command lines received by the simulator.
+    """
+    lines: list[str] = []
+    execute = simulator.execute
+
+    def recordingExecute(p_line: str) -> list[str]:
+        lines.append(p_line)
+        return execute(p_line)
+
+    simulator.execute = recordingExecute
+    return lines
+
+
+@pytest.fixture
+def snapshot(modem: QuectelModemATCommands) -> dict:
+    for command in ("AT+CMEE=2", "AT+CMGF=1", "AT+CNMI=2,1,0,1,0"):
+        assert modem.sendCommand(command)[0]
+    return takeSnapshot(modem, ["AT&V"])
+
+
+def test_parseConfiguration():
+    assert parseConfiguration(["&C: 1; &D: 2", "S0: 0", "garbage"]) == {
+        "&C": "1",
+        "&D": "2",
+        "S0": "0",
+    }
+
+
+def test_restoreCommands():
+    reads = {
+        "AT+CMEE?": ["+CMEE: 2", "OK"],
+        "AT+CPMS?": ['+CPMS: "SM",3,50,"ME",0,100,"SM",3,50', "OK"],
+        "AT+CGDCONT?": ['+CGDCONT: 1,"IP","internet"', '+CGDCONT: 2,"IP","ims"', "OK"],
+        "AT+CFUN?": ["+CFUN: 1", "OK"],
+        "AT&V": ["&C: 1", "&D: 2", "E: 1", "OK"],
+    }
+    assert restoreCommands({"reads": reads}) == [
+        "AT+CMEE=2",
+        'AT+CPMS="SM","ME","SM"',
+        'AT+CGDCONT=1,"IP","internet"',
+        'AT+CGDCONT=2,"IP","ims"',
+        "AT&C1&D2",
+    ]
+
+
+def test_saveAndLoad(snapshot: dict, tmp_path):
+    fileName = str(tmp_path / "snapshot.json.gz")
+    saveSnapshot(snapshot, fileName)
+    assert loadSnapshot(fileName) == snapshot
+
+
+def test_restoreWritesOnlyChangedSettingsInOneLine(
+    modem: QuectelModemATCommands, snapshot: dict, commandLines: list[str]
+):
+    for command in ("AT+CMEE=0", "AT+CMGF=0", "AT+CNMI=0,0,0,0,0"):
+        assert modem.sendCommand(command)[0]
+    del commandLines[:]
+
+    status, report = restoreSnapshot(modem, snapshot)
+    assert status and all(line.endswith(" OK") for line in report)
+    # One batch of reads, then one line of the three writes
+    assert len(commandLines) == 2
+    assert commandLines[1] == "AT+CMEE=2;+CMGF=1;+CNMI=2,1,0,1,0"
+
+    del commandLines[:]
+    assert restoreSnapshot(modem, snapshot)[0]
+    assert len(commandLines) == 1
+
+
+def test_restoreFailedWriteInLine(
+    modem: QuectelModemATCommands,
+    simulator: QuectelSimulatedSerial,
+    snapshot: dict,
+    commandLines: list[str],
+):
+    for command in ("AT+CMEE=0", "AT+CMGF=0", "AT+CNMI=0,0,0,0,0"):
+        assert modem.sendCommand(command)[0]
+    simulator.handlers["+CMGF"] = lambda p_name, p_parameters: (
+        [f"+CMGF: {simulator.settings['+CMGF']}"] if p_parameters == "?" else ["ERROR"]
+    )
+    del commandLines[:]
+
+    status, report = restoreSnapshot(modem, snapshot)
+    assert not status
+    assert "AT+CMEE=2 OK" in report
+    assert "AT+CMGF=1 ERROR" in report
+    assert "AT+CNMI=2,1,0,1,0 OK" in report
+    # The write before the failed one is not sent again, the one after it is
+    writes = [line for line in commandLines if "?" not in line and line != "AT&V"]
+    assert writes == ["AT+CMEE=2;+CMGF=1;+CNMI=2,1,0,1,0", "AT+CNMI=2,1,0,1,0"]
+    assert simulator.settings["+CNMI"] == "2,1,0,1,0"
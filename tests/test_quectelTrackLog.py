@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import datetime
+import io
+import json
+import os
+import pytest
+from quectelatcommands.quectelGnssPosition import GnssPosition
+from quectelatcommands.quectelTrackLog import (
+    QuectelTrackReader,
+    QuectelTrackWriter,
+    TrackRecord,
+    positionTime,
+)
+
+START = 1774224000.0  # 2026-03-23T00:00:00Z
+
+
+def record(p_index: int) -> TrackRecord:
+    return TrackRecord(
+        START + p_index, 48.0 + p_index / 1000, 11.0, 500.0, 36.0, 0.5, 8, 3
+    )
+
+
+def writeTrack(p_directory: str, p_count: int, **p_options) -> None:
+    with QuectelTrackWriter(p_directory, **p_options) as writer:
+        for index in range(p_count):
+            writer.appendRecord(record(index))
+
+
+def test_positionTime():
+    position = GnssPosition(
+        3600.5, 48.0, 11.0, 0.9, 500.0, 3, 0.0, 0.0, 0.0, datetime.date(2026, 3, 23), 8
+    )
+    assert positionTime(position) == START + 3600.5
+
+
+def test_segmentsRotate(tmp_path):
+    directory = str(tmp_path / "track")
+    writeTrack(directory, 10, p_segmentRecords=4, p_maxSegments=2)
+    reader = QuectelTrackReader(directory)
+    # Records 8 and 9, after the 2 oldest segments were deleted
+    assert [count for _, count in reader.segments()] == [4, 2]
+    records = list(reader.records())
+    assert records[0] == record(4) and records[-1] == record(9)
+    assert [os.path.basename(fileName) for fileName, _ in reader.segments()] == [
+        "track-00000002.bin",
+        "track-00000003.bin",
+    ]
+
+
+def test_reopenAppendsToTheLastSegment(tmp_path):
+    directory = str(tmp_path / "track")
+    writeTrack(directory, 3, p_segmentRecords=4)
+    with QuectelTrackWriter(directory, p_segmentRecords=4) as writer:
+        writer.appendRecord(record(3))
+        writer.appendRecord(record(4))
+    assert list(QuectelTrackReader(directory).records()) == [
+        record(index) for index in range(5)
+    ]
+
+
+def test_readTimeRange(tmp_path):
+    np = pytest.importorskip("numpy")
+    directory = str(tmp_path / "track")
+    writeTrack(directory, 10, p_segmentRecords=4)
+    reader = QuectelTrackReader(directory)
+    array = reader.read(START + 2, START + 7)
+    assert np.array_equal(array["time"], START + np.arange(2, 7))
+    assert list(array["satellites"]) == [8] * 5
+    records = list(reader.records(START + 2, START + 7))
+    assert np.allclose(array["latitude"], [r.latitude for r in records])
+    assert len(QuectelTrackReader(str(tmp_path / "none")).read()) == 0
+
+
+def test_exports(tmp_path):
+    directory = str(tmp_path / "track")
+    writeTrack(directory, 3)
+    reader = QuectelTrackReader(directory)
+
+    gpx = io.StringIO()
+    assert reader.exportGpx(gpx) == 3
+    assert gpx.getvalue().count("<trkpt") == 3
+    assert "<time>2026-03-23T00:00:01.000Z</time>" in gpx.getvalue()
+
+    geoJson = io.StringIO()
+    assert reader.exportGeoJson(geoJson, p_start=START + 1) == 2
+    feature = json.loads(geoJson.getvalue())
+    assert feature["geometry"]["coordinates"][0] == [11.0, 48.001, 500.0]
+    assert feature["properties"]["coordTimes"] == [
+        "2026-03-23T00:00:01.000Z",
+        "2026-03-23T00:00:02.000Z",
+    ]
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import pytest
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+from quectelatcommands.quectelTtffBenchmark import QuectelTtffBenchmark
+
+# Simulated seconds per real second, a hot start taking a few simulated seconds
+BENCHMARK_SPEED = 500.0
+
+
+@pytest.fixture
+def benchmarkSimulator() -> QuectelSimulatedSerial:
+    return QuectelSimulatedSerial(BENCHMARK_SPEED, 1)
+
+
+@pytest.fixture
+def gnss(benchmarkSimulator: QuectelSimulatedSerial):
+    client = QuectelGnssATCommands("simulator")
+    client.open(benchmarkSimulator)
+    yield client
+    client.close()
+
+
+def benchmark(p_gnss, p_simulator, p_fileName) -> QuectelTtffBenchmark:
+    return QuectelTtffBenchmark(
+        p_gnss,
+        str(p_fileName),
+        p_runs=2,
+        p_pollInterval=0.5,
+        p_timeScale=BENCHMARK_SPEED,
+        p_connection=p_simulator,
+    )
+
+
+def test_configurations():
+    configurations = QuectelTtffBenchmark.configurations((0, 1), (0, 1))
+    assert len(configurations) == 4
+    assert [c["deleteType"] for c in configurations] == [0, 1, 0, 1]
+    assert [c["xtra"] for c in configurations] == [0, 0, 1, 1]
+
+
+def test_summarize():
+    rows = [
+        {"deleteType": 1, "xtra": 1, "ttff": ttff} for ttff in (2.0, 4.0, 3.0, None)
+    ]
+    rows.append({"deleteType": 0, "xtra": 1, "ttff": None, "error": "x"})
+    summary = QuectelTtffBenchmark.summarize(rows)
+    assert summary[0]["start"] == "hot"
+    assert (summary[0]["runs"], summary[0]["fixes"], summary[0]["errors"]) == (4, 3, 0)
+    assert (summary[0]["min"], summary[0]["median"], summary[0]["max"]) == (
+        2.0,
+        3.0,
+        4.0,
+    )
+    assert summary[1]["start"] == "cold"
+    assert (summary[1]["runs"], summary[1]["errors"], summary[1]["median"]) == (
+        0,
+        1,
+        None,
+    )
+
+
+def test_runAppendsResults(benchmarkSimulator, gnss, tmp_path):
+    fileName = tmp_path / "ttff.jsonl"
+    summary = benchmark(gnss, benchmarkSimulator, fileName).run(
+        QuectelTtffBenchmark.configurations((1,), (1,))
+    )
+    assert summary[0]["runs"] == 2 and summary[0]["fixes"] == 2
+    assert len(QuectelTtffBenchmark.loadResults(str(fileName))) == 2
+
+
+def test_unappliedConfigurationIsSkipped(benchmarkSimulator, gnss, tmp_path):
+    fileName = tmp_path / "ttff.jsonl"
+    benchmarkSimulator.handlers["+QGPSXTRA"] = lambda p_name, p_parameters: ["ERROR"]
+    summary = benchmark(gnss, benchmarkSimulator, fileName).run(
+        QuectelTtffBenchmark.configurations((1, 2), (1,))
+    )
+    assert [(entry["runs"], entry["errors"]) for entry in summary] == [(0, 1), (0, 1)]
+    results = QuectelTtffBenchmark.loadResults(str(fileName))
+    assert [result["error"] for result in results] == ["configuration not applied"] * 2
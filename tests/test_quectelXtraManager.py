@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import datetime
+import pytest
+from quectelatcommands.quectelDeviceRegistry import QuectelDeviceRegistry
+from quectelatcommands.quectelGnssATCommands import QuectelGnssATCommands
+from quectelatcommands.quectelSimulator import QuectelSimulatedSerial
+from quectelatcommands.quectelXtraManager import (
+    QuectelXtraManager,
+    parseXtraData,
+    qfuplChecksum,
+)
+
+XTRA_DATA = bytes(range(256)) * 4 + b"\x01"
+
+
+@pytest.fixture
+def gnss(simulator: QuectelSimulatedSerial):
+    client = QuectelGnssATCommands("simulator")
+    client.open(simulator)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def manager(gnss, tmp_path) -> QuectelXtraManager:
+    manager = QuectelXtraManager(
+        gnss,
+        p_cacheDir=str(tmp_path / "xtra"),
+        p_registry=QuectelDeviceRegistry(str(tmp_path / "devices.jsonl")),
+        p_deviceKey="861234567890123",
+        p_urls=(),
+    )
+    manager.store(XTRA_DATA)
+    return manager
+
+
+def test_parseXtraData():
+    expiry = parseXtraData(['+QGPSXTRADATA: 10080,"2024/11/22,01:39:20"', "OK"])
+    assert expiry == datetime.datetime(2024, 11, 29, 1, 39, 20)
+    assert parseXtraData(['+QGPSXTRADATA: 0,"1980/01/05,23:59:48"', "OK"]) is None
+
+
+def test_qfuplChecksum():
+    assert qfuplChecksum(b"\x12\x34\x56\x78") == 0x1234 ^ 0x5678
+    # An odd last byte is padded with 0
+    assert qfuplChecksum(b"\x12\x34\x56") == 0x1234 ^ 0x5600
+
+
+def test_validDataIsKept(simulator, manager):
+    report = manager.ensure()
+    assert report["valid"] and not report["steps"]
+    assert not simulator.files
+
+
+def test_uploadOncePerModuleAndFile(simulator, manager):
+    simulator.xtraValid = False
+    report = manager.ensure()
+    assert report["valid"] and set(report["steps"]) == {"upload", "time", "data"}
+    assert list(simulator.files.values()) == [XTRA_DATA]
+
+    # The module holds the file already
+    simulator.xtraValid = False
+    report = manager.ensure()
+    assert report["valid"] and set(report["steps"]) == {"time", "data"}
+    assert report["skipped"] == ["download", "upload"] and report["saved"] > 0
+
+
+def test_removedFileIsUploadedAgain(simulator, manager):
+    simulator.xtraValid = False
+    assert manager.ensure()["valid"]
+    simulator.files.clear()
+    simulator.xtraValid = False
+    report = manager.ensure()
+    assert report["valid"] and "upload" in report["steps"]
+    assert list(simulator.files.values()) == [XTRA_DATA]